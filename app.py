@@ -2,8 +2,15 @@ from flask import Flask, render_template_string, request, jsonify, redirect
 import sqlite3
 import os
 import hashlib
+import hmac
+import gzip
+import shutil
+import tempfile
 from datetime import datetime, date
+from functools import wraps
 import logging
+from src.models.engine import connect_db
+from src.utils.sync_journal import SyncJournal, aplicar_en_db, aplicar_eventos, get_journal_path
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -13,6 +20,35 @@ app = Flask(__name__)
 
 # Configurar la base de datos para Railway
 DATABASE_PATH = '/tmp/asistencia_qr.db' if os.environ.get('RAILWAY_ENVIRONMENT') else 'database/asistencia_qr.db'
+JOURNAL_NODE_ID = 'railway'
+# Secreto compartido con la app local para los endpoints que reemplazan o borran datos
+API_TOKEN_ENV = 'RAILWAY_API_TOKEN'
+_journal = None
+
+def requiere_token(vista):
+    """
+    Exigir 'Authorization: Bearer <token>' igual a RAILWAY_API_TOKEN.
+    Sin token configurado en el servidor el endpoint queda cerrado.
+    """
+    @wraps(vista)
+    def protegida(*args, **kwargs):
+        esperado = os.environ.get(API_TOKEN_ENV, '')
+        esquema, _, recibido = request.headers.get('Authorization', '').partition(' ')
+        if not esperado or esquema != 'Bearer' or \
+                not hmac.compare_digest(recibido.strip().encode(), esperado.encode()):
+            logger.warning(f"Acceso rechazado a {request.path} desde {request.remote_addr}")
+            return jsonify({'error': 'No autorizado'}), 401
+        return vista(*args, **kwargs)
+    return protegida
+
+def get_journal():
+    """Journal de asistencias de este nodo (se crea al primer uso)"""
+    global _journal
+    if _journal is None:
+        if not os.environ.get('RAILWAY_ENVIRONMENT'):
+            os.makedirs('database', exist_ok=True)
+        _journal = SyncJournal(get_journal_path(DATABASE_PATH), node_id=JOURNAL_NODE_ID)
+    return _journal
 
 def init_database():
     """Inicializar la base de datos con la misma estructura que el servidor QR local"""
@@ -21,7 +57,7 @@ def init_database():
         if not os.environ.get('RAILWAY_ENVIRONMENT'):
             os.makedirs('database', exist_ok=True)
         
-        conn = sqlite3.connect(DATABASE_PATH)
+        conn = connect_db(DATABASE_PATH)
         cursor = conn.cursor()
         
         # Crear tabla empleados (misma estructura que el servidor QR)
@@ -72,6 +108,13 @@ def init_database():
         ''')
         
         conn.commit()
+        
+        # Reconstruir asistencias desde el journal tras un reinicio del proceso
+        estado = get_journal().estado()
+        if estado:
+            restaurados = aplicar_en_db(conn, estado.values(), crear_empleados=True)
+            logger.info(f"Restauradas {restaurados} asistencias desde el journal")
+        
         conn.close()
         logger.info("Base de datos inicializada correctamente")
         return True
@@ -83,14 +126,8 @@ def init_database():
 def get_db_connection():
     """Obtener conexión a la base de datos"""
     try:
-        conn = sqlite3.connect(DATABASE_PATH, timeout=20.0)
-        conn.row_factory = sqlite3.Row
-        # Configurar para evitar bloqueos
-        conn.execute("PRAGMA journal_mode=WAL")
-        conn.execute("PRAGMA synchronous=NORMAL")
-        conn.execute("PRAGMA cache_size=10000")
-        conn.execute("PRAGMA temp_store=MEMORY")
-        return conn
+        # WAL, synchronous=NORMAL y caché los aplica el engine compartido
+        return connect_db(DATABASE_PATH, row_factory=sqlite3.Row)
     except Exception as e:
         logger.error(f"Error conectando a la base de datos: {e}")
         raise
@@ -343,6 +380,9 @@ def procesar_asistencia(token, documento, nombre, request, tipo_registro='entrad
                     VALUES (?, ?, ?, 'entrada', ?, ?, ?)
                 """, (empleado_id, hoy, ahora, token, request.remote_addr, request.headers.get('User-Agent', '')))
             
+            get_journal().registrar(documento, hoy, hora_entrada=ahora, nombre=nombre, token_qr=token,
+                                    ip_registro=request.remote_addr,
+                                    dispositivo=request.headers.get('User-Agent', ''))
             mensaje = f"Entrada registrada exitosamente a las {ahora.strftime('%H:%M:%S')}"
             
         elif tipo_registro == 'salida':
@@ -359,6 +399,10 @@ def procesar_asistencia(token, documento, nombre, request, tipo_registro='entrad
                 WHERE id = ?
             """, (ahora, registro_existente[0]))
             
+            get_journal().registrar(documento, hoy, hora_salida=ahora, nombre=nombre, token_qr=token,
+                                    ip_registro=request.remote_addr,
+                                    dispositivo=request.headers.get('User-Agent', ''))
+            
             # Calcular horas trabajadas
             hora_entrada = datetime.fromisoformat(registro_existente[1])
             tiempo_trabajado = ahora - hora_entrada
@@ -981,44 +1025,315 @@ def sync_asistencia():
         data = request.get_json()
         
         conn = get_db_connection()
-        cursor = conn.cursor()
         
-        # Obtener o crear empleado
-        cursor.execute("SELECT id FROM empleados WHERE cedula = ?", (data['cedula_empleado'],))
-        empleado_result = cursor.fetchone()
+        # Registrar en el journal y fusionar con (empleado, fecha) como clave,
+        # en lugar de INSERT OR REPLACE que pisaba registros concurrentes
+        _registrar_asistencia(conn, data)
+        conn.close()
         
-        if empleado_result:
-            empleado_id = empleado_result[0]
+        return jsonify({'success': True, 'message': 'Asistencia sincronizada'})
+        
+    except Exception as e:
+        logger.error(f"Error sincronizando asistencia: {e}")
+        return jsonify({'error': str(e)}), 500
+
+CAMPOS_EMPLEADO = ('cedula', 'nombre_completo', 'telefono', 'email', 'direccion',
+                   'fecha_ingreso', 'area_trabajo', 'cargo', 'salario_base', 'estado')
+
+def _guardar_empleado(cursor, data):
+    """Insertar o actualizar un empleado por cédula conservando su id"""
+    cursor.execute("""
+        INSERT INTO empleados
+        (cedula, nombre_completo, telefono, email, direccion,
+         fecha_ingreso, area_trabajo, cargo, salario_base, estado)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(cedula) DO UPDATE SET
+            nombre_completo = excluded.nombre_completo, telefono = excluded.telefono,
+            email = excluded.email, direccion = excluded.direccion,
+            fecha_ingreso = excluded.fecha_ingreso, area_trabajo = excluded.area_trabajo,
+            cargo = excluded.cargo, salario_base = excluded.salario_base, estado = excluded.estado
+    """, (
+        data['cedula'], data['nombre_completo'],
+        data.get('telefono'), data.get('email'),
+        data.get('direccion'), data.get('fecha_ingreso'),
+        data.get('area_trabajo'), data.get('cargo'),
+        data.get('salario_base'), data.get('estado', 1)
+    ))
+
+def _actualizar_empleado(cursor, cedula, data):
+    """Actualizar solo los campos enviados de un empleado"""
+    campos = [c for c in CAMPOS_EMPLEADO if c in data and c != 'cedula']
+    if not campos:
+        return False
+    cursor.execute(
+        f"UPDATE empleados SET {', '.join(f'{c} = ?' for c in campos)} WHERE cedula = ?",
+        [data[c] for c in campos] + [cedula]
+    )
+    return cursor.rowcount > 0
+
+def _desactivar_empleado(cursor, cedula):
+    """Baja lógica (estado = 0): las asistencias del empleado siguen apuntando a él"""
+    cursor.execute("UPDATE empleados SET estado = 0 WHERE cedula = ?", (cedula,))
+    return cursor.rowcount > 0
+
+def _registrar_asistencia(conn, data):
+    """Registrar una asistencia en el journal y fusionarla en la base"""
+    entrada = get_journal().registrar(
+        data['cedula_empleado'], data['fecha'],
+        hora_entrada=data.get('hora_entrada'), hora_salida=data.get('hora_salida'),
+        nombre=data.get('nombre_empleado'), token_qr=data.get('token_qr'),
+        ip_registro=data.get('ip_registro'), dispositivo=data.get('dispositivo')
+    )
+    registro = get_journal().registro(entrada['cedula'], entrada['fecha'])
+    aplicar_en_db(conn, [registro], crear_empleados=True)
+
+@app.route('/api/empleados', methods=['GET'])
+def api_listar_empleados():
+    """Listar empleados"""
+    try:
+        conn = get_db_connection()
+        rows = conn.execute(f"SELECT {', '.join(CAMPOS_EMPLEADO)} FROM empleados ORDER BY nombre_completo").fetchall()
+        conn.close()
+        return jsonify([dict(row) for row in rows])
+    except Exception as e:
+        logger.error(f"Error listando empleados: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/empleados', methods=['POST'])
+@requiere_token
+def api_crear_empleado():
+    """Crear o actualizar un empleado"""
+    try:
+        conn = get_db_connection()
+        _guardar_empleado(conn.cursor(), request.get_json())
+        conn.commit()
+        conn.close()
+        return jsonify({'success': True})
+    except Exception as e:
+        logger.error(f"Error guardando empleado: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/empleados/<cedula>', methods=['PUT', 'DELETE'])
+@requiere_token
+def api_modificar_empleado(cedula):
+    """Actualizar o dar de baja (estado = 0) un empleado por cédula"""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        if request.method == 'PUT':
+            encontrado = _actualizar_empleado(cursor, cedula, request.get_json())
         else:
-            # Crear empleado si no existe
-            cursor.execute("""
-                INSERT INTO empleados (cedula, nombre_completo, estado)
-                VALUES (?, ?, 1)
-            """, (data['cedula_empleado'], data['nombre_empleado']))
-            empleado_id = cursor.lastrowid
+            encontrado = _desactivar_empleado(cursor, cedula)
+        conn.commit()
+        conn.close()
+        if not encontrado:
+            return jsonify({'error': 'Empleado no encontrado'}), 404
+        return jsonify({'success': True})
+    except Exception as e:
+        logger.error(f"Error modificando empleado: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/asistencias', methods=['GET'])
+def api_listar_asistencias():
+    """Listar asistencias, opcionalmente entre fecha_inicio y fecha_fin"""
+    try:
+        query = """
+            SELECT a.fecha, a.hora_entrada, a.hora_salida, a.tipo_registro,
+                   a.token_qr, a.ip_registro, a.dispositivo,
+                   e.cedula AS cedula_empleado, e.nombre_completo AS nombre_empleado
+            FROM asistencias a
+            JOIN empleados e ON a.empleado_id = e.id
+            WHERE 1 = 1
+        """
+        params = []
+        if request.args.get('fecha_inicio'):
+            query += " AND a.fecha >= ?"
+            params.append(request.args['fecha_inicio'])
+        if request.args.get('fecha_fin'):
+            query += " AND a.fecha <= ?"
+            params.append(request.args['fecha_fin'])
+        query += " ORDER BY a.fecha DESC, a.hora_entrada DESC"
         
-        # Insertar asistencia
-        cursor.execute("""
-            INSERT OR REPLACE INTO asistencias 
-            (empleado_id, fecha, hora_entrada, hora_salida, 
-             tipo_registro, token_qr, ip_registro, dispositivo)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            empleado_id, data['fecha'], data.get('hora_entrada'),
-            data.get('hora_salida'), data.get('tipo_registro'),
-            data.get('token_qr'), data.get('ip_registro'),
-            data.get('dispositivo')
-        ))
+        conn = get_db_connection()
+        rows = conn.execute(query, params).fetchall()
+        conn.close()
+        return jsonify([dict(row) for row in rows])
+    except Exception as e:
+        logger.error(f"Error listando asistencias: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/asistencias', methods=['POST'])
+@requiere_token
+def api_crear_asistencia():
+    """Registrar una asistencia"""
+    try:
+        conn = get_db_connection()
+        _registrar_asistencia(conn, request.get_json())
+        conn.close()
+        return jsonify({'success': True})
+    except Exception as e:
+        logger.error(f"Error registrando asistencia: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/batch', methods=['POST'])
+@requiere_token
+def api_batch():
+    """
+    Aplicar varias escrituras en una sola petición.
+    Cuerpo: {"operations": [{"op": "add_empleado", "data": {...}}, ...]}
+    Cada operación informa su propio resultado; un fallo no anula las demás.
+    """
+    try:
+        operaciones = request.get_json().get('operations', [])
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        resultados = []
+        
+        for operacion in operaciones:
+            op = operacion.get('op')
+            data = operacion.get('data') or {}
+            try:
+                if op == 'add_empleado':
+                    _guardar_empleado(cursor, data)
+                    ok = True
+                elif op == 'update_empleado':
+                    ok = _actualizar_empleado(cursor, operacion['cedula'], data)
+                elif op == 'delete_empleado':
+                    ok = _desactivar_empleado(cursor, operacion['cedula'])
+                elif op == 'add_asistencia':
+                    conn.commit()
+                    _registrar_asistencia(conn, data)
+                    ok = True
+                else:
+                    raise ValueError(f"Operación desconocida: {op}")
+                resultados.append({'success': ok})
+            except Exception as e:
+                resultados.append({'success': False, 'error': str(e)})
         
         conn.commit()
         conn.close()
+        return jsonify({'results': resultados})
+    except Exception as e:
+        logger.error(f"Error en batch: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/sync_journal', methods=['POST'])
+def sync_journal():
+    """Intercambio bidireccional de eventos del journal con un nodo local"""
+    try:
+        data = request.get_json()
+        journal = get_journal()
+        since = int(data.get('since', 0))
         
-        return jsonify({'success': True, 'message': 'Asistencia sincronizada'})
+        # El cliente conoce otro journal (redeploy) o un cursor imposible: pedir reenvío completo
+        if (data.get('journal') and data['journal'] != journal.journal_id) or since > len(journal):
+            return jsonify({'reset': True, 'journal': journal.journal_id})
+        
+        conn = get_db_connection()
+        aplicados = aplicar_eventos(journal, conn, data.get('entries', []), crear_empleados=True)
+        conn.close()
+        
+        entries, cursor = journal.entradas_desde(since, excluir_nodo=data.get('node'))
+        
+        return jsonify({
+            'journal': journal.journal_id,
+            'cursor': cursor,
+            'entries': entries,
+            'applied': aplicados,
+            'timestamp': datetime.now().isoformat()
+        })
         
     except Exception as e:
-        logger.error(f"Error sincronizando asistencia: {e}")
+        logger.error(f"Error en sync_journal: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/restore_snapshot', methods=['POST'])
+@requiere_token
+def restore_snapshot():
+    """Restaurar empleados y asistencias desde un snapshot gzip de la app local"""
+    tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(DATABASE_PATH)))
+    try:
+        # Recibir el cuerpo en streaming verificando el hash sin cargarlo en memoria
+        gz_path = os.path.join(tmp_dir, 'snapshot.db.gz')
+        digest = hashlib.sha256()
+        with open(gz_path, 'wb') as f:
+            for chunk in iter(lambda: request.stream.read(1024 * 1024), b''):
+                digest.update(chunk)
+                f.write(chunk)
+        
+        expected = request.headers.get('X-Snapshot-SHA256')
+        if expected and expected != digest.hexdigest():
+            return jsonify({'error': 'Hash del snapshot no coincide'}), 400
+        
+        snapshot_path = os.path.join(tmp_dir, 'snapshot.db')
+        with gzip.open(gz_path, 'rb') as gz, open(snapshot_path, 'wb') as raw:
+            shutil.copyfileobj(gz, raw, 1024 * 1024)
+        
+        snap = sqlite3.connect(snapshot_path)
+        integrity = snap.execute("PRAGMA integrity_check").fetchone()[0]
+        tablas = {row[0] for row in snap.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        snap.close()
+        if integrity != 'ok' or not {'empleados', 'asistencias'} <= tablas:
+            return jsonify({'error': 'Snapshot inválido'}), 400
+        
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("ATTACH DATABASE ? AS snap", (snapshot_path,))
+        try:
+            # Reemplazo completo en una sola transacción: los lectores ven todo o nada
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("DELETE FROM asistencias")
+            cursor.execute("DELETE FROM empleados")
+            cursor.execute("""
+                INSERT INTO empleados
+                (cedula, nombre_completo, telefono, email, direccion,
+                 fecha_ingreso, area_trabajo, cargo, salario_base, estado)
+                SELECT cedula, nombre_completo, telefono, email, direccion,
+                       fecha_ingreso, area_trabajo, cargo, salario_base, estado
+                FROM snap.empleados
+            """)
+            empleados_count = cursor.rowcount
+            cursor.execute("""
+                INSERT INTO asistencias
+                (empleado_id, fecha, hora_entrada, hora_salida,
+                 tipo_registro, token_qr, ip_registro, dispositivo)
+                SELECT e.id, a.fecha, a.hora_entrada, a.hora_salida,
+                       a.tipo_registro, a.token_qr, a.ip_registro, a.dispositivo
+                FROM snap.asistencias a
+                JOIN snap.empleados se ON a.empleado_id = se.id
+                JOIN empleados e ON e.cedula = se.cedula
+            """)
+            asistencias_count = cursor.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.execute("DETACH DATABASE snap")
+        
+        # Reaplicar lo registrado en este nodo desde el arranque
+        estado = get_journal().estado()
+        if estado:
+            aplicar_en_db(conn, estado.values(), crear_empleados=True)
+        conn.close()
+        
+        logger.info(f"Snapshot restaurado: {empleados_count} empleados, {asistencias_count} asistencias")
+        return jsonify({
+            'success': True,
+            'empleados': empleados_count,
+            'asistencias': asistencias_count,
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error restaurando snapshot: {e}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+# gunicorn no ejecuta el bloque __main__: inicializar al importar
+init_database()
+
 if __name__ == '__main__':
     # Inicializar base de datos al arrancar
     if init_database():
@@ -4,7 +4,6 @@ Sistema de Alertas y Notificaciones - Versión Mejorada
 Monitorea el sistema y genera alertas automáticas
 """
 
-import sqlite3
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from datetime import datetime, timedelta
@@ -13,7 +12,9 @@ import threading
 import time
 import json
 from pathlib import Path
-import pandas as pd
+from models.engine import connect_db
+from utils.inventario_engine import get_inventario
+from utils.inventario_forecast import alertas_quiebre, ejecutar_si_vencido
 
 class AlertsManager:
     """Gestor central de alertas del sistema - Versión Mejorada"""
@@ -36,8 +37,10 @@ class AlertsManager:
         
         # Configuración de alertas mejorada
         self.alert_config = {
-            'stock_critico_threshold': 5,  # Stock crítico más bajo
-            'stock_bajo_threshold': 15,    # Stock bajo
+            'stock_critico_threshold': 5,  # Stock crítico (productos sin pronóstico)
+            'stock_bajo_threshold': 15,    # Stock bajo (productos sin pronóstico)
+            'quiebre_dias_alerta': 14,     # Alertar quiebres proyectados dentro de estos días
+            'pronostico_horas': 24,        # Recalcular pronósticos de reposición cada tantas horas
             'vencimiento_dias_alerta': 30,
             'contrato_dias_alerta': 60,    # Alertas de contratos
             'check_interval_minutes': 5,   # Verificar cada 5 minutos
@@ -60,7 +63,7 @@ class AlertsManager:
         # Crear directorio de base de datos si no existe
         self.database_dir.mkdir(exist_ok=True)
         
-        conn = sqlite3.connect(self.alerts_db)
+        conn = connect_db(self.alerts_db)
         cursor = conn.cursor()
         
         # Tabla principal de alertas
@@ -117,6 +120,9 @@ class AlertsManager:
         """Bucle principal de monitoreo mejorado"""
         while not self.should_stop:
             try:
+                # Pronósticos de reposición (tarea por lotes, una vez al día)
+                self.update_forecasts()
+                
                 # Verificar todas las condiciones de alerta
                 self.check_stock_alerts()
                 self.check_expiration_alerts()
@@ -137,94 +143,75 @@ class AlertsManager:
                 if not self.should_stop:
                     time.sleep(60)  # Esperar 1 minuto si hay error
     
+    def update_forecasts(self):
+        """Recalcular los mínimos dinámicos de las líneas cuyo pronóstico está vencido"""
+        try:
+            resumen = ejecutar_si_vencido(
+                {system: self.db_paths[system] for system in ['quimicos', 'almacen', 'poscosecha']},
+                horas=self.alert_config['pronostico_horas'])
+            if resumen:
+                print(f"[OK] Pronósticos de reposición: {resumen['lineas']} ({resumen['segundos']:.2f} s)")
+                for system, error in resumen['errores']:
+                    print(f"Error pronosticando {system}: {error}")
+        except Exception as e:
+            print(f"Error calculando pronósticos: {e}")
+    
     def check_stock_alerts(self):
-        """Verificar alertas de stock crítico mejorado"""
+        """Verificar alertas de stock por fecha de quiebre proyectada"""
         try:
             for system in ['quimicos', 'almacen', 'poscosecha']:
                 if os.path.exists(self.db_paths[system]):
-                    conn = sqlite3.connect(self.db_paths[system])
-                    cursor = conn.cursor()
-                    
-                    # Verificar stock crítico
-                    if system == 'quimicos':
-                        cursor.execute("""
-                            SELECT codigo, nombre, saldo, clase, valor_unitario
-                            FROM productos_quimicos 
-                            WHERE saldo <= ? AND activo = 1
-                        """, (self.alert_config['stock_critico_threshold'],))
-                    elif system == 'almacen':
-                        cursor.execute("""
-                            SELECT codigo, nombre, saldo, categoria, valor_unitario
-                            FROM productos_almacen 
-                            WHERE saldo <= ? AND activo = 1
-                        """, (self.alert_config['stock_critico_threshold'],))
-                    elif system == 'poscosecha':
-                            cursor.execute("""
-                            SELECT codigo, nombre, saldo, tipo, valor_unitario
-                                FROM productos_poscosecha 
-                            WHERE saldo <= ? AND activo = 1
-                            """, (self.alert_config['stock_critico_threshold'],))
-                    
-                    productos_criticos = cursor.fetchall()
-                    
-                    # Verificar stock bajo
-                    if system == 'quimicos':
-                        cursor.execute("""
-                            SELECT codigo, nombre, saldo, clase, valor_unitario
-                            FROM productos_quimicos 
-                            WHERE saldo <= ? AND saldo > ? AND activo = 1
-                        """, (self.alert_config['stock_bajo_threshold'], self.alert_config['stock_critico_threshold']))
-                    elif system == 'almacen':
-                        cursor.execute("""
-                            SELECT codigo, nombre, saldo, categoria, valor_unitario
-                            FROM productos_almacen 
-                            WHERE saldo <= ? AND saldo > ? AND activo = 1
-                        """, (self.alert_config['stock_bajo_threshold'], self.alert_config['stock_critico_threshold']))
-                    elif system == 'poscosecha':
-                        cursor.execute("""
-                            SELECT codigo, nombre, saldo, tipo, valor_unitario
-                            FROM productos_poscosecha 
-                            WHERE saldo <= ? AND saldo > ? AND activo = 1
-                        """, (self.alert_config['stock_bajo_threshold'], self.alert_config['stock_critico_threshold']))
-                    
-                    productos_bajos = cursor.fetchall()
-                    conn.close()
+                    # Contra el pronóstico y el saldo vigente, en caché hasta el próximo movimiento
+                    productos_criticos, productos_bajos = alertas_quiebre(
+                        get_inventario(system, self.db_paths[system]),
+                        self.alert_config['stock_critico_threshold'],
+                        self.alert_config['stock_bajo_threshold'],
+                        self.alert_config['quiebre_dias_alerta'])
                     
                     # Crear alertas críticas
                     for producto in productos_criticos:
-                        valor_total = producto[2] * (producto[4] or 0)
+                        valor_total = producto[2] * (producto[3] or 0)
                         self.create_alert(
                             alert_type='STOCK_CRITICO',
                             severity='HIGH',
                             title=f'🚨 Stock Crítico - {system.title()}',
-                            message=f'Producto {producto[1]} ({producto[0]}) tiene stock crítico: {producto[2]} unidades. Valor: ${valor_total:,.0f}',
+                            message=f'Producto {producto[1]} ({producto[0]}) tiene stock crítico: {producto[2]} unidades{self.texto_quiebre(producto)}. Valor: ${valor_total:,.0f}',
                             source_system=system,
                             source_id=producto[0],
-                            data={'saldo': producto[2], 'valor_unitario': producto[4]}
+                            data={'saldo': producto[2], 'valor_unitario': producto[3],
+                                  'fecha_quiebre': producto[4], 'punto_reorden': producto[5]}
                         )
                     
                     # Crear alertas de stock bajo
                     for producto in productos_bajos:
-                        valor_total = producto[2] * (producto[4] or 0)
+                        valor_total = producto[2] * (producto[3] or 0)
                         self.create_alert(
                             alert_type='STOCK_BAJO',
                             severity='MEDIUM',
                             title=f'⚠️ Stock Bajo - {system.title()}',
-                            message=f'Producto {producto[1]} ({producto[0]}) tiene stock bajo: {producto[2]} unidades. Valor: ${valor_total:,.0f}',
+                            message=f'Producto {producto[1]} ({producto[0]}) tiene stock bajo: {producto[2]} unidades{self.texto_quiebre(producto)}. Valor: ${valor_total:,.0f}',
                             source_system=system,
                             source_id=producto[0],
-                            data={'saldo': producto[2], 'valor_unitario': producto[4]}
+                            data={'saldo': producto[2], 'valor_unitario': producto[3],
+                                  'fecha_quiebre': producto[4], 'punto_reorden': producto[5]}
                         )
                     
         except Exception as e:
             print(f"Error verificando stock: {e}")
     
+    def texto_quiebre(self, producto):
+        """Fecha de quiebre proyectada y punto de reorden para el mensaje de la alerta"""
+        if not producto[4]:
+            return ''
+        fecha = datetime.strptime(producto[4], '%Y-%m-%d').strftime('%d/%m/%Y')
+        return f', se agotaría el {fecha} (punto de reorden: {producto[5]})'
+    
     def check_expiration_alerts(self):
         """Verificar alertas de vencimiento mejorado"""
         try:
             # Solo químicos tienen fechas de vencimiento
             if os.path.exists(self.db_paths['quimicos']):
-                conn = sqlite3.connect(self.db_paths['quimicos'])
+                conn = connect_db(self.db_paths['quimicos'])
                 cursor = conn.cursor()
                 
                 # Verificar productos que vencen en los próximos días
@@ -264,7 +251,7 @@ class AlertsManager:
         """Verificar alertas de contratos mejorado"""
         try:
             if os.path.exists(self.db_paths['personal']):
-                conn = sqlite3.connect(self.db_paths['personal'])
+                conn = connect_db(self.db_paths['personal'])
                 cursor = conn.cursor()
                 
                 # Verificar contratos que vencen pronto
@@ -317,7 +304,7 @@ class AlertsManager:
                 else:
                     # Verificar conectividad
                     try:
-                        conn = sqlite3.connect(db_path)
+                        conn = connect_db(db_path)
                         cursor = conn.cursor()
                         cursor.execute("SELECT COUNT(*) FROM sqlite_master")
                         conn.close()
@@ -345,7 +332,7 @@ class AlertsManager:
             if self.get_alert_count_by_type(alert_type) >= self.alert_config['max_alerts_per_type']:
                 return
             
-            conn = sqlite3.connect(self.alerts_db)
+            conn = connect_db(self.alerts_db)
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -367,7 +354,7 @@ class AlertsManager:
     def alert_exists(self, alert_type, source_system, source_id):
         """Verificar si ya existe una alerta similar"""
         try:
-            conn = sqlite3.connect(self.alerts_db)
+            conn = connect_db(self.alerts_db)
             cursor = conn.cursor()
             
             # Verificar si existe una alerta activa del mismo tipo y fuente
@@ -388,7 +375,7 @@ class AlertsManager:
     def get_alert_count_by_type(self, alert_type):
         """Obtener cantidad de alertas activas por tipo"""
         try:
-            conn = sqlite3.connect(self.alerts_db)
+            conn = connect_db(self.alerts_db)
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -408,7 +395,7 @@ class AlertsManager:
     def get_active_alerts(self, limit=50):
         """Obtener alertas activas ordenadas por prioridad"""
         try:
-            conn = sqlite3.connect(self.alerts_db)
+            conn = connect_db(self.alerts_db)
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -432,7 +419,7 @@ class AlertsManager:
     def resolve_alert(self, alert_id):
         """Resolver una alerta"""
         try:
-            conn = sqlite3.connect(self.alerts_db)
+            conn = connect_db(self.alerts_db)
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -456,7 +443,7 @@ class AlertsManager:
     def get_alerts_summary(self):
         """Obtener resumen de alertas mejorado"""
         try:
-            conn = sqlite3.connect(self.alerts_db)
+            conn = connect_db(self.alerts_db)
             cursor = conn.cursor()
             
             # Contar por severidad
@@ -500,7 +487,7 @@ class AlertsManager:
     def cleanup_old_alerts(self):
         """Limpiar alertas antiguas resueltas"""
         try:
-            conn = sqlite3.connect(self.alerts_db)
+            conn = connect_db(self.alerts_db)
             cursor = conn.cursor()
             
             # Eliminar alertas resueltas de más de 30 días
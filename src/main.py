@@ -1,51 +1,70 @@
+import time
+_INICIO = time.perf_counter()
+
 import tkinter as tk
 import sys
 import os
-import time
+import threading
 os.environ["PYTHONIOENCODING"] = "utf-8"
 
 # Agregar directorios al path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from views.main_window import MainWindow
-from models.database import create_tables
 from utils.logger import get_logger, log_system_event, log_performance
-from utils.settings_manager import settings_manager
-from utils.database_optimizer import database_optimizer
+from utils.startup_profile import StartupProfiler, perfil_importaciones
 
 def main():
-    start_time = time.time()
+    # --profile-startup: fases de arranque e importaciones más lentas en consola
+    perfilar = "--profile-startup" in sys.argv
+    profiler = StartupProfiler(_INICIO)
     logger = get_logger("main")
-    
+
     try:
+        # Las vistas (y SQLAlchemy) se importan aquí para medirlas; pandas,
+        # openpyxl, reportlab, PIL y qrcode se importan al primer uso
+        from views.main_window import MainWindow
+        from models.database import create_tables
+        from utils.database_optimizer import database_optimizer
+        profiler.marcar("importaciones")
+
         # Registrar inicio del sistema (reducido para mejor rendimiento)
         # log_system_event("system_startup", "Iniciando Sistema de Gestión de Personal", "INFO")
-        
-        # Inicializar configuraciones
-        # logger.info("Cargando configuraciones del sistema...")
-        
+
         # Crear tablas si no existen
         # logger.info("Inicializando base de datos...")
         create_tables()
-        
+        profiler.marcar("base_de_datos")
+
         # Optimización de base de datos al inicio si está configurada
         # Comentado temporalmente para mejorar rendimiento de inicio
         # if settings_manager.get("database.vacuum_on_startup", False):
         #     logger.info("Ejecutando optimización de base de datos al inicio...")
         #     database_optimizer.vacuum_on_startup_if_needed()
-        
+
         # Crear ventana principal
         logger.info("Creando interfaz principal...")
         root = tk.Tk()
         app = MainWindow(root)
-        
-        # Calcular tiempo de inicio
-        startup_duration = time.time() - start_time
-        # log_performance("system_startup", startup_duration, {"version": "2.0.0"})
-        
-        # logger.info(f"Sistema iniciado correctamente en {startup_duration:.2f} segundos")
-        # log_system_event("system_ready", "Sistema listo para uso", "INFO")
-        
+        profiler.marcar("ventana_principal")
+
+        # Los servicios en segundo plano arrancan cuando la ventana ya está en pantalla
+        def ventana_lista(segundos):
+            log_performance("startup_first_window", segundos, {
+                "version": "2.0.0",
+                "fases": {fase: round(t, 3) for fase, t in profiler.fases},
+                "modulos_pesados": profiler.modulos_pesados_cargados(),
+            })
+            app.iniciar_servicios()
+            if database_optimizer.auto_optimize:
+                database_optimizer.start_auto_optimization()
+
+            if perfilar:
+                def reportar():
+                    print(profiler.reporte(perfil_importaciones()))
+                threading.Thread(target=reportar, daemon=True).start()
+
+        profiler.al_pintar(root, ventana_lista)
+
         # Configurar cierre limpio
         def on_closing():
             log_system_event("system_shutdown", "Cerrando sistema", "INFO")
@@ -57,12 +76,12 @@ def main():
                 logger.error(f"Error durante el cierre: {e}")
             finally:
                 root.destroy()
-        
+
         root.protocol("WM_DELETE_WINDOW", on_closing)
-        
+
         print("[OK] Sistema iniciado correctamente")
         root.mainloop()
-        
+
     except Exception as e:
         error_msg = f"Error al iniciar el sistema: {e}"
         logger.error(error_msg)
@@ -71,4 +90,4 @@ def main():
         input("Presiona Enter para salir...")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Consultas de Contratos
+Listado y estadísticas de contratos en una sola ida a la base de datos.
+"""
+
+from sqlalchemy import func
+from sqlalchemy.orm import contains_eager, joinedload
+
+from .database import Contrato
+
+
+def listar_contratos(db):
+    """Contratos con su empleado y tipo de contrato cargados en la misma consulta"""
+    return (
+        db.query(Contrato)
+        .join(Contrato.empleado)
+        .options(contains_eager(Contrato.empleado), joinedload(Contrato.tipo_contrato))
+        .order_by(Contrato.id)
+        .all()
+    )
+
+
+def contar_por_estado(db):
+    """Número de contratos por estado con un único COUNT agrupado"""
+    return dict(
+        db.query(Contrato.estado, func.count(Contrato.id))
+        .group_by(Contrato.estado)
+        .all()
+    )
@@ -1,15 +1,18 @@
 import os
 import sqlite3
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Date, Float, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Date, Float, Boolean, ForeignKey, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime, date
-import requests
 import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from .engine import get_engine
 
 # Configuración de base de datos local
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'empleados.db')
-LOCAL_ENGINE = create_engine(f'sqlite:///{DB_PATH}')
+LOCAL_ENGINE = get_engine(DB_PATH)
 LOCAL_SESSION = sessionmaker(bind=LOCAL_ENGINE)
 
 Base = declarative_base()
@@ -81,50 +84,107 @@ class TokenQR(Base):
     activo = Column(Boolean, default=True)
 
 class RailwayDatabase:
-    """Clase para manejar operaciones con la base de datos de Railway"""
+    """
+    Repositorio de la base de datos de Railway.
+    Reutiliza una sesión HTTP (keep-alive), cachea las lecturas de listas con
+    TTL, une lecturas idénticas concurrentes en una sola petición y permite
+    escribir por lotes. Las escrituras invalidan la caché afectada y viajan
+    con el secreto compartido RAILWAY_API_TOKEN.
+    """
     
-    def __init__(self):
-        self.base_url = RAILWAY_DB_URL
-        self.session = None
+    def __init__(self, base_url=RAILWAY_DB_URL, cache_ttl=30, timeout=10, api_token=None):
+        self.base_url = base_url
+        self.api_token = api_token or os.environ.get('RAILWAY_API_TOKEN')
+        self.cache_ttl = cache_ttl
+        self.timeout = timeout
+        self._session = None
+        self._cache = {}
+        self._inflight = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='railway')
     
-    def get_empleados(self):
-        """Obtener todos los empleados desde Railway"""
+    @property
+    def session(self):
+        """Sesión HTTP creada al primer uso (requests no se importa al arrancar)"""
+        with self._lock:
+            if self._session is None:
+                import requests
+                session = requests.Session()
+                session.headers.update({'Content-Type': 'application/json'})
+                if self.api_token:
+                    session.headers['Authorization'] = f"Bearer {self.api_token}"
+                self._session = session
+            return self._session
+    
+    def _read(self, key, path, params=None):
+        """Lectura read-through: caché, petición en curso o nueva petición"""
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] > time.monotonic():
+                return list(cached[1])
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+                generation = self._generation
+        
+        if not owner:
+            return list(future.result())
+        
+        value = []
         try:
-            response = requests.get(f"{self.base_url}/api/empleados", timeout=10)
+            response = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
             if response.status_code == 200:
-                return response.json()
-            return []
+                value = response.json()
+                with self._lock:
+                    # Si hubo una escritura mientras tanto, el resultado ya no es fiable
+                    if generation == self._generation:
+                        self._cache[key] = (time.monotonic() + self.cache_ttl, value)
         except Exception as e:
-            print(f"Error obteniendo empleados: {e}")
-            return []
+            print(f"Error leyendo {path}: {e}")
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_result(value)
+        return list(value)
+    
+    def invalidate(self, prefix=None):
+        """Invalidar la caché completa o las claves que empiezan por prefix"""
+        with self._lock:
+            self._generation += 1
+            if prefix is None:
+                self._cache.clear()
+            else:
+                for key in [k for k in self._cache if k[0] == prefix]:
+                    del self._cache[key]
+    
+    def _write(self, method, path, data=None, invalidate=None):
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", json=data, timeout=self.timeout)
+            return response.status_code == 200
+        finally:
+            self.invalidate(invalidate)
+    
+    def get_empleados(self):
+        """Obtener todos los empleados desde Railway"""
+        return self._read(('empleados',), "/api/empleados")
     
     def get_asistencias(self, fecha_inicio=None, fecha_fin=None):
         """Obtener asistencias desde Railway"""
-        try:
-            params = {}
-            if fecha_inicio:
-                params['fecha_inicio'] = fecha_inicio
-            if fecha_fin:
-                params['fecha_fin'] = fecha_fin
-                
-            response = requests.get(f"{self.base_url}/api/asistencias", params=params, timeout=10)
-            if response.status_code == 200:
-                return response.json()
-            return []
-        except Exception as e:
-            print(f"Error obteniendo asistencias: {e}")
-            return []
+        params = {}
+        if fecha_inicio:
+            params['fecha_inicio'] = str(fecha_inicio)
+        if fecha_fin:
+            params['fecha_fin'] = str(fecha_fin)
+        return self._read(('asistencias', params.get('fecha_inicio'), params.get('fecha_fin')),
+                          "/api/asistencias", params)
     
     def add_empleado(self, empleado_data):
         """Agregar empleado a Railway"""
         try:
-            response = requests.post(
-                f"{self.base_url}/api/empleados",
-                json=empleado_data,
-                headers={'Content-Type': 'application/json'},
-                timeout=10
-            )
-            return response.status_code == 200
+            return self._write('POST', "/api/empleados", empleado_data, 'empleados')
         except Exception as e:
             print(f"Error agregando empleado: {e}")
             return False
@@ -132,39 +192,65 @@ class RailwayDatabase:
     def add_asistencia(self, asistencia_data):
         """Agregar asistencia a Railway"""
         try:
-            response = requests.post(
-                f"{self.base_url}/api/asistencias",
-                json=asistencia_data,
-                headers={'Content-Type': 'application/json'},
-                timeout=10
-            )
-            return response.status_code == 200
+            return self._write('POST', "/api/asistencias", asistencia_data, 'asistencias')
         except Exception as e:
             print(f"Error agregando asistencia: {e}")
             return False
     
-    def update_empleado(self, empleado_id, empleado_data):
+    def update_empleado(self, cedula, empleado_data):
         """Actualizar empleado en Railway"""
         try:
-            response = requests.put(
-                f"{self.base_url}/api/empleados/{empleado_id}",
-                json=empleado_data,
-                headers={'Content-Type': 'application/json'},
-                timeout=10
-            )
-            return response.status_code == 200
+            return self._write('PUT', f"/api/empleados/{cedula}", empleado_data, 'empleados')
         except Exception as e:
             print(f"Error actualizando empleado: {e}")
             return False
     
-    def delete_empleado(self, empleado_id):
-        """Eliminar empleado de Railway"""
+    def delete_empleado(self, cedula):
+        """Dar de baja un empleado en Railway (estado = 0, conserva sus asistencias)"""
         try:
-            response = requests.delete(f"{self.base_url}/api/empleados/{empleado_id}", timeout=10)
-            return response.status_code == 200
+            return self._write('DELETE', f"/api/empleados/{cedula}", invalidate='empleados')
         except Exception as e:
             print(f"Error eliminando empleado: {e}")
             return False
+    
+    def batch_write(self, operaciones):
+        """
+        Enviar varias escrituras en una sola petición.
+        operaciones: [{'op': 'add_empleado', 'data': {...}},
+                      {'op': 'update_empleado', 'cedula': '...', 'data': {...}}, ...]
+        Retorna una lista de booleanos con el resultado de cada operación.
+        """
+        if not operaciones:
+            return []
+        try:
+            response = self.session.post(
+                f"{self.base_url}/api/batch",
+                json={'operations': list(operaciones)},
+                timeout=max(self.timeout, len(operaciones) * 0.1)
+            )
+            if response.status_code != 200:
+                return [False] * len(operaciones)
+            return [r.get('success', False) for r in response.json().get('results', [])]
+        except Exception as e:
+            print(f"Error en escritura por lotes: {e}")
+            return [False] * len(operaciones)
+        finally:
+            self.invalidate()
+    
+    def submit(self, method_name, *args, callback=None, widget=None, **kwargs):
+        """
+        Ejecutar una operación en segundo plano para no bloquear la interfaz.
+        Si se indica un widget de Tk, el callback se ejecuta en el hilo de Tk.
+        """
+        future = self._executor.submit(getattr(self, method_name), *args, **kwargs)
+        if callback:
+            def done(f):
+                if widget is not None:
+                    widget.after(0, callback, f.result())
+                else:
+                    callback(f.result())
+            future.add_done_callback(done)
+        return future
 
 # Instancia global de la base de datos de Railway
 railway_db = RailwayDatabase()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fábrica de Engines SQLite
+Punto único de configuración para todas las bases locales (empleados.db y
+las bases de inventario): mismos PRAGMAs y mismo pool de conexiones para la
+interfaz y los hilos en segundo plano.
+"""
+
+import os
+import threading
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+
+# PRAGMAs aplicados a cada conexión nueva del pool. Sólo rendimiento y
+# concurrencia: nada que cambie el resultado de una sentencia (foreign_keys,
+# recursive_triggers), porque valen para todas las bases y todos los
+# llamadores. recursive_triggers rompía los triggers AFTER UPDATE que se
+# actualizan a sí mismos (fecha_actualizacion); los índices FTS no lo
+# necesitan mientras sus tablas no se escriban con INSERT OR REPLACE.
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),       # lectores no bloquean al escritor
+    ('synchronous', 'NORMAL'),     # seguro con WAL y mucho más rápido que FULL
+    ('cache_size', -16000),        # ~16 MB de caché de páginas por conexión
+    ('temp_store', 'MEMORY'),
+    ('busy_timeout', 30000),
+)
+
+# Conexiones por base: la interfaz más unos pocos hilos (QR, sync, alertas)
+POOL_SIZE = 5
+MAX_OVERFLOW = 10
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def _aplicar_pragmas(dbapi_conn, connection_record):
+    cursor = dbapi_conn.cursor()
+    for nombre, valor in SQLITE_PRAGMAS:
+        cursor.execute(f"PRAGMA {nombre}={valor}")
+    cursor.close()
+
+
+def _limpiar_conexion(dbapi_conn, connection_record):
+    # Un row_factory pedido por un llamador no debe filtrarse al siguiente
+    dbapi_conn.row_factory = None
+
+
+def get_engine(db_path):
+    """Engine compartido (uno por archivo) con PRAGMAs y pool configurados"""
+    ruta = os.path.abspath(str(db_path))
+    with _engines_lock:
+        engine = _engines.get(ruta)
+        if engine is None:
+            engine = create_engine(
+                f'sqlite:///{ruta}',
+                # Las sesiones y conexiones cruzan a hilos en segundo plano
+                connect_args={'check_same_thread': False, 'timeout': 30},
+                poolclass=QueuePool,
+                pool_size=POOL_SIZE,
+                max_overflow=MAX_OVERFLOW,
+                pool_timeout=30
+            )
+            event.listen(engine, 'connect', _aplicar_pragmas)
+            event.listen(engine, 'checkin', _limpiar_conexion)
+            _engines[ruta] = engine
+        return engine
+
+
+def connect_db(db_path, row_factory=None):
+    """
+    Conexión sqlite3 tomada del pool del engine compartido.
+    Se usa igual que sqlite3.connect; close() la devuelve al pool.
+    """
+    conn = get_engine(db_path).raw_connection()
+    if row_factory is not None:
+        conn.driver_connection.row_factory = row_factory
+    return conn
+
+
+def dispose_engines():
+    """Cerrar todas las conexiones del pool (p.ej. antes de reemplazar archivos)"""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
@@ -415,15 +415,14 @@ def abrir_generador_contratos_excel(parent, contratos_window, contrato):
     """Abrir ventana del generador de contratos Excel"""
     import tkinter as tk
     from tkinter import messagebox, filedialog
-    import openpyxl
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-    from datetime import datetime
     import os
     import sys
     
     # Agregar path para importar modelos
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     from models.database import Empleado
+    from utils.document_index import get_document_index
+    from utils.contrato_excel_renderer import TEMPLATE_PATH, generar_contrato
     
     def generar_contrato_excel():
         """Generar contrato Excel usando la plantilla original"""
@@ -434,232 +433,13 @@ def abrir_generador_contratos_excel(parent, contratos_window, contrato):
                 messagebox.showerror("Error", "Empleado no encontrado")
                 return
             
-            # Ruta de la plantilla
-            template_path = "templates_contratos/CONTRATO EXCEL FLORE JUNCALITO.xlsx"
-            if not os.path.exists(template_path):
-                messagebox.showerror("Error", f"Plantilla no encontrada: {template_path}")
+            # Plantilla cargada una sola vez y compartida con la vista de contratos
+            if not os.path.exists(TEMPLATE_PATH):
+                messagebox.showerror("Error", f"Plantilla no encontrada: {TEMPLATE_PATH}")
                 return
             
-            # Cargar la plantilla
-            wb = openpyxl.load_workbook(template_path)
-            ws = wb.active
-            
-            # Función para convertir fechas a español
-            def fecha_a_espanol(fecha):
-                """Convertir fecha a formato español"""
-                if not fecha:
-                    return "NO DEFINIDA"
-                
-                meses_espanol = {
-                    1: "ENERO", 2: "FEBRERO", 3: "MARZO", 4: "ABRIL",
-                    5: "MAYO", 6: "JUNIO", 7: "JULIO", 8: "AGOSTO",
-                    9: "SEPTIEMBRE", 10: "OCTUBRE", 11: "NOVIEMBRE", 12: "DICIEMBRE"
-                }
-                
-                dia = fecha.day
-                mes = meses_espanol[fecha.month]
-                anio = fecha.year
-                
-                return f"{dia} DE {mes} DE {anio}"
-            
-            # Función para convertir números a letras (versión mejorada)
-            def numero_a_letras(numero):
-                """Convertir número a letras"""
-                if numero is None or numero == 0:
-                    return "CERO PESOS"
-                
-                # Convertir a entero
-                numero = int(numero)
-                
-                # Diccionarios para conversión
-                unidades = ["", "UNO", "DOS", "TRES", "CUATRO", "CINCO", "SEIS", "SIETE", "OCHO", "NUEVE"]
-                decenas = ["", "DIEZ", "VEINTE", "TREINTA", "CUARENTA", "CINCUENTA", "SESENTA", "SETENTA", "OCHENTA", "NOVENTA"]
-                centenas = ["", "CIENTO", "DOSCIENTOS", "TRESCIENTOS", "CUATROCIENTOS", "QUINIENTOS", "SEISCIENTOS", "SETECIENTOS", "OCHOCIENTOS", "NOVECIENTOS"]
-                
-                if numero == 0:
-                    return "CERO PESOS"
-                elif numero == 100:
-                    return "CIEN PESOS"
-                elif numero < 1000:
-                    # Manejar números menores a 1000
-                    if numero < 100:
-                        if numero < 20:
-                            if numero == 11:
-                                return "ONCE PESOS"
-                            elif numero == 12:
-                                return "DOCE PESOS"
-                            elif numero == 13:
-                                return "TRECE PESOS"
-                            elif numero == 14:
-                                return "CATORCE PESOS"
-                            elif numero == 15:
-                                return "QUINCE PESOS"
-                            elif numero == 16:
-                                return "DIECISÉIS PESOS"
-                            elif numero == 17:
-                                return "DIECISIETE PESOS"
-                            elif numero == 18:
-                                return "DIECIOCHO PESOS"
-                            elif numero == 19:
-                                return "DIECINUEVE PESOS"
-                            else:
-                                return unidades[numero] + " PESOS"
-                        else:
-                            if numero % 10 == 0:
-                                return decenas[numero // 10] + " PESOS"
-                            else:
-                                return decenas[numero // 10] + " Y " + unidades[numero % 10] + " PESOS"
-                    else:
-                        # Números entre 100 y 999
-                        centena = numero // 100
-                        resto = numero % 100
-                        
-                        if resto == 0:
-                            return centenas[centena] + " PESOS"
-                        else:
-                            return centenas[centena] + " " + numero_a_letras(resto).replace(" PESOS", "") + " PESOS"
-                else:
-                    # Para números grandes, usar formato simplificado
-                    return f"{numero:,} PESOS"
-            
-            # Reemplazar variables con llaves en toda la plantilla
-            print(f"Buscando y reemplazando variables en la plantilla...")
-            
-            # Diccionario de variables disponibles
-            variables = {
-                # Datos del empleado
-                '{NOMBRE_EMPLEADO}': empleado.nombre_completo or "NO DEFINIDO",
-                '{CEDULA_EMPLEADO}': empleado.cedula or "NO DEFINIDO",
-                '{DIRECCION_EMPLEADO}': empleado.direccion or "DIRECCIÓN NO ESPECIFICADA",
-                '{TELEFONO_EMPLEADO}': empleado.telefono or "NO DEFINIDO",
-                '{EMAIL_EMPLEADO}': empleado.email or "NO DEFINIDO",
-                '{CARGO_EMPLEADO}': empleado.cargo or "OPERARIO OFICIOS VARIOS",
-                '{AREA_TRABAJO}': empleado.area_trabajo or "NO DEFINIDO",
-                
-                # Datos del contrato
-                '{NUMERO_CONTRATO}': contrato.numero_contrato or "NO DEFINIDO",
-                '{TIPO_CONTRATO}': contrato.tipo_contrato_rel.nombre if contrato.tipo_contrato_rel else "NO DEFINIDO",
-                '{SALARIO_NUMEROS}': f"$ {contrato.salario_contrato:,}" if contrato.salario_contrato else "NO DEFINIDO",
-                '{SALARIO_LETRAS}': numero_a_letras(contrato.salario_contrato) if contrato.salario_contrato else "NO DEFINIDO",
-                '{FECHA_INICIO}': fecha_a_espanol(contrato.fecha_inicio) if contrato.fecha_inicio else "NO DEFINIDA",
-                '{FECHA_FIN}': fecha_a_espanol(contrato.fecha_fin) if contrato.fecha_fin else "NO DEFINIDA",
-                '{ESTADO_CONTRATO}': contrato.estado or "NO DEFINIDO",
-                
-                # Fechas del sistema
-                '{FECHA_GENERACION}': datetime.now().strftime('%d/%m/%Y'),
-                '{FECHA_ACTUAL}': datetime.now().strftime('%d/%m/%Y'),
-                '{HORA_GENERACION}': datetime.now().strftime('%H:%M:%S'),
-                
-                # Datos de la empresa (puedes personalizar)
-                '{NOMBRE_EMPRESA}': "FLORES JUNCALITO S.A.S",
-                '{DIRECCION_EMPRESA}': "CALLE 19* C N. 88-07",
-                '{CIUDAD_EMPRESA}': "EL ROSAL CUNDINAMARCA",
-                
-                # NUEVAS VARIABLES BASADAS EN LA PLANTILLA
-                '{NOMBRE_EMPLEADOR}': "FLORES JUNCALITO S.A.S",
-                '{DIRECCION_EMPLEADOR}': "CALLE 19* C N. 88-07",
-                '{LUGAR_NACIMIENTO}': empleado.lugar_nacimiento or "BOGOTÁ, COLOMBIA",
-                '{FECHA_NACIMIENTO}': fecha_a_espanol(empleado.fecha_nacimiento) if empleado.fecha_nacimiento else "01 DE ENERO DE 1990",
-                '{NACIONALIDAD}': empleado.nacionalidad or "COLOMBIANA",
-                '{TIPO_SALARIO}': "ORDINARIO",
-                '{PERIODOS_PAGO}': "MENSUALES",
-                '{LUGAR_LABORES}': "FLORES JUNCALITO S.A.S",
-                '{CIUDAD_CONTRATACION}': "BARRIO SAN JOSE - EL ROSAL CUNDINAMARCA",
-                '{TIPO_TERMINO_CONTRATO}': "FIJO",
-                
-                # Variables adicionales para flexibilidad
-                '{SALARIO_CONTRATO}': f"$ {contrato.salario_contrato:,}" if contrato.salario_contrato else "NO DEFINIDO",
-                '{FECHA_INICIO_LABORES}': fecha_a_espanol(contrato.fecha_inicio) if contrato.fecha_inicio else "NO DEFINIDA",
-                '{VENCE_EL_DIA}': fecha_a_espanol(contrato.fecha_fin) if contrato.fecha_fin else "NO DEFINIDA"
-            }
-            
-            # Buscar y reemplazar variables en todas las celdas
-            variables_encontradas = 0
-            for row in ws.iter_rows():
-                for cell in row:
-                    if cell.value and isinstance(cell.value, str):
-                        valor_original = cell.value
-                        valor_nuevo = valor_original
-                        
-                        # Reemplazar todas las variables encontradas
-                        for variable, valor in variables.items():
-                            if variable in valor_original:
-                                valor_nuevo = valor_nuevo.replace(variable, str(valor))
-                                variables_encontradas += 1
-                                print(f"   Reemplazado: {variable} -> {valor}")
-                        
-                        # Actualizar la celda si hubo cambios
-                        if valor_nuevo != valor_original:
-                            cell.value = valor_nuevo
-            
-            print(f"   📊 Total de variables reemplazadas: {variables_encontradas}")
-            
-            # También reemplazar referencias directas a celdas específicas (como H24, K24)
-            print(f"🔄 Reemplazando referencias directas a celdas...")
-            
-            # Mapeo de celdas específicas basado en las referencias que mencionaste
-            celdas_especificas = {
-                'H24': numero_a_letras(contrato.salario_contrato) if contrato.salario_contrato else "NO DEFINIDO",
-                'K24': contrato.fecha_fin.strftime('%d/%m/%Y') if contrato.fecha_fin else "NO DEFINIDA",
-                'E24': empleado.nombre_completo or "NO DEFINIDO",
-                'F24': empleado.cedula or "NO DEFINIDO",
-                'G24': str(contrato.salario_contrato) if contrato.salario_contrato else "NO DEFINIDO",
-                'I24': contrato.fecha_inicio.strftime('%d/%m/%Y') if contrato.fecha_inicio else "NO DEFINIDA",
-                'L24': empleado.cargo or "NO DEFINIDO",
-                'M24': empleado.direccion or "NO DEFINIDO"
-            }
-            
-            # Buscar y reemplazar referencias a BASE DE DATOS
-            referencias_encontradas = 0
-            for row in ws.iter_rows():
-                for cell in row:
-                    if cell.value:
-                        cell_value = str(cell.value)
-                        
-                        # Buscar referencias como ='BASE DE DATOS'!H24
-                        if "'BASE DE DATOS'!" in cell_value:
-                            # Extraer la referencia de celda (ej: H24, K24)
-                            import re
-                            match = re.search(r"'BASE DE DATOS'!([A-Z]+\d+)", cell_value)
-                            if match:
-                                celda_ref = match.group(1)
-                                if celda_ref in celdas_especificas:
-                                    cell.value = celdas_especificas[celda_ref]
-                                    referencias_encontradas += 1
-                                    print(f"   Reemplazada referencia {celda_ref} -> {celdas_especificas[celda_ref]}")
-            
-            print(f"   Total de referencias reemplazadas: {referencias_encontradas}")
-            
-            if variables_encontradas == 0 and referencias_encontradas == 0:
-                print("   No se encontraron variables ni referencias para reemplazar")
-                print("   Sugerencia: Agrega variables como {NOMBRE_EMPLEADO} o referencias a BASE DE DATOS")
-            
-            # Función para limpiar nombres de archivo
-            def limpiar_nombre_archivo(texto):
-                if not texto:
-                    return "sin_nombre"
-                # Remover caracteres problemáticos para nombres de archivo
-                caracteres_prohibidos = ['<', '>', ':', '"', '/', '\\', '|', '?', '*']
-                texto_limpio = str(texto)
-                for char in caracteres_prohibidos:
-                    texto_limpio = texto_limpio.replace(char, '_')
-                texto_limpio = texto_limpio.replace(" ", "_")
-                return texto_limpio
-            
-            # Crear carpeta del empleado si no existe
-            nombre_seguro = limpiar_nombre_archivo(empleado.nombre_completo)
-            cedula_segura = limpiar_nombre_archivo(empleado.cedula)
-            empleado_dir = os.path.join("empleados_data", f"{nombre_seguro}_{cedula_segura}")
-            contratos_dir = os.path.join(empleado_dir, "contratos")
-            
-            os.makedirs(contratos_dir, exist_ok=True)
-            
-            # Guardar archivo en la carpeta del empleado
-            filename = f"contrato_{limpiar_nombre_archivo(empleado.cedula)}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            filepath = os.path.join(contratos_dir, filename)
-            
-            wb.save(filepath)
-            wb.close()
+            filepath = generar_contrato(contrato, empleado)
+            get_document_index().registrar_archivo(filepath)
             
             # Actualizar contrato en base de datos
             contrato.archivo_path = filepath
@@ -693,7 +473,7 @@ def abrir_generador_contratos_excel(parent, contratos_window, contrato):
     tk.Label(window, text=f"Empleado: {contrato.empleado.nombre_completo if contrato.empleado else 'No encontrado'}", 
             font=('Segoe UI', 12), bg='#f8f9fa').pack(pady=10)
     
-    tk.Label(window, text=f"Contrato: {contrato.numero_contrato or 'Sin número'}", 
+    tk.Label(window, text=f"Contrato: {getattr(contrato, 'numero_contrato', None) or 'Sin número'}", 
             font=('Segoe UI', 12), bg='#f8f9fa').pack(pady=10)
     
     tk.Button(window, text="Generar Contrato Excel", command=generar_contrato_excel,
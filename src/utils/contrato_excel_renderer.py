@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Renderizador de Contratos Excel
+Carga la plantilla de contrato una sola vez y, al cargarla, compila las
+reglas de llenado: qué celdas contienen variables {VARIABLE} o referencias
+'BASE DE DATOS'!H24. Cada contrato solo escribe esas celdas sobre el libro
+en memoria, lo guarda y restaura los valores originales de la plantilla.
+Incluye generación masiva a una carpeta o a un único .zip.
+"""
+
+import io
+import os
+import re
+import threading
+import time
+import zipfile
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import openpyxl
+
+from .formato_espanol import fecha_a_espanol, numero_a_letras
+
+TEMPLATE_PATH = os.path.join("templates_contratos", "CONTRATO EXCEL FLORE JUNCALITO.xlsx")
+
+VARIABLE_RE = re.compile(r"\{[A-ZÑ_]+\}")
+REFERENCIA_RE = re.compile(r"'BASE DE DATOS'!([A-Z]+\d+)")
+
+# Celdas de la hoja 'BASE DE DATOS' que se sustituyen por datos del contrato
+CELDAS_BASE_DATOS = ('E24', 'F24', 'G24', 'H24', 'I24', 'K24', 'L24', 'M24')
+
+EMPRESA = "FLORES JUNCALITO S.A.S"
+DIRECCION_EMPRESA = "CALLE 19* C N. 88-07"
+CIUDAD = "EL ROSAL CUNDINAMARCA"
+
+
+def limpiar_nombre_archivo(texto):
+    if not texto:
+        return "sin_nombre"
+    caracteres_prohibidos = ['<', '>', ':', '"', '/', '\\', '|', '?', '*']
+    texto_limpio = str(texto)
+    for char in caracteres_prohibidos:
+        texto_limpio = texto_limpio.replace(char, '_')
+    return texto_limpio.replace(" ", "_")
+
+
+def variables_contrato(contrato, empleado, ahora: datetime = None) -> Dict[str, str]:
+    """Valores de las variables de la plantilla para un contrato"""
+    ahora = ahora or datetime.now()
+    salario = contrato.salario
+    tipo = contrato.tipo_contrato.nombre if contrato.tipo_contrato else "NO DEFINIDO"
+    salario_numeros = f"$ {salario:,.0f}" if salario else "NO DEFINIDO"
+    salario_letras = numero_a_letras(salario) if salario else "NO DEFINIDO"
+    inicio = fecha_a_espanol(contrato.fecha_inicio)
+    fin = fecha_a_espanol(contrato.fecha_fin)
+    nacimiento = getattr(empleado, 'fecha_nacimiento', None)
+
+    variables = {
+        # Empleado
+        '{NOMBRE_EMPLEADO}': empleado.nombre_completo or "NO DEFINIDO",
+        '{CEDULA_EMPLEADO}': empleado.cedula or "NO DEFINIDO",
+        '{DIRECCION_EMPLEADO}': empleado.direccion or "DIRECCION NO ESPECIFICADA",
+        '{TELEFONO_EMPLEADO}': empleado.telefono or "NO DEFINIDO",
+        '{EMAIL_EMPLEADO}': empleado.email or "NO DEFINIDO",
+        '{CARGO_EMPLEADO}': empleado.cargo or "OPERARIO OFICIOS VARIOS",
+        '{AREA_TRABAJO}': empleado.area_trabajo or "NO DEFINIDO",
+        '{LUGAR_NACIMIENTO}': getattr(empleado, 'lugar_nacimiento', None) or CIUDAD,
+        '{FECHA_NACIMIENTO}': fecha_a_espanol(nacimiento),
+        '{NACIONALIDAD}': getattr(empleado, 'nacionalidad', None) or "COLOMBIANA",
+
+        # Contrato
+        '{NUMERO_CONTRATO}': getattr(contrato, 'numero_contrato', None) or f"CT-{contrato.id or 0:04d}",
+        '{TIPO_CONTRATO}': tipo,
+        '{SALARIO_NUMEROS}': salario_numeros,
+        '{SALARIO_CONTRATO}': salario_numeros,
+        '{SALARIO_LETRAS}': salario_letras,
+        '{FECHA_INICIO}': inicio,
+        '{FECHA_FIN}': fin,
+        '{ESTADO_CONTRATO}': contrato.estado or "NO DEFINIDO",
+        '{TIPO_SALARIO}': "ORDINARIO" if salario and salario < 10000000 else "INTEGRAL",
+        '{TIPO_TERMINO_CONTRATO}': "FIJO" if contrato.fecha_fin else "INDEFINIDO",
+        '{PERIODOS_PAGO}': "MENSUAL",
+        '{FECHA_INICIO_LABORES}': inicio,
+        '{VENCE_EL_DIA}': fin,
+
+        # Fechas del sistema
+        '{FECHA_GENERACION}': ahora.strftime('%d/%m/%Y'),
+        '{FECHA_ACTUAL}': ahora.strftime('%d/%m/%Y'),
+        '{HORA_GENERACION}': ahora.strftime('%H:%M:%S'),
+
+        # Empresa
+        '{NOMBRE_EMPRESA}': EMPRESA,
+        '{DIRECCION_EMPRESA}': DIRECCION_EMPRESA,
+        '{CIUDAD_EMPRESA}': CIUDAD,
+        '{NOMBRE_EMPLEADOR}': EMPRESA,
+        '{DIRECCION_EMPLEADOR}': DIRECCION_EMPRESA,
+        '{CIUDAD_CONTRATACION}': CIUDAD,
+        '{LUGAR_LABORES}': CIUDAD,
+
+        # Sinónimos usados en otras versiones de la plantilla
+        '{NOMBRE_TRABAJADOR}': empleado.nombre_completo or "NO DEFINIDO",
+        '{DIRECCION_TRABAJADOR}': empleado.direccion or "DIRECCION NO ESPECIFICADA",
+        '{CARGO_OFICIO}': empleado.cargo or "OPERARIO OFICIOS VARIOS",
+        '{VALOR_SALARIO}': salario_numeros,
+        '{VALOR_LETRAS}': salario_letras,
+        '{FECHA_INICIACION}': inicio,
+        '{LUGAR_DESEMPEÑO}': CIUDAD,
+        '{TERMINO_INICIAL}': inicio,
+        '{FECHA_VENCIMIENTO}': fin,
+    }
+
+    # Celdas de la hoja 'BASE DE DATOS' que la plantilla referencia con fórmulas
+    variables.update({
+        'H24': salario_letras,
+        'K24': contrato.fecha_fin.strftime('%d/%m/%Y') if contrato.fecha_fin else "NO DEFINIDA",
+        'E24': empleado.nombre_completo or "NO DEFINIDO",
+        'F24': empleado.cedula or "NO DEFINIDO",
+        'G24': f"{salario:.0f}" if salario else "NO DEFINIDO",
+        'I24': contrato.fecha_inicio.strftime('%d/%m/%Y') if contrato.fecha_inicio else "NO DEFINIDA",
+        'L24': empleado.cargo or "NO DEFINIDO",
+        'M24': empleado.direccion or "NO DEFINIDO",
+    })
+    return variables
+
+
+class ContratoTemplate:
+    """Plantilla de contrato analizada una vez, con reglas de llenado precompiladas"""
+
+    def __init__(self, template_path: str = TEMPLATE_PATH):
+        self.template_path = template_path
+        self.lock = threading.Lock()
+        self._mtime = None
+        self._wb = None
+        self._ws = None
+        # (celda, valor original, partes) donde partes alterna texto fijo y nombres de variable
+        self._reglas = []
+
+    def _cargar(self):
+        """(Re)cargar solo si la plantilla cambió en disco"""
+        mtime = os.path.getmtime(self.template_path)
+        if self._wb is not None and mtime == self._mtime:
+            return
+        wb = openpyxl.load_workbook(self.template_path)
+        ws = wb.active
+        reglas = []
+        for row in ws.iter_rows():
+            for cell in row:
+                valor = cell.value
+                if not isinstance(valor, str):
+                    continue
+                referencia = REFERENCIA_RE.search(valor)
+                if referencia and referencia.group(1) in CELDAS_BASE_DATOS:
+                    # La fórmula completa se sustituye por el dato
+                    reglas.append((cell, valor, ('', referencia.group(1), '')))
+                elif '{' in valor:
+                    partes = VARIABLE_RE.split(valor)
+                    nombres = VARIABLE_RE.findall(valor)
+                    if nombres:
+                        compiladas = [partes[0]]
+                        for nombre, texto in zip(nombres, partes[1:]):
+                            compiladas.extend((nombre, texto))
+                        reglas.append((cell, valor, tuple(compiladas)))
+        self._wb, self._ws, self._reglas, self._mtime = wb, ws, reglas, mtime
+
+    @property
+    def variables(self) -> List[str]:
+        """Variables y referencias que usa la plantilla"""
+        with self.lock:
+            self._cargar()
+            return sorted({p for _, _, partes in self._reglas for p in partes[1::2]})
+
+    def render(self, variables: Dict[str, str], destino) -> int:
+        """Guardar el contrato en 'destino' (ruta o archivo binario); retorna las celdas llenadas"""
+        with self.lock:
+            self._cargar()
+            llenadas = 0
+            try:
+                for cell, original, partes in self._reglas:
+                    texto = []
+                    for i, parte in enumerate(partes):
+                        if i % 2:
+                            # Variable desconocida: se deja tal cual, como antes
+                            texto.append(str(variables.get(parte, parte)))
+                        else:
+                            texto.append(parte)
+                    cell.value = ''.join(texto)
+                    llenadas += 1
+                self._wb.save(destino)
+            finally:
+                # Devolver la plantilla a su estado original para el siguiente contrato
+                for cell, original, _ in self._reglas:
+                    cell.value = original
+            return llenadas
+
+    def render_bytes(self, variables: Dict[str, str]) -> bytes:
+        buffer = io.BytesIO()
+        self.render(variables, buffer)
+        return buffer.getvalue()
+
+
+_templates: Dict[str, ContratoTemplate] = {}
+_templates_lock = threading.Lock()
+
+
+def get_contrato_template(template_path: str = TEMPLATE_PATH) -> ContratoTemplate:
+    """Plantilla compartida por ruta"""
+    with _templates_lock:
+        clave = os.path.abspath(template_path)
+        if clave not in _templates:
+            _templates[clave] = ContratoTemplate(template_path)
+        return _templates[clave]
+
+
+def nombre_archivo_contrato(empleado, ahora: datetime = None) -> str:
+    ahora = ahora or datetime.now()
+    return f"contrato_{limpiar_nombre_archivo(empleado.cedula)}_{ahora.strftime('%Y%m%d_%H%M%S')}.xlsx"
+
+
+def generar_contrato(contrato, empleado=None, base_dir: str = "empleados_data",
+                     template_path: str = TEMPLATE_PATH) -> str:
+    """Generar el Excel de un contrato en la carpeta del empleado; retorna la ruta"""
+    empleado = empleado or contrato.empleado
+    contratos_dir = os.path.join(
+        base_dir,
+        f"{limpiar_nombre_archivo(empleado.nombre_completo)}_{limpiar_nombre_archivo(empleado.cedula)}",
+        "contratos"
+    )
+    os.makedirs(contratos_dir, exist_ok=True)
+    ahora = datetime.now()
+    filepath = os.path.join(contratos_dir, nombre_archivo_contrato(empleado, ahora))
+    get_contrato_template(template_path).render(variables_contrato(contrato, empleado, ahora), filepath)
+    return filepath
+
+
+def generar_contratos_masivo(contratos, destino: Optional[str] = None, zip_path: Optional[str] = None,
+                             template_path: str = TEMPLATE_PATH) -> dict:
+    """
+    Generar varios contratos.
+    zip_path: todos en un único .zip; destino: todos en una carpeta;
+    sin ninguno: cada uno en la carpeta de su empleado.
+    """
+    plantilla = get_contrato_template(template_path)
+    inicio = time.perf_counter()
+    resumen = {'generados': 0, 'errores': [], 'archivos': []}
+
+    archivo_zip = zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) if zip_path else None
+    if destino:
+        os.makedirs(destino, exist_ok=True)
+    try:
+        for contrato in contratos:
+            empleado = contrato.empleado
+            try:
+                ahora = datetime.now()
+                variables = variables_contrato(contrato, empleado, ahora)
+                # El id del contrato evita colisiones de nombre dentro del mismo segundo
+                nombre = nombre_archivo_contrato(empleado, ahora).replace(".xlsx", f"_{contrato.id}.xlsx")
+                if archivo_zip:
+                    archivo_zip.writestr(nombre, plantilla.render_bytes(variables))
+                    resumen['archivos'].append(nombre)
+                elif destino:
+                    ruta = os.path.join(destino, nombre)
+                    plantilla.render(variables, ruta)
+                    resumen['archivos'].append(ruta)
+                else:
+                    ruta = generar_contrato(contrato, empleado, template_path=template_path)
+                    resumen['archivos'].append(ruta)
+                    try:
+                        from utils.document_index import get_document_index
+                        get_document_index().registrar_archivo(ruta)
+                    except Exception as e:
+                        print(f"Error actualizando índice de documentos: {e}")
+                resumen['generados'] += 1
+            except Exception as e:
+                resumen['errores'].append((contrato.id, str(e)))
+    finally:
+        if archivo_zip:
+            archivo_zip.close()
+
+    resumen['duracion'] = time.perf_counter() - inicio
+    resumen['por_segundo'] = resumen['generados'] / resumen['duracion'] if resumen['duracion'] else 0.0
+    return resumen
+
+
+# =================== BENCHMARK ===================
+
+def _plantilla_de_prueba(ruta: str, filas: int = 120, columnas: int = 11):
+    """Plantilla sintética del tamaño de un contrato real, con variables dispersas"""
+    from openpyxl.styles import Font, Border, Side
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    borde = Border(left=Side(style='thin'), right=Side(style='thin'))
+    nombres = ['{NOMBRE_EMPLEADO}', '{CEDULA_EMPLEADO}', '{SALARIO_LETRAS}', '{FECHA_INICIO}',
+               '{FECHA_FIN}', '{CARGO_EMPLEADO}', '{NOMBRE_EMPRESA}', '{TIPO_CONTRATO}']
+    for r in range(1, filas + 1):
+        for c in range(1, columnas + 1):
+            if (r * c) % 13 == 0:
+                valor = f"Campo: {nombres[(r + c) % len(nombres)]}"
+            elif (r * c) % 29 == 0:
+                valor = "='BASE DE DATOS'!H24"
+            else:
+                valor = f"Cláusula {r}.{c}"
+            celda = ws.cell(row=r, column=c, value=valor)
+            celda.font = Font(size=10)
+            celda.border = borde
+    wb.save(ruta)
+
+
+def benchmark(n: int = 100):
+    """Comparar cargar la plantilla por contrato contra la plantilla en caché"""
+    import tempfile
+    from types import SimpleNamespace
+    from datetime import date
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "plantilla.xlsx")
+        _plantilla_de_prueba(ruta)
+        empleado = SimpleNamespace(nombre_completo="José Pérez", cedula="1070000000", direccion="Calle 1",
+                                   telefono="3000000000", email=None, cargo="Operario", area_trabajo="cultivo")
+        contratos = [SimpleNamespace(id=i, empleado=empleado, tipo_contrato=None, salario=1423500,
+                                     fecha_inicio=date(2025, 1, 1), fecha_fin=date(2025, 12, 31),
+                                     estado='activo') for i in range(n)]
+
+        # Antes: load_workbook y recorrido completo de la hoja por contrato
+        inicio = time.perf_counter()
+        for contrato in contratos:
+            wb = openpyxl.load_workbook(ruta)
+            variables = variables_contrato(contrato, empleado)
+            for row in wb.active.iter_rows():
+                for cell in row:
+                    if isinstance(cell.value, str) and '{' in cell.value:
+                        for variable, valor in variables.items():
+                            if variable in cell.value:
+                                cell.value = cell.value.replace(variable, str(valor))
+            wb.save(io.BytesIO())
+        antes = n / (time.perf_counter() - inicio)
+
+        resultados = {'carga_por_contrato': antes}
+        resumen = generar_contratos_masivo(contratos, destino=os.path.join(tmp, "salida"), template_path=ruta)
+        resultados['plantilla_en_cache'] = resumen['por_segundo']
+        resumen = generar_contratos_masivo(contratos, zip_path=os.path.join(tmp, "contratos.zip"), template_path=ruta)
+        resultados['plantilla_en_cache_zip'] = resumen['por_segundo']
+
+    for nombre, por_segundo in resultados.items():
+        print(f"{nombre:<26} {por_segundo:8.1f} contratos/s")
+    return resultados
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -18,10 +18,11 @@ from .settings_manager import get_setting
 class DatabaseOptimizer:
     """Sistema de optimización automática para bases de datos SQLite"""
     
-    def __init__(self):
+    def __init__(self, auto_start: bool = True):
         self.logger = get_logger("database_optimizer")
         self.optimization_thread = None
         self.stop_optimization = False
+        self._stop_event = threading.Event()
         self.last_optimization = {}
         
         # Configuraciones
@@ -30,7 +31,7 @@ class DatabaseOptimizer:
         self.vacuum_on_startup = get_setting("database.vacuum_on_startup", False)
         
         # Iniciar optimización automática si está habilitada
-        if self.auto_optimize:
+        if auto_start and self.auto_optimize:
             self.start_auto_optimization()
     
     def get_database_paths(self) -> List[str]:
@@ -229,6 +230,7 @@ class DatabaseOptimizer:
             return
         
         self.stop_optimization = False
+        self._stop_event.clear()
         self.optimization_thread = threading.Thread(
             target=self._auto_optimization_loop,
             daemon=True
@@ -240,6 +242,7 @@ class DatabaseOptimizer:
     def stop_auto_optimization(self):
         """Detener optimización automática"""
         self.stop_optimization = True
+        self._stop_event.set()
         if self.optimization_thread:
             self.optimization_thread.join(timeout=5)
         
@@ -260,11 +263,11 @@ class DatabaseOptimizer:
                     self.optimize_all_databases()
                 
                 # Esperar hasta la próxima verificación (24 horas)
-                time.sleep(24 * 60 * 60)
+                self._stop_event.wait(24 * 60 * 60)
                 
             except Exception as e:
                 self.logger.error(f"Error en bucle de optimización automática: {e}")
-                time.sleep(60 * 60)  # Esperar 1 hora antes de reintentar
+                self._stop_event.wait(60 * 60)  # Esperar 1 hora antes de reintentar
     
     def get_optimization_status(self) -> Dict[str, any]:
         """Obtener estado de optimización del sistema"""
@@ -307,8 +310,9 @@ class DatabaseOptimizer:
             except Exception as e:
                 self.logger.error(f"Error en VACUUM de {db_path}: {e}")
 
-# Instancia global del optimizador
-database_optimizer = DatabaseOptimizer()
+# Instancia global del optimizador; la optimización automática la arranca
+# main.py cuando la ventana principal ya está en pantalla
+database_optimizer = DatabaseOptimizer(auto_start=False)
 
 def optimize_database(db_path: str, vacuum: bool = True) -> Tuple[bool, str]:
     """Función helper para optimizar una base de datos"""
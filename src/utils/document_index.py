@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índice de Documentos de Empleados
+Mantiene en memoria el contenido de empleados_data/ (cédula → carpeta del
+empleado → archivos con tamaño y fecha de modificación) para que las vistas
+no recorran el disco fila por fila. Un hilo de sondeo lo mantiene al día
+revisando solo las carpetas cuya fecha de modificación cambió, y los
+generadores lo actualizan al escribir un documento.
+"""
+
+import fnmatch
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+# Intervalo del hilo vigilante en segundos
+POLL_INTERVAL = 5
+
+
+class DocumentIndex:
+    """Índice en memoria de empleados_data"""
+
+    def __init__(self, base_dir: str = "empleados_data", ttl: float = 30):
+        self.base_dir = base_dir
+        self.ttl = ttl
+        self.lock = threading.RLock()
+        # carpeta → {ruta relativa: (tamaño, mtime)}
+        self._carpetas: Dict[str, Dict[str, Tuple[int, float]]] = {}
+        # carpeta → mtimes de sus directorios (firma para detectar cambios)
+        self._firmas: Dict[str, Tuple[float, ...]] = {}
+        # sufijo de carpeta (cédula) → carpetas
+        self._por_cedula: Dict[str, Set[str]] = {}
+        self._escaneado = None
+        self._watcher = None
+        self._stop = threading.Event()
+
+    # ---- escaneo ----
+
+    def _firma(self, ruta: str) -> Tuple[float, ...]:
+        """mtime de la carpeta y de sus subcarpetas: cambia al crear o borrar archivos"""
+        firma = []
+        for raiz, _, _ in os.walk(ruta):
+            try:
+                firma.append(os.stat(raiz).st_mtime)
+            except OSError:
+                pass
+        return tuple(firma)
+
+    def _escanear_carpeta(self, ruta: str) -> Dict[str, Tuple[int, float]]:
+        archivos = {}
+        for raiz, _, nombres in os.walk(ruta):
+            relativa = os.path.relpath(raiz, ruta)
+            for nombre in nombres:
+                try:
+                    stat = os.stat(os.path.join(raiz, nombre))
+                except OSError:
+                    continue
+                clave = nombre if relativa == '.' else f"{relativa}/{nombre}".replace(os.sep, '/')
+                archivos[clave] = (stat.st_size, stat.st_mtime)
+        return archivos
+
+    def _indexar_cedulas(self, carpeta: str, agregar: bool = True):
+        # La cédula es un sufijo tras "_"; como nombre y cédula pueden contener "_",
+        # se registran todos los sufijos posibles
+        partes = carpeta.split('_')
+        for i in range(1, len(partes)):
+            sufijo = '_'.join(partes[i:])
+            if agregar:
+                self._por_cedula.setdefault(sufijo, set()).add(carpeta)
+            elif sufijo in self._por_cedula:
+                self._por_cedula[sufijo].discard(carpeta)
+                if not self._por_cedula[sufijo]:
+                    del self._por_cedula[sufijo]
+
+    def refrescar(self) -> int:
+        """Reescanear solo las carpetas nuevas, borradas o modificadas; retorna cuántas cambiaron"""
+        actuales = {}
+        if os.path.isdir(self.base_dir):
+            with os.scandir(self.base_dir) as entradas:
+                actuales = {e.name: e.path for e in entradas if e.is_dir()}
+
+        # El disco se recorre fuera del lock para no frenar las consultas de la interfaz
+        with self.lock:
+            firmas_previas = dict(self._firmas)
+        modificadas = {}
+        for carpeta, ruta in actuales.items():
+            firma = self._firma(ruta)
+            if firmas_previas.get(carpeta) != firma:
+                modificadas[carpeta] = (firma, self._escanear_carpeta(ruta))
+
+        with self.lock:
+            borradas = set(self._carpetas) - set(actuales)
+            for carpeta in borradas:
+                del self._carpetas[carpeta]
+                self._firmas.pop(carpeta, None)
+                self._indexar_cedulas(carpeta, agregar=False)
+            for carpeta, (firma, archivos) in modificadas.items():
+                if carpeta not in self._carpetas:
+                    self._indexar_cedulas(carpeta)
+                self._carpetas[carpeta] = archivos
+                self._firmas[carpeta] = firma
+            self._escaneado = time.monotonic()
+        return len(borradas) + len(modificadas)
+
+    def _asegurar(self):
+        """Construir el índice la primera vez; sin vigilante, refrescar por TTL"""
+        with self.lock:
+            vencido = self._escaneado is None or (
+                self._watcher is None and time.monotonic() - self._escaneado > self.ttl
+            )
+            if vencido:
+                self.refrescar()
+
+    def invalidate(self):
+        """Forzar un refresco en la próxima consulta"""
+        with self.lock:
+            self._escaneado = None
+
+    def registrar_archivo(self, ruta_archivo: str):
+        """Actualizar el índice tras escribir un documento en empleados_data"""
+        relativa = os.path.relpath(os.path.abspath(ruta_archivo), os.path.abspath(self.base_dir))
+        partes = relativa.replace(os.sep, '/').split('/', 1)
+        if len(partes) != 2 or partes[0] == '..':
+            return
+        carpeta, archivo = partes
+        try:
+            stat = os.stat(ruta_archivo)
+        except OSError:
+            return
+        with self.lock:
+            if carpeta not in self._carpetas:
+                self._carpetas[carpeta] = {}
+                self._indexar_cedulas(carpeta)
+            self._carpetas[carpeta][archivo] = (stat.st_size, stat.st_mtime)
+            self._firmas[carpeta] = self._firma(os.path.join(self.base_dir, carpeta))
+
+    # ---- vigilante ----
+
+    def start_watcher(self, interval: float = POLL_INTERVAL):
+        """Mantener el índice al día con un hilo de sondeo en segundo plano"""
+        if self._watcher and self._watcher.is_alive():
+            return
+        self._stop.clear()
+
+        def vigilar():
+            while not self._stop.wait(interval):
+                try:
+                    self.refrescar()
+                except Exception as e:
+                    print(f"Error refrescando índice de documentos: {e}")
+
+        self.refrescar()
+        self._watcher = threading.Thread(target=vigilar, daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+        self._watcher = None
+
+    # ---- consultas ----
+
+    def carpeta_de(self, nombre_completo: str, cedula: str) -> str:
+        """Nombre de carpeta con la misma convención que usan los generadores"""
+        nombre_seguro = nombre_completo.replace(" ", "_").replace("/", "_")
+        cedula_segura = cedula.replace(" ", "_")
+        return f"{nombre_seguro}_{cedula_segura}"
+
+    def existe(self, carpeta: str) -> bool:
+        self._asegurar()
+        return carpeta in self._carpetas
+
+    def ruta(self, carpeta: str, archivo: str = None) -> str:
+        partes = [self.base_dir, carpeta] + (archivo.split('/') if archivo else [])
+        return os.path.join(*partes)
+
+    def archivos(self, carpeta: str, patron: str = None) -> List[str]:
+        """Archivos de la carpeta de un empleado, opcionalmente filtrados con un patrón glob"""
+        self._asegurar()
+        with self.lock:
+            archivos = sorted(self._carpetas.get(carpeta, {}))
+        if patron:
+            return [a for a in archivos if fnmatch.fnmatch(a, patron)]
+        return archivos
+
+    def ultimo_documento(self, carpeta: str, patron: str = "*.xlsx") -> Optional[str]:
+        """Ruta completa del documento más reciente de la carpeta"""
+        self._asegurar()
+        with self.lock:
+            candidatos = [
+                (mtime, archivo) for archivo, (_, mtime) in self._carpetas.get(carpeta, {}).items()
+                if fnmatch.fnmatch(archivo, patron)
+            ]
+        if not candidatos:
+            return None
+        return self.ruta(carpeta, max(candidatos)[1])
+
+    def documentos(self, cedula: str) -> List[dict]:
+        """Todos los documentos de una cédula con tamaño y fecha de modificación"""
+        self._asegurar()
+        with self.lock:
+            carpetas = sorted(self._por_cedula.get(cedula.replace(" ", "_"), ()))
+            return [
+                {'carpeta': carpeta, 'archivo': archivo, 'ruta': self.ruta(carpeta, archivo),
+                 'tamano': tamano, 'mtime': mtime}
+                for carpeta in carpetas
+                for archivo, (tamano, mtime) in sorted(self._carpetas[carpeta].items())
+            ]
+
+    def cedulas_con_excel(self) -> Set[str]:
+        """Cédulas (normalizadas con "_") que tienen al menos un .xlsx, para marcar toda la grilla"""
+        self._asegurar()
+        with self.lock:
+            return {
+                cedula for cedula, carpetas in self._por_cedula.items()
+                if any(a.endswith('.xlsx') for c in carpetas for a in self._carpetas[c])
+            }
+
+    def tiene_excel(self, cedula: str) -> bool:
+        self._asegurar()
+        with self.lock:
+            carpetas = self._por_cedula.get(cedula.replace(" ", "_"), ())
+            return any(a.endswith('.xlsx') for c in carpetas for a in self._carpetas[c])
+
+
+_document_index: Optional[DocumentIndex] = None
+_document_index_lock = threading.Lock()
+
+
+def get_document_index() -> DocumentIndex:
+    """Instancia global del índice de documentos"""
+    global _document_index
+    with _document_index_lock:
+        if _document_index is None:
+            _document_index = DocumentIndex()
+        return _document_index
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Generador de Excel de Empleados
+Genera la ficha Excel de uno o muchos empleados. Cada proceso arma la
+plantilla (estilos, hojas y encabezados) una sola vez y por empleado solo
+escribe las celdas variables. Los lotes grandes se reparten en un
+ProcessPoolExecutor, informan el avance por una cola y omiten a los
+empleados cuyos datos no cambiaron desde el último archivo generado.
+"""
+
+import hashlib
+import json
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import openpyxl
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from dateutil.relativedelta import relativedelta
+
+from .formato_espanol import numero_a_letras
+
+# Cambiar al modificar la plantilla para regenerar todos los archivos
+PLANTILLA_VERSION = 2
+
+# Manifiesto con el hash de los datos del último Excel de cada cédula
+MANIFIESTO = ".excel_empleados.json"
+
+# Por debajo de este número de empleados no compensa levantar procesos
+MIN_LOTE_PROCESOS = 8
+MAX_WORKERS = 4
+
+# Fila de cada dato en la hoja "Datos Personales"
+FILAS_DATOS = {
+    'nombre_completo': 5, 'cedula': 6, 'telefono': 7, 'email': 8, 'direccion': 9,
+    'area_trabajo': 12, 'cargo': 13, 'salario_base': 14, 'estado': 15, 'fecha_ingreso': 16,
+    'salario_letras': 17,
+}
+
+_manifiesto_lock = threading.Lock()
+
+
+def limpiar_texto(texto):
+    """Texto para una celda: preserva tildes y ñ, reemplaza solo caracteres problemáticos"""
+    if texto is None:
+        return "No definido"
+    texto_str = str(texto).strip()
+    if not texto_str:
+        return "No definido"
+    caracteres_problematicos = {
+        '✅': '✓',  # check mark
+        '❌': '✗',  # cross mark
+        '…': '...',  # ellipsis
+    }
+    for problema, reemplazo in caracteres_problematicos.items():
+        texto_str = texto_str.replace(problema, reemplazo)
+    return texto_str
+
+
+def limpiar_nombre_archivo(texto):
+    if not texto:
+        return "sin_nombre"
+    caracteres_prohibidos = ['<', '>', ':', '"', '/', '\\', '|', '?', '*']
+    texto_limpio = str(texto)
+    for char in caracteres_prohibidos:
+        texto_limpio = texto_limpio.replace(char, '_')
+    return texto_limpio.replace(" ", "_")
+
+
+def datos_empleado(empleado) -> dict:
+    """Datos de un Empleado como diccionario simple (serializable para otros procesos)"""
+    return {
+        'nombre_completo': empleado.nombre_completo,
+        'cedula': empleado.cedula,
+        'telefono': empleado.telefono,
+        'email': empleado.email,
+        'direccion': empleado.direccion,
+        'area_trabajo': empleado.area_trabajo,
+        'cargo': empleado.cargo,
+        'salario_base': empleado.salario_base,
+        'estado': bool(empleado.estado),
+        'fecha_ingreso': empleado.fecha_ingreso.strftime('%d/%m/%Y') if empleado.fecha_ingreso else None,
+    }
+
+
+def hash_datos(datos: dict) -> str:
+    """Hash de los datos de origen más la versión de la plantilla"""
+    contenido = json.dumps([PLANTILLA_VERSION, datos], sort_keys=True, default=str)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+# =================== PLANTILLA ===================
+
+def _construir_plantilla():
+    """Libro con todo lo que no depende del empleado"""
+    wb = openpyxl.Workbook()
+
+    header_font = Font(size=14, bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    title_font = Font(size=18, bold=True, color="2F4F4F")
+    data_font = Font(size=11)
+    border = Border(left=Side(style='thin'), right=Side(style='thin'),
+                    top=Side(style='thin'), bottom=Side(style='thin'))
+
+    def encabezados(ws, titulos):
+        for i, titulo in enumerate(titulos, 1):
+            cell = ws.cell(row=3, column=i, value=titulo)
+            cell.font = header_font
+            cell.fill = header_fill
+            cell.border = border
+            cell.alignment = Alignment(horizontal='center', vertical='center')
+
+    def titulo(ws, rango, texto):
+        ws.merge_cells(rango)
+        ws['A1'] = texto
+        ws['A1'].font = title_font
+        ws['A1'].alignment = Alignment(horizontal='center', vertical='center')
+
+    # ===== HOJA 1: DATOS PERSONALES =====
+    ws1 = wb.active
+    ws1.title = "Datos Personales"
+    titulo(ws1, 'A1:D1', "INFORMACION DEL EMPLEADO")
+    ws1.merge_cells('A2:D2')
+    ws1['A2'].alignment = Alignment(horizontal='center')
+    ws1['A2'].font = Font(size=10, italic=True)
+
+    etiquetas = {
+        4: "DATOS BASICOS", 5: "Nombre Completo:", 6: "Cedula:", 7: "Telefono:",
+        8: "Email:", 9: "Direccion:", 11: "DATOS LABORALES", 12: "Area de Trabajo:",
+        13: "Cargo:", 14: "Salario Base:", 15: "Estado:", 16: "Fecha de Ingreso:",
+        17: "Salario en Letras:",
+    }
+    for row, label in etiquetas.items():
+        if label.startswith("DATOS"):
+            ws1.merge_cells(f'A{row}:D{row}')
+            ws1[f'A{row}'] = label
+            ws1[f'A{row}'].font = header_font
+            ws1[f'A{row}'].fill = header_fill
+            ws1[f'A{row}'].alignment = Alignment(horizontal='center', vertical='center')
+            ws1[f'A{row}'].border = border
+        else:
+            ws1[f'A{row}'] = label
+            ws1[f'A{row}'].font = Font(size=11, bold=True)
+            ws1[f'B{row}'].font = data_font
+            ws1[f'A{row}'].border = border
+            ws1[f'B{row}'].border = border
+
+    for col, width in zip('ABCD', [20, 30, 15, 15]):
+        ws1.column_dimensions[col].width = width
+
+    # ===== HOJA 2: SEGUIMIENTO =====
+    ws2 = wb.create_sheet("Seguimiento")
+    titulo(ws2, 'A1:F1', "SEGUIMIENTO Y NOTAS")
+    encabezados(ws2, ['Fecha', 'Tipo', 'Descripcion', 'Usuario', 'Estado', 'Observaciones'])
+    ejemplo = [None, 'CREACION', 'Empleado registrado en el sistema', 'Sistema',
+               'COMPLETADO', 'Registro inicial automatico']
+    for i, value in enumerate(ejemplo, 1):
+        cell = ws2.cell(row=4, column=i, value=value)
+        cell.font = data_font
+        cell.border = border
+    for i, width in enumerate([12, 15, 30, 15, 12, 25], 1):
+        ws2.column_dimensions[chr(64 + i)].width = width
+
+    # ===== HOJA 3: CAPACITACIONES =====
+    ws3 = wb.create_sheet("Capacitaciones")
+    titulo(ws3, 'A1:E1', "REGISTRO DE CAPACITACIONES")
+    encabezados(ws3, ['Fecha', 'Capacitacion', 'Instructor', 'Duracion (hrs)', 'Estado'])
+    ws3['A5'] = "INSTRUCCIONES:"
+    ws3['A5'].font = Font(size=12, bold=True, color="8B0000")
+    instrucciones = [
+        "• Registrar todas las capacitaciones recibidas",
+        "• Actualizar el estado segun el progreso",
+        "• Incluir certificaciones obtenidas",
+        "• Revisar mensualmente"
+    ]
+    for i, instruccion in enumerate(instrucciones, 6):
+        ws3[f'A{i}'] = instruccion
+        ws3[f'A{i}'].font = Font(size=10)
+    for i, width in enumerate([12, 25, 20, 12, 15], 1):
+        ws3.column_dimensions[chr(64 + i)].width = width
+
+    # ===== HOJA 4: EVALUACIONES =====
+    ws4 = wb.create_sheet("Evaluaciones")
+    titulo(ws4, 'A1:F1', "EVALUACIONES DE DESEMPEÑO")
+    encabezados(ws4, ['Fecha', 'Periodo', 'Puntuacion', 'Fortalezas', 'Areas de Mejora', 'Evaluador'])
+    ws4['A5'] = "Proxima evaluacion:"
+    ws4['A5'].font = Font(size=11, bold=True)
+    ws4['B5'].font = Font(size=11, color="FF0000")
+    for i, width in enumerate([12, 15, 12, 25, 25, 15], 1):
+        ws4.column_dimensions[chr(64 + i)].width = width
+
+    return wb
+
+
+# Plantilla ya armada, una por proceso (el lock cubre a los hilos del mismo proceso)
+_plantilla = None
+_plantilla_lock = threading.Lock()
+
+
+def _obtener_plantilla():
+    global _plantilla
+    if _plantilla is None:
+        _plantilla = _construir_plantilla()
+    return _plantilla
+
+
+def generar_excel(datos: dict, base_dir: str = "empleados_data") -> str:
+    """Escribir la ficha Excel de un empleado y retornar su ruta"""
+    nombre_seguro = limpiar_nombre_archivo(datos['nombre_completo'])
+    cedula_segura = limpiar_nombre_archivo(datos['cedula'])
+    contratos_dir = os.path.join(base_dir, f"{nombre_seguro}_{cedula_segura}", "contratos")
+    os.makedirs(contratos_dir, exist_ok=True)
+
+    ahora = datetime.now()
+    filepath = os.path.join(contratos_dir, f"empleado_{cedula_segura}_{ahora.strftime('%Y%m%d_%H%M%S')}.xlsx")
+
+    valores = {}
+    for campo, row in FILAS_DATOS.items():
+        valor = datos.get(campo)
+        if campo == 'salario_base':
+            valor = f"${valor:,}" if valor else "No definido"
+        elif campo == 'estado':
+            valor = "Activo" if valor else "Inactivo"
+        elif campo == 'fecha_ingreso':
+            valor = valor or "No definida"
+        elif campo == 'salario_letras':
+            salario = datos.get('salario_base')
+            valor = numero_a_letras(salario) if salario else "No definido"
+        valores[f'B{row}'] = limpiar_texto(valor)
+
+    # La plantilla se reutiliza: solo se sobrescriben las celdas variables
+    with _plantilla_lock:
+        wb = _obtener_plantilla()
+        ws1 = wb["Datos Personales"]
+        ws1['A2'] = f"Generado: {ahora.strftime('%d/%m/%Y %H:%M')}"
+        for celda, valor in valores.items():
+            ws1[celda] = valor
+        wb["Seguimiento"]['A4'] = ahora.strftime('%d/%m/%Y')
+        wb["Evaluaciones"]['B5'] = (ahora + relativedelta(months=3)).strftime('%d/%m/%Y')
+        wb.save(filepath)
+    return filepath
+
+
+def _generar_en_proceso(datos: dict, base_dir: str):
+    """Tarea de un proceso del pool: (cédula, ruta, error)"""
+    try:
+        return datos['cedula'], generar_excel(datos, base_dir), None
+    except Exception as e:
+        return datos['cedula'], None, str(e)
+
+
+# =================== LOTES ===================
+
+class EmpleadoExcelBatch:
+    """Generación de fichas Excel en lote con avance por cola y omisión de datos sin cambios"""
+
+    def __init__(self, base_dir: str = "empleados_data", max_workers: int = None):
+        self.base_dir = base_dir
+        self.max_workers = max_workers or min(MAX_WORKERS, os.cpu_count() or 1)
+        self._cancelado = threading.Event()
+
+    # ---- manifiesto ----
+
+    def _ruta_manifiesto(self) -> str:
+        return os.path.join(self.base_dir, MANIFIESTO)
+
+    def leer_manifiesto(self) -> Dict[str, dict]:
+        try:
+            with open(self._ruta_manifiesto(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _actualizar_manifiesto(self, generados: Dict[str, dict]):
+        if not generados:
+            return
+        with _manifiesto_lock:
+            manifiesto = self.leer_manifiesto()
+            manifiesto.update(generados)
+            os.makedirs(self.base_dir, exist_ok=True)
+            temporal = self._ruta_manifiesto() + ".tmp"
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(manifiesto, f, ensure_ascii=False, indent=1)
+            os.replace(temporal, self._ruta_manifiesto())
+
+    def pendientes(self, empleados: List[dict], forzar: bool = False):
+        """Separar (pendientes, omitidos): se omite si el hash coincide y el archivo sigue existiendo"""
+        if forzar:
+            return list(empleados), []
+        manifiesto = self.leer_manifiesto()
+        pendientes, omitidos = [], []
+        for datos in empleados:
+            previo = manifiesto.get(datos['cedula'])
+            if previo and previo.get('hash') == hash_datos(datos) and os.path.exists(previo.get('archivo', '')):
+                omitidos.append(datos)
+            else:
+                pendientes.append(datos)
+        return pendientes, omitidos
+
+    # ---- generación ----
+
+    def cancelar(self):
+        self._cancelado.set()
+
+    def generar(self, empleados: List[dict], progreso: Optional[queue.Queue] = None,
+                forzar: bool = False) -> dict:
+        """
+        Generar las fichas de una lista de datos_empleado().
+        Publica en 'progreso' un dict por empleado y uno final con tipo 'fin'.
+        """
+        self._cancelado.clear()
+        inicio = datetime.now()
+        pendientes, omitidos = self.pendientes(empleados, forzar)
+        total = len(empleados)
+        resumen = {'total': total, 'generados': 0, 'omitidos': len(omitidos), 'errores': [],
+                   'archivos': [], 'cancelado': False}
+        hechos = 0
+        generados = {}
+
+        def avisar(cedula, estado, ruta=None, error=None):
+            if progreso is not None:
+                progreso.put({'tipo': 'progreso', 'hechos': hechos, 'total': total,
+                              'cedula': cedula, 'estado': estado, 'ruta': ruta, 'error': error})
+
+        for datos in omitidos:
+            hechos += 1
+            avisar(datos['cedula'], 'omitido')
+
+        por_cedula = {d['cedula']: d for d in pendientes}
+
+        def registrar(cedula, ruta, error):
+            nonlocal hechos
+            hechos += 1
+            if error:
+                resumen['errores'].append((cedula, error))
+                avisar(cedula, 'error', error=error)
+                return
+            resumen['generados'] += 1
+            resumen['archivos'].append(ruta)
+            generados[cedula] = {'hash': hash_datos(por_cedula[cedula]), 'archivo': ruta}
+            try:
+                from utils.document_index import get_document_index
+                get_document_index().registrar_archivo(ruta)
+            except Exception as e:
+                print(f"Error actualizando índice de documentos: {e}")
+            avisar(cedula, 'generado', ruta=ruta)
+
+        restantes = dict(por_cedula)
+        if len(restantes) >= MIN_LOTE_PROCESOS and self.max_workers > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                    futuros = [pool.submit(_generar_en_proceso, d, self.base_dir) for d in restantes.values()]
+                    for futuro in as_completed(futuros):
+                        if self._cancelado.is_set():
+                            for f in futuros:
+                                f.cancel()
+                        if futuro.cancelled():
+                            continue
+                        cedula, ruta, error = futuro.result()
+                        registrar(cedula, ruta, error)
+                        restantes.pop(cedula, None)
+            except Exception as e:
+                # Sin procesos disponibles (p.ej. entorno restringido): continuar en este hilo
+                print(f"Pool de procesos no disponible, generando en serie: {e}")
+
+        for datos in list(restantes.values()):
+            if self._cancelado.is_set():
+                break
+            registrar(*_generar_en_proceso(datos, self.base_dir))
+
+        self._actualizar_manifiesto(generados)
+        resumen['cancelado'] = self._cancelado.is_set()
+        resumen['duracion'] = (datetime.now() - inicio).total_seconds()
+        if progreso is not None:
+            progreso.put({'tipo': 'fin', 'resumen': resumen})
+        return resumen
+
+    def iniciar(self, empleados: List[dict], forzar: bool = False) -> queue.Queue:
+        """Generar en un hilo de fondo; la interfaz lee el avance de la cola retornada"""
+        progreso = queue.Queue()
+        threading.Thread(target=self.generar, args=(empleados, progreso, forzar), daemon=True).start()
+        return progreso
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Búsqueda de Empleados en Memoria
+Almacén por columnas de los empleados con un índice de trigramas sobre
+nombre, cédula y cargo. Permite filtrar sin materializar objetos ORM. El
+texto lo resuelve el índice de búsqueda común (search_index) y el almacén
+filtra esos ids por estado y área (filtrar_ids); buscar() en memoria queda
+para cuando la base no responde. El índice se construye en segundo plano;
+mientras tanto la búsqueda recorre los textos normalizados.
+"""
+
+import threading
+import unicodedata
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Orden de columnas del almacén (mismo orden que la consulta de carga)
+COLUMNAS = ('id', 'nombre_completo', 'cedula', 'telefono', 'area_trabajo',
+            'cargo', 'salario_base', 'estado')
+
+
+def normalizar(texto) -> str:
+    """Minúsculas y sin tildes, para que 'jose' encuentre 'José'"""
+    if not texto:
+        return ''
+    descompuesto = unicodedata.normalize('NFKD', str(texto))
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).casefold()
+
+
+def trigramas(texto: str):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class EmpleadoStore:
+    """Almacén por columnas con índice de trigramas y filtrado incremental"""
+
+    def __init__(self):
+        self.columnas: Dict[str, list] = {c: [] for c in COLUMNAS}
+        self._texto: List[str] = []
+        self._trigramas: Optional[Dict[str, array]] = None
+        self._ultima: Optional[Tuple[str, Optional[bool], Optional[str], List[int]]] = None
+        self._posiciones: Dict[int, int] = {}
+        self._generacion = 0
+
+    def cargar(self, filas: Iterable[tuple], indexar_en_segundo_plano: bool = True):
+        """Reemplazar el contenido con filas en el orden de COLUMNAS"""
+        columnas = {c: [] for c in COLUMNAS}
+        textos = []
+        for fila in filas:
+            for columna, valor in zip(COLUMNAS, fila):
+                columnas[columna].append(valor)
+            # Nombre, cédula y cargo separados para no crear coincidencias entre campos
+            textos.append('\x00'.join(normalizar(fila[j]) for j in (1, 2, 5)))
+
+        self._generacion += 1
+        self.columnas = columnas
+        self._posiciones = {id_: i for i, id_ in enumerate(columnas['id'])}
+        self._texto = textos
+        self._trigramas = None
+        self._ultima = None
+        if indexar_en_segundo_plano:
+            threading.Thread(target=self._indexar, args=(self._generacion, textos), daemon=True).start()
+        else:
+            self._indexar(self._generacion, textos)
+
+    def _indexar(self, generacion: int, textos: List[str]):
+        indice: Dict[str, array] = {}
+        for i, texto in enumerate(textos):
+            for tri in trigramas(texto):
+                # Las filas se recorren en orden, así que cada lista queda ordenada
+                lista = indice.get(tri)
+                if lista is None:
+                    indice[tri] = lista = array('I')
+                lista.append(i)
+        # Descartar el índice si entretanto se recargó el almacén
+        if generacion == self._generacion:
+            self._trigramas = indice
+
+    @property
+    def indexado(self) -> bool:
+        return self._trigramas is not None
+
+    def cargar_desde_db(self, db):
+        """Cargar desde la base local con una sola consulta de columnas (sin objetos ORM)"""
+        from models.database import Empleado
+        self.cargar(
+            db.query(*(getattr(Empleado, c) for c in COLUMNAS)).order_by(Empleado.id).all()
+        )
+
+    def __len__(self):
+        return len(self._texto)
+
+    def fila(self, i: int) -> tuple:
+        return tuple(self.columnas[c][i] for c in COLUMNAS)
+
+    def contar_estados(self) -> Tuple[int, int]:
+        """(total, activos)"""
+        estados = self.columnas['estado']
+        return len(estados), sum(1 for e in estados if e)
+
+    def _candidatos(self, consulta: str, estado, area) -> Iterable[int]:
+        # Filtrado incremental: si la consulta nueva contiene a la anterior,
+        # sus resultados son un subconjunto de los anteriores
+        if self._ultima:
+            previa, estado_previo, area_previa, resultados = self._ultima
+            if previa and previa in consulta and (estado, area) == (estado_previo, area_previa):
+                return resultados
+        indice = self._trigramas
+        if len(consulta) >= 3 and indice is not None:
+            # La lista del trigrama más raro acota los candidatos
+            listas = []
+            for tri in trigramas(consulta):
+                lista = indice.get(tri)
+                if lista is None:
+                    return ()
+                listas.append(lista)
+            return min(listas, key=len)
+        return range(len(self._texto))
+
+    def buscar(self, texto: str = '', estado: Optional[bool] = None,
+               area: Optional[str] = None) -> List[int]:
+        """Índices de filas que contienen el texto (en nombre, cédula o cargo) y cumplen los filtros"""
+        consulta = normalizar(texto.strip())
+        textos = self._texto
+        estados = self.columnas['estado']
+        areas = self.columnas['area_trabajo']
+
+        resultados = [
+            i for i in self._candidatos(consulta, estado, area)
+            if (not consulta or consulta in textos[i])
+            and (estado is None or bool(estados[i]) == estado)
+            and (area is None or areas[i] == area)
+        ]
+        self._ultima = (consulta, estado, area, resultados)
+        return resultados
+
+    def filtrar_ids(self, ids: Iterable[int], estado: Optional[bool] = None,
+                    area: Optional[str] = None) -> List[int]:
+        """Índices de filas de los ids dados (en su orden) que cumplen los filtros"""
+        posiciones = self._posiciones
+        estados = self.columnas['estado']
+        areas = self.columnas['area_trabajo']
+        return [
+            i for i in (posiciones.get(id_) for id_ in ids)
+            if i is not None
+            and (estado is None or bool(estados[i]) == estado)
+            and (area is None or areas[i] == area)
+        ]
+
+    def ordenar(self, indices: List[int], columna: str, descendente: bool = False) -> List[int]:
+        """Ordenar índices por una columna (nulos al final)"""
+        valores = self.columnas[columna]
+        con_valor = [i for i in indices if valores[i] is not None]
+        sin_valor = [i for i in indices if valores[i] is None]
+        con_valor.sort(key=lambda i: normalizar(valores[i]) if isinstance(valores[i], str) else valores[i],
+                       reverse=descendente)
+        return con_valor + sin_valor
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Formato en Español
+Conversión de números a letras (montos en pesos) y de fechas a texto para
+contratos, fichas de empleados y reportes. Los algoritmos usan tablas y
+escala larga (millón, billón, trillón); los resultados se memorizan porque
+los salarios se repiten mucho entre contratos.
+"""
+
+from datetime import date, datetime
+from functools import lru_cache
+
+UNIDADES = (
+    "CERO", "UNO", "DOS", "TRES", "CUATRO", "CINCO", "SEIS", "SIETE", "OCHO", "NUEVE",
+    "DIEZ", "ONCE", "DOCE", "TRECE", "CATORCE", "QUINCE", "DIECISÉIS", "DIECISIETE",
+    "DIECIOCHO", "DIECINUEVE", "VEINTE", "VEINTIUNO", "VEINTIDÓS", "VEINTITRÉS",
+    "VEINTICUATRO", "VEINTICINCO", "VEINTISÉIS", "VEINTISIETE", "VEINTIOCHO", "VEINTINUEVE",
+)
+DECENAS = ("", "", "", "TREINTA", "CUARENTA", "CINCUENTA", "SESENTA", "SETENTA", "OCHENTA", "NOVENTA")
+CENTENAS = ("", "CIENTO", "DOSCIENTOS", "TRESCIENTOS", "CUATROCIENTOS", "QUINIENTOS",
+            "SEISCIENTOS", "SETECIENTOS", "OCHOCIENTOS", "NOVECIENTOS")
+
+# Escala larga: cada grupo de seis cifras (singular, plural)
+ESCALAS = ((None, None), ("MILLÓN", "MILLONES"), ("BILLÓN", "BILLONES"), ("TRILLÓN", "TRILLONES"))
+MAXIMO = 10 ** (6 * len(ESCALAS)) - 1
+
+MESES = ("", "ENERO", "FEBRERO", "MARZO", "ABRIL", "MAYO", "JUNIO", "JULIO",
+         "AGOSTO", "SEPTIEMBRE", "OCTUBRE", "NOVIEMBRE", "DICIEMBRE")
+
+
+def _decenas(n: int, apocope: bool) -> str:
+    """1..99; con apócope 'UNO' pasa a 'UN' delante de un sustantivo (VEINTIÚN MIL, UN PESO)"""
+    if n < 30:
+        palabra = UNIDADES[n]
+    else:
+        decena, unidad = divmod(n, 10)
+        palabra = DECENAS[decena] + (f" Y {UNIDADES[unidad]}" if unidad else "")
+    if apocope:
+        if palabra == "VEINTIUNO":
+            return "VEINTIÚN"
+        if palabra.endswith("UNO"):
+            return palabra[:-1]
+    return palabra
+
+
+def _centenas(n: int, apocope: bool) -> str:
+    """1..999"""
+    if n == 100:
+        return "CIEN"
+    centena, resto = divmod(n, 100)
+    partes = [CENTENAS[centena]] if centena else []
+    if resto:
+        partes.append(_decenas(resto, apocope))
+    return " ".join(partes)
+
+
+def _miles(n: int, apocope: bool) -> str:
+    """1..999999"""
+    miles, resto = divmod(n, 1000)
+    partes = []
+    if miles == 1:
+        partes.append("MIL")
+    elif miles:
+        partes.append(f"{_centenas(miles, True)} MIL")
+    if resto:
+        partes.append(_centenas(resto, apocope))
+    return " ".join(partes)
+
+
+@lru_cache(maxsize=2048)
+def _entero_a_letras(n: int, moneda: str) -> str:
+    if n < 0:
+        return "MENOS " + _entero_a_letras(-n, moneda)
+    if n > MAXIMO:
+        raise ValueError(f"Número fuera de rango: {n}")
+
+    if n == 0:
+        texto = UNIDADES[0]
+    else:
+        partes = []
+        grupos = []
+        resto = n
+        while resto:
+            resto, grupo = divmod(resto, 10 ** 6)
+            grupos.append(grupo)
+        for nivel in range(len(grupos) - 1, -1, -1):
+            grupo = grupos[nivel]
+            if not grupo:
+                continue
+            if nivel == 0:
+                # El último grupo va pegado a la moneda: "VEINTIÚN PESOS"
+                partes.append(_miles(grupo, bool(moneda)))
+            else:
+                singular, plural = ESCALAS[nivel]
+                partes.append(f"UN {singular}" if grupo == 1 else f"{_miles(grupo, True)} {plural}")
+        texto = " ".join(partes)
+
+    if not moneda:
+        return texto
+    if n == 1:
+        return f"UN {moneda[:-1] if moneda.endswith('S') else moneda}"
+    # "UN MILLÓN DE PESOS", pero "UN MILLÓN CIEN PESOS"
+    if n >= 10 ** 6 and n % 10 ** 6 == 0:
+        return f"{texto} DE {moneda}"
+    return f"{texto} {moneda}"
+
+
+def numero_a_letras(numero, moneda: str = "PESOS") -> str:
+    """
+    Monto en letras: 1423500 → 'UN MILLÓN CUATROCIENTOS VEINTITRÉS MIL QUINIENTOS PESOS'.
+    Se toma la parte entera; moneda='' retorna solo el número en letras.
+    """
+    if numero is None:
+        numero = 0
+    return _entero_a_letras(int(numero), moneda or "")
+
+
+@lru_cache(maxsize=1024)
+def _fecha_a_espanol(dia: int, mes: int, anio: int) -> str:
+    return f"{dia} DE {MESES[mes]} DE {anio}"
+
+
+def fecha_a_espanol(fecha, vacio: str = "NO DEFINIDA") -> str:
+    """date o datetime → '19 DE OCTUBRE DE 2026'"""
+    if not fecha:
+        return vacio
+    if not isinstance(fecha, (date, datetime)):
+        return str(fecha)
+    return _fecha_a_espanol(fecha.day, fecha.month, fecha.year)
+
+
+def cache_info() -> dict:
+    """Aciertos de la memoria de conversiones"""
+    return {'numeros': _entero_a_letras.cache_info(), 'fechas': _fecha_a_espanol.cache_info()}
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Historial de Movimientos por Páginas
+Las ventanas de historial no cargan el libro completo: piden páginas de
+movimientos (los más recientes primero) con los filtros de tipo, producto
+y rango de fechas, y cada página sigue desde el último movimiento de la
+anterior (paginación por clave sobre los índices (tipo, fecha_hora),
+(producto_codigo, fecha_hora) y (fecha_hora)). Así abrir la ventana cuesta
+lo mismo con un mes que con años de movimientos. El Treeview pide la
+página siguiente cuando el desplazamiento se acerca al final.
+"""
+
+from datetime import date, datetime
+from typing import Callable, List, Optional
+
+# Movimientos por página
+TAMANO_PAGINA = 200
+# Fracción desplazada a partir de la cual se pide la página siguiente
+UMBRAL_CARGA = 0.9
+
+
+def fecha_filtro(texto: str) -> Optional[date]:
+    """Fecha DD/MM/AAAA de un campo de filtro (vacío = sin límite); ValueError si no es válida"""
+    texto = (texto or '').strip()
+    if not texto:
+        return None
+    try:
+        return datetime.strptime(texto, '%d/%m/%Y').date()
+    except ValueError:
+        raise ValueError(f"Fecha inválida: {texto} (use DD/MM/AAAA)")
+
+
+class HistorialMovimientos:
+    """Consulta paginada del libro de una línea con filtros fijos"""
+
+    def __init__(self, inventario, tipo: str = None, codigo: str = None, desde: date = None,
+                 hasta: date = None, tamano: int = TAMANO_PAGINA):
+        if desde and hasta and desde > hasta:
+            raise ValueError("La fecha 'desde' es posterior a 'hasta'")
+        self.inventario = inventario
+        self.filtros = {'tipo': tipo or None, 'codigo': codigo or None, 'desde': desde, 'hasta': hasta}
+        self.tamano = tamano
+        self.cargados = 0
+        self.hay_mas = True
+        self._ultimo = None
+
+    def siguiente_pagina(self) -> List:
+        """Próxima página de Movimiento; lista vacía cuando ya no quedan"""
+        if not self.hay_mas:
+            return []
+        pagina = self.inventario.movimientos(limite=self.tamano, despues=self._ultimo, **self.filtros)
+        if pagina:
+            self._ultimo = (pagina[-1].fecha_hora, pagina[-1].id)
+        self.cargados += len(pagina)
+        self.hay_mas = len(pagina) == self.tamano
+        return pagina
+
+
+def cargar_al_desplazar(tree, v_scrollbar, cargar_mas: Callable[[], None]):
+    """
+    Conectar el Treeview a su barra vertical y llamar cargar_mas() cuando la
+    parte visible llega cerca del final (también si la primera página no
+    alcanza a llenar la vista)
+    """
+    def desplazado(primero, ultimo):
+        v_scrollbar.set(primero, ultimo)
+        if float(ultimo) >= UMBRAL_CARGA:
+            tree.after_idle(cargar_mas)
+
+    tree.configure(yscrollcommand=desplazado)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Analítica de Inventarios
+Carga el libro de movimientos en arreglos NumPy/pandas y calcula, sin
+recorrer fila por fila: consumo por producto, días de cobertura,
+clasificación ABC por valor consumido, punto de reorden según el uso
+histórico y la valorización de cada inventario en el tiempo. Los
+resultados quedan en la caché de lecturas por día (y se invalidan con
+cualquier escritura en la tabla de productos) y se pueden exportar a
+Excel o CSV. Un año de movimientos se procesa en fracciones de segundo.
+"""
+
+import os
+from datetime import date, datetime, time as hora, timedelta
+from typing import TYPE_CHECKING, Dict
+
+from .read_cache import cached
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# Participación acumulada del valor consumido que cierra las clases A y B
+LIMITES_ABC = (0.80, 0.95)
+# Factor de servicio del stock de seguridad (~95 %)
+Z_SERVICIO = 1.65
+
+COLUMNAS_ANALISIS = ('codigo', 'nombre', 'saldo', 'valor_unitario', 'valor_stock', 'consumo_periodo',
+                     'consumo_diario', 'desviacion_diaria', 'dias_cobertura', 'punto_reorden',
+                     'valor_consumo', 'clase_abc', 'reponer')
+
+
+def _segundos_hasta_manana() -> float:
+    return (datetime.combine(date.today() + timedelta(days=1), hora.min) - datetime.now()).total_seconds()
+
+
+def _en_cache(inventario, nombre: str, parametros: tuple, cargar):
+    """Resultado del día en la caché de lecturas, etiquetado con la tabla de productos"""
+    tabla = inventario.linea.tabla
+    clave = ('analitica', nombre, tabla, os.path.abspath(inventario.db_path), date.today()) + parametros
+    return cached(clave, cargar, ttl=_segundos_hasta_manana(), etiquetas=(tabla,)).copy()
+
+
+def _productos(inventario):
+    import pandas as pd
+
+    filas = inventario.consultar(
+        f"SELECT id, codigo, nombre, COALESCE(saldo, 0), COALESCE(valor_unitario, 0) "
+        f"FROM {inventario.linea.tabla} WHERE COALESCE(activo, 1) = 1 ORDER BY codigo")
+    return pd.DataFrame.from_records(filas, columns=['id', 'codigo', 'nombre', 'saldo', 'valor_unitario'])
+
+
+def _movimientos(inventario, hasta: date, desde: date = None):
+    """Asientos hasta el día indicado como (producto_id, fecha, delta, salida)"""
+    import numpy as np
+    import pandas as pd
+
+    sql = (f"SELECT producto_id, substr(fecha_hora, 1, 10), tipo, cantidad "
+           f"FROM {inventario.linea.tabla_movimientos} WHERE fecha_hora < ?")
+    params = [(hasta + timedelta(days=1)).isoformat()]
+    if desde:
+        sql += " AND fecha_hora >= ?"
+        params.append(desde.isoformat())
+    df = pd.DataFrame.from_records(inventario.consultar(sql, params),
+                                   columns=['producto_id', 'fecha', 'tipo', 'cantidad'])
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    cantidad = df['cantidad'].to_numpy(dtype=float)
+    es_salida = (df['tipo'] == 'salida').to_numpy()
+    df['delta'] = np.where(es_salida, -cantidad, cantidad)
+    df['salida'] = np.where(es_salida, cantidad, 0.0)
+    return df
+
+
+def salidas_diarias(inventario, ids, inicio: date, hasta: date) -> "np.ndarray":
+    """Matriz producto × día de unidades salidas entre inicio y hasta (los días sin salidas son cero)"""
+    import pandas as pd
+
+    movimientos = _movimientos(inventario, hasta, desde=inicio)
+    diario = movimientos[movimientos['salida'] > 0].pivot_table(
+        index='producto_id', columns='fecha', values='salida', aggfunc='sum', fill_value=0)
+    return diario.reindex(index=list(ids), columns=pd.date_range(inicio, hasta), fill_value=0).to_numpy(dtype=float)
+
+
+def analizar(inventario, hoy: date = None, dias: int = 365, dias_entrega: int = 7) -> "pd.DataFrame":
+    """
+    Una fila por producto activo con consumo del período (salidas de los
+    últimos `dias`), consumo diario medio y su desviación, días de
+    cobertura, punto de reorden (consumo durante la entrega + stock de
+    seguridad), valor consumido, clase ABC y si hay que reponer
+    """
+    hoy = hoy or date.today()
+
+    def cargar():
+        import numpy as np
+        import pandas as pd
+
+        productos = _productos(inventario)
+        matriz = salidas_diarias(inventario, productos['id'], hoy - timedelta(days=dias - 1), hoy)
+
+        saldo = productos['saldo'].to_numpy(dtype=float)
+        valor_unitario = productos['valor_unitario'].to_numpy(dtype=float)
+        consumo = matriz.sum(axis=1)
+        consumo_diario = matriz.mean(axis=1) if dias else np.zeros(len(productos))
+        desviacion = matriz.std(axis=1) if dias else np.zeros(len(productos))
+        cobertura = np.divide(saldo, consumo_diario, out=np.full(len(productos), np.inf),
+                              where=consumo_diario > 0)
+        reorden = np.ceil(consumo_diario * dias_entrega + Z_SERVICIO * desviacion * np.sqrt(dias_entrega))
+
+        # ABC: participación acumulada del valor consumido, de mayor a menor
+        valor_consumo = consumo * valor_unitario
+        orden = np.argsort(-valor_consumo, kind='stable')
+        total = valor_consumo.sum()
+        previo = np.empty(len(productos))
+        previo[orden] = (np.cumsum(valor_consumo[orden]) - valor_consumo[orden]) / total if total else 1.0
+        clase = np.select([previo < LIMITES_ABC[0], previo < LIMITES_ABC[1]], ['A', 'B'], 'C')
+
+        return pd.DataFrame({
+            'codigo': productos['codigo'], 'nombre': productos['nombre'], 'saldo': saldo,
+            'valor_unitario': valor_unitario, 'valor_stock': saldo * valor_unitario,
+            'consumo_periodo': consumo, 'consumo_diario': consumo_diario, 'desviacion_diaria': desviacion,
+            'dias_cobertura': cobertura, 'punto_reorden': reorden, 'valor_consumo': valor_consumo,
+            'clase_abc': clase, 'reponer': (consumo > 0) & (saldo <= reorden),
+        }, columns=COLUMNAS_ANALISIS)
+
+    return _en_cache(inventario, 'productos', (hoy, dias, dias_entrega), cargar)
+
+
+def valorizacion(inventario, desde: date, hasta: date = None, frecuencia: str = 'ME') -> "pd.DataFrame":
+    """
+    Unidades y valor del inventario al cierre de cada período (fin de mes
+    por defecto) entre desde y hasta. Los saldos salen de la suma
+    acumulada del libro; el valor usa el precio unitario vigente.
+    """
+    hasta = hasta or date.today()
+
+    def cargar():
+        import pandas as pd
+
+        movimientos = _movimientos(inventario, hasta)
+        precios = pd.Series({fila[0]: fila[1] or 0 for fila in inventario.consultar(
+            f"SELECT id, valor_unitario FROM {inventario.linea.tabla}")}, dtype=float)
+        cortes = pd.date_range(desde, hasta, freq=frecuencia)
+        if not len(cortes) or cortes[-1] != pd.Timestamp(hasta):
+            cortes = cortes.append(pd.DatetimeIndex([pd.Timestamp(hasta)]))
+        if movimientos.empty:
+            return pd.DataFrame({'unidades': 0.0, 'valor': 0.0}, index=pd.Index(cortes, name='fecha'))
+
+        # Saldo de cada producto al final de cada día = suma acumulada de los deltas
+        inicio = min(movimientos['fecha'].min(), pd.Timestamp(desde))
+        diario = movimientos.pivot_table(index='producto_id', columns='fecha', values='delta',
+                                         aggfunc='sum', fill_value=0)
+        saldos = diario.reindex(columns=pd.date_range(inicio, hasta), fill_value=0).cumsum(axis=1)[cortes]
+        valores = precios.reindex(saldos.index, fill_value=0).to_numpy()
+        return pd.DataFrame({'unidades': saldos.sum(axis=0).to_numpy(),
+                             'valor': valores @ saldos.to_numpy()},
+                            index=pd.Index(cortes, name='fecha'))
+
+    return _en_cache(inventario, 'valorizacion', (desde, hasta, frecuencia), cargar)
+
+
+def analizar_inventarios(inventarios: Dict, **opciones) -> "pd.DataFrame":
+    """analizar() de varias líneas en una sola tabla, con la columna 'linea'"""
+    import pandas as pd
+
+    partes = [analizar(inventario, **opciones).assign(linea=linea) for linea, inventario in inventarios.items()]
+    return pd.concat(partes, ignore_index=True)[['linea', *COLUMNAS_ANALISIS]]
+
+
+def valorizacion_inventarios(inventarios: Dict, desde: date, hasta: date = None,
+                             frecuencia: str = 'ME') -> "pd.DataFrame":
+    """Valor de cada línea por período, más el total"""
+    import pandas as pd
+
+    df = pd.DataFrame({linea: valorizacion(inventario, desde, hasta, frecuencia)['valor']
+                       for linea, inventario in inventarios.items()})
+    df['total'] = df.sum(axis=1)
+    return df
+
+
+def exportar(inventarios: Dict, ruta: str, desde: date = None, hoy: date = None) -> str:
+    """
+    Análisis por producto y valorización mensual del último año. En .xlsx
+    van en dos hojas; en .csv, el análisis y la valorización en
+    <nombre>_valorizacion.csv
+    """
+    hoy = hoy or date.today()
+    desde = desde or hoy - timedelta(days=365)
+    productos = analizar_inventarios(inventarios, hoy=hoy)
+    valores = valorizacion_inventarios(inventarios, desde, hoy)
+    if os.path.splitext(ruta)[1].lower() == '.xlsx':
+        import openpyxl
+        libro = openpyxl.Workbook(write_only=True)
+        _hoja(libro, 'Productos', productos)
+        _hoja(libro, 'Valorización', valores.reset_index())
+        libro.save(ruta)
+    else:
+        productos.to_csv(ruta, index=False, encoding='utf-8-sig')
+        valores.to_csv(f"{os.path.splitext(ruta)[0]}_valorizacion.csv", encoding='utf-8-sig')
+    return ruta
+
+
+def _hoja(libro, titulo: str, df):
+    """Volcar un DataFrame en una hoja (Excel no admite infinito: cobertura sin consumo va vacía)"""
+    hoja = libro.create_sheet(titulo)
+    hoja.append(list(df.columns))
+    for fila in df.itertuples(index=False, name=None):
+        hoja.append([None if isinstance(v, float) and v == float('inf')
+                     else v.to_pydatetime() if hasattr(v, 'to_pydatetime')
+                     else v.item() if hasattr(v, 'item') else v for v in fila])
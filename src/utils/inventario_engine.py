@@ -0,0 +1,919 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motor de Inventarios
+Un solo esquema de productos y movimientos para las tres líneas
+(químicos, almacén, poscosecha), parametrizado por línea. Cada base de
+inventario tiene una conexión de larga vida con los PRAGMAs de
+models.engine, y todas las vistas consultan y escriben a través de los
+métodos tipados de InventarioEngine en lugar de armar SQL por tipo.
+
+La tabla de movimientos es un libro de solo anexión y la fuente de verdad
+del stock: productos.saldo es su saldo materializado, que mantiene un
+trigger en la misma transacción de cada asiento. Los cambios directos de
+saldo se registran como asientos de 'ajuste'. Los cierres mensuales
+guardan el saldo de cada producto al final del mes, así que el stock a
+una fecha se calcula como cierre anterior + movimientos del mes.
+"""
+
+import csv
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from models.engine import connect_db
+
+from .read_cache import invalidar
+from .search_index import filtro_busqueda
+
+# Línea de inventario: tablas de productos, movimientos, cierres y
+# pronósticos, y columna de categoría (los químicos se agrupan por clase)
+Linea = namedtuple('Linea', 'nombre tabla tabla_movimientos tabla_cierres tabla_pronosticos columna_categoria campos')
+
+LINEAS = {
+    'quimicos': Linea('quimicos', 'productos_quimicos', 'movimientos_quimicos', 'cierres_quimicos',
+                      'pronosticos_quimicos', 'clase', ('clase', 'nivel_peligrosidad', 'fecha_vencimiento')),
+    'almacen': Linea('almacen', 'productos_almacen', 'movimientos_almacen', 'cierres_almacen',
+                     'pronosticos_almacen', 'categoria', ('stock_minimo',)),
+    'poscosecha': Linea('poscosecha', 'productos_poscosecha', 'movimientos_poscosecha', 'cierres_poscosecha',
+                        'pronosticos_poscosecha', 'categoria', ('categoria', 'stock_minimo', 'tipo_producto')),
+}
+
+# Efecto de un asiento sobre el saldo: las salidas restan; entradas y
+# ajustes (con cantidad con signo) suman
+DELTA_SQL = "CASE tipo WHEN 'salida' THEN -cantidad ELSE cantidad END"
+TIPOS_MOVIMIENTO = ('entrada', 'salida', 'ajuste')
+
+# Esquema unificado: (columna, definición). Es la unión de las variantes
+# que creaba cada ventana; las bases existentes se completan con ALTER TABLE.
+COLUMNAS_PRODUCTO = (
+    ('codigo', "TEXT UNIQUE NOT NULL"),
+    ('nombre', "TEXT NOT NULL DEFAULT ''"),
+    ('clase', "TEXT DEFAULT ''"),
+    ('categoria', "TEXT DEFAULT 'General'"),
+    ('tipo_producto', "TEXT DEFAULT ''"),
+    ('tipo', "TEXT DEFAULT 'General'"),
+    ('saldo', "INTEGER DEFAULT 0"),
+    ('unidad', "TEXT DEFAULT ''"),
+    ('valor_unitario', "REAL DEFAULT 0"),
+    ('stock_minimo', "INTEGER DEFAULT 0"),
+    ('ubicacion', "TEXT DEFAULT ''"),
+    ('proveedor', "TEXT DEFAULT ''"),
+    ('fecha_vencimiento', "DATE"),
+    ('lote', "TEXT"),
+    ('nivel_peligrosidad', "TEXT DEFAULT 'MEDIO'"),
+    ('descripcion', "TEXT DEFAULT ''"),
+    ('ingrediente_activo', "TEXT DEFAULT ''"),
+    ('concentracion', "TEXT DEFAULT ''"),
+    ('numero_registro', "TEXT DEFAULT ''"),
+    ('stock_maximo', "INTEGER DEFAULT 0"),
+    ('notas', "TEXT DEFAULT ''"),
+    ('activo', "INTEGER DEFAULT 1"),
+    ('fecha_creacion', "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"),
+)
+
+COLUMNAS_MOVIMIENTO = (
+    ('producto_id', "INTEGER"),
+    ('producto_codigo', "TEXT"),
+    ('producto_nombre', "TEXT"),
+    ('tipo', "TEXT NOT NULL"),
+    ('cantidad', "INTEGER NOT NULL"),
+    ('fecha', "DATE"),
+    ('hora', "TEXT"),
+    ('fecha_hora', "TIMESTAMP"),
+    ('saldo_anterior', "INTEGER"),
+    ('saldo_nuevo', "INTEGER"),
+    ('factura', "TEXT"),
+    ('proveedor', "TEXT"),
+    ('destino', "TEXT"),
+    ('valor_total', "REAL"),
+    ('responsable', "TEXT"),
+    ('observaciones', "TEXT"),
+    ('fecha_registro', "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"),
+)
+
+Producto = namedtuple('Producto', ['id'] + [c for c, _ in COLUMNAS_PRODUCTO])
+Movimiento = namedtuple('Movimiento', ['id'] + [c for c, _ in COLUMNAS_MOVIMIENTO])
+
+# Valores para las columnas que un alta no trae (también cubre los NOT NULL de las variantes viejas)
+DEFECTOS_PRODUCTO = {
+    'nombre': '', 'clase': '', 'categoria': 'General', 'tipo_producto': '', 'tipo': 'General',
+    'saldo': 0, 'unidad': '', 'valor_unitario': 0.0, 'stock_minimo': 0, 'ubicacion': '',
+    'proveedor': '', 'fecha_vencimiento': None, 'lote': None, 'nivel_peligrosidad': 'MEDIO', 'descripcion': '',
+    'ingrediente_activo': '', 'concentracion': '', 'numero_registro': '', 'stock_maximo': 0, 'notas': '', 'activo': 1,
+}
+
+_SELECT_PRODUCTO = ', '.join(f"{{t}}.{c}" for c in Producto._fields)
+_SELECT_MOVIMIENTO = ', '.join(Movimiento._fields)
+
+
+def _definicion_agregable(definicion: str) -> str:
+    """ALTER TABLE ADD COLUMN no admite UNIQUE, NOT NULL sin defecto ni CURRENT_TIMESTAMP"""
+    partes = definicion.replace('UNIQUE', '').replace('DEFAULT CURRENT_TIMESTAMP', '')
+    if 'NOT NULL' in partes and 'DEFAULT' not in partes:
+        partes = partes.replace('NOT NULL', '')
+    return ' '.join(partes.split())
+
+
+class InventarioEngine:
+    """Acceso tipado a productos y movimientos de una línea de inventario"""
+
+    def __init__(self, linea: str, db_path: str = None):
+        if linea not in LINEAS:
+            raise ValueError(f"Línea de inventario desconocida: {linea}")
+        self.linea = LINEAS[linea]
+        self.db_path = db_path or os.path.join('database', f'inventario_{linea}.db')
+        directorio = os.path.dirname(self.db_path)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = connect_db(self.db_path)
+        self.asegurar_esquema()
+
+    def consultar(self, sql: str, params=()) -> list:
+        """Filas de una consulta de lectura, serializada con el resto de la conexión"""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # ---- Esquema ----
+
+    def asegurar_esquema(self):
+        """Crear las tablas o completar las columnas que le falten a una base existente"""
+        tabla, movimientos, cierres = self.linea.tabla, self.linea.tabla_movimientos, self.linea.tabla_cierres
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {tabla} (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                           + ', '.join(f"{c} {d}" for c, d in COLUMNAS_PRODUCTO) + ")")
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {movimientos} (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                           + ', '.join(f"{c} {d}" for c, d in COLUMNAS_MOVIMIENTO) + ")")
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {cierres} (
+                    periodo TEXT NOT NULL,
+                    producto_id INTEGER NOT NULL,
+                    saldo INTEGER NOT NULL,
+                    fecha_cierre TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (periodo, producto_id)
+                )
+            """)
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.linea.tabla_pronosticos} (
+                    producto_id INTEGER PRIMARY KEY,
+                    demanda_diaria REAL NOT NULL,
+                    desviacion REAL NOT NULL,
+                    dias_entrega INTEGER NOT NULL,
+                    punto_reorden INTEGER NOT NULL,
+                    calculado_en TIMESTAMP NOT NULL
+                )
+            """)
+            # Cuándo corrió el último cálculo, aunque no haya dejado filas
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.linea.tabla_pronosticos}_meta (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    calculado_en TIMESTAMP NOT NULL
+                )
+            """)
+
+            agregadas = self._agregar_columnas(cursor, tabla, COLUMNAS_PRODUCTO)
+            agregadas_mov = self._agregar_columnas(cursor, movimientos, COLUMNAS_MOVIMIENTO)
+            if agregadas_mov:
+                # Movimientos guardados por una variante vieja: completar código, id y fecha_hora
+                cursor.execute(f"DROP TRIGGER IF EXISTS {movimientos}_sin_cambios")
+                cursor.execute(f"""
+                    UPDATE {movimientos} SET
+                        producto_codigo = COALESCE(producto_codigo,
+                            (SELECT codigo FROM {tabla} WHERE {tabla}.id = {movimientos}.producto_id)),
+                        producto_nombre = COALESCE(producto_nombre,
+                            (SELECT nombre FROM {tabla} WHERE {tabla}.id = {movimientos}.producto_id)),
+                        producto_id = COALESCE(producto_id,
+                            (SELECT id FROM {tabla} WHERE {tabla}.codigo = {movimientos}.producto_codigo)),
+                        fecha_hora = COALESCE(fecha_hora, fecha || ' ' || COALESCE(hora, '00:00:00'),
+                                              fecha, fecha_registro)
+                    WHERE producto_codigo IS NULL OR producto_id IS NULL OR fecha_hora IS NULL
+                """)
+
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{movimientos}_producto "
+                           f"ON {movimientos} (producto_codigo, fecha_hora)")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{movimientos}_fecha ON {movimientos} (fecha_hora)")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{movimientos}_tipo ON {movimientos} (tipo, fecha_hora)")
+
+            if not cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+                                  (f"{movimientos}_aplicar",)).fetchone():
+                self._abrir_libro(cursor)
+            # Una salida nunca deja el saldo en negativo, la escriba quien la escriba
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {movimientos}_sin_negativo BEFORE INSERT ON {movimientos}
+                WHEN new.tipo = 'salida'
+                BEGIN
+                    SELECT RAISE(ABORT, 'Stock insuficiente')
+                    WHERE (SELECT COALESCE(saldo, 0) FROM {tabla} WHERE id = new.producto_id) < new.cantidad;
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {movimientos}_sin_cambios BEFORE UPDATE ON {movimientos}
+                BEGIN SELECT RAISE(ABORT, 'El libro de movimientos es de solo anexión'); END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {movimientos}_sin_borrado BEFORE DELETE ON {movimientos}
+                BEGIN SELECT RAISE(ABORT, 'El libro de movimientos es de solo anexión'); END
+            """)
+            self._conn.commit()
+        if agregadas:
+            invalidar(tabla)
+
+    def _abrir_libro(self, cursor):
+        """
+        Primera vez con libro: el saldo guardado hasta hoy manda. Se asienta
+        un ajuste de apertura por la diferencia con los movimientos previos y
+        desde ahí el trigger mantiene el saldo con cada asiento.
+        """
+        tabla, movimientos = self.linea.tabla, self.linea.tabla_movimientos
+        cursor.execute(f"""
+            INSERT INTO {movimientos} (producto_id, producto_codigo, producto_nombre, tipo, cantidad,
+                                       fecha, hora, fecha_hora, saldo_anterior, saldo_nuevo, observaciones)
+            SELECT p.id, p.codigo, p.nombre, 'ajuste', COALESCE(p.saldo, 0) - COALESCE(m.total, 0),
+                   date(COALESCE(p.fecha_creacion, 'now')), time(COALESCE(p.fecha_creacion, 'now')),
+                   datetime(COALESCE(p.fecha_creacion, 'now')), COALESCE(m.total, 0), COALESCE(p.saldo, 0),
+                   'Saldo de apertura'
+            FROM {tabla} p
+            LEFT JOIN (SELECT producto_id, SUM({DELTA_SQL}) AS total FROM {movimientos} GROUP BY producto_id) m
+                   ON m.producto_id = p.id
+            WHERE COALESCE(p.saldo, 0) != COALESCE(m.total, 0)
+        """)
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{movimientos}_libro ON {movimientos} (producto_id, fecha_hora)")
+        cursor.execute(f"""
+            CREATE TRIGGER {movimientos}_aplicar AFTER INSERT ON {movimientos}
+            BEGIN
+                UPDATE {tabla} SET saldo = COALESCE(saldo, 0) +
+                    (CASE new.tipo WHEN 'salida' THEN -new.cantidad ELSE new.cantidad END)
+                WHERE id = new.producto_id;
+            END
+        """)
+
+    def _agregar_columnas(self, cursor, tabla: str, columnas) -> List[str]:
+        existentes = {fila[1] for fila in cursor.execute(f"PRAGMA table_info({tabla})")}
+        faltantes = [(c, d) for c, d in columnas if c not in existentes]
+        for columna, definicion in faltantes:
+            cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna} {_definicion_agregable(definicion)}")
+        return [c for c, _ in faltantes]
+
+    # ---- Productos ----
+
+    def productos(self, texto: str = '', categoria: str = None, ubicacion: str = None,
+                  estado_stock: str = None, solo_activos: bool = False) -> List[Producto]:
+        """
+        Productos de la línea, ordenados por relevancia si hay texto de búsqueda
+        y si no por código. estado_stock: 'Bajo', 'Agotado' o 'Normal'.
+        """
+        tabla = self.linea.tabla
+        with self._lock:
+            busqueda = filtro_busqueda(self._conn, tabla, texto)
+            sql = f"SELECT {_SELECT_PRODUCTO.format(t=tabla)} FROM {tabla}{busqueda.join} WHERE 1=1{busqueda.where}"
+            params = busqueda.join_params + busqueda.where_params
+
+            if categoria:
+                sql += f" AND {self.linea.columna_categoria} = ?"
+                params.append(categoria)
+            if ubicacion:
+                sql += " AND ubicacion = ?"
+                params.append(ubicacion)
+            if estado_stock == 'Bajo':
+                sql += " AND saldo <= stock_minimo AND saldo > 0"
+            elif estado_stock == 'Agotado':
+                sql += " AND saldo = 0"
+            elif estado_stock == 'Normal':
+                sql += " AND saldo > stock_minimo"
+            if solo_activos:
+                sql += " AND activo = 1"
+
+            sql += f" ORDER BY {busqueda.orden}, codigo" if busqueda.orden else " ORDER BY codigo"
+            return [Producto._make(fila) for fila in self._conn.execute(sql, params)]
+
+    def producto(self, codigo: str) -> Optional[Producto]:
+        tabla = self.linea.tabla
+        with self._lock:
+            fila = self._conn.execute(f"SELECT {_SELECT_PRODUCTO.format(t=tabla)} FROM {tabla} WHERE codigo = ?",
+                                      (codigo,)).fetchone()
+        return Producto._make(fila) if fila else None
+
+    def contar(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.linea.tabla}").fetchone()[0]
+
+    def guardar_producto(self, datos: Dict, codigo_original: str = None):
+        """
+        Alta (sin codigo_original) o actualización de un producto. En la
+        actualización sólo se escriben las columnas presentes en datos; un
+        saldo distinto del actual se asienta como ajuste en el libro.
+        Lanza ValueError si el código ya existe.
+        """
+        tabla = self.linea.tabla
+        columnas = {c for c, _ in COLUMNAS_PRODUCTO} - {'fecha_creacion'}
+        datos = {c: v for c, v in datos.items() if c in columnas}
+        saldo = datos.pop('saldo', None)
+        with self._lock:
+            codigo = datos.get('codigo', codigo_original)
+            try:
+                # El código se verifica con el bloqueo de escritura tomado: otra
+                # ventana o proceso no puede darlo de alta entre la consulta y el INSERT
+                self._inmediata()
+                if codigo != codigo_original and self._conn.execute(
+                        f"SELECT 1 FROM {tabla} WHERE codigo = ?", (codigo,)).fetchone():
+                    raise ValueError(f"El código {codigo} ya existe")
+
+                if codigo_original is None:
+                    fila = dict(DEFECTOS_PRODUCTO, **datos, saldo=0)
+                    self._conn.execute(f"INSERT INTO {tabla} ({', '.join(fila)}) "
+                                       f"VALUES ({', '.join('?' * len(fila))})", list(fila.values()))
+                elif datos:
+                    asignaciones = ', '.join(f"{c} = ?" for c in datos)
+                    self._conn.execute(f"UPDATE {tabla} SET {asignaciones} WHERE codigo = ?",
+                                       list(datos.values()) + [codigo_original])
+                if saldo is not None:
+                    self._ajustar(codigo, saldo, "Ajuste manual" if codigo_original else "Saldo inicial")
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        invalidar(tabla)
+
+    def insertar_productos(self, filas: Iterable[Dict], vaciar: bool = False) -> int:
+        """
+        Alta en bloque (datos de ejemplo, importaciones) en una sola
+        transacción. Las filas se cargan con executemany en una tabla
+        temporal de carga y de ahí pasan, con un INSERT ... SELECT cada uno,
+        a productos (en cero) y al libro (el saldo inicial como ajuste).
+        """
+        filas = list(filas)
+        with self._lock:
+            try:
+                self._inmediata()
+                if vaciar:
+                    self._conn.execute(f"DELETE FROM {self.linea.tabla}")
+                self._insertar_por_carga(filas)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        invalidar(self.linea.tabla)
+        return len(filas)
+
+    def _insertar_por_carga(self, filas: List[Dict]):
+        """executemany a la tabla temporal y de ahí a productos y al libro (sin commit)"""
+        tabla, movimientos = self.linea.tabla, self.linea.tabla_movimientos
+        carga = f"temp.carga_{tabla}"
+        nombres = [c for c in DEFECTOS_PRODUCTO] + ['codigo']
+        ahora = datetime.now()
+        self._conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS carga_{tabla} ({', '.join(nombres)})")
+        self._conn.execute(f"DELETE FROM {carga}")
+        self._conn.executemany(f"INSERT INTO {carga} VALUES ({', '.join('?' * len(nombres))})",
+                               [[fila.get(c, DEFECTOS_PRODUCTO.get(c)) for c in nombres] for fila in filas])
+        # Los productos entran en cero y su saldo se asienta en el libro
+        self._conn.execute(f"""
+            INSERT INTO {tabla} ({', '.join(nombres)})
+            SELECT {', '.join('0' if c == 'saldo' else c for c in nombres)} FROM {carga} ORDER BY rowid
+        """)
+        self._conn.execute(f"""
+            INSERT INTO {movimientos} (producto_id, producto_codigo, producto_nombre, tipo, cantidad,
+                                       fecha, hora, fecha_hora, saldo_anterior, saldo_nuevo, observaciones)
+            SELECT p.id, p.codigo, p.nombre, 'ajuste', c.saldo, ?, ?, ?, 0, c.saldo, 'Saldo inicial'
+            FROM {carga} c JOIN {tabla} p ON p.codigo = c.codigo
+            WHERE COALESCE(c.saldo, 0) != 0
+            ORDER BY c.rowid
+        """, (ahora.date().isoformat(), ahora.strftime('%H:%M:%S'), ahora.isoformat(sep=' ', timespec='seconds')))
+        self._conn.execute(f"DELETE FROM {carga}")
+
+    def sincronizar_productos(self, filas: Iterable[Dict], clave: str = 'codigo', desactivar: bool = True,
+                              aplicar: bool = True, campos: Iterable[str] = None) -> Dict:
+        """
+        Importación incremental: compara las filas con la tabla actual por
+        código o por nombre normalizado (clave='nombre', sin tildes ni
+        mayúsculas) y aplica sólo las diferencias en una transacción.
+        Los productos nuevos se insertan; los existentes actualizan sólo las
+        columnas que cambiaron (un saldo distinto se asienta como ajuste) y
+        se reactivan si estaban inactivos; los que ya no vienen se
+        desactivan (activo = 0) sin borrar su historial.
+        campos limita la comparación a las columnas que trae el archivo: el
+        resto de la fila (valores por defecto) sólo se usa para los nuevos y
+        no pisa lo editado a mano. Con aplicar=False sólo calcula la vista previa.
+        Retorna {'nuevos': [codigo], 'actualizados': [(codigo, {campo: (antes, después)})],
+                 'desactivados': [codigo], 'sin_cambios', 'duplicados': [clave], 'aplicado'}.
+        """
+        if clave not in ('codigo', 'nombre'):
+            raise ValueError(f"Clave de importación inválida: {clave}")
+        llave = (lambda fila: str(fila.get('codigo') or '').strip()) if clave == 'codigo' else \
+            (lambda fila: _clave_nombre(fila.get('nombre')))
+        # La clave no se compara: un nombre que sólo cambia tildes o mayúsculas no es un cambio
+        columnas = {c for c, _ in COLUMNAS_PRODUCTO} - {'fecha_creacion', 'codigo', clave}
+        if campos is not None:
+            columnas &= set(campos)
+        resumen = {'nuevos': [], 'actualizados': [], 'desactivados': [], 'sin_cambios': 0,
+                   'duplicados': [], 'aplicado': False}
+
+        with self._lock:
+            try:
+                self._inmediata()
+                actuales = {}
+                for producto in self.productos():
+                    actuales.setdefault(llave(producto._asdict()), producto)
+                usados = {p.codigo for p in actuales.values()}
+
+                nuevos, cambios, vistos = [], [], set()
+                for fila in filas:
+                    k = llave(fila)
+                    if not k:
+                        continue
+                    if k in vistos:
+                        resumen['duplicados'].append(k)
+                        continue
+                    vistos.add(k)
+                    actual = actuales.get(k)
+                    if actual is None:
+                        fila = dict(fila, codigo=_codigo_libre(str(fila.get('codigo') or 'P').strip(), usados))
+                        usados.add(fila['codigo'])
+                        nuevos.append(fila)
+                        continue
+                    diferencias = {c: (getattr(actual, c), v) for c, v in fila.items()
+                                   if c in columnas and not _mismo_valor(getattr(actual, c), v)}
+                    if not actual.activo and 'activo' not in fila:
+                        diferencias['activo'] = (actual.activo, 1)
+                    if diferencias:
+                        cambios.append((actual.codigo, diferencias))
+                    else:
+                        resumen['sin_cambios'] += 1
+
+                desactivados = [p.codigo for k, p in actuales.items() if k not in vistos and p.activo] \
+                    if desactivar else []
+                resumen.update(nuevos=[f['codigo'] for f in nuevos], actualizados=cambios,
+                               desactivados=desactivados)
+                if not aplicar or not (nuevos or cambios or desactivados):
+                    self._conn.rollback()
+                    return resumen
+
+                if nuevos:
+                    self._insertar_por_carga(nuevos)
+                for codigo, diferencias in cambios:
+                    datos = {c: despues for c, (_, despues) in diferencias.items() if c != 'saldo'}
+                    if datos:
+                        self._conn.execute(
+                            f"UPDATE {self.linea.tabla} SET {', '.join(f'{c} = ?' for c in datos)} WHERE codigo = ?",
+                            list(datos.values()) + [codigo])
+                    if 'saldo' in diferencias:
+                        self._ajustar(codigo, diferencias['saldo'][1] or 0, "Ajuste por importación")
+                self._conn.executemany(f"UPDATE {self.linea.tabla} SET activo = 0 WHERE codigo = ?",
+                                       [(codigo,) for codigo in desactivados])
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        invalidar(self.linea.tabla)
+        resumen['aplicado'] = True
+        return resumen
+
+    def importar_base_anterior(self, ruta: str, renombrar: Dict[str, str] = None) -> int:
+        """
+        Traer los productos de una base de otra variante (la que creaba el
+        inventario avanzado de químicos, con saldo_real). renombrar lleva sus
+        columnas a las del esquema; las que éste no tiene se ignoran. Los
+        códigos que ya existen no se tocan y los nuevos entran con su saldo
+        como ajuste inicial en el libro. Retorna cuántos entraron.
+        """
+        renombrar = renombrar or {}
+        columnas = {c for c, _ in COLUMNAS_PRODUCTO} - {'fecha_creacion'}
+        origen = sqlite3.connect(str(ruta))
+        try:
+            cursor = origen.execute(f"SELECT * FROM {self.linea.tabla}")
+            nombres = [renombrar.get(d[0], d[0]) for d in cursor.description]
+            filas = [{c: v for c, v in zip(nombres, fila) if c in columnas} for fila in cursor]
+        finally:
+            origen.close()
+
+        with self._lock:
+            existentes = {fila[0] for fila in self._conn.execute(f"SELECT codigo FROM {self.linea.tabla}")}
+        nuevas = [dict(fila, saldo=fila.get('saldo') or 0) for fila in filas
+                  if fila.get('codigo') and fila['codigo'] not in existentes]
+        return self.insertar_productos(nuevas) if nuevas else 0
+
+    def eliminar_producto(self, codigo: str):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.linea.tabla} WHERE codigo = ?", (codigo,))
+            self._conn.commit()
+        invalidar(self.linea.tabla)
+
+    def vaciar(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.linea.tabla}")
+            self._conn.commit()
+        invalidar(self.linea.tabla)
+
+    def exportar_csv(self, ruta: str) -> int:
+        """Escribir todos los productos a CSV; retorna cuántos"""
+        productos = self.productos()
+        with open(ruta, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(Producto._fields)
+            writer.writerows(productos)
+        return len(productos)
+
+    # ---- Movimientos ----
+
+    def registrar_movimiento(self, codigo: str, tipo: str, cantidad: int, responsable: str = '',
+                             observaciones: str = '', cuando: datetime = None, factura: str = None,
+                             proveedor: str = None, destino: str = None) -> Movimiento:
+        """
+        Asentar una entrada o salida; el trigger del libro actualiza el saldo
+        en la misma transacción. La transacción es inmediata, así que el saldo
+        leído no cambia hasta el commit aunque otros procesos o conexiones
+        registren a la vez, y saldo_nuevo del movimiento es el saldo real.
+        Lanza ValueError si el producto no existe, la cantidad no es positiva
+        o una salida supera el saldo.
+        """
+        if tipo not in ('entrada', 'salida'):
+            raise ValueError(f"Tipo de movimiento inválido: {tipo}")
+        if cantidad <= 0:
+            raise ValueError("La cantidad debe ser mayor a 0")
+
+        with self._lock:
+            try:
+                movimiento = self._asentar(codigo, tipo, cantidad, cuando, responsable=responsable,
+                                           observaciones=observaciones, factura=factura,
+                                           proveedor=proveedor, destino=destino)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        invalidar(self.linea.tabla)
+        return movimiento
+
+    def _inmediata(self):
+        """
+        Tomar el bloqueo de escritura antes de leer saldos. Si ya hay una
+        transacción abierta, o empezó con BEGIN IMMEDIATE o sqlite3 la abrió
+        al escribir (nunca al leer), así que el bloqueo ya está tomado.
+        """
+        if not self._conn.in_transaction:
+            self._conn.execute("BEGIN IMMEDIATE")
+
+    def _ajustar(self, codigo: str, saldo: int, observaciones: str):
+        """Asiento de ajuste que lleva el saldo de un producto al valor indicado (sin commit)"""
+        self._inmediata()
+        actual = self._conn.execute(f"SELECT saldo FROM {self.linea.tabla} WHERE codigo = ?", (codigo,)).fetchone()
+        diferencia = saldo - ((actual[0] if actual else 0) or 0)
+        if diferencia:
+            self._asentar(codigo, 'ajuste', diferencia, observaciones=observaciones)
+
+    def _asentar(self, codigo: str, tipo: str, cantidad: int, cuando: datetime = None, **extra) -> Movimiento:
+        """Insertar un asiento en el libro (sin commit); el trigger aplica el saldo"""
+        tabla, movimientos = self.linea.tabla, self.linea.tabla_movimientos
+        self._inmediata()
+        fila = self._conn.execute(f"SELECT id, nombre, saldo, valor_unitario FROM {tabla} WHERE codigo = ?",
+                                  (codigo,)).fetchone()
+        if not fila:
+            raise ValueError(f"Producto {codigo} no encontrado")
+        producto_id, nombre, saldo, valor_unitario = fila
+        saldo = saldo or 0
+        delta = -cantidad if tipo == 'salida' else cantidad
+        if saldo + delta < 0:
+            raise ValueError(f"Stock insuficiente. Disponible: {saldo}")
+
+        valores = _valores_movimiento(producto_id, codigo, nombre, tipo, cantidad, saldo, valor_unitario,
+                                      cuando or datetime.now())
+        valores.update(extra)
+        cursor = self._conn.execute(
+            f"INSERT INTO {movimientos} ({', '.join(valores)}) VALUES ({', '.join('?' * len(valores))})",
+            list(valores.values()))
+
+        # Un asiento con fecha dentro de un mes ya cerrado deja viejos esos cierres
+        periodo = valores['fecha'][:7]
+        self._conn.execute(f"DELETE FROM {self.linea.tabla_cierres} WHERE periodo >= ?", (periodo,))
+        return Movimiento(id=cursor.lastrowid, fecha_registro=None, **valores)
+
+    def registrar_movimientos(self, lineas: Iterable[Dict], tipo: str = None, responsable: str = '',
+                              cuando: datetime = None, factura: str = None, proveedor: str = None,
+                              destino: str = None, aplicar: bool = True) -> Dict:
+        """
+        Movimientos en bloque (una factura de 40 líneas, un despacho). Cada
+        línea es un dict con codigo, cantidad y opcionalmente tipo,
+        observaciones, factura, proveedor, destino, responsable y 'linea'
+        (número a reportar; por defecto su posición desde 1). Los demás
+        argumentos son los valores del encabezado.
+
+        Todas las líneas se validan primero contra el saldo actual, en
+        orden (dos salidas del mismo producto suman). Si ninguna tiene error
+        se asientan con un solo executemany en una transacción inmediata;
+        si alguna falla, o con aplicar=False, no se asienta nada.
+        Retorna {'total', 'aplicados', 'errores': [(linea, mensaje)], 'movimientos'}.
+        """
+        tabla, movimientos = self.linea.tabla, self.linea.tabla_movimientos
+        lineas = list(lineas)
+        resumen = {'total': len(lineas), 'aplicados': 0, 'errores': [], 'movimientos': []}
+        encabezado = {'responsable': responsable or '', 'factura': factura, 'proveedor': proveedor,
+                      'destino': destino}
+        cuando = cuando or datetime.now()
+
+        with self._lock:
+            try:
+                self._inmediata()
+                codigos = list({str(linea.get('codigo') or '').strip() for linea in lineas} - {''})
+                productos = {}
+                for inicio in range(0, len(codigos), 500):
+                    lote = codigos[inicio:inicio + 500]
+                    for fila in self._conn.execute(
+                            f"SELECT codigo, id, nombre, saldo, valor_unitario FROM {tabla} "
+                            f"WHERE codigo IN ({', '.join('?' * len(lote))})", lote):
+                        productos[fila[0]] = list(fila[1:])
+
+                filas = []
+                for posicion, linea in enumerate(lineas, 1):
+                    numero = linea.get('linea', posicion)
+                    codigo = str(linea.get('codigo') or '').strip()
+                    tipo_linea = str(linea.get('tipo') or tipo or '').strip().lower()
+                    cantidad = _cantidad(linea.get('cantidad'))
+                    if not codigo:
+                        error = "Falta el código"
+                    elif codigo not in productos:
+                        error = f"Producto {codigo} no encontrado"
+                    elif tipo_linea not in ('entrada', 'salida'):
+                        error = f"Tipo de movimiento inválido: {tipo_linea or '(vacío)'}"
+                    elif cantidad is None or cantidad <= 0:
+                        error = f"Cantidad inválida: {linea.get('cantidad')}"
+                    else:
+                        error = None
+                    if error:
+                        resumen['errores'].append((numero, error))
+                        continue
+
+                    producto = productos[codigo]
+                    producto_id, nombre, saldo, valor_unitario = producto
+                    saldo = saldo or 0
+                    if tipo_linea == 'salida' and cantidad > saldo:
+                        resumen['errores'].append((numero, f"Stock insuficiente de {codigo}. Disponible: {saldo}"))
+                        continue
+                    valores = _valores_movimiento(producto_id, codigo, nombre, tipo_linea, cantidad, saldo,
+                                                  valor_unitario, cuando)
+                    valores.update({c: v for c, v in encabezado.items() if v is not None})
+                    valores.update({c: linea[c] for c in ('observaciones', 'factura', 'proveedor', 'destino',
+                                                          'responsable') if linea.get(c) not in (None, '')})
+                    producto[2] = valores['saldo_nuevo']
+                    filas.append(valores)
+
+                if resumen['errores'] or not aplicar or not filas:
+                    self._conn.rollback()
+                    return resumen
+
+                columnas = list(filas[0])
+                ultimo = self._conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {movimientos}").fetchone()[0]
+                self._conn.executemany(
+                    f"INSERT INTO {movimientos} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})",
+                    [[fila[c] for c in columnas] for fila in filas])
+                self._conn.execute(f"DELETE FROM {self.linea.tabla_cierres} WHERE periodo >= ?",
+                                   (cuando.strftime('%Y-%m'),))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            ids = [fila[0] for fila in self._conn.execute(
+                f"SELECT id FROM {movimientos} WHERE id > ? ORDER BY id LIMIT ?", (ultimo, len(filas)))]
+        invalidar(tabla)
+        resumen['aplicados'] = len(filas)
+        resumen['movimientos'] = [Movimiento(id=i, fecha_registro=None, **fila) for i, fila in zip(ids, filas)]
+        return resumen
+
+    def movimientos(self, codigo: str = None, tipo: str = None, limite: int = 1000, desde: date = None,
+                    hasta: date = None, despues: tuple = None) -> List[Movimiento]:
+        """
+        Movimientos más recientes primero, opcionalmente de un producto, de
+        un tipo o entre dos fechas (inclusive). Para paginar, despues es el
+        (fecha_hora, id) del último de la página anterior: la consulta sigue
+        desde ahí por el índice en lugar de saltar filas con OFFSET
+        """
+        sql = f"SELECT {_SELECT_MOVIMIENTO} FROM {self.linea.tabla_movimientos} WHERE 1=1"
+        params = []
+        if codigo:
+            sql += " AND producto_codigo = ?"
+            params.append(codigo)
+        if tipo:
+            sql += " AND tipo = ?"
+            params.append(tipo)
+        if desde:
+            sql += " AND fecha_hora >= ?"
+            params.append(desde.isoformat())
+        if hasta:
+            sql += " AND fecha_hora < ?"
+            params.append((hasta + timedelta(days=1)).isoformat())
+        if despues:
+            sql += " AND (fecha_hora, id) < (?, ?)"
+            params.extend(despues)
+        sql += " ORDER BY fecha_hora DESC, id DESC LIMIT ?"
+        params.append(limite)
+        with self._lock:
+            return [Movimiento._make(fila) for fila in self._conn.execute(sql, params)]
+
+    # ---- Saldos a una fecha y cierres mensuales ----
+
+    def existencias_a_fecha(self, fecha: date) -> Dict[int, int]:
+        """{producto_id: saldo} al final del día indicado (cierre anterior + movimientos del mes)"""
+        self.cerrar_periodos_pendientes()
+        with self._lock:
+            return self._existencias(fecha)
+
+    def saldo_a_fecha(self, codigo: str, fecha: date) -> int:
+        producto = self.producto(codigo)
+        if not producto:
+            raise ValueError(f"Producto {codigo} no encontrado")
+        return self.existencias_a_fecha(fecha).get(producto.id, 0)
+
+    def productos_a_fecha(self, fecha: date, **filtros) -> List[Producto]:
+        """Los productos de productos() con el saldo que tenían a esa fecha"""
+        saldos = self.existencias_a_fecha(fecha)
+        return [p._replace(saldo=saldos.get(p.id, 0)) for p in self.productos(**filtros)]
+
+    def _existencias(self, fecha: date) -> Dict[int, int]:
+        movimientos, cierres = self.linea.tabla_movimientos, self.linea.tabla_cierres
+        base = self._conn.execute(f"SELECT MAX(periodo) FROM {cierres} WHERE periodo < ?",
+                                  (fecha.strftime('%Y-%m'),)).fetchone()[0]
+        sql = f"SELECT producto_id, SUM({DELTA_SQL}) FROM {movimientos} WHERE fecha_hora < ?"
+        params = [(fecha + timedelta(days=1)).isoformat()]
+        saldos = {}
+        if base:
+            saldos = dict(self._conn.execute(f"SELECT producto_id, saldo FROM {cierres} WHERE periodo = ?", (base,)))
+            sql += " AND fecha_hora >= ?"
+            params.append(_inicio_mes_siguiente(base).isoformat())
+        for producto_id, delta in self._conn.execute(sql + " GROUP BY producto_id", params):
+            saldos[producto_id] = saldos.get(producto_id, 0) + (delta or 0)
+        return saldos
+
+    def cerrar_periodo(self, periodo: str) -> int:
+        """Guardar el saldo de cada producto al final del mes 'AAAA-MM'; retorna cuántos"""
+        fin = _inicio_mes_siguiente(periodo) - timedelta(days=1)
+        cierres = self.linea.tabla_cierres
+        with self._lock:
+            try:
+                # Un asiento de otro proceso entre la suma y el INSERT dejaría un cierre viejo
+                self._inmediata()
+                saldos = self._existencias(fin)
+                self._conn.execute(f"DELETE FROM {cierres} WHERE periodo = ?", (periodo,))
+                self._conn.executemany(f"INSERT INTO {cierres} (periodo, producto_id, saldo) VALUES (?, ?, ?)",
+                                       [(periodo, pid, saldo) for pid, saldo in saldos.items()])
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return len(saldos)
+
+    def cerrar_periodos_pendientes(self, hoy: date = None) -> List[str]:
+        """Cerrar, en orden, los meses ya terminados que aún no tienen cierre"""
+        hoy = hoy or date.today()
+        actual = hoy.strftime('%Y-%m')
+        with self._lock:
+            ultimo = self._conn.execute(f"SELECT MAX(periodo) FROM {self.linea.tabla_cierres}").fetchone()[0]
+            if ultimo:
+                siguiente = _inicio_mes_siguiente(ultimo)
+            else:
+                primero = self._conn.execute(
+                    f"SELECT MIN(fecha_hora) FROM {self.linea.tabla_movimientos}").fetchone()[0]
+                if not primero:
+                    return []
+                siguiente = date.fromisoformat(primero[:7] + '-01')
+
+            cerrados = []
+            while siguiente.strftime('%Y-%m') < actual:
+                periodo = siguiente.strftime('%Y-%m')
+                self.cerrar_periodo(periodo)
+                cerrados.append(periodo)
+                siguiente = _inicio_mes_siguiente(periodo)
+        return cerrados
+
+    def guardar_pronosticos(self, filas: Iterable[tuple], calculado_en: datetime = None) -> int:
+        """
+        Reemplazar los pronósticos de la línea por filas (producto_id,
+        demanda_diaria, desviacion, dias_entrega, punto_reorden) y anotar
+        cuándo se calcularon; retorna cuántos
+        """
+        filas = list(filas)
+        calculado_en = (calculado_en or datetime.now()).strftime('%Y-%m-%d %H:%M:%S')
+        pronosticos = self.linea.tabla_pronosticos
+        with self._lock:
+            try:
+                self._inmediata()
+                self._conn.execute(f"DELETE FROM {pronosticos}")
+                self._conn.executemany(f"""
+                    INSERT INTO {pronosticos} (producto_id, demanda_diaria, desviacion, dias_entrega,
+                                               punto_reorden, calculado_en)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, [tuple(fila) + (calculado_en,) for fila in filas])
+                self._conn.execute(f"INSERT OR REPLACE INTO {pronosticos}_meta (id, calculado_en) VALUES (1, ?)",
+                                   (calculado_en,))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        invalidar(pronosticos)
+        return len(filas)
+
+    def recalcular_saldos(self) -> int:
+        """Reconstruir el saldo materializado desde el libro; retorna cuántos productos cambiaron"""
+        tabla, movimientos = self.linea.tabla, self.linea.tabla_movimientos
+        with self._lock:
+            cursor = self._conn.execute(f"""
+                UPDATE {tabla} SET saldo = COALESCE(
+                    (SELECT SUM({DELTA_SQL}) FROM {movimientos} WHERE producto_id = {tabla}.id), 0)
+                WHERE COALESCE(saldo, 0) != COALESCE(
+                    (SELECT SUM({DELTA_SQL}) FROM {movimientos} WHERE producto_id = {tabla}.id), 0)
+            """)
+            self._conn.commit()
+        invalidar(tabla)
+        return cursor.rowcount
+
+    def respaldar(self, destino: str) -> int:
+        """Copia consistente de la base en destino (API de backup de SQLite); retorna su tamaño"""
+        with self._lock:
+            copia = sqlite3.connect(str(destino))
+            try:
+                self._conn.driver_connection.backup(copia)
+            finally:
+                copia.close()
+        return os.path.getsize(destino)
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _valores_movimiento(producto_id: int, codigo: str, nombre: str, tipo: str, cantidad: int, saldo: int,
+                        valor_unitario: float, cuando: datetime) -> Dict:
+    """Columnas de un asiento con los valores por defecto de los campos opcionales"""
+    delta = -cantidad if tipo == 'salida' else cantidad
+    return {
+        'producto_id': producto_id, 'producto_codigo': codigo, 'producto_nombre': nombre,
+        'tipo': tipo, 'cantidad': cantidad,
+        'fecha': cuando.date().isoformat(), 'hora': cuando.strftime('%H:%M:%S'),
+        'fecha_hora': cuando.isoformat(sep=' ', timespec='seconds'),
+        'saldo_anterior': saldo, 'saldo_nuevo': saldo + delta,
+        'factura': None, 'proveedor': None, 'destino': None,
+        'valor_total': abs(cantidad) * (valor_unitario or 0),
+        'responsable': '', 'observaciones': '',
+    }
+
+
+def _clave_nombre(nombre) -> str:
+    """Nombre comparable entre importaciones: sin tildes, en mayúsculas y con espacios simples"""
+    texto = unicodedata.normalize('NFKD', str(nombre or '')).encode('ascii', 'ignore').decode()
+    return ' '.join(texto.upper().split())
+
+
+def _mismo_valor(actual, nuevo) -> bool:
+    """Igualdad tolerante: '' y None son lo mismo, 15 y 15.0 también, y se ignoran espacios"""
+    if actual in (None, '') and nuevo in (None, ''):
+        return True
+    if isinstance(actual, (int, float)) and isinstance(nuevo, (int, float)):
+        return float(actual) == float(nuevo)
+    if isinstance(actual, str) and isinstance(nuevo, str):
+        return actual.strip() == nuevo.strip()
+    return actual == nuevo
+
+
+def _codigo_libre(codigo: str, usados) -> str:
+    """El código pedido o, si ya existe, el siguiente número libre con su mismo prefijo"""
+    if codigo not in usados:
+        return codigo
+    prefijo = re.match(r'\D*', codigo).group()
+    numeros = [int(u[len(prefijo):]) for u in usados if u.startswith(prefijo) and u[len(prefijo):].isdigit()]
+    siguiente = max(numeros, default=0) + 1
+    while f"{prefijo}{siguiente:03d}" in usados:
+        siguiente += 1
+    return f"{prefijo}{siguiente:03d}"
+
+
+def _cantidad(valor) -> Optional[int]:
+    """Cantidad entera de una celda o campo de texto ('12', 12.0, ' 3 '); None si no lo es"""
+    try:
+        numero = float(str(valor).strip().replace(',', '.'))
+    except (TypeError, ValueError):
+        return None
+    return int(numero) if numero.is_integer() else None
+
+
+def _inicio_mes_siguiente(periodo: str) -> date:
+    """Primer día del mes siguiente a 'AAAA-MM'"""
+    anio, mes = int(periodo[:4]), int(periodo[5:7])
+    return date(anio + mes // 12, mes % 12 + 1, 1)
+
+
+_inventarios: Dict[tuple, InventarioEngine] = {}
+_inventarios_lock = threading.Lock()
+
+
+def get_inventario(linea: str, db_path: str = None) -> InventarioEngine:
+    """Motor compartido de una línea (uno por archivo de base)"""
+    ruta = os.path.abspath(db_path or os.path.join('database', f'inventario_{linea}.db'))
+    with _inventarios_lock:
+        engine = _inventarios.get((linea, ruta))
+        if engine is None:
+            engine = InventarioEngine(linea, db_path)
+            _inventarios[(linea, ruta)] = engine
+        return engine
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pronóstico de Reposición
+Calcula por producto un mínimo dinámico a partir del libro de
+movimientos: la demanda diaria es el suavizado exponencial de las salidas
+(en forma cerrada, una multiplicación matriz × pesos para todos los
+productos) y el punto de reorden es la demanda durante el tiempo de
+entrega más un stock de seguridad por la variabilidad de las salidas.
+Corre como tarea por lotes (el hilo del gestor de alertas la lanza una
+vez al día) y guarda el resultado en la tabla de pronósticos de cada
+línea. Las alertas de stock se calculan contra el saldo vigente: la fecha
+de quiebre proyectada es saldo / demanda diaria.
+"""
+
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from .inventario_analytics import Z_SERVICIO, salidas_diarias
+from .inventario_engine import get_inventario
+from .logger import get_logger, log_performance
+from .read_cache import cached
+
+# Peso de la última observación en el suavizado exponencial
+ALFA = 0.3
+# Días de historia usados para el pronóstico
+DIAS_HISTORIA = 90
+# Días que tarda en llegar un pedido
+DIAS_ENTREGA = 7
+# Días hacia adelante en que un quiebre proyectado ya genera alerta
+HORIZONTE_DIAS = 14
+
+
+def suavizado_exponencial(matriz, alfa: float = ALFA):
+    """
+    Último nivel del suavizado exponencial simple de cada fila, partiendo
+    de la media de la fila: equivale a iterar nivel = α·x + (1-α)·nivel
+    día por día, pero con pesos α(1-α)^k en una sola operación
+    """
+    import numpy as np
+
+    dias = matriz.shape[1]
+    if not dias:
+        return np.zeros(matriz.shape[0])
+    pesos = alfa * (1 - alfa) ** np.arange(dias - 1, -1, -1)
+    return matriz @ pesos + matriz.mean(axis=1) * (1 - alfa) ** dias
+
+
+def pronosticar(inventario, hoy: date = None, dias: int = DIAS_HISTORIA, alfa: float = ALFA,
+                dias_entrega: int = DIAS_ENTREGA) -> List[tuple]:
+    """
+    (producto_id, demanda_diaria, desviacion, dias_entrega, punto_reorden)
+    de los productos activos con salidas en los últimos `dias`
+    """
+    import numpy as np
+
+    hoy = hoy or date.today()
+    ids = [fila[0] for fila in inventario.consultar(
+        f"SELECT id FROM {inventario.linea.tabla} WHERE COALESCE(activo, 1) = 1 ORDER BY id")]
+    matriz = salidas_diarias(inventario, ids, hoy - timedelta(days=dias - 1), hoy)
+    demanda = suavizado_exponencial(matriz, alfa).round(4)
+    desviacion = matriz.std(axis=1) if matriz.shape[1] else np.zeros(len(ids))
+    reorden = np.ceil(demanda * dias_entrega + Z_SERVICIO * desviacion * np.sqrt(dias_entrega))
+    con_salidas = matriz.sum(axis=1) > 0
+    return [(pid, float(d), float(s), dias_entrega, int(r))
+            for pid, d, s, r, usar in zip(ids, demanda, desviacion, reorden, con_salidas) if usar]
+
+
+def ejecutar(db_paths: Dict[str, str], hoy: date = None, **opciones) -> Dict:
+    """
+    Tarea por lotes: pronosticar y guardar cada línea cuya base exista.
+    Retorna {'lineas': {linea: productos}, 'errores': [(linea, msg)], 'segundos'}
+    """
+    inicio = time.perf_counter()
+    resumen = {'lineas': {}, 'errores': []}
+    for linea, db_path in db_paths.items():
+        if not os.path.exists(db_path):
+            continue
+        try:
+            inventario = get_inventario(linea, db_path)
+            resumen['lineas'][linea] = inventario.guardar_pronosticos(pronosticar(inventario, hoy, **opciones))
+        except Exception as e:
+            resumen['errores'].append((linea, str(e)))
+    resumen['segundos'] = time.perf_counter() - inicio
+
+    log_performance("pronosticos_reposicion", resumen['segundos'],
+                    {'productos': sum(resumen['lineas'].values()), 'errores': len(resumen['errores'])})
+    for linea, error in resumen['errores']:
+        get_logger("inventario_forecast").error(f"Pronóstico de {linea}: {error}")
+    return resumen
+
+
+def ultimo_calculo(inventario) -> Optional[datetime]:
+    """Cuándo se guardaron los pronósticos vigentes de la línea (None si nunca)"""
+    fila = inventario.consultar(f"SELECT calculado_en FROM {inventario.linea.tabla_pronosticos}_meta")
+    return datetime.fromisoformat(fila[0][0]) if fila and fila[0][0] else None
+
+
+def ejecutar_si_vencido(db_paths: Dict[str, str], horas: float = 24, ahora: datetime = None,
+                        **opciones) -> Optional[Dict]:
+    """Lanzar la tarea sólo para las líneas cuyo último cálculo tiene más de `horas`"""
+    ahora = ahora or datetime.now()
+    vencidas = {}
+    for linea, db_path in db_paths.items():
+        if os.path.exists(db_path):
+            calculado = ultimo_calculo(get_inventario(linea, db_path))
+            if calculado is None or ahora - calculado >= timedelta(hours=horas):
+                vencidas[linea] = db_path
+    return ejecutar(vencidas, ahora.date(), **opciones) if vencidas else None
+
+
+def alertas_quiebre(inventario, umbral_critico: int, umbral_bajo: int, horizonte_dias: int = HORIZONTE_DIAS,
+                    hoy: date = None) -> Tuple[List[tuple], List[tuple]]:
+    """
+    (críticos, bajos) como filas (codigo, nombre, saldo, valor_unitario,
+    fecha_quiebre, punto_reorden). Con pronóstico, es crítico lo que se
+    agota antes de que llegue un pedido y bajo lo que está en el punto de
+    reorden o se agota dentro del horizonte; sin pronóstico (productos sin
+    salidas recientes) se usan los umbrales fijos y fecha_quiebre es None.
+    """
+    linea = inventario.linea
+    hoy = hoy or date.today()
+
+    def cargar():
+        filas = inventario.consultar(f"""
+            SELECT p.codigo, p.nombre, COALESCE(p.saldo, 0), p.valor_unitario,
+                   f.demanda_diaria, f.dias_entrega, f.punto_reorden
+            FROM {linea.tabla} p
+            LEFT JOIN {linea.tabla_pronosticos} f ON f.producto_id = p.id AND f.demanda_diaria > 0
+            WHERE COALESCE(p.activo, 1) = 1 AND (
+                  (f.producto_id IS NOT NULL AND (COALESCE(p.saldo, 0) <= f.punto_reorden
+                                                  OR COALESCE(p.saldo, 0) <= f.demanda_diaria * ?))
+               OR (f.producto_id IS NULL AND COALESCE(p.saldo, 0) <= ?))
+            ORDER BY p.codigo
+        """, (horizonte_dias, max(umbral_bajo, umbral_critico)))
+
+        criticos, bajos = [], []
+        for codigo, nombre, saldo, valor_unitario, demanda, dias_entrega, reorden in filas:
+            if demanda:
+                dias = max(saldo, 0) / demanda
+                fila = (codigo, nombre, saldo, valor_unitario, (hoy + timedelta(days=int(dias))).isoformat(), reorden)
+                (criticos if dias <= dias_entrega else bajos).append(fila)
+            else:
+                fila = (codigo, nombre, saldo, valor_unitario, None, None)
+                (criticos if saldo <= umbral_critico else bajos).append(fila)
+        # Primero lo que se agota antes (los que no tienen pronóstico, como si fuera hoy)
+        def por_fecha(fila):
+            return fila[4] or hoy.isoformat(), fila[0]
+        return tuple(sorted(criticos, key=por_fecha)), tuple(sorted(bajos, key=por_fecha))
+
+    clave = ('alertas_quiebre', linea.tabla, os.path.abspath(inventario.db_path), umbral_critico, umbral_bajo,
+             horizonte_dias, hoy)
+    criticos, bajos = cached(clave, cargar, etiquetas=(linea.tabla, linea.tabla_pronosticos))
+    return list(criticos), list(bajos)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Importación de Inventarios desde Excel
+Cada libro se lee una sola vez en modo streaming (openpyxl read_only,
+values_only): el encabezado se detecta en la misma pasada y las filas de
+datos se acumulan como tuplas. Las columnas se normalizan con operaciones
+vectorizadas de pandas y el resultado se carga con
+InventarioEngine.insertar_productos (executemany a una tabla temporal y
+de ahí a productos y al libro) o, en modo incremental, con
+sincronizar_productos, que sólo aplica las diferencias y permite ver una
+vista previa antes de confirmar. Se reporta el throughput de cada carga.
+"""
+
+import os
+import time
+from collections import namedtuple
+from typing import Dict, List, Tuple
+
+from .logger import get_logger, log_performance
+
+# Formato de los Excel de cada línea: palabras que identifican la fila de
+# encabezados, posición de cada columna de datos, nombres a descartar,
+# prefijo del código generado y valores para lo que el Excel no trae
+PerfilExcel = namedtuple('PerfilExcel', 'encabezado columnas excluidos prefijo defectos')
+
+PERFILES = {
+    'quimicos': PerfilExcel(('SALDO ANTERIOR',), {'saldo': 0, 'clase': 1, 'nombre': 2, 'valor_unitario': 3},
+                            (), 'Q',
+                            {'clase': 'General', 'unidad': 'Kg', 'valor_unitario': 50.0, 'stock_minimo': 10,
+                             'ubicacion': 'Almacén General', 'proveedor': 'Proveedor General'}),
+    'almacen': PerfilExcel(('PRODUCTO', 'SALDO'), {'saldo': 0, 'nombre': 1}, ('PRODUCTO y saldos',), 'A',
+                           {'categoria': 'General', 'unidad': 'Unidad', 'valor_unitario': 15.0,
+                            'stock_minimo': 5, 'ubicacion': 'Almacén General', 'proveedor': 'Proveedor General'}),
+    'poscosecha': PerfilExcel(('PRODUCTO', 'SALDO'), {'nombre': 0, 'saldo': 1}, ('PRODUCTO',), 'P',
+                              {'tipo': 'General', 'unidad': 'Unidad', 'valor_unitario': 25.0, 'stock_minimo': 8,
+                               'ubicacion': 'Almacén General', 'proveedor': 'Proveedor General'}),
+}
+
+
+def _es_encabezado(fila, palabras) -> bool:
+    texto = ' '.join(str(valor) for valor in fila if valor is not None)
+    return all(palabra in texto for palabra in palabras)
+
+
+def leer_hoja(ruta: str, palabras) -> Tuple[list, List[tuple]]:
+    """
+    (encabezado, filas de datos) de la primera hoja, en una sola pasada.
+    Sin fila de encabezado retorna ([], []).
+    """
+    if os.path.splitext(ruta)[1].lower() == '.xls':
+        # openpyxl no lee el formato viejo: una sola lectura con pandas
+        import pandas as pd
+        df = pd.read_excel(ruta, header=None)
+        filas = list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+    else:
+        import openpyxl
+        libro = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+        try:
+            filas = libro.worksheets[0].iter_rows(values_only=True)
+            for fila in filas:
+                if _es_encabezado(fila, palabras):
+                    return list(fila), list(filas)
+            return [], []
+        finally:
+            libro.close()
+
+    for i, fila in enumerate(filas):
+        if _es_encabezado(fila, palabras):
+            return list(fila), filas[i + 1:]
+    return [], []
+
+
+def normalizar(filas: List[tuple], perfil: PerfilExcel) -> List[Dict]:
+    """Filas del Excel → dicts de productos, con columnas convertidas de una vez (pandas)"""
+    import pandas as pd
+
+    df = pd.DataFrame.from_records(filas) if filas else pd.DataFrame()
+    for posicion in perfil.columnas.values():
+        if posicion not in df.columns:
+            df[posicion] = None
+
+    nombre = df[perfil.columnas['nombre']]
+    nombre = nombre.where(nombre.notna(), '').astype(str).str.strip()
+    saldo = pd.to_numeric(df[perfil.columnas['saldo']], errors='coerce').fillna(0).astype('int64')
+    validas = (nombre != '') & ~nombre.isin(perfil.excluidos) & (saldo > 0)
+
+    productos = pd.DataFrame({'nombre': nombre[validas], 'saldo': saldo[validas]})
+    for campo, defecto in perfil.defectos.items():
+        if campo in perfil.columnas:
+            columna = df.loc[validas, perfil.columnas[campo]]
+            if isinstance(defecto, float):
+                columna = pd.to_numeric(columna, errors='coerce')
+            else:
+                columna = columna.map(lambda v: str(v).strip(), na_action='ignore')
+            productos[campo] = columna.where(columna.notna(), defecto)
+        else:
+            productos[campo] = defecto
+    productos.insert(0, 'codigo', [f"{perfil.prefijo}{i:03d}" for i in range(len(productos))])
+
+    # Tipos nativos: sqlite3 no acepta numpy.int64
+    return [{campo: (valor.item() if hasattr(valor, 'item') else valor) for campo, valor in fila.items()}
+            for fila in productos.to_dict('records')]
+
+
+def leer_excel_inventario(ruta: str, linea: str) -> Tuple[List[Dict], Dict]:
+    """Productos de un Excel de inventario y el resumen de la lectura"""
+    perfil = PERFILES[linea]
+    inicio = time.perf_counter()
+    encabezado, filas = leer_hoja(ruta, perfil.encabezado)
+    productos = normalizar(filas, perfil)
+    resumen = {
+        'archivo': os.path.basename(ruta),
+        'columnas': [str(c) for c in encabezado if c is not None],
+        'leidas': len(filas),
+        'validas': len(productos),
+        'segundos_lectura': time.perf_counter() - inicio,
+    }
+    return productos, resumen
+
+
+def _campos_archivo(inventario) -> Tuple[str, ...]:
+    """Columnas que trae el Excel de la línea: lo demás son defectos que no se comparan"""
+    return tuple(PERFILES[inventario.linea.nombre].columnas)
+
+
+def importar_productos(inventario, productos: List[Dict], resumen: Dict, incremental: bool = False) -> Dict:
+    """
+    Cargar los productos leídos y completar el resumen con tiempos y filas
+    por segundo. Por defecto reemplaza el inventario; con incremental=True
+    aplica sólo altas, cambios y desactivaciones, emparejando por nombre
+    (los códigos del Excel son posicionales)
+    """
+    inicio = time.perf_counter()
+    if incremental:
+        cambios = inventario.sincronizar_productos(productos, clave='nombre', campos=_campos_archivo(inventario))
+        resumen['cambios'] = cambios
+        resumen['importadas'] = len(cambios['nuevos']) + len(cambios['actualizados'])
+    else:
+        resumen['importadas'] = inventario.insertar_productos(productos, vaciar=True)
+    resumen['segundos_carga'] = time.perf_counter() - inicio
+    resumen['segundos'] = resumen['segundos_lectura'] + resumen['segundos_carga']
+    resumen['filas_por_segundo'] = resumen['leidas'] / resumen['segundos'] if resumen['segundos'] else 0.0
+
+    log_performance(f"importar_excel_{inventario.linea.nombre}", resumen['segundos'],
+                    {c: resumen[c] for c in ('archivo', 'leidas', 'importadas', 'filas_por_segundo')})
+    get_logger("inventario_import").info(
+        f"{resumen['archivo']}: {resumen['leidas']} filas, {resumen['importadas']} productos en "
+        f"{resumen['segundos']:.2f} s ({resumen['filas_por_segundo']:,.0f} filas/s)")
+    return resumen
+
+
+def vista_previa(inventario, productos: List[Dict]) -> Dict:
+    """Cambios que haría la importación incremental, sin aplicarlos"""
+    return inventario.sincronizar_productos(productos, clave='nombre', aplicar=False,
+                                            campos=_campos_archivo(inventario))
+
+
+def texto_vista_previa(cambios: Dict) -> str:
+    """Resumen de una vista previa para mostrar antes de confirmar"""
+    texto = (f"Nuevos: {len(cambios['nuevos'])}\n"
+             f"Actualizados: {len(cambios['actualizados'])}\n"
+             f"Desactivados: {len(cambios['desactivados'])}\n"
+             f"Sin cambios: {cambios['sin_cambios']}")
+    if cambios['duplicados']:
+        texto += f"\nRepetidos en el archivo (se toma el primero): {len(cambios['duplicados'])}"
+    for codigo, diferencias in cambios['actualizados'][:5]:
+        texto += f"\n  • {codigo}: " + ", ".join(f"{c} {a} → {d}" for c, (a, d) in diferencias.items())
+    return texto
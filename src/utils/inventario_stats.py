@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Estadísticas de Inventarios
+Todos los indicadores de un inventario (productos, sin stock, stock bajo,
+alto riesgo, vencimientos, categorías, valor) salen de una sola pasada
+SUM(CASE ...) sobre la tabla de productos, cuyo saldo es el materializado
+por el libro de movimientos. El resultado queda en la caché de lecturas
+etiquetado con la tabla, así que dura hasta el siguiente movimiento o
+cambio de productos (que llaman a invalidar(tabla)). Las tarjetas de los
+tableros y el gestor de alertas leen de aquí.
+"""
+
+import os
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+from .read_cache import cached
+
+# Indicadores en el orden de la consulta
+INDICADORES = ('total', 'activos', 'sin_stock', 'stock_bajo', 'bajo_minimo', 'alto_riesgo',
+               'vencidos', 'por_vencer', 'categorias', 'unidades', 'valor_total')
+
+
+def calcular(consultar, tabla: str, columna_saldo: str = 'saldo', columna_categoria: str = 'categoria',
+             dias_vencimiento: int = 30) -> Dict:
+    """
+    Indicadores de una tabla de productos en una sola consulta. Salvo
+    'total', todos cuentan sólo productos activos. consultar(sql, params)
+    retorna las filas (InventarioEngine.consultar).
+    """
+    columnas = {fila[1] for fila in consultar(f"PRAGMA table_info({tabla})", ())}
+    saldo = f"COALESCE({columna_saldo}, 0)"
+    activo = "COALESCE(activo, 1) = 1" if 'activo' in columnas else "1"
+    peligro = "nivel_peligrosidad = 'ALTO'" if 'nivel_peligrosidad' in columnas else "0"
+    vence = "fecha_vencimiento" if 'fecha_vencimiento' in columnas else "NULL"
+    categoria = columna_categoria if columna_categoria in columnas else "NULL"
+    hoy = date.today()
+
+    fila = consultar(f"""
+        SELECT COUNT(*),
+               SUM(CASE WHEN {activo} THEN 1 ELSE 0 END),
+               SUM(CASE WHEN {activo} AND {saldo} <= 0 THEN 1 ELSE 0 END),
+               SUM(CASE WHEN {activo} AND {saldo} > 0 AND {saldo} <= COALESCE(stock_minimo, 0) THEN 1 ELSE 0 END),
+               SUM(CASE WHEN {activo} AND {saldo} <= COALESCE(stock_minimo, 0) THEN 1 ELSE 0 END),
+               SUM(CASE WHEN {activo} AND {peligro} THEN 1 ELSE 0 END),
+               SUM(CASE WHEN {activo} AND {vence} < ? THEN 1 ELSE 0 END),
+               SUM(CASE WHEN {activo} AND {vence} >= ? AND {vence} <= ? THEN 1 ELSE 0 END),
+               COUNT(DISTINCT CASE WHEN {activo} AND {categoria} != '' THEN {categoria} END),
+               SUM(CASE WHEN {activo} THEN {saldo} ELSE 0 END),
+               SUM(CASE WHEN {activo} THEN {saldo} * COALESCE(valor_unitario, 0) ELSE 0 END)
+        FROM {tabla}
+    """, (hoy.isoformat(), hoy.isoformat(), (hoy + timedelta(days=dias_vencimiento)).isoformat()))[0]
+    return {indicador: valor or 0 for indicador, valor in zip(INDICADORES, fila)}
+
+
+def estadisticas(inventario, dias_vencimiento: int = 30) -> Dict:
+    """Indicadores de un InventarioEngine, en caché hasta la siguiente escritura en su tabla"""
+    linea = inventario.linea
+
+    def cargar():
+        return calcular(inventario.consultar, linea.tabla, columna_categoria=linea.columna_categoria,
+                        dias_vencimiento=dias_vencimiento)
+    clave = ('estadisticas', linea.tabla, os.path.abspath(inventario.db_path), dias_vencimiento)
+    return dict(cached(clave, cargar, etiquetas=(linea.tabla,)))
+
+
+def productos_en_alerta(inventario, umbral_critico: int, umbral_bajo: int) -> Tuple[List[tuple], List[tuple]]:
+    """
+    (críticos, bajos) como filas (codigo, nombre, saldo, categoria,
+    valor_unitario) de los productos activos, en una sola consulta
+    """
+    linea = inventario.linea
+
+    def cargar():
+        filas = inventario.consultar(f"""
+            SELECT codigo, nombre, COALESCE(saldo, 0), {linea.columna_categoria}, valor_unitario,
+                   CASE WHEN COALESCE(saldo, 0) <= ? THEN 'critico' ELSE 'bajo' END
+            FROM {linea.tabla}
+            WHERE COALESCE(activo, 1) = 1 AND COALESCE(saldo, 0) <= ?
+            ORDER BY saldo, codigo
+        """, (umbral_critico, max(umbral_bajo, umbral_critico)))
+        return (tuple(f[:5] for f in filas if f[5] == 'critico'), tuple(f[:5] for f in filas if f[5] == 'bajo'))
+    clave = ('alertas_stock', linea.tabla, os.path.abspath(inventario.db_path), umbral_critico, umbral_bajo)
+    criticos, bajos = cached(clave, cargar, etiquetas=(linea.tabla,))
+    return list(criticos), list(bajos)
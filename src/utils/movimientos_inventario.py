@@ -2,14 +2,34 @@
 # -*- coding: utf-8 -*-
 """
 Sistema Unificado de Movimientos de Inventario
-Maneja entradas y salidas con fecha y hora automática
+Maneja entradas y salidas con fecha y hora automática, una a una o en
+bloque (grilla de líneas o archivo CSV/Excel)
 """
 
+import csv
+import os
+import unicodedata
 import tkinter as tk
-from tkinter import ttk, messagebox
-import sqlite3
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
-import os
+from .historial_movimientos import HistorialMovimientos, cargar_al_desplazar, fecha_filtro
+from .inventario_engine import LINEAS, get_inventario
+
+# Encabezados aceptados en los archivos de movimientos (sin tildes, en minúscula)
+ENCABEZADOS_MOVIMIENTO = {
+    'codigo': 'codigo', 'cod': 'codigo', 'referencia': 'codigo',
+    'tipo': 'tipo', 'movimiento': 'tipo',
+    'cantidad': 'cantidad', 'cant': 'cantidad',
+    'observaciones': 'observaciones', 'obs': 'observaciones', 'detalle': 'observaciones',
+    'factura': 'factura', 'n. factura': 'factura',
+    'proveedor': 'proveedor', 'destino': 'destino', 'responsable': 'responsable',
+}
+
+SISTEMAS_TEXTO = {
+    'quimicos': 'Químicos',
+    'almacen': 'Almacén',
+    'poscosecha': 'Poscosecha'
+}
 
 class MovimientoInventarioDialog:
     """Diálogo unificado para registrar movimientos de inventario"""
@@ -31,47 +51,10 @@ class MovimientoInventarioDialog:
         self.load_products()
     
     def setup_database(self):
-        """Configurar conexión a base de datos"""
-        db_paths = {
-            'quimicos': 'database/inventario_quimicos.db',
-            'almacen': 'database/inventario_almacen.db',
-            'poscosecha': 'database/inventario_poscosecha.db'
-        }
-        
-        self.db_path = db_paths.get(self.sistema)
-        if not self.db_path or not os.path.exists(self.db_path):
-            messagebox.showerror("Error", f"Base de datos de {self.sistema} no encontrada")
-            self.window.destroy()
-            return
-        
-        # Crear tabla de movimientos si no existe
-        self.create_movements_table()
-    
-    def create_movements_table(self):
-        """Crear tabla de movimientos si no existe"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        table_name = f"movimientos_{self.sistema}"
-        
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS {table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                producto_codigo TEXT NOT NULL,
-                producto_nombre TEXT NOT NULL,
-                tipo TEXT NOT NULL,
-                cantidad INTEGER NOT NULL,
-                fecha_hora TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                saldo_anterior INTEGER,
-                saldo_nuevo INTEGER,
-                responsable TEXT,
-                observaciones TEXT,
-                fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        """Motor del inventario (crea o completa las tablas de productos y movimientos)"""
+        if self.sistema not in LINEAS:
+            raise ValueError(f"Sistema de inventario desconocido: {self.sistema}")
+        self.inventario = get_inventario(self.sistema)
     
     def setup_window(self):
         """Configurar ventana"""
@@ -218,19 +201,8 @@ class MovimientoInventarioDialog:
     def load_products(self):
         """Cargar productos en el combobox"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Obtener productos según el sistema
-            if self.sistema == 'quimicos':
-                cursor.execute("SELECT codigo, nombre, saldo FROM productos_quimicos ORDER BY nombre")
-            elif self.sistema == 'almacen':
-                cursor.execute("SELECT codigo, nombre, saldo FROM productos_almacen ORDER BY nombre")
-            else:  # poscosecha
-                cursor.execute("SELECT codigo, nombre, saldo FROM productos_poscosecha ORDER BY nombre")
-            
-            productos = cursor.fetchall()
-            conn.close()
+            productos = [(p.codigo, p.nombre, p.saldo) for p in self.inventario.productos()]
+            productos.sort(key=lambda p: p[1] or '')
             
             # Crear lista para combobox
             productos_list = [f"{codigo} - {nombre}" for codigo, nombre, saldo in productos]
@@ -281,49 +253,20 @@ class MovimientoInventarioDialog:
             
             # Obtener datos
             selected = self.producto_var.get()
-            codigo, nombre, saldo_actual = self.productos_data[selected]
+            codigo, nombre, _ = self.productos_data[selected]
             cantidad = int(self.cantidad_var.get())
             responsable = self.responsable_var.get()
             observaciones = self.observaciones_text.get("1.0", tk.END).strip()
             
-            # Validar stock para salidas
-            if self.tipo == 'salida' and cantidad > saldo_actual:
-                messagebox.showerror("Error", f"Stock insuficiente. Disponible: {saldo_actual}")
+            # Registrar movimiento y nuevo saldo en una sola transacción; el
+            # motor valida el stock con el saldo actual de la base
+            try:
+                movimiento = self.inventario.registrar_movimiento(codigo, self.tipo, cantidad,
+                                                                  responsable, observaciones)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
                 return
-            
-            # Calcular nuevo saldo
-            if self.tipo == 'entrada':
-                nuevo_saldo = saldo_actual + cantidad
-            else:
-                nuevo_saldo = saldo_actual - cantidad
-            
-            # Guardar en base de datos
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Insertar movimiento
-            table_name = f"movimientos_{self.sistema}"
-            cursor.execute(f'''
-                INSERT INTO {table_name} 
-                (producto_codigo, producto_nombre, tipo, cantidad, fecha_hora, 
-                 saldo_anterior, saldo_nuevo, responsable, observaciones)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (codigo, nombre, self.tipo, cantidad, datetime.now(),
-                  saldo_actual, nuevo_saldo, responsable, observaciones))
-            
-            # Actualizar stock del producto
-            if self.sistema == 'quimicos':
-                cursor.execute("UPDATE productos_quimicos SET saldo = ? WHERE codigo = ?", 
-                              (nuevo_saldo, codigo))
-            elif self.sistema == 'almacen':
-                cursor.execute("UPDATE productos_almacen SET saldo = ? WHERE codigo = ?", 
-                              (nuevo_saldo, codigo))
-            else:  # poscosecha
-                cursor.execute("UPDATE productos_poscosecha SET saldo = ? WHERE codigo = ?", 
-                              (nuevo_saldo, codigo))
-            
-            conn.commit()
-            conn.close()
+            nuevo_saldo = movimiento.saldo_nuevo
             
             # Mostrar confirmación
             tipo_text = "Entrada" if self.tipo == 'entrada' else "Salida"
@@ -349,6 +292,10 @@ def abrir_movimiento_salida(parent, sistema):
     """Abrir diálogo de salida"""
     MovimientoInventarioDialog(parent, sistema, 'salida')
 
+def abrir_movimientos_en_bloque(parent, sistema, tipo, db_path=None):
+    """Abrir la grilla de movimientos en bloque"""
+    MovimientosEnBloqueWindow(parent, sistema, tipo, db_path)
+
 def abrir_historial_movimientos(parent, sistema):
     """Abrir historial de movimientos"""
     HistorialMovimientosWindow(parent, sistema)
@@ -361,17 +308,11 @@ class HistorialMovimientosWindow:
         self.parent = parent
         self.sistema = sistema
         
-        # Configurar base de datos
-        db_paths = {
-            'quimicos': 'database/inventario_quimicos.db',
-            'almacen': 'database/inventario_almacen.db',
-            'poscosecha': 'database/inventario_poscosecha.db'
-        }
-        
-        self.db_path = db_paths.get(sistema)
-        if not self.db_path or not os.path.exists(self.db_path):
-            messagebox.showerror("Error", f"Base de datos de {sistema} no encontrada")
+        if sistema not in LINEAS:
+            messagebox.showerror("Error", f"Sistema de inventario desconocido: {sistema}")
             return
+        self.inventario = get_inventario(sistema)
+        self.historial = None
         
         # Crear ventana
         self.window = tk.Toplevel(parent)
@@ -427,9 +368,39 @@ class HistorialMovimientosWindow:
                              relief='flat', bd=0, padx=15, pady=5, cursor='hand2')
         close_btn.pack(side=tk.RIGHT)
         
+        # Filtros
+        self.create_filters()
+        
         # Tabla de movimientos
         self.create_movements_table()
     
+    def create_filters(self):
+        """Crear filtros de tipo, producto y fechas (DD/MM/AAAA)"""
+        filter_frame = tk.Frame(self.window, bg='#f8f9fa')
+        filter_frame.pack(fill=tk.X, padx=20, pady=(15, 0))
+        
+        tk.Label(filter_frame, text="Tipo:", bg='#f8f9fa').pack(side=tk.LEFT, padx=5)
+        self.type_filter = ttk.Combobox(filter_frame, values=['Todos', 'entrada', 'salida', 'ajuste'],
+                                        width=10, state='readonly')
+        self.type_filter.set('Todos')
+        self.type_filter.pack(side=tk.LEFT, padx=5)
+        self.type_filter.bind('<<ComboboxSelected>>', lambda e: self.load_movements())
+        
+        self.filter_entries = {}
+        for campo, texto in (('codigo', "Código:"), ('desde', "Desde:"), ('hasta', "Hasta:")):
+            tk.Label(filter_frame, text=texto, bg='#f8f9fa').pack(side=tk.LEFT, padx=(15, 5))
+            entry = tk.Entry(filter_frame, width=12)
+            entry.pack(side=tk.LEFT, padx=5)
+            entry.bind('<Return>', lambda e: self.load_movements())
+            self.filter_entries[campo] = entry
+        
+        tk.Button(filter_frame, text="🔍 Filtrar", command=self.load_movements,
+                  bg='#3498db', fg='white', relief='flat', padx=15, pady=3,
+                  cursor='hand2').pack(side=tk.LEFT, padx=15)
+        
+        self.count_label = tk.Label(filter_frame, text="", bg='#f8f9fa', fg='#7f8c8d')
+        self.count_label.pack(side=tk.RIGHT, padx=5)
+    
     def create_movements_table(self):
         """Crear tabla de movimientos"""
         table_frame = tk.Frame(self.window, bg='#f8f9fa')
@@ -458,7 +429,10 @@ class HistorialMovimientosWindow:
         # Scrollbars
         v_scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.movements_tree.yview)
         h_scrollbar = ttk.Scrollbar(table_frame, orient=tk.HORIZONTAL, command=self.movements_tree.xview)
-        self.movements_tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.movements_tree.configure(xscrollcommand=h_scrollbar.set)
+        
+        # Páginas siguientes al acercarse al final
+        cargar_al_desplazar(self.movements_tree, v_scrollbar, self.load_next_page)
         
         # Layout
         self.movements_tree.grid(row=0, column=0, sticky='nsew')
@@ -469,32 +443,33 @@ class HistorialMovimientosWindow:
         table_frame.grid_columnconfigure(0, weight=1)
     
     def load_movements(self):
-        """Cargar movimientos en la tabla"""
+        """Cargar la primera página de movimientos con los filtros actuales"""
         try:
-            # Limpiar tabla
-            for item in self.movements_tree.get_children():
-                self.movements_tree.delete(item)
-            
-            # Conectar a base de datos
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Obtener movimientos
-            table_name = f"movimientos_{self.sistema}"
-            cursor.execute(f'''
-                SELECT fecha_hora, tipo, producto_nombre, cantidad, saldo_anterior, 
-                       saldo_nuevo, responsable, observaciones
-                FROM {table_name}
-                ORDER BY fecha_hora DESC
-                LIMIT 1000
-            ''')
-            
-            movements = cursor.fetchall()
-            conn.close()
-            
-            # Insertar en tabla
-            for movement in movements:
-                fecha_hora, tipo, producto, cantidad, saldo_anterior, saldo_nuevo, responsable, observaciones = movement
+            tipo_filtro = self.type_filter.get()
+            historial = HistorialMovimientos(
+                self.inventario,
+                tipo=None if tipo_filtro == 'Todos' else tipo_filtro,
+                codigo=self.filter_entries['codigo'].get().strip(),
+                desde=fecha_filtro(self.filter_entries['desde'].get()),
+                hasta=fecha_filtro(self.filter_entries['hasta'].get()))
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        
+        # Limpiar tabla
+        self.movements_tree.delete(*self.movements_tree.get_children())
+        self.movements_tree.yview_moveto(0)
+        self.historial = historial
+        self.load_next_page()
+    
+    def load_next_page(self):
+        """Agregar la siguiente página de movimientos al final de la tabla"""
+        if not self.historial or not self.historial.hay_mas:
+            return
+        try:
+            for movement in self.historial.siguiente_pagina():
+                fecha_hora = movement.fecha_hora
+                tipo = movement.tipo
                 
                 # Formatear fecha
                 try:
@@ -504,24 +479,247 @@ class HistorialMovimientosWindow:
                     fecha_formateada = fecha_hora
                 
                 # Formatear tipo con emoji
-                tipo_emoji = "📥" if tipo == 'entrada' else "📤"
+                tipo_emoji = {'entrada': "📥", 'salida': "📤"}.get(tipo, "⚖️")
                 tipo_formateado = f"{tipo_emoji} {tipo.title()}"
                 
                 # Insertar en tabla
                 self.movements_tree.insert('', 'end', values=(
                     fecha_formateada,
                     tipo_formateado,
-                    producto,
-                    cantidad,
-                    saldo_anterior,
-                    saldo_nuevo,
-                    responsable or "No especificado",
-                    observaciones or "Sin observaciones"
+                    movement.producto_nombre,
+                    movement.cantidad,
+                    movement.saldo_anterior,
+                    movement.saldo_nuevo,
+                    movement.responsable or "No especificado",
+                    movement.observaciones or "Sin observaciones"
                 ))
             
             # Mostrar contador
-            total_movements = len(movements)
-            self.window.title(f"📋 Historial de Movimientos - {total_movements} registros")
+            mas = "+" if self.historial.hay_mas else ""
+            self.count_label.config(text=f"{self.historial.cargados}{mas} registros")
+            self.window.title(f"📋 Historial de Movimientos - {self.historial.cargados}{mas} registros")
             
         except Exception as e:
-            messagebox.showerror("Error", f"Error cargando movimientos: {e}") 
\ No newline at end of file
+            messagebox.showerror("Error", f"Error cargando movimientos: {e}") 
+
+
+def _normalizar_encabezado(texto) -> str:
+    texto = unicodedata.normalize('NFKD', str(texto or '')).encode('ascii', 'ignore').decode()
+    return ' '.join(texto.strip().lower().split())
+
+
+def leer_archivo_movimientos(ruta):
+    """
+    Líneas de movimiento de un CSV (coma o punto y coma) o de la primera
+    hoja de un Excel. La primera fila son los encabezados; cada línea lleva
+    'linea' con su número de fila en el archivo para reportar errores.
+    """
+    if os.path.splitext(ruta)[1].lower() in ('.xlsx', '.xlsm'):
+        import openpyxl
+        libro = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+        try:
+            filas = [list(fila) for fila in libro.worksheets[0].iter_rows(values_only=True)]
+        finally:
+            libro.close()
+    else:
+        with open(ruta, newline='', encoding='utf-8-sig') as f:
+            muestra = f.read(4096)
+            f.seek(0)
+            delimitador = ';' if muestra.count(';') > muestra.count(',') else ','
+            filas = list(csv.reader(f, delimiter=delimitador))
+
+    if not filas:
+        return []
+    campos = [ENCABEZADOS_MOVIMIENTO.get(_normalizar_encabezado(c)) for c in filas[0]]
+    if 'codigo' not in campos or 'cantidad' not in campos:
+        raise ValueError("El archivo debe tener columnas de código y cantidad")
+
+    lineas = []
+    for numero, fila in enumerate(filas[1:], 2):
+        if not any(str(valor).strip() for valor in fila if valor is not None):
+            continue
+        linea = {campo: valor for campo, valor in zip(campos, fila) if campo and valor is not None}
+        linea['linea'] = numero
+        lineas.append(linea)
+    return lineas
+
+
+class MovimientosEnBloqueWindow:
+    """Grilla para registrar una factura o despacho de varias líneas en un solo paso"""
+    
+    def __init__(self, parent, sistema, tipo, db_path=None):
+        self.parent = parent
+        self.sistema = sistema
+        self.tipo = tipo  # 'entrada' o 'salida'
+        self.lineas = []  # dicts como los recibe registrar_movimientos
+        
+        if sistema not in LINEAS:
+            messagebox.showerror("Error", f"Sistema de inventario desconocido: {sistema}")
+            return
+        self.inventario = get_inventario(sistema, db_path)
+        
+        self.window = tk.Toplevel(parent)
+        self.color = '#27ae60' if tipo == 'entrada' else '#e74c3c'
+        self.window.title(f"{'📥 Entradas' if tipo == 'entrada' else '📤 Salidas'} en bloque - "
+                          f"{SISTEMAS_TEXTO.get(sistema, '')}")
+        self.window.geometry("900x600")
+        self.window.configure(bg='#f8f9fa')
+        self.window.transient(parent)
+        self.window.grab_set()
+        
+        self.create_interface()
+        self.load_products()
+    
+    def create_interface(self):
+        """Encabezado del documento, captura de líneas, grilla y botones"""
+        header_frame = tk.Frame(self.window, bg=self.color)
+        header_frame.pack(fill=tk.X)
+        tk.Label(header_frame, text=f"{'Entrada' if self.tipo == 'entrada' else 'Salida'} en bloque",
+                font=('Segoe UI', 16, 'bold'), bg=self.color, fg='white').pack(side=tk.LEFT, padx=20, pady=15)
+        
+        # Datos comunes a todas las líneas
+        doc_frame = tk.Frame(self.window, bg='#f8f9fa')
+        doc_frame.pack(fill=tk.X, padx=20, pady=(15, 5))
+        self.responsable_var = tk.StringVar()
+        self.documento_var = tk.StringVar()
+        self.tercero_var = tk.StringVar()
+        campos = [("Responsable:", self.responsable_var)]
+        if self.tipo == 'entrada':
+            campos += [("Factura:", self.documento_var), ("Proveedor:", self.tercero_var)]
+        else:
+            campos += [("Destino:", self.tercero_var)]
+        for i, (texto, variable) in enumerate(campos):
+            tk.Label(doc_frame, text=texto, font=('Segoe UI', 10, 'bold'),
+                    bg='#f8f9fa', fg='#2c3e50').grid(row=0, column=i * 2, sticky='w')
+            tk.Entry(doc_frame, textvariable=variable, font=('Segoe UI', 10),
+                    width=20).grid(row=0, column=i * 2 + 1, sticky='w', padx=(5, 15))
+        
+        # Captura de una línea
+        linea_frame = tk.Frame(self.window, bg='#f8f9fa')
+        linea_frame.pack(fill=tk.X, padx=20, pady=5)
+        self.producto_var = tk.StringVar()
+        self.cantidad_var = tk.StringVar()
+        self.observaciones_var = tk.StringVar()
+        self.producto_combo = ttk.Combobox(linea_frame, textvariable=self.producto_var,
+                                          font=('Segoe UI', 10), width=40)
+        self.producto_combo.pack(side=tk.LEFT)
+        tk.Label(linea_frame, text="Cant.:", bg='#f8f9fa').pack(side=tk.LEFT, padx=(10, 2))
+        cantidad_entry = tk.Entry(linea_frame, textvariable=self.cantidad_var, width=8)
+        cantidad_entry.pack(side=tk.LEFT)
+        cantidad_entry.bind('<Return>', lambda e: self.agregar_linea())
+        tk.Label(linea_frame, text="Obs.:", bg='#f8f9fa').pack(side=tk.LEFT, padx=(10, 2))
+        tk.Entry(linea_frame, textvariable=self.observaciones_var, width=25).pack(side=tk.LEFT)
+        tk.Button(linea_frame, text="➕ Agregar", command=self.agregar_linea,
+                 bg='#3498db', fg='white', relief='flat', padx=10).pack(side=tk.LEFT, padx=(10, 0))
+        
+        # Grilla de líneas
+        table_frame = tk.Frame(self.window, bg='#f8f9fa')
+        table_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=5)
+        columns = ('Línea', 'Código', 'Cantidad', 'Observaciones', 'Estado')
+        self.tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=15)
+        for col, ancho in zip(columns, (60, 150, 90, 300, 250)):
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=ancho, anchor='w' if col in ('Observaciones', 'Estado') else 'center')
+        self.tree.tag_configure('error', background='#fadbd8')
+        v_scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=v_scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        # Acciones
+        buttons_frame = tk.Frame(self.window, bg='#f8f9fa')
+        buttons_frame.pack(fill=tk.X, padx=20, pady=(5, 15))
+        for texto, comando, color in (("📂 Importar CSV/Excel", self.importar_archivo, '#f39c12'),
+                                      ("🗑️ Quitar línea", self.quitar_linea, '#95a5a6'),
+                                      ("✔️ Validar", lambda: self.guardar(aplicar=False), '#8e44ad'),
+                                      ("💾 Guardar todo", self.guardar, self.color)):
+            tk.Button(buttons_frame, text=texto, command=comando, bg=color, fg='white',
+                     font=('Segoe UI', 10, 'bold'), relief='flat', padx=15, pady=6,
+                     cursor='hand2').pack(side=tk.LEFT, padx=(0, 10))
+        self.total_label = tk.Label(buttons_frame, text="0 líneas", bg='#f8f9fa', fg='#7f8c8d')
+        self.total_label.pack(side=tk.RIGHT)
+    
+    def load_products(self):
+        """Productos del combo como 'codigo - nombre'"""
+        try:
+            self.producto_combo['values'] = [f"{p.codigo} - {p.nombre}" for p in self.inventario.productos()]
+        except Exception as e:
+            messagebox.showerror("Error", f"Error cargando productos: {e}")
+    
+    def agregar_linea(self):
+        """Pasar la línea capturada a la grilla (se valida al guardar)"""
+        codigo = self.producto_var.get().split(' - ', 1)[0].strip()
+        if not codigo or not self.cantidad_var.get().strip():
+            messagebox.showerror("Error", "Indica producto y cantidad", parent=self.window)
+            return
+        self.lineas.append({'codigo': codigo, 'cantidad': self.cantidad_var.get().strip(),
+                            'observaciones': self.observaciones_var.get().strip()})
+        self.cantidad_var.set("")
+        self.observaciones_var.set("")
+        self.producto_combo.focus_set()
+        self.mostrar_lineas()
+    
+    def quitar_linea(self):
+        seleccion = self.tree.selection()
+        for item in sorted((self.tree.index(i) for i in seleccion), reverse=True):
+            del self.lineas[item]
+        self.mostrar_lineas()
+    
+    def importar_archivo(self):
+        """Agregar a la grilla las líneas de un CSV o Excel (código, cantidad, observaciones...)"""
+        ruta = filedialog.askopenfilename(parent=self.window, title="Importar movimientos",
+                                          filetypes=[("CSV o Excel", "*.csv *.xlsx"), ("Todos", "*.*")])
+        if not ruta:
+            return
+        try:
+            lineas = leer_archivo_movimientos(ruta)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error leyendo archivo: {e}", parent=self.window)
+            return
+        for linea in lineas:
+            linea.pop('linea', None)  # en la grilla manda la posición
+        self.lineas.extend(lineas)
+        self.mostrar_lineas()
+    
+    def mostrar_lineas(self, errores=None):
+        """Redibujar la grilla, marcando las líneas con error"""
+        errores = dict(errores or ())
+        self.tree.delete(*self.tree.get_children())
+        for numero, linea in enumerate(self.lineas, 1):
+            error = errores.get(numero)
+            self.tree.insert('', 'end', tags=('error',) if error else (), values=(
+                numero, linea.get('codigo', ''), linea.get('cantidad', ''),
+                linea.get('observaciones', ''), f"❌ {error}" if error else ("✔️" if errores is not None else "")))
+        self.total_label.config(text=f"{len(self.lineas)} líneas")
+    
+    def guardar(self, aplicar=True):
+        """Validar todas las líneas y, si no hay errores, asentarlas en una sola transacción"""
+        if not self.lineas:
+            messagebox.showerror("Error", "No hay líneas para registrar", parent=self.window)
+            return
+        if aplicar and not self.responsable_var.get().strip():
+            messagebox.showerror("Error", "Ingresa el responsable", parent=self.window)
+            return
+        if self.tipo == 'entrada':
+            documento = {'factura': self.documento_var.get().strip() or None,
+                         'proveedor': self.tercero_var.get().strip() or None}
+        else:
+            documento = {'destino': self.tercero_var.get().strip() or None}
+        try:
+            resumen = self.inventario.registrar_movimientos(
+                self.lineas, tipo=self.tipo, responsable=self.responsable_var.get().strip(),
+                aplicar=aplicar, **documento)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error registrando movimientos: {e}", parent=self.window)
+            return
+        
+        self.mostrar_lineas(resumen['errores'])
+        if resumen['errores']:
+            detalle = "\n".join(f"Línea {n}: {e}" for n, e in resumen['errores'][:10])
+            messagebox.showerror("Errores", f"{len(resumen['errores'])} de {resumen['total']} líneas con error; "
+                                 f"no se registró ninguna.\n\n{detalle}", parent=self.window)
+        elif not aplicar:
+            messagebox.showinfo("Validación", f"Las {resumen['total']} líneas son válidas", parent=self.window)
+        else:
+            messagebox.showinfo("Éxito", f"{resumen['aplicados']} movimientos registrados", parent=self.window)
+            self.window.destroy()
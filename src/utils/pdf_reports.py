@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reportes PDF
+Cola de trabajos con un grupo de hilos que genera PDFs con reportlab sin
+bloquear la interfaz: contratos, reportes de asistencia e inventarios.
+Fuentes y estilos se registran una sola vez; cada archivo se escribe en un
+temporal y se renombra al terminar, y la duración de cada trabajo queda en
+el log de rendimiento.
+"""
+
+import itertools
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+
+from .formato_espanol import fecha_a_espanol, numero_a_letras
+from .inventario_engine import LINEAS, get_inventario
+from .logger import get_logger, log_performance
+from .settings_manager import get_setting
+from models.engine import connect_db
+
+WORKERS = 2
+
+logger = get_logger("pdf_reports")
+
+
+# =================== FUENTES Y ESTILOS ===================
+
+@lru_cache(maxsize=1)
+def _fuentes():
+    """Registrar una vez las fuentes TTF que trae reportlab (cubren tildes y ñ)"""
+    import reportlab
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    carpeta = os.path.join(os.path.dirname(reportlab.__file__), 'fonts')
+    try:
+        pdfmetrics.registerFont(TTFont('Base', os.path.join(carpeta, 'Vera.ttf')))
+        pdfmetrics.registerFont(TTFont('Base-Bold', os.path.join(carpeta, 'VeraBd.ttf')))
+        return 'Base', 'Base-Bold'
+    except Exception as e:
+        logger.warning(f"Fuentes TTF no disponibles, se usa Helvetica: {e}")
+        return 'Helvetica', 'Helvetica-Bold'
+
+
+@lru_cache(maxsize=1)
+def _estilos() -> Dict[str, object]:
+    """Estilos de párrafo y de tabla compartidos por todos los reportes"""
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.platypus import TableStyle
+
+    normal, negrita = _fuentes()
+    return {
+        'titulo': ParagraphStyle('titulo', fontName=negrita, fontSize=15, leading=19,
+                                 alignment=TA_CENTER, textColor=colors.HexColor('#2c3e50'), spaceAfter=6),
+        'subtitulo': ParagraphStyle('subtitulo', fontName=normal, fontSize=9, leading=12,
+                                    alignment=TA_CENTER, textColor=colors.HexColor('#7f8c8d'), spaceAfter=12),
+        'seccion': ParagraphStyle('seccion', fontName=negrita, fontSize=11, leading=14,
+                                  spaceBefore=10, spaceAfter=4),
+        'texto': ParagraphStyle('texto', fontName=normal, fontSize=10, leading=14, alignment=TA_JUSTIFY),
+        'tabla': TableStyle([
+            ('FONTNAME', (0, 0), (-1, 0), negrita),
+            ('FONTNAME', (0, 1), (-1, -1), normal),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f2f4f7')]),
+            ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#bdc3c7')),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]),
+        'ficha': TableStyle([
+            ('FONTNAME', (0, 0), (0, -1), negrita),
+            ('FONTNAME', (1, 0), (1, -1), normal),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#bdc3c7')),
+        ]),
+    }
+
+
+def _documento(ruta: str, titulo: str, horizontal: bool = False):
+    from reportlab.lib.pagesizes import landscape, letter
+    from reportlab.lib.units import cm
+    from reportlab.platypus import SimpleDocTemplate
+
+    return SimpleDocTemplate(ruta, pagesize=landscape(letter) if horizontal else letter, title=titulo,
+                             leftMargin=2 * cm, rightMargin=2 * cm, topMargin=1.8 * cm, bottomMargin=1.8 * cm)
+
+
+def _encabezado(titulo: str):
+    from reportlab.platypus import Paragraph
+    estilos = _estilos()
+    return [Paragraph(titulo, estilos['titulo']),
+            Paragraph(f"Generado el {fecha_a_espanol(datetime.now())} a las {datetime.now():%H:%M}",
+                      estilos['subtitulo'])]
+
+
+def _tabla(filas, anchos=None, estilo='tabla'):
+    from reportlab.platypus import Table
+    tabla = Table(filas, colWidths=anchos, repeatRows=1 if estilo == 'tabla' else 0)
+    tabla.setStyle(_estilos()[estilo])
+    return tabla
+
+
+# =================== REPORTES ===================
+
+def render_contrato(ruta: str, contrato_id: int, **_):
+    """Contrato laboral de la base local"""
+    from reportlab.platypus import Paragraph, Spacer
+    from models.database import get_db, Contrato
+    from .contrato_excel_renderer import variables_contrato
+
+    db = get_db()
+    try:
+        contrato = db.query(Contrato).filter(Contrato.id == contrato_id).first()
+        if not contrato or not contrato.empleado:
+            raise ValueError(f"Contrato {contrato_id} no encontrado")
+        v = variables_contrato(contrato, contrato.empleado)
+    finally:
+        db.close()
+
+    estilos = _estilos()
+    historia = _encabezado(f"CONTRATO INDIVIDUAL DE TRABAJO {v['{NUMERO_CONTRATO}']}")
+    historia.append(_tabla([
+        ["Empleador", v['{NOMBRE_EMPLEADOR}']],
+        ["Dirección del empleador", v['{DIRECCION_EMPLEADOR}']],
+        ["Trabajador", v['{NOMBRE_EMPLEADO}']],
+        ["Cédula", v['{CEDULA_EMPLEADO}']],
+        ["Dirección del trabajador", v['{DIRECCION_EMPLEADO}']],
+        ["Cargo", v['{CARGO_EMPLEADO}']],
+        ["Tipo de contrato", v['{TIPO_CONTRATO}']],
+        ["Salario", f"{v['{SALARIO_NUMEROS}']} ({v['{SALARIO_LETRAS}']})"],
+        ["Periodo de pago", v['{PERIODOS_PAGO}']],
+        ["Fecha de inicio", v['{FECHA_INICIO}']],
+        ["Fecha de terminación", v['{FECHA_FIN}']],
+        ["Lugar de labores", v['{LUGAR_LABORES}']],
+    ], anchos=[150, 320], estilo='ficha'))
+
+    clausulas = [
+        ("PRIMERA. OBJETO", f"El trabajador se obliga a prestar sus servicios personales como "
+                            f"{v['{CARGO_EMPLEADO}']} en {v['{LUGAR_LABORES}']}, bajo la subordinación del empleador."),
+        ("SEGUNDA. REMUNERACIÓN", f"El empleador pagará al trabajador un salario {v['{TIPO_SALARIO}'].lower()} "
+                                  f"de {v['{SALARIO_LETRAS}']} ({v['{SALARIO_NUMEROS}']}), por periodos "
+                                  f"{v['{PERIODOS_PAGO}'].lower()}es."),
+        ("TERCERA. DURACIÓN", f"El contrato inicia el {v['{FECHA_INICIO}']} y su término es "
+                              f"{v['{TIPO_TERMINO_CONTRATO}'].lower()}"
+                              + (f", con vencimiento el {v['{FECHA_FIN}']}." if v['{TIPO_TERMINO_CONTRATO}'] == "FIJO" else ".")),
+    ]
+    for titulo, texto in clausulas:
+        historia.append(Paragraph(titulo, estilos['seccion']))
+        historia.append(Paragraph(texto, estilos['texto']))
+
+    historia.append(Spacer(1, 60))
+    historia.append(_tabla([["_" * 32, "_" * 32], ["EL EMPLEADOR", "EL TRABAJADOR"],
+                            [v['{NOMBRE_EMPLEADOR}'], v['{NOMBRE_EMPLEADO}']]], anchos=[235, 235], estilo='ficha'))
+    _documento(ruta, "Contrato").build(historia)
+    return {'contrato_id': contrato_id}
+
+
+def _horas(entrada, salida) -> Optional[float]:
+    def convertir(valor):
+        if isinstance(valor, str):
+            return datetime.fromisoformat(valor.replace('Z', '+00:00'))
+        return valor
+    try:
+        if entrada and salida:
+            return (convertir(salida) - convertir(entrada)).total_seconds() / 3600
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def _hora(valor) -> str:
+    if not valor:
+        return '-'
+    if isinstance(valor, str):
+        try:
+            return datetime.fromisoformat(valor.replace('Z', '+00:00')).strftime('%H:%M')
+        except ValueError:
+            return valor
+    return valor.strftime('%H:%M')
+
+
+def render_asistencia(ruta: str, fecha_desde: str, fecha_hasta: str, db_path: str = None, **_):
+    """Registros de asistencia entre dos fechas (YYYY-MM-DD), con horas trabajadas"""
+    from reportlab.platypus import Paragraph
+    from models.database import DB_PATH
+
+    conn = connect_db(db_path or DB_PATH)
+    try:
+        registros = conn.execute("""
+            SELECT e.nombre_completo, e.cedula, a.fecha, a.hora_entrada, a.hora_salida
+            FROM asistencias a
+            JOIN empleados e ON a.empleado_id = e.id
+            WHERE a.fecha BETWEEN ? AND ?
+            ORDER BY a.fecha, e.nombre_completo
+        """, (fecha_desde, fecha_hasta)).fetchall()
+    finally:
+        conn.close()
+
+    filas = [["Empleado", "Cédula", "Fecha", "Entrada", "Salida", "Horas"]]
+    total_horas = 0.0
+    for nombre, cedula, fecha, entrada, salida in registros:
+        horas = _horas(entrada, salida)
+        total_horas += horas or 0
+        filas.append([nombre, cedula, str(fecha), _hora(entrada), _hora(salida),
+                      f"{horas:.2f}" if horas is not None else "-"])
+
+    historia = _encabezado("REPORTE DE ASISTENCIA")
+    historia.append(Paragraph(f"Periodo: {fecha_desde} a {fecha_hasta} · {len(registros)} registros · "
+                              f"{total_horas:.1f} horas trabajadas", _estilos()['texto']))
+    historia.append(_tabla(filas, anchos=[150, 70, 65, 55, 55, 50]))
+    _documento(ruta, "Reporte de asistencia").build(historia)
+    return {'registros': len(registros)}
+
+
+def render_inventario(ruta: str, sistema: str, db_path: str = None, fecha_corte=None, **_):
+    """Existencias y valorización de un inventario (quimicos, almacen o poscosecha), hoy o a fecha_corte"""
+    from reportlab.platypus import Paragraph
+
+    if sistema not in LINEAS:
+        raise ValueError(f"Sistema de inventario desconocido: {sistema}")
+    inventario = get_inventario(sistema, db_path)
+    productos = inventario.productos_a_fecha(fecha_corte) if fecha_corte else inventario.productos()
+
+    filas = [["Código", "Producto", "Saldo", "Unidad", "Valor unit.", "Stock mín.", "Valor total", "Estado"]]
+    valor_inventario = 0
+    criticos = 0
+    for producto in productos:
+        codigo, nombre, unidad, valor_unitario, stock_minimo = (
+            producto.codigo, producto.nombre, producto.unidad, producto.valor_unitario, producto.stock_minimo)
+        saldo = producto.saldo or 0
+        valor_total = saldo * (valor_unitario or 0)
+        valor_inventario += valor_total or 0
+        if saldo <= 0:
+            estado = "AGOTADO"
+        elif saldo <= (stock_minimo or 0):
+            estado = "BAJO"
+        else:
+            estado = "NORMAL"
+        criticos += estado != "NORMAL"
+        filas.append([codigo, nombre, f"{saldo:,.0f}", unidad or '', f"${valor_unitario or 0:,.0f}",
+                      f"{stock_minimo or 0:,.0f}", f"${valor_total or 0:,.0f}", estado])
+
+    historia = _encabezado(f"REPORTE DE INVENTARIO - {sistema.upper()}"
+                           + (f" AL {fecha_corte.strftime('%d/%m/%Y')}" if fecha_corte else ""))
+    historia.append(Paragraph(
+        f"{len(productos)} productos · {criticos} con stock bajo o agotado · valor total "
+        f"${valor_inventario:,.0f} ({numero_a_letras(valor_inventario)})", _estilos()['texto']))
+    historia.append(_tabla(filas, anchos=[60, 200, 60, 50, 75, 60, 85, 60]))
+    _documento(ruta, f"Inventario {sistema}", horizontal=True).build(historia)
+    return {'productos': len(productos)}
+
+
+RENDERERS: Dict[str, Callable] = {
+    'contrato': render_contrato,
+    'asistencia': render_asistencia,
+    'inventario': render_inventario,
+}
+
+
+# =================== COLA DE TRABAJOS ===================
+
+class ReportJob:
+    """Trabajo de la cola: se completa con ruta o error"""
+
+    def __init__(self, job_id: int, tipo: str, params: dict):
+        self.id = job_id
+        self.tipo = tipo
+        self.params = params
+        self.estado = 'pendiente'
+        self.ruta: Optional[str] = None
+        self.error: Optional[str] = None
+        self.duracion: Optional[float] = None
+        self._fin = threading.Event()
+
+    @property
+    def terminado(self) -> bool:
+        return self._fin.is_set()
+
+    def esperar(self, timeout: float = None) -> bool:
+        return self._fin.wait(timeout)
+
+
+class PDFReportPipeline:
+    """Cola de trabajos PDF atendida por un grupo de hilos en segundo plano"""
+
+    def __init__(self, output_dir: str = None, workers: int = WORKERS):
+        self.output_dir = output_dir
+        self.workers = workers
+        self.trabajos: "queue.Queue[Optional[ReportJob]]" = queue.Queue()
+        self._ids = itertools.count(1)
+        self._hilos = []
+        self._lock = threading.Lock()
+
+    def _directorio(self) -> str:
+        directorio = self.output_dir or get_setting("reports.reports_directory", "reports/generated")
+        os.makedirs(directorio, exist_ok=True)
+        return directorio
+
+    def _iniciar_hilos(self):
+        with self._lock:
+            self._hilos = [h for h in self._hilos if h.is_alive()]
+            for _ in range(self.workers - len(self._hilos)):
+                hilo = threading.Thread(target=self._trabajar, daemon=True)
+                hilo.start()
+                self._hilos.append(hilo)
+
+    def submit(self, tipo: str, nombre: str = None, **params) -> ReportJob:
+        """Encolar un reporte; 'nombre' es el archivo de salida (sin carpeta)"""
+        if tipo not in RENDERERS:
+            raise ValueError(f"Tipo de reporte desconocido: {tipo}")
+        job = ReportJob(next(self._ids), tipo, params)
+        job.params['nombre'] = nombre or f"{tipo}_{datetime.now():%Y%m%d_%H%M%S}_{job.id}.pdf"
+        self._iniciar_hilos()
+        self.trabajos.put(job)
+        return job
+
+    def _trabajar(self):
+        while True:
+            job = self.trabajos.get()
+            if job is None:
+                break
+            self._ejecutar(job)
+
+    def _ejecutar(self, job: ReportJob):
+        job.estado = 'generando'
+        inicio = time.perf_counter()
+        ruta = os.path.join(self._directorio(), job.params['nombre'])
+        temporal = f"{ruta}.{job.id}.tmp"
+        detalles = {'tipo': job.tipo}
+        try:
+            detalles.update(RENDERERS[job.tipo](temporal, **job.params) or {})
+            # Escritura atómica: el PDF final aparece completo o no aparece
+            os.replace(temporal, ruta)
+            job.ruta = ruta
+            job.estado = 'listo'
+            detalles['bytes'] = os.path.getsize(ruta)
+        except Exception as e:
+            job.error = str(e)
+            job.estado = 'error'
+            detalles['error'] = job.error
+            logger.error(f"Error generando reporte {job.tipo}: {e}")
+            try:
+                os.remove(temporal)
+            except OSError:
+                pass
+        finally:
+            job.duracion = time.perf_counter() - inicio
+            log_performance(f"pdf_{job.tipo}", job.duracion, detalles)
+            job._fin.set()
+
+    def shutdown(self):
+        for _ in self._hilos:
+            self.trabajos.put(None)
+        self._hilos = []
+
+
+_pipeline: Optional[PDFReportPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_report_pipeline() -> PDFReportPipeline:
+    """Instancia global de la cola de reportes PDF"""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = PDFReportPipeline()
+        return _pipeline
+
+
+def esperar_reporte(widget, job: ReportJob, al_terminar: Callable[[ReportJob], None], intervalo: int = 150):
+    """Sondear un trabajo desde Tk (con after) y llamar al_terminar en el hilo de la interfaz"""
+    def revisar():
+        if job.terminado:
+            al_terminar(job)
+        else:
+            widget.after(intervalo, revisar)
+    revisar()
+
+
+def abrir_archivo(ruta: str):
+    """Abrir un archivo con la aplicación predeterminada del sistema"""
+    try:
+        os.startfile(ruta)  # Windows
+    except AttributeError:
+        import subprocess
+        import sys
+        subprocess.Popen(['open' if sys.platform == 'darwin' else 'xdg-open', ruta])
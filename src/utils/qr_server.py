@@ -1,5 +1,4 @@
 from flask import Flask, render_template_string, request, jsonify, redirect, url_for
-import sqlite3
 import os
 import hashlib
 from datetime import datetime, date, timedelta
@@ -11,6 +10,9 @@ from PIL import Image
 import io
 import base64
 import socket
+from .sync_journal import get_journal, get_journal_path
+from .sync_telemetry import get_sync_telemetry
+from models.engine import connect_db
 
 class QRServer:
     def __init__(self, db_path, port=5000):
@@ -19,6 +21,7 @@ class QRServer:
         self.port = port
         self.server_thread = None
         self.is_running = False
+        self.journal = get_journal(get_journal_path(db_path))
         
         # Configurar rutas
         self.setup_routes()
@@ -30,7 +33,7 @@ class QRServer:
             try:
                 # Obtener el token del día
                 fecha_actual = date.today()
-                conn = sqlite3.connect(self.db_path)
+                conn = connect_db(self.db_path)
                 cursor = conn.cursor()
                 
                 cursor.execute("""
@@ -104,6 +107,18 @@ class QRServer:
         def network_info_page():
             """Página con información de red y opciones de conexión"""
             return self.render_network_info()
+
+        @self.app.route('/sync_telemetry')
+        def sync_telemetry():
+            """Métricas de sincronización con Railway en JSON"""
+            try:
+                telemetry = get_sync_telemetry()
+                limit = request.args.get('limit', 50, type=int)
+                resumen = telemetry.get_summary()
+                resumen['runs'] = telemetry.get_runs(limit, request.args.get('operacion'))
+                return jsonify(resumen)
+            except Exception as e:
+                return jsonify({'error': str(e)}), 500
     
     def verificar_token(self, token):
         """Verificar si el token es válido y no ha expirado"""
@@ -126,7 +141,7 @@ class QRServer:
                         pass
             
             # Si no es un token de Railway, verificar en la base de datos local
-            conn = sqlite3.connect(self.db_path)
+            conn = connect_db(self.db_path)
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -150,7 +165,7 @@ class QRServer:
     def procesar_asistencia(self, token, documento, nombre, request, tipo_registro='entrada'):
         """Procesar el registro de asistencia con tipo específico"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = connect_db(self.db_path)
             cursor = conn.cursor()
             
             # Buscar empleado por documento
@@ -221,6 +236,15 @@ class QRServer:
             conn.commit()
             conn.close()
             
+            # Registrar el evento en el journal para la sincronización bidireccional
+            self.journal.registrar(
+                documento, hoy,
+                hora_entrada=ahora if tipo_registro == 'entrada' else None,
+                hora_salida=ahora if tipo_registro == 'salida' else None,
+                nombre=nombre_db, token_qr=token, ip_registro=request.remote_addr,
+                dispositivo=request.headers.get('User-Agent', '')
+            )
+            
             # Sincronizar con Railway después de guardar localmente
             try:
                 self._sincronizar_con_railway(empleado_id, hoy, ahora, tipo_registro, token, request)
@@ -239,7 +263,7 @@ class QRServer:
             import requests
             
             # Obtener datos del empleado
-            conn = sqlite3.connect(self.db_path)
+            conn = connect_db(self.db_path)
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -291,7 +315,7 @@ class QRServer:
             token_base = f"{fecha_actual.isoformat()}_{hashlib.md5(str(fecha_actual).encode()).hexdigest()[:8]}"
             
             # Verificar si ya existe un token para hoy
-            conn = sqlite3.connect(self.db_path)
+            conn = connect_db(self.db_path)
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -614,7 +638,7 @@ class QRServer:
         if not token:
             try:
                 fecha_actual = date.today()
-                conn = sqlite3.connect(self.db_path)
+                conn = connect_db(self.db_path)
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT token FROM tokens_qr 
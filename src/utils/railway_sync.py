@@ -1,117 +1,140 @@
 import requests
 import json
 import sqlite3
+import gzip
+import hashlib
+import shutil
+import tempfile
 from datetime import datetime, date
 import logging
+import os
 from pathlib import Path
+from .sync_journal import get_journal, aplicar_eventos, get_journal_path
+from .sync_telemetry import get_sync_telemetry
+from models.engine import connect_db
 
 logger = logging.getLogger(__name__)
 
 class RailwaySync:
-    def __init__(self, railway_url="https://juancalito-production.up.railway.app", local_db_path="empleados.db"):
+    def __init__(self, railway_url="https://juancalito-production.up.railway.app", local_db_path="empleados.db",
+                 telemetry=None, api_token=None):
         self.railway_url = railway_url
         self.local_db_path = local_db_path
+        self.telemetry = telemetry or get_sync_telemetry()
+        # Secreto que Railway exige para restaurar el snapshot
+        self.api_token = api_token or os.environ.get('RAILWAY_API_TOKEN')
         
     def sync_empleados_to_railway(self):
         """Sincronizar empleados de la app local a Railway"""
-        try:
-            # Obtener empleados de la base de datos local
-            conn = sqlite3.connect(self.local_db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT cedula, nombre_completo, telefono, email, direccion, 
-                       fecha_ingreso, area_trabajo, cargo, salario_base, estado
-                FROM empleados
-            """)
-            
-            empleados = cursor.fetchall()
-            conn.close()
-            
-            if not empleados:
-                logger.info("No hay empleados para sincronizar")
-                return True
-            
-            # Enviar cada empleado a Railway
-            success_count = 0
-            for empleado in empleados:
-                empleado_data = {
-                    'cedula': empleado[0],
-                    'nombre_completo': empleado[1],
-                    'telefono': empleado[2] or '',
-                    'email': empleado[3] or '',
-                    'direccion': empleado[4] or '',
-                    'fecha_ingreso': empleado[5] or '',
-                    'area_trabajo': empleado[6] or '',
-                    'cargo': empleado[7] or '',
-                    'salario_base': empleado[8] or 0,
-                    'estado': empleado[9] or 1
-                }
+        with self.telemetry.start('empleados_to_railway') as run:
+            try:
+                # Obtener empleados de la base de datos local
+                conn = connect_db(self.local_db_path)
+                cursor = conn.cursor()
                 
-                if self._send_empleado_to_railway(empleado_data):
-                    success_count += 1
-                else:
-                    logger.error(f"Error enviando empleado {empleado[0]} a Railway")
+                cursor.execute("""
+                    SELECT cedula, nombre_completo, telefono, email, direccion, 
+                           fecha_ingreso, area_trabajo, cargo, salario_base, estado
+                    FROM empleados
+                """)
                 
-            logger.info(f"Sincronizados {success_count}/{len(empleados)} empleados a Railway")
-            return success_count == len(empleados)
-            
-        except Exception as e:
-            logger.error(f"Error sincronizando empleados: {e}")
-            return False
+                empleados = cursor.fetchall()
+                conn.close()
+                
+                if not empleados:
+                    logger.info("No hay empleados para sincronizar")
+                    run.exito = True
+                    return True
+                
+                # Enviar cada empleado a Railway
+                success_count = 0
+                for empleado in empleados:
+                    empleado_data = {
+                        'cedula': empleado[0],
+                        'nombre_completo': empleado[1],
+                        'telefono': empleado[2] or '',
+                        'email': empleado[3] or '',
+                        'direccion': empleado[4] or '',
+                        'fecha_ingreso': empleado[5] or '',
+                        'area_trabajo': empleado[6] or '',
+                        'cargo': empleado[7] or '',
+                        'salario_base': empleado[8] or 0,
+                        'estado': empleado[9] or 1
+                    }
+                    
+                    if self._send_empleado_to_railway(empleado_data, run):
+                        success_count += 1
+                        run.add_rows()
+                    else:
+                        logger.error(f"Error enviando empleado {empleado[0]} a Railway")
+                    
+                logger.info(f"Sincronizados {success_count}/{len(empleados)} empleados a Railway")
+                run.exito = success_count == len(empleados)
+                return run.exito
+                
+            except Exception as e:
+                logger.error(f"Error sincronizando empleados: {e}")
+                return False
     
     def sync_asistencias_to_railway(self):
         """Sincronizar asistencias de la app local a Railway"""
-        try:
-            # Obtener asistencias de la base de datos local
-            conn = sqlite3.connect(self.local_db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT a.fecha, a.hora_entrada, a.hora_salida, a.tipo_registro,
-                       a.token_qr, a.ip_registro, a.dispositivo,
-                       e.cedula, e.nombre_completo
-                FROM asistencias a
-                JOIN empleados e ON a.empleado_id = e.id
-            """)
-            
-            asistencias = cursor.fetchall()
-            conn.close()
-            
-            # Enviar cada asistencia a Railway
-            for asistencia in asistencias:
-                self._send_asistencia_to_railway({
-                    'fecha': asistencia[0],
-                    'hora_entrada': asistencia[1],
-                    'hora_salida': asistencia[2],
-                    'tipo_registro': asistencia[3],
-                    'token_qr': asistencia[4],
-                    'ip_registro': asistencia[5],
-                    'dispositivo': asistencia[6],
-                    'cedula_empleado': asistencia[7],
-                    'nombre_empleado': asistencia[8]
-                })
+        with self.telemetry.start('asistencias_to_railway') as run:
+            try:
+                # Obtener asistencias de la base de datos local
+                conn = connect_db(self.local_db_path)
+                cursor = conn.cursor()
                 
-            logger.info(f"Sincronizadas {len(asistencias)} asistencias a Railway")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error sincronizando asistencias: {e}")
-            return False
+                cursor.execute("""
+                    SELECT a.fecha, a.hora_entrada, a.hora_salida, a.tipo_registro,
+                           a.token_qr, a.ip_registro, a.dispositivo,
+                           e.cedula, e.nombre_completo
+                    FROM asistencias a
+                    JOIN empleados e ON a.empleado_id = e.id
+                """)
+                
+                asistencias = cursor.fetchall()
+                conn.close()
+                
+                # Enviar cada asistencia a Railway
+                for asistencia in asistencias:
+                    if self._send_asistencia_to_railway({
+                        'fecha': asistencia[0],
+                        'hora_entrada': asistencia[1],
+                        'hora_salida': asistencia[2],
+                        'tipo_registro': asistencia[3],
+                        'token_qr': asistencia[4],
+                        'ip_registro': asistencia[5],
+                        'dispositivo': asistencia[6],
+                        'cedula_empleado': asistencia[7],
+                        'nombre_empleado': asistencia[8]
+                    }, run):
+                        run.add_rows()
+                    
+                logger.info(f"Sincronizadas {len(asistencias)} asistencias a Railway")
+                run.exito = True
+                return True
+                
+            except Exception as e:
+                logger.error(f"Error sincronizando asistencias: {e}")
+                return False
     
     def sync_from_railway(self):
         """Sincronizar datos desde Railway a la app local"""
+        run = self.telemetry.start('from_railway')
         try:
             # Obtener solo asistencias recientes (más eficiente)
             response = requests.get(f"{self.railway_url}/sync_recent_asistencias", timeout=10)
+            run.add_response(response)
             if response.status_code == 200:
                 data = response.json()
                 
                 # Sincronizar asistencias
                 if 'asistencias' in data:
                     self._sync_asistencias_from_railway(data['asistencias'])
+                    run.add_rows(len(data['asistencias']))
                     logger.info(f"Sincronizadas {len(data['asistencias'])} asistencias desde Railway")
                     
+                run.exito = True
                 return True
             else:
                 logger.error(f"Error obteniendo datos de Railway: {response.status_code}")
@@ -126,8 +149,217 @@ class RailwaySync:
         except Exception as e:
             logger.error(f"Error sincronizando desde Railway: {e}")
             return False
+        finally:
+            self.telemetry.record(run)
+    
+    def sync_journal(self, journal=None):
+        """
+        Sincronización bidireccional por journal: envía los eventos locales
+        pendientes y aplica los eventos remotos que aún no se conocen.
+        Si Railway perdió su journal (redeploy en /tmp) se reenvía todo.
+        """
+        with self.telemetry.start('journal') as run:
+            run.exito = self._sync_journal(journal, run)
+            if not run.exito:
+                self._lag_sin_confirmar(journal, run)
+            return run.exito
+
+    def _leer_cursores(self, journal):
+        """Cursores guardados junto al journal (ruta, dict)"""
+        cursor_path = journal.path + '.cursor.json'
+        cursores = {}
+        if os.path.exists(cursor_path):
+            with open(cursor_path, 'r', encoding='utf-8') as f:
+                cursores = json.load(f)
+        return cursor_path, cursores
+
+    def _lag_sin_confirmar(self, journal, run):
+        """
+        Tras un intercambio fallido el retraso sigue creciendo: se mide contra
+        lo último que Railway confirmó. Si no se puede medir queda como
+        desconocido (None) en lugar de repetir el último lag bueno.
+        """
+        run.lag_segundos = None
+        try:
+            journal = journal or get_journal(get_journal_path(self.local_db_path))
+            _, cursores = self._leer_cursores(journal)
+            run.set_lag(journal.ultimo_ts(), journal.ultimo_ts(cursores.get('enviados', 0)))
+        except Exception as e:
+            logger.error(f"No se pudo medir el retraso del journal: {e}")
+
+    def _sync_journal(self, journal, run):
+        """Un intercambio de journal; reintenta tras un reinicio remoto"""
+        try:
+            journal = journal or get_journal(get_journal_path(self.local_db_path))
+            cursor_path, cursores = self._leer_cursores(journal)
+
+            if len(journal) == 0:
+                conn = connect_db(self.local_db_path)
+                sembradas = journal.sembrar_desde_db(conn)
+                conn.close()
+                logger.info(f"Journal inicializado con {sembradas} asistencias existentes")
+
+            pendientes, cursor_local = journal.entradas_desde(cursores.get('enviados', 0))
+            response = requests.post(
+                f"{self.railway_url}/sync_journal",
+                json={
+                    'node': journal.node_id,
+                    'journal': cursores.get('remoto_id'),
+                    'since': cursores.get('cursor_remoto', 0),
+                    'entries': pendientes
+                },
+                timeout=30
+            )
+            run.add_response(response)
+            if response.status_code != 200:
+                logger.error(f"Error HTTP {response.status_code} en sync_journal")
+                return False
+
+            data = response.json()
+            if data.get('reset'):
+                # Journal remoto nuevo: reenviar todo el histórico local
+                logger.warning("Journal de Railway reiniciado, reenviando eventos locales")
+                cursores = {'remoto_id': data.get('journal')}
+                with open(cursor_path, 'w', encoding='utf-8') as f:
+                    json.dump(cursores, f)
+                run.retry()
+                return self._sync_journal(journal, run)
+
+            conn = connect_db(self.local_db_path)
+            aplicados = aplicar_eventos(journal, conn, data.get('entries', []))
+            conn.close()
+
+            cursores = {
+                'remoto_id': data.get('journal'),
+                'cursor_remoto': data.get('cursor', 0),
+                'enviados': cursor_local
+            }
+            with open(cursor_path, 'w', encoding='utf-8') as f:
+                json.dump(cursores, f)
+
+            run.add_rows(len(pendientes) + aplicados)
+            run.set_lag(journal.ultimo_ts(), journal.ultimo_ts(cursor_local))
+            logger.info(f"Journal sincronizado: {len(pendientes)} enviados, {aplicados} aplicados")
+            return True
+
+        except requests.exceptions.Timeout:
+            logger.error("Timeout sincronizando journal con Railway")
+            return False
+        except requests.exceptions.ConnectionError:
+            logger.error("Error de conexión con Railway")
+            return False
+        except Exception as e:
+            logger.error(f"Error sincronizando journal: {e}")
+            return False
+
+    def create_snapshot(self, snapshot_path):
+        """
+        Crear un snapshot gzip de empleados y asistencias.
+        La copia se toma con la API de backup online de SQLite (igual que
+        BackupManager.create_backup), así que es consistente aunque la app
+        siga escribiendo. Retorna el SHA-256 del archivo comprimido.
+        """
+        source_conn = sqlite3.connect(self.local_db_path)
+        memory_conn = sqlite3.connect(':memory:')
+        try:
+            source_conn.backup(memory_conn)
+            
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                raw_path = os.path.join(tmp_dir, 'snapshot.db')
+                
+                # Base nueva con solo las tablas que necesita el servidor de asistencia
+                # (y sus índices); los índices FTS, triggers y demás tablas no se copian
+                esquema = memory_conn.execute("""
+                    SELECT type, name, sql FROM sqlite_master
+                    WHERE tbl_name IN ('empleados', 'asistencias') AND type IN ('table', 'index')
+                    AND sql IS NOT NULL
+                    ORDER BY type = 'index'
+                """).fetchall()
+                snapshot_conn = sqlite3.connect(raw_path)
+                try:
+                    for _, _, sql in esquema:
+                        snapshot_conn.execute(sql)
+                    snapshot_conn.commit()
+                finally:
+                    snapshot_conn.close()
+                
+                memory_conn.execute("ATTACH DATABASE ? AS snapshot", (raw_path,))
+                for tipo, tabla, _ in esquema:
+                    if tipo == 'table':
+                        memory_conn.execute(f'INSERT INTO snapshot."{tabla}" SELECT * FROM main."{tabla}"')
+                memory_conn.commit()
+                memory_conn.execute("DETACH DATABASE snapshot")
+                
+                with open(raw_path, 'rb') as raw, gzip.open(snapshot_path, 'wb', compresslevel=6) as gz:
+                    shutil.copyfileobj(raw, gz, 1024 * 1024)
+        finally:
+            memory_conn.close()
+            source_conn.close()
+        
+        digest = hashlib.sha256()
+        with open(snapshot_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def bootstrap_railway(self):
+        """
+        Calentar una instancia nueva de Railway con una sola transferencia:
+        snapshot comprimido subido en streaming y restaurado atómicamente.
+        """
+        with self.telemetry.start('bootstrap') as run:
+            run.exito = self._bootstrap_railway(run)
+            return run.exito
+
+    def _bootstrap_railway(self, run):
+        """Crear, subir y verificar el snapshot"""
+        if not self.api_token:
+            logger.error("Falta RAILWAY_API_TOKEN: Railway no acepta snapshots sin el secreto compartido")
+            return False
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                snapshot_path = os.path.join(tmp_dir, 'snapshot.db.gz')
+                sha256 = self.create_snapshot(snapshot_path)
+                size = os.path.getsize(snapshot_path)
+                
+                # Pasar el archivo abierto hace que requests lo envíe en streaming
+                with open(snapshot_path, 'rb') as f:
+                    response = requests.post(
+                        f"{self.railway_url}/restore_snapshot",
+                        data=f,
+                        headers={
+                            'Content-Type': 'application/gzip',
+                            'Content-Length': str(size),
+                            'X-Snapshot-SHA256': sha256,
+                            'Authorization': f"Bearer {self.api_token}"
+                        },
+                        timeout=120
+                    )
+            run.add_response(response)
+            
+            if response.status_code != 200:
+                logger.error(f"Error HTTP {response.status_code} restaurando snapshot: {response.text}")
+                return False
+            
+            data = response.json()
+            run.add_rows(data.get('empleados', 0) + data.get('asistencias', 0))
+            logger.info(
+                f"Snapshot restaurado en Railway ({size / 1024:.1f} KB): "
+                f"{data.get('empleados', 0)} empleados, {data.get('asistencias', 0)} asistencias"
+            )
+            return True
+            
+        except requests.exceptions.Timeout:
+            logger.error("Timeout enviando snapshot a Railway")
+            return False
+        except requests.exceptions.ConnectionError:
+            logger.error("Error de conexión con Railway")
+            return False
+        except Exception as e:
+            logger.error(f"Error creando o enviando snapshot: {e}")
+            return False
     
-    def _send_empleado_to_railway(self, empleado_data):
+    def _send_empleado_to_railway(self, empleado_data, run=None):
         """Enviar un empleado específico a Railway"""
         try:
             response = requests.post(
@@ -136,6 +368,8 @@ class RailwaySync:
                 headers={'Content-Type': 'application/json'},
                 timeout=10
             )
+            if run:
+                run.add_response(response)
             
             if response.status_code != 200:
                 logger.error(f"Error HTTP {response.status_code}: {response.text}")
@@ -149,6 +383,9 @@ class RailwaySync:
                         headers={'Content-Type': 'application/json'},
                         timeout=10
                     )
+                    if run:
+                        run.retry()
+                        run.add_response(response)
                     if response.status_code == 200:
                         return True
                 return False
@@ -165,7 +402,7 @@ class RailwaySync:
             logger.error(f"Error enviando empleado a Railway: {e}")
             return False
     
-    def _send_asistencia_to_railway(self, asistencia_data):
+    def _send_asistencia_to_railway(self, asistencia_data, run=None):
         """Enviar una asistencia específica a Railway"""
         try:
             response = requests.post(
@@ -174,6 +411,8 @@ class RailwaySync:
                 headers={'Content-Type': 'application/json'},
                 timeout=10
             )
+            if run:
+                run.add_response(response)
             return response.status_code == 200
         except Exception as e:
             logger.error(f"Error enviando asistencia a Railway: {e}")
@@ -182,15 +421,23 @@ class RailwaySync:
     def _sync_empleados_from_railway(self, empleados_data):
         """Sincronizar empleados desde Railway a la base local"""
         try:
-            conn = sqlite3.connect(self.local_db_path)
+            conn = connect_db(self.local_db_path)
             cursor = conn.cursor()
             
             for empleado in empleados_data:
+                # Upsert por cédula: REPLACE borraba la fila (nuevo id, asistencias
+                # huérfanas) sin disparar el trigger de borrado del índice de búsqueda
                 cursor.execute("""
-                    INSERT OR REPLACE INTO empleados 
+                    INSERT INTO empleados 
                     (cedula, nombre_completo, telefono, email, direccion, 
                      fecha_ingreso, area_trabajo, cargo, salario_base, estado)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(cedula) DO UPDATE SET
+                        nombre_completo = excluded.nombre_completo, telefono = excluded.telefono,
+                        email = excluded.email, direccion = excluded.direccion,
+                        fecha_ingreso = excluded.fecha_ingreso, area_trabajo = excluded.area_trabajo,
+                        cargo = excluded.cargo, salario_base = excluded.salario_base,
+                        estado = excluded.estado
                 """, (
                     empleado['cedula'], empleado['nombre_completo'],
                     empleado.get('telefono'), empleado.get('email'),
@@ -208,7 +455,7 @@ class RailwaySync:
     def _sync_asistencias_from_railway(self, asistencias_data):
         """Sincronizar asistencias desde Railway a la base local"""
         try:
-            conn = sqlite3.connect(self.local_db_path)
+            conn = connect_db(self.local_db_path)
             cursor = conn.cursor()
             
             sync_count = 0
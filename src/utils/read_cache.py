@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Caché de Lecturas
+Caché en memoria, compartida por toda la aplicación, para datos de
+referencia que cambian poco (proveedores, categorías, tipos de contrato,
+configuraciones). Cada entrada vence por TTL y lleva etiquetas (nombres de
+tabla) que las escrituras invalidan. El tamaño total respeta
+performance.cache_size_mb y se desaloja por LRU.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Optional
+
+from .logger import get_logger
+from .settings_manager import get_setting
+
+TTL_DEFECTO = 300  # segundos
+
+
+def tamano_aproximado(valor, _vistos=None) -> int:
+    """Bytes aproximados de un valor y de lo que contiene (listas, tuplas, dicts)"""
+    if _vistos is None:
+        _vistos = set()
+    if id(valor) in _vistos:
+        return 0
+    _vistos.add(id(valor))
+    tamano = sys.getsizeof(valor)
+    if isinstance(valor, dict):
+        tamano += sum(tamano_aproximado(k, _vistos) + tamano_aproximado(v, _vistos) for k, v in valor.items())
+    elif isinstance(valor, (list, tuple, set, frozenset)):
+        tamano += sum(tamano_aproximado(v, _vistos) for v in valor)
+    return tamano
+
+
+class _Entrada:
+    __slots__ = ('valor', 'vence', 'etiquetas', 'tamano')
+
+    def __init__(self, valor, vence: float, etiquetas: frozenset, tamano: int):
+        self.valor = valor
+        self.vence = vence
+        self.etiquetas = etiquetas
+        self.tamano = tamano
+
+
+class ReadCache:
+    """Caché LRU con TTL, invalidación por etiquetas y límite en bytes"""
+
+    def __init__(self, max_bytes: int, ttl: float = TTL_DEFECTO, enabled: bool = True):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entradas: "OrderedDict[Hashable, _Entrada]" = OrderedDict()
+        self._bytes = 0
+        self._generacion = 0  # cambia con cada invalidación
+        self._lock = threading.Lock()
+        self._stats = {'aciertos': 0, 'fallos': 0, 'desalojos': 0, 'invalidaciones': 0, 'vencidas': 0}
+
+    def get_or_load(self, clave: Hashable, cargar: Callable[[], object], ttl: float = None,
+                    etiquetas: Iterable[str] = ()):
+        """Valor en caché o, si falta o venció, el resultado de cargar()"""
+        if not self.enabled:
+            return cargar()
+
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                if entrada.vence > ahora:
+                    self._entradas.move_to_end(clave)
+                    self._stats['aciertos'] += 1
+                    return entrada.valor
+                self._quitar(clave)
+                self._stats['vencidas'] += 1
+            self._stats['fallos'] += 1
+            generacion = self._generacion
+
+        valor = cargar()
+        self.set(clave, valor, ttl, etiquetas, generacion)
+        return valor
+
+    def set(self, clave: Hashable, valor, ttl: float = None, etiquetas: Iterable[str] = (),
+            _generacion: int = None):
+        if not self.enabled:
+            return
+        tamano = tamano_aproximado(valor)
+        if tamano > self.max_bytes:
+            return  # Nunca cabría: no vale la pena desalojar todo lo demás
+        entrada = _Entrada(valor, time.monotonic() + (self.ttl if ttl is None else ttl),
+                           frozenset(etiquetas), tamano)
+        with self._lock:
+            if _generacion is not None and _generacion != self._generacion:
+                return  # Hubo una escritura mientras se cargaba: el valor puede estar viejo
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = entrada
+            self._bytes += tamano
+            self._recortar()
+
+    def invalidate(self, *etiquetas: str) -> int:
+        """Descartar las entradas que tengan alguna de las etiquetas; retorna cuántas"""
+        objetivo = set(etiquetas)
+        with self._lock:
+            self._generacion += 1
+            claves = [c for c, e in self._entradas.items() if e.etiquetas & objetivo]
+            for clave in claves:
+                self._quitar(clave)
+            self._stats['invalidaciones'] += len(claves)
+        return len(claves)
+
+    def clear(self):
+        with self._lock:
+            self._generacion += 1
+            self._entradas.clear()
+            self._bytes = 0
+
+    def configure(self, max_mb: float = None, enabled: bool = None):
+        """Aplicar cambios de performance.cache_size_mb / cache_enabled sin reiniciar"""
+        with self._lock:
+            if max_mb is not None:
+                self.max_bytes = int(max_mb * 1024 * 1024)
+            if enabled is not None:
+                self.enabled = enabled
+            if not self.enabled:
+                self._entradas.clear()
+                self._bytes = 0
+            self._recortar()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            consultas = self._stats['aciertos'] + self._stats['fallos']
+            return dict(self._stats,
+                        entradas=len(self._entradas),
+                        bytes=self._bytes,
+                        max_bytes=self.max_bytes,
+                        habilitada=self.enabled,
+                        tasa_aciertos=self._stats['aciertos'] / consultas if consultas else 0.0)
+
+    def _quitar(self, clave):
+        entrada = self._entradas.pop(clave)
+        self._bytes -= entrada.tamano
+
+    def _recortar(self):
+        while self._bytes > self.max_bytes and self._entradas:
+            clave = next(iter(self._entradas))
+            self._quitar(clave)
+            self._stats['desalojos'] += 1
+
+
+_read_cache: Optional[ReadCache] = None
+_read_cache_lock = threading.Lock()
+
+
+def get_read_cache() -> ReadCache:
+    """Instancia global, configurada desde la sección 'performance'"""
+    global _read_cache
+    with _read_cache_lock:
+        if _read_cache is None:
+            _read_cache = ReadCache(
+                max_bytes=int(get_setting("performance.cache_size_mb", 100) * 1024 * 1024),
+                enabled=get_setting("performance.cache_enabled", True),
+            )
+            get_logger("read_cache").info(f"Caché de lecturas: {get_setting('performance.cache_size_mb', 100)} MB")
+        return _read_cache
+
+
+def cached(clave: Hashable, cargar: Callable[[], object], ttl: float = None, etiquetas: Iterable[str] = ()):
+    """Atajo a get_read_cache().get_or_load"""
+    return get_read_cache().get_or_load(clave, cargar, ttl, etiquetas)
+
+
+def invalidar(*etiquetas: str) -> int:
+    """Hook para las escrituras: invalidar todo lo leído de estas tablas"""
+    return get_read_cache().invalidate(*etiquetas)
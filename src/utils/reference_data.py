@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Datos de Referencia
+Lecturas pequeñas y repetidas (proveedores, categorías, listas de productos
+para combos, tipos de contrato) servidas desde la caché de lecturas. Las de
+inventario reciben el InventarioEngine de la línea y leen con su consultar().
+Cada lectura se etiqueta con su tabla; quien escribe en esa tabla llama a
+invalidar(tabla). Los valores son tuplas o copias para que nadie modifique
+lo que está en caché.
+"""
+
+import os
+from typing import Tuple
+
+from .read_cache import cached
+
+
+def _clave(nombre: str, inventario) -> tuple:
+    return (nombre, inventario.linea.tabla, os.path.abspath(inventario.db_path))
+
+
+def proveedores(inventario) -> Tuple[str, ...]:
+    """Proveedores distintos de los productos de un InventarioEngine, ordenados"""
+    tabla = inventario.linea.tabla
+
+    def cargar():
+        filas = inventario.consultar(f"SELECT DISTINCT proveedor FROM {tabla} "
+                                     f"WHERE proveedor IS NOT NULL AND proveedor != '' ORDER BY proveedor")
+        return tuple(fila[0] for fila in filas)
+    return cached(_clave('proveedores', inventario), cargar, etiquetas=(tabla,))
+
+
+def categorias(inventario) -> Tuple[str, ...]:
+    """Categorías (o clases químicas) distintas de los productos de un InventarioEngine"""
+    tabla, columna = inventario.linea.tabla, inventario.linea.columna_categoria
+
+    def cargar():
+        filas = inventario.consultar(f"SELECT DISTINCT {columna} FROM {tabla} "
+                                     f"WHERE {columna} IS NOT NULL AND {columna} != '' ORDER BY {columna}")
+        return tuple(fila[0] for fila in filas)
+    return cached(_clave('categorias', inventario), cargar, etiquetas=(tabla,))
+
+
+def productos_combo(inventario, solo_activos: bool = False) -> Tuple[Tuple[int, str, str], ...]:
+    """(id, codigo, nombre) de los productos, para llenar combos de movimientos"""
+    tabla = inventario.linea.tabla
+
+    def cargar():
+        filtro = " WHERE activo = 1" if solo_activos else ""
+        return tuple(tuple(fila) for fila in
+                     inventario.consultar(f"SELECT id, codigo, nombre FROM {tabla}{filtro} ORDER BY codigo"))
+    return cached(_clave('productos_combo', inventario) + (solo_activos,), cargar, etiquetas=(tabla,))
+
+
+def tipos_contrato(db) -> Tuple[Tuple[int, str], ...]:
+    """(id, nombre) de los tipos de contrato (sesión SQLAlchemy)"""
+    from models.database import TipoContrato
+
+    def cargar():
+        return tuple((tipo.id, tipo.nombre) for tipo in db.query(TipoContrato).order_by(TipoContrato.nombre))
+    return cached(('tipos_contrato',), cargar, etiquetas=('tipos_contrato',))
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índice de Búsqueda de Texto Completo
+Tablas virtuales FTS5 (contenido externo) sobre empleados y las tablas de
+productos, sincronizadas por triggers. Cada tabla tiene dos índices: uno
+de palabras con tokenización sin tildes (José = jose, Muñoz = munoz) que
+busca por prefijo y ordena por relevancia (bm25), y uno de trigramas que
+encuentra subcadenas de tres o más caracteres ('001' en ALM001, 'ltro' en
+Filtro). Un término coincide si aparece en cualquiera de los dos; ninguna
+búsqueda recorre la tabla. Los empleados se buscan con buscar(); los
+productos, con InventarioEngine.productos(texto), que arma su consulta con
+filtro_busqueda() sobre su propia conexión y bajo su bloqueo.
+"""
+
+import re
+import sqlite3
+import threading
+from collections import namedtuple
+from typing import List, Optional, Tuple
+
+# Tabla → columnas indexadas (las mismas que antes se filtraban con LIKE)
+TABLAS_FTS = {
+    'empleados': ('nombre_completo', 'cedula', 'cargo'),
+    'productos_quimicos': ('codigo', 'nombre', 'clase'),
+    'productos_almacen': ('codigo', 'nombre'),
+    'productos_poscosecha': ('codigo', 'nombre', 'categoria'),
+}
+
+# Sufijo de cada índice → tokenizer. El de trigramas no quita tildes (requiere
+# SQLite 3.45), pero sirve para códigos y fragmentos; las tildes las cubre el otro
+TOKENIZER = "unicode61 remove_diacritics 2"
+INDICES = {'fts': TOKENIZER, 'tri': 'trigram'}
+
+# Largo mínimo de un término para buscarlo en el índice de trigramas
+MINIMO_TRIGRAMA = 3
+
+# Fragmentos SQL para incrustar en la consulta de una vista:
+#   SELECT ... FROM tabla{join} WHERE ...{where} ORDER BY {orden}
+FiltroBusqueda = namedtuple('FiltroBusqueda', 'join join_params where where_params orden')
+
+SIN_FILTRO = FiltroBusqueda('', [], '', [], None)
+
+
+def terminos_busqueda(texto: str) -> List[str]:
+    return re.findall(r'\w+', texto or '')
+
+
+def expresion_fts(texto: str) -> Optional[str]:
+    """Convertir lo escrito por el usuario en una consulta FTS5 de prefijos: 'jos per' → "jos"* AND "per"*"""
+    terminos = terminos_busqueda(texto)
+    if not terminos:
+        return None
+    return ' AND '.join(f'"{t}"*' for t in terminos)
+
+
+class SearchIndex:
+    """Crea y mantiene los índices FTS5 y construye las consultas de búsqueda"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._listos = {}
+        self._tokenizers = {}
+
+    def _disponible(self, conn, tokenizer: str) -> bool:
+        """FTS5 con ese tokenizer compilado en este SQLite (trigram desde 3.34)"""
+        if tokenizer not in self._tokenizers:
+            try:
+                conn.execute(f"CREATE VIRTUAL TABLE temp._prueba_fts5 USING fts5(x, tokenize='{tokenizer}')")
+                conn.execute("DROP TABLE temp._prueba_fts5")
+                self._tokenizers[tokenizer] = True
+            except sqlite3.OperationalError:
+                self._tokenizers[tokenizer] = False
+        return self._tokenizers[tokenizer]
+
+    def _archivo(self, conn) -> str:
+        return conn.execute("PRAGMA database_list").fetchone()[2]
+
+    def asegurar(self, conn, tabla: str) -> Tuple[str, ...]:
+        """
+        Crear (o reconstruir) los índices de una tabla si faltan; retorna los
+        sufijos disponibles ('fts', 'tri'), vacío si no hay FTS5
+        """
+        clave = (self._archivo(conn), tabla)
+        if clave in self._listos:
+            return self._listos[clave]
+        with self.lock:
+            if clave in self._listos:
+                return self._listos[clave]
+
+            existentes = {row[1] for row in conn.execute(f"PRAGMA table_info({tabla})")}
+            if 'id' not in existentes or not self._disponible(conn, TOKENIZER):
+                return ()
+            columnas = [c for c in TABLAS_FTS[tabla] if c in existentes]
+            triggers = {row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (tabla,)
+            )}
+            disponibles = tuple(sufijo for sufijo, tokenizer in INDICES.items()
+                                if self._disponible(conn, tokenizer))
+            for sufijo in disponibles:
+                self._crear(conn, tabla, f"{tabla}_{sufijo}", INDICES[sufijo], columnas, triggers)
+            self._listos[clave] = disponibles
+            return disponibles
+
+    def _crear(self, conn, tabla: str, fts: str, tokenizer: str, columnas: List[str], triggers: set):
+        actuales = [row[1] for row in conn.execute(f"PRAGMA table_info({fts})")]
+        if actuales == columnas and {f"{fts}_ai", f"{fts}_ad", f"{fts}_au"} <= triggers:
+            return
+
+        # Índice ausente, con otras columnas o sin triggers (tabla recreada): reconstruir
+        lista = ', '.join(columnas)
+        nuevos = ', '.join(f"new.{c}" for c in columnas)
+        viejos = ', '.join(f"old.{c}" for c in columnas)
+        conn.executescript(f"""
+            DROP TRIGGER IF EXISTS {fts}_ai;
+            DROP TRIGGER IF EXISTS {fts}_ad;
+            DROP TRIGGER IF EXISTS {fts}_au;
+            DROP TABLE IF EXISTS {fts};
+            CREATE VIRTUAL TABLE {fts} USING fts5(
+                {lista}, content='{tabla}', content_rowid='id', tokenize='{tokenizer}'
+            );
+            CREATE TRIGGER {fts}_ai AFTER INSERT ON {tabla} BEGIN
+                INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {nuevos});
+            END;
+            CREATE TRIGGER {fts}_ad AFTER DELETE ON {tabla} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {viejos});
+            END;
+            CREATE TRIGGER {fts}_au AFTER UPDATE ON {tabla} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {viejos});
+                INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {nuevos});
+            END;
+            INSERT INTO {fts}({fts}) VALUES ('rebuild');
+        """)
+        conn.commit()
+
+    def filtro_busqueda(self, conn, tabla: str, texto: str) -> FiltroBusqueda:
+        """
+        Fragmentos para filtrar y ordenar por relevancia la consulta de una vista.
+        Si FTS5 no está disponible se recurre a LIKE sobre las mismas columnas.
+        """
+        expresion = expresion_fts(texto)
+        if not expresion:
+            return SIN_FILTRO
+
+        try:
+            indices = self.asegurar(conn, tabla)
+        except sqlite3.Error as e:
+            print(f"Error preparando índice de búsqueda para {tabla}: {e}")
+            indices = ()
+
+        if not indices:
+            columnas = [f"{tabla}.{c}" for c in TABLAS_FTS[tabla]]
+            termino = f"%{texto.strip().lower()}%"
+            where = " AND (" + " OR ".join(f"LOWER({c}) LIKE ?" for c in columnas) + ")"
+            return FiltroBusqueda('', [], where, [termino] * len(columnas), None)
+
+        # Cada término: prefijo de palabra (sin tildes) o, desde tres caracteres, subcadena
+        # en el índice de trigramas. Ambos son búsquedas por rowid, nunca un recorrido
+        where, where_params = '', []
+        for termino in terminos_busqueda(texto):
+            consultas = [f"SELECT rowid FROM {tabla}_fts WHERE {tabla}_fts MATCH ?"]
+            where_params.append(f'"{termino}"*')
+            if 'tri' in indices and len(termino) >= MINIMO_TRIGRAMA:
+                consultas.append(f"SELECT rowid FROM {tabla}_tri WHERE {tabla}_tri MATCH ?")
+                where_params.append(f'"{termino}"')
+            where += f" AND {tabla}.id IN ({' UNION '.join(consultas)})"
+
+        # Subconsulta con alias propios para no chocar con los nombres de columna de la vista. El rank
+        # bm25 es negativo: las filas que sólo coinciden por trigramas (sin rank) quedan después
+        join = (f" LEFT JOIN (SELECT rowid AS fts_id, rank AS fts_rank FROM {tabla}_fts "
+                f"WHERE {tabla}_fts MATCH ?) AS fts ON fts.fts_id = {tabla}.id")
+        return FiltroBusqueda(join, [expresion], where, where_params, 'COALESCE(fts.fts_rank, 0)')
+
+    def buscar(self, conn, tabla: str, texto: str, limite: int = 50) -> List[Tuple[int, float]]:
+        """(id, relevancia) de las filas que coinciden, las más relevantes primero (limite=-1: todas)"""
+        filtro = self.filtro_busqueda(conn, tabla, texto)
+        if filtro is SIN_FILTRO:
+            return []
+        orden = filtro.orden or f"{tabla}.id"
+        relevancia = filtro.orden or "0"
+        sql = (f"SELECT {tabla}.id, {relevancia} FROM {tabla}{filtro.join} "
+               f"WHERE 1=1{filtro.where} ORDER BY {orden}, {tabla}.id LIMIT ?")
+        return [tuple(row) for row in conn.execute(sql, filtro.join_params + filtro.where_params + [limite])]
+
+
+# Instancia global
+search_index = SearchIndex()
+
+
+def filtro_busqueda(conn, tabla: str, texto: str) -> FiltroBusqueda:
+    return search_index.filtro_busqueda(conn, tabla, texto)
+
+
+def buscar(conn, tabla: str, texto: str, limite: int = 50) -> List[Tuple[int, float]]:
+    return search_index.buscar(conn, tabla, texto, limite)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Perfil de Arranque
+Mide el arranque de la aplicación de escritorio: fases con reloj de pared
+hasta que la primera ventana se pinta y desglose de importaciones a partir
+de la salida de `python -X importtime`. Se activa con `python main.py
+--profile-startup`; el tiempo hasta la primera ventana se registra siempre.
+"""
+
+import os
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+# Módulos que deben importarse al primer uso y no durante el arranque
+MODULOS_PESADOS = ('pandas', 'numpy', 'openpyxl', 'PIL', 'qrcode', 'reportlab', 'tkcalendar', 'requests')
+
+
+def parse_importtime(texto: str) -> List[Dict]:
+    """
+    Convertir la salida de `-X importtime` en una lista de
+    {'modulo', 'propio_ms', 'acumulado_ms', 'nivel'}
+    """
+    modulos = []
+    for linea in texto.splitlines():
+        if not linea.startswith('import time:'):
+            continue
+        partes = linea[len('import time:'):].split('|')
+        if len(partes) != 3:
+            continue
+        try:
+            propio, acumulado = int(partes[0]), int(partes[1])
+        except ValueError:
+            continue  # encabezado "self [us] | cumulative | imported package"
+        nombre = partes[2].rstrip()
+        sangria = len(nombre) - len(nombre.lstrip())
+        modulos.append({
+            'modulo': nombre.strip(),
+            'propio_ms': propio / 1000,
+            'acumulado_ms': acumulado / 1000,
+            'nivel': max(0, (sangria - 1) // 2),
+        })
+    return modulos
+
+
+def perfil_importaciones(modulo: str = 'views.main_window', limite: int = 15) -> Dict:
+    """Importar un módulo en un intérprete limpio con -X importtime y resumir el resultado"""
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    resultado = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+                               cwd=src_dir, capture_output=True, text=True)
+    modulos = parse_importtime(resultado.stderr)
+    raiz = next((m for m in reversed(modulos) if m['modulo'] == modulo), None)
+    return {
+        'modulo': modulo,
+        'total_ms': raiz['acumulado_ms'] if raiz else sum(m['propio_ms'] for m in modulos),
+        'cantidad': len(modulos),
+        'mas_lentos': sorted(modulos, key=lambda m: m['propio_ms'], reverse=True)[:limite],
+        'pesados': sorted({m['modulo'].split('.')[0] for m in modulos} & set(MODULOS_PESADOS)),
+    }
+
+
+class StartupProfiler:
+    """Fases de arranque medidas desde el inicio del proceso"""
+
+    def __init__(self, inicio: Optional[float] = None):
+        self.inicio = inicio if inicio is not None else time.perf_counter()
+        self.fases: List[tuple] = []
+        self.primera_ventana: Optional[float] = None
+
+    def marcar(self, fase: str) -> float:
+        """Registrar el fin de una fase y devolver su duración en segundos"""
+        ahora = time.perf_counter() - self.inicio
+        anterior = self.fases[-1][1] if self.fases else 0.0
+        self.fases.append((fase, ahora))
+        return ahora - anterior
+
+    def al_pintar(self, root, callback: Callable[[float], None]):
+        """
+        Llamar callback(segundos) cuando la ventana ya se pintó: after_idle
+        se atiende después de los redibujados que Tk dejó pendientes
+        """
+        def pintada():
+            self.marcar('primera_ventana')
+            self.primera_ventana = self.fases[-1][1]
+            callback(self.primera_ventana)
+        root.after_idle(pintada)
+
+    @staticmethod
+    def modulos_pesados_cargados() -> List[str]:
+        return [m for m in MODULOS_PESADOS if m in sys.modules]
+
+    def reporte(self, importaciones: Optional[Dict] = None) -> str:
+        lineas = ["=== Perfil de arranque ==="]
+        anterior = 0.0
+        for fase, t in self.fases:
+            lineas.append(f"  {fase:<22}{(t - anterior) * 1000:>9.1f} ms   (t={t * 1000:.1f} ms)")
+            anterior = t
+        if self.primera_ventana is not None:
+            lineas.append(f"  Tiempo hasta la primera ventana: {self.primera_ventana * 1000:.1f} ms")
+        cargados = self.modulos_pesados_cargados()
+        lineas.append(f"  Módulos pesados ya cargados: {', '.join(cargados) if cargados else 'ninguno'}")
+        if importaciones:
+            lineas.append(f"=== Importaciones de {importaciones['modulo']}: "
+                          f"{importaciones['total_ms']:.1f} ms, {importaciones['cantidad']} módulos ===")
+            for m in importaciones['mas_lentos']:
+                lineas.append(f"  {m['propio_ms']:>8.1f} ms  {m['acumulado_ms']:>8.1f} ms  {m['modulo']}")
+        return "\n".join(lineas)
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Journal de Sincronización de Asistencias
+Registro NDJSON append-only con resolución determinista de conflictos
+entre la base local (QRServer) y la de Railway.
+
+Cada línea del journal es un evento de asistencia. El estado de un nodo se
+reconstruye reproduciendo el journal y fusionando los eventos por
+(cedula, fecha) con reglas conmutativas:
+    - hora_entrada: la más temprana registrada en cualquier nodo
+    - hora_salida: la más tardía registrada en cualquier nodo
+    - resto de campos: último escritor gana por (ts, nodo), campo a campo
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_VERSION = 1
+
+# Campos que se resuelven por último escritor gana
+CAMPOS_LWW = ('nombre', 'token_qr', 'ip_registro', 'dispositivo')
+
+
+def get_journal_path(db_path: str) -> str:
+    """Ruta del journal asociado a una base de datos (junto al archivo .db)"""
+    return os.path.splitext(db_path)[0] + '_journal.ndjson'
+
+
+def normalizar_hora(valor) -> Optional[str]:
+    """Normalizar un datetime o texto ISO a 'YYYY-MM-DD HH:MM:SS.ffffff'"""
+    if valor is None or valor == '':
+        return None
+    if isinstance(valor, datetime):
+        dt = valor
+    else:
+        try:
+            dt = datetime.fromisoformat(str(valor))
+        except ValueError:
+            return str(valor)
+    return dt.isoformat(sep=' ', timespec='microseconds')
+
+
+def _min_no_nulo(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)
+
+
+def _max_no_nulo(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return max(a, b)
+
+
+def _como_registro(evento: dict) -> dict:
+    """Convertir un evento del journal en un registro con versión por campo"""
+    if 'versiones' in evento:
+        return evento
+    version = [evento.get('ts', 0), evento.get('node', '')]
+    registro = {
+        'cedula': evento['cedula'],
+        'fecha': evento['fecha'],
+        'hora_entrada': evento.get('hora_entrada'),
+        'hora_salida': evento.get('hora_salida'),
+        'versiones': {},
+    }
+    for campo in CAMPOS_LWW:
+        registro[campo] = evento.get(campo)
+        if evento.get(campo) is not None:
+            registro['versiones'][campo] = version
+    registro['tipo_registro'] = 'salida' if registro['hora_salida'] else 'entrada'
+    return registro
+
+
+def fusionar_registros(a: Optional[dict], b: dict) -> dict:
+    """
+    Fusionar dos registros (o eventos) de la misma (cedula, fecha).
+    La operación es conmutativa, asociativa e idempotente, así que el
+    resultado no depende del orden en que lleguen los eventos. Cada campo
+    LWW es un registro independiente con su propia versión (ts, nodo).
+    """
+    b = _como_registro(b)
+    if a is None:
+        return b
+    a = _como_registro(a)
+
+    resultado = {
+        'cedula': a['cedula'],
+        'fecha': a['fecha'],
+        'hora_entrada': _min_no_nulo(a.get('hora_entrada'), b.get('hora_entrada')),
+        'hora_salida': _max_no_nulo(a.get('hora_salida'), b.get('hora_salida')),
+        'versiones': {},
+    }
+    for campo in CAMPOS_LWW:
+        version_a = a['versiones'].get(campo)
+        version_b = b['versiones'].get(campo)
+        if version_b is None or (version_a is not None and tuple(version_a) >= tuple(version_b)):
+            resultado[campo], version = a.get(campo), version_a
+        else:
+            resultado[campo], version = b.get(campo), version_b
+        if version is not None:
+            resultado['versiones'][campo] = version
+
+    resultado['tipo_registro'] = 'salida' if resultado['hora_salida'] else 'entrada'
+    return resultado
+
+
+def reproducir(entradas: Iterable[dict]) -> Dict[Tuple[str, str], dict]:
+    """Reconstruir el estado fusionado a partir de una secuencia de eventos"""
+    estado = {}
+    for entrada in entradas:
+        clave = (entrada['cedula'], entrada['fecha'])
+        estado[clave] = fusionar_registros(estado.get(clave), entrada)
+    return estado
+
+
+class SyncJournal:
+    """Journal NDJSON append-only de eventos de asistencia de un nodo"""
+
+    def __init__(self, journal_path: str, node_id: str = None):
+        self.path = journal_path
+        self.node_id = node_id or f"local-{socket.gethostname()}"
+        self.journal_id = None
+        self.lock = threading.Lock()
+        self._entradas: List[dict] = []
+        self._estado: Dict[Tuple[str, str], dict] = {}
+        self._ids = set()
+        self._seq = 0
+        self._cargar()
+
+    def _cargar(self):
+        """Cargar el journal desde disco, ignorando líneas truncadas"""
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for linea in f:
+                    linea = linea.strip()
+                    if not linea:
+                        continue
+                    try:
+                        entrada = json.loads(linea)
+                    except json.JSONDecodeError:
+                        # Última línea incompleta tras un cierre abrupto
+                        logger.warning("Línea de journal corrupta ignorada")
+                        continue
+                    if 'journal' in entrada:
+                        self.journal_id = entrada['journal']
+                        continue
+                    self._indexar(entrada)
+            # Cerrar una línea truncada para que el siguiente append no se mezcle con ella
+            with open(self.path, 'rb+') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        f.write(b'\n')
+
+        if not self.journal_id:
+            self.journal_id = uuid.uuid4().hex
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.write(self._serializar({'journal': self.journal_id, 'version': JOURNAL_VERSION}))
+                for entrada in self._entradas:
+                    f.write(self._serializar(entrada))
+
+    def _indexar(self, entrada: dict) -> bool:
+        if entrada['id'] in self._ids:
+            return False
+        self._ids.add(entrada['id'])
+        self._entradas.append(entrada)
+        # La fusión es asociativa: el estado se mantiene incrementalmente
+        clave = (entrada['cedula'], entrada['fecha'])
+        self._estado[clave] = fusionar_registros(self._estado.get(clave), entrada)
+        if entrada.get('node') == self.node_id:
+            self._seq = max(self._seq, entrada.get('seq', 0))
+        return True
+
+    @staticmethod
+    def _serializar(entrada: dict) -> str:
+        compacta = {k: v for k, v in entrada.items() if v is not None}
+        return json.dumps(compacta, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+    def _escribir(self, entradas: List[dict]):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for entrada in entradas:
+                f.write(self._serializar(entrada))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def registrar(self, cedula: str, fecha, hora_entrada=None, hora_salida=None,
+                  nombre: str = None, token_qr: str = None, ip_registro: str = None,
+                  dispositivo: str = None) -> dict:
+        """Registrar un evento local de asistencia"""
+        with self.lock:
+            self._seq += 1
+            entrada = {
+                'id': f"{self.node_id}:{self._seq}",
+                'node': self.node_id,
+                'seq': self._seq,
+                'ts': time.time_ns(),
+                'cedula': str(cedula),
+                'fecha': fecha.isoformat() if hasattr(fecha, 'isoformat') else str(fecha),
+                'hora_entrada': normalizar_hora(hora_entrada),
+                'hora_salida': normalizar_hora(hora_salida),
+                'nombre': nombre,
+                'token_qr': token_qr,
+                'ip_registro': ip_registro,
+                'dispositivo': dispositivo,
+            }
+            self._indexar(entrada)
+            self._escribir([entrada])
+            return entrada
+
+    def agregar(self, entradas: Iterable[dict]) -> List[dict]:
+        """Incorporar eventos de otro nodo. Retorna solo los que eran nuevos"""
+        with self.lock:
+            nuevas = []
+            for entrada in entradas:
+                entrada = dict(entrada)
+                entrada['hora_entrada'] = normalizar_hora(entrada.get('hora_entrada'))
+                entrada['hora_salida'] = normalizar_hora(entrada.get('hora_salida'))
+                if self._indexar(entrada):
+                    nuevas.append(entrada)
+            if nuevas:
+                self._escribir(nuevas)
+            return nuevas
+
+    def entradas_desde(self, cursor: int = 0, excluir_nodo: str = None) -> Tuple[List[dict], int]:
+        """Eventos a partir de una posición del journal y la nueva posición"""
+        with self.lock:
+            entradas = self._entradas[cursor:]
+            nuevo_cursor = len(self._entradas)
+        if excluir_nodo:
+            entradas = [e for e in entradas if e.get('node') != excluir_nodo]
+        return entradas, nuevo_cursor
+
+    def estado(self) -> Dict[Tuple[str, str], dict]:
+        """Estado fusionado actual del nodo"""
+        with self.lock:
+            return dict(self._estado)
+
+    def registro(self, cedula: str, fecha) -> Optional[dict]:
+        """Registro fusionado de un empleado en una fecha"""
+        fecha = fecha.isoformat() if hasattr(fecha, 'isoformat') else str(fecha)
+        with self.lock:
+            return self._estado.get((str(cedula), fecha))
+
+    def ultimo_ts(self, hasta: int = None) -> Optional[float]:
+        """Marca de tiempo (s) del evento propio más reciente, opcionalmente antes de una posición"""
+        with self.lock:
+            marcas = [e['ts'] for e in self._entradas[:hasta] if e.get('node') == self.node_id]
+        return max(marcas) / 1e9 if marcas else None
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def sembrar_desde_db(self, conn) -> int:
+        """
+        Registrar en un journal vacío las asistencias ya existentes en la base,
+        para que la primera sincronización incluya el histórico.
+        """
+        if self._entradas:
+            return 0
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT e.cedula, e.nombre_completo, a.fecha, a.hora_entrada, a.hora_salida,
+                   a.token_qr, a.ip_registro, a.dispositivo
+            FROM asistencias a
+            JOIN empleados e ON a.empleado_id = e.id
+        """)
+        filas = cursor.fetchall()
+        for cedula, nombre, fecha, entrada, salida, token, ip, dispositivo in filas:
+            self.registrar(cedula, fecha, entrada, salida, nombre, token, ip, dispositivo)
+        return len(filas)
+
+
+_journals: Dict[str, SyncJournal] = {}
+_journals_lock = threading.Lock()
+
+
+def get_journal(journal_path: str, node_id: str = None) -> SyncJournal:
+    """
+    Instancia compartida del journal para una ruta. Dos instancias sobre el
+    mismo archivo tendrían contadores de secuencia independientes.
+    """
+    clave = os.path.abspath(journal_path)
+    with _journals_lock:
+        if clave not in _journals:
+            _journals[clave] = SyncJournal(journal_path, node_id)
+        return _journals[clave]
+
+
+def aplicar_en_db(conn, registros: Iterable[dict], crear_empleados: bool = False) -> int:
+    """
+    Aplicar registros fusionados a la tabla asistencias usando (empleado, fecha)
+    como clave de conflicto. El valor ya guardado se fusiona con el entrante en
+    lugar de sobrescribirse, por lo que aplicar dos veces no cambia nada.
+    """
+    cursor = conn.cursor()
+    aplicados = 0
+
+    for registro in registros:
+        cursor.execute("SELECT id FROM empleados WHERE cedula = ?", (registro['cedula'],))
+        empleado = cursor.fetchone()
+        if empleado:
+            empleado_id = empleado[0]
+        elif crear_empleados:
+            cursor.execute("""
+                INSERT INTO empleados (cedula, nombre_completo, estado)
+                VALUES (?, ?, 1)
+            """, (registro['cedula'], registro.get('nombre') or registro['cedula']))
+            empleado_id = cursor.lastrowid
+        else:
+            logger.warning(f"Empleado no encontrado: {registro['cedula']}")
+            continue
+
+        cursor.execute("""
+            SELECT id, hora_entrada, hora_salida FROM asistencias
+            WHERE empleado_id = ? AND fecha = ?
+            ORDER BY id LIMIT 1
+        """, (empleado_id, registro['fecha']))
+        existente = cursor.fetchone()
+
+        if existente:
+            hora_entrada = _min_no_nulo(normalizar_hora(existente[1]), registro.get('hora_entrada'))
+            hora_salida = _max_no_nulo(normalizar_hora(existente[2]), registro.get('hora_salida'))
+            cursor.execute("""
+                UPDATE asistencias
+                SET hora_entrada = ?, hora_salida = ?, tipo_registro = ?,
+                    token_qr = COALESCE(?, token_qr),
+                    ip_registro = COALESCE(?, ip_registro),
+                    dispositivo = COALESCE(?, dispositivo)
+                WHERE id = ?
+            """, (
+                hora_entrada, hora_salida, 'salida' if hora_salida else 'entrada',
+                registro.get('token_qr'), registro.get('ip_registro'),
+                registro.get('dispositivo'), existente[0]
+            ))
+        else:
+            cursor.execute("""
+                INSERT INTO asistencias
+                (empleado_id, fecha, hora_entrada, hora_salida,
+                 tipo_registro, token_qr, ip_registro, dispositivo)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                empleado_id, registro['fecha'], registro.get('hora_entrada'),
+                registro.get('hora_salida'), registro.get('tipo_registro', 'entrada'),
+                registro.get('token_qr'), registro.get('ip_registro'),
+                registro.get('dispositivo')
+            ))
+        aplicados += 1
+
+    conn.commit()
+    return aplicados
+
+
+def aplicar_eventos(journal: SyncJournal, conn, entradas: Iterable[dict],
+                    crear_empleados: bool = False) -> int:
+    """Incorporar eventos remotos al journal y reflejar en la base las claves afectadas"""
+    nuevas = journal.agregar(entradas)
+    if not nuevas:
+        return 0
+    claves = {(e['cedula'], e['fecha']) for e in nuevas}
+    return aplicar_en_db(conn, [journal.registro(*c) for c in claves], crear_empleados)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telemetría de Sincronización
+Registra duración, filas por segundo, bytes transferidos, reintentos y
+retraso de replicación de cada sincronización con Railway en una pequeña
+serie temporal SQLite.
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from models.engine import connect_db
+
+# Filas conservadas en la serie temporal
+MAX_RUNS = 5000
+
+
+class SyncRun:
+    """Medición en curso de una ejecución de sincronización"""
+
+    def __init__(self, telemetry: 'SyncTelemetry', operacion: str):
+        self.telemetry = telemetry
+        self.operacion = operacion
+        self.inicio = datetime.now()
+        self._t0 = time.perf_counter()
+        self.filas = 0
+        self.bytes_enviados = 0
+        self.bytes_recibidos = 0
+        self.reintentos = 0
+        self.lag_segundos = None
+        self.exito = False
+
+    def add_rows(self, n: int = 1):
+        self.filas += n
+
+    def add_response(self, response):
+        """Contabilizar bytes de una respuesta de requests (petición + cuerpo)"""
+        body = response.request.body if response.request is not None else None
+        if isinstance(body, (bytes, str)):
+            self.bytes_enviados += len(body)
+        elif response.request is not None and response.request.headers.get('Content-Length'):
+            self.bytes_enviados += int(response.request.headers['Content-Length'])
+        self.bytes_recibidos += len(response.content or b'')
+
+    def retry(self):
+        self.reintentos += 1
+
+    def set_lag(self, ultimo_local: Optional[float], ultimo_confirmado: Optional[float]):
+        """
+        Retraso de replicación en segundos: cambio local más reciente frente
+        al cambio local más reciente que el remoto ya confirmó.
+        """
+        if ultimo_local is None:
+            self.lag_segundos = 0.0
+        elif ultimo_confirmado is None:
+            self.lag_segundos = max(0.0, time.time() - ultimo_local)
+        else:
+            self.lag_segundos = max(0.0, ultimo_local - ultimo_confirmado)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.exito = False
+        self.telemetry.record(self)
+        return False
+
+
+class SyncTelemetry:
+    """Serie temporal SQLite de métricas de sincronización"""
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or self._get_default_db_path()
+        self.lock = threading.Lock()
+        self._crear_tabla()
+
+    def _get_default_db_path(self) -> str:
+        base_dir = Path(__file__).resolve().parent.parent.parent
+        db_dir = base_dir / "database"
+        db_dir.mkdir(exist_ok=True)
+        return str(db_dir / "sync_telemetry.db")
+
+    def _connect(self):
+        return connect_db(self.db_path, row_factory=sqlite3.Row)
+
+    def _crear_tabla(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sync_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                inicio TIMESTAMP NOT NULL,
+                operacion TEXT NOT NULL,
+                duracion_s REAL,
+                filas INTEGER,
+                filas_por_s REAL,
+                bytes_enviados INTEGER,
+                bytes_recibidos INTEGER,
+                reintentos INTEGER,
+                lag_s REAL,
+                exito INTEGER
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sync_runs_op_inicio ON sync_runs (operacion, inicio)")
+        conn.commit()
+        conn.close()
+
+    def start(self, operacion: str) -> SyncRun:
+        """Iniciar la medición de una sincronización (usar como context manager)"""
+        return SyncRun(self, operacion)
+
+    def record(self, run: SyncRun):
+        """Persistir una ejecución terminada"""
+        duracion = time.perf_counter() - run._t0
+        filas_por_s = run.filas / duracion if duracion > 0 else 0.0
+        with self.lock:
+            conn = self._connect()
+            cursor = conn.execute("""
+                INSERT INTO sync_runs
+                (inicio, operacion, duracion_s, filas, filas_por_s, bytes_enviados,
+                 bytes_recibidos, reintentos, lag_s, exito)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                run.inicio.isoformat(), run.operacion, round(duracion, 4), run.filas,
+                round(filas_por_s, 2), run.bytes_enviados, run.bytes_recibidos,
+                run.reintentos, run.lag_segundos, int(run.exito)
+            ))
+            # Recortar la serie de vez en cuando
+            if cursor.lastrowid % 100 == 0:
+                conn.execute("DELETE FROM sync_runs WHERE id <= ?", (cursor.lastrowid - MAX_RUNS,))
+            conn.commit()
+            conn.close()
+
+    def get_runs(self, limit: int = 50, operacion: str = None) -> List[Dict[str, Any]]:
+        """Últimas ejecuciones, más recientes primero"""
+        query = "SELECT * FROM sync_runs"
+        params = []
+        if operacion:
+            query += " WHERE operacion = ?"
+            params.append(operacion)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        conn = self._connect()
+        rows = [dict(row) for row in conn.execute(query, params)]
+        conn.close()
+        return rows
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Resumen para la interfaz y el endpoint JSON"""
+        conn = self._connect()
+        ultima = conn.execute("SELECT * FROM sync_runs ORDER BY id DESC LIMIT 1").fetchone()
+        # Lag de la última sincronización de journal, haya salido bien o no (None = desconocido)
+        ultimo_lag = conn.execute(
+            "SELECT lag_s FROM sync_runs WHERE operacion = 'journal' ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        agregado = conn.execute("""
+            SELECT COUNT(*) AS total, SUM(exito) AS exitosas, AVG(duracion_s) AS duracion_media,
+                   AVG(filas_por_s) AS filas_por_s_media, SUM(bytes_enviados) AS bytes_enviados,
+                   SUM(bytes_recibidos) AS bytes_recibidos, SUM(reintentos) AS reintentos
+            FROM sync_runs
+            WHERE inicio >= datetime('now', 'localtime', '-1 day')
+        """).fetchone()
+        conn.close()
+        return {
+            'ultima': dict(ultima) if ultima else None,
+            'lag_s': ultimo_lag[0] if ultimo_lag else None,
+            'ultimas_24h': dict(agregado),
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def format_status(self) -> str:
+        """Texto corto para la zona de estado de la ventana de asistencia"""
+        resumen = self.get_summary()
+        ultima = resumen['ultima']
+        if not ultima:
+            return "Sin sincronizaciones registradas"
+        estado = "OK" if ultima['exito'] else "ERROR"
+        lag = resumen['lag_s']
+        lag_texto = f"{lag:.0f}s" if lag is not None else "?"
+        return (f"Sync {estado} {ultima['inicio'][11:19]} · {ultima['duracion_s']:.1f}s · "
+                f"{ultima['filas_por_s']:.0f} filas/s · {ultima['bytes_enviados'] / 1024:.1f} KB · "
+                f"lag {lag_texto}")
+
+
+_sync_telemetry = None
+_sync_telemetry_lock = threading.Lock()
+
+
+def get_sync_telemetry() -> SyncTelemetry:
+    """Instancia global (creada al primer uso para no tocar disco al importar)"""
+    global _sync_telemetry
+    with _sync_telemetry_lock:
+        if _sync_telemetry is None:
+            _sync_telemetry = SyncTelemetry()
+        return _sync_telemetry
@@ -12,6 +12,7 @@ from pathlib import Path
 from utils.settings_manager import settings_manager, get_setting, set_setting
 from utils.logger import get_logger, log_user_action
 from utils.database_optimizer import get_optimization_status, optimize_all_databases
+from utils.read_cache import get_read_cache
 
 class AdvancedSettingsWindow:
     """Ventana de configuración avanzada del sistema"""
@@ -313,6 +314,39 @@ class AdvancedSettingsWindow:
         ttk.Label(settings_frame, text="Intervalo de limpieza (horas):").grid(row=3, column=0, sticky=tk.W, pady=2)
         self.cleanup_interval_var = tk.StringVar()
         ttk.Entry(settings_frame, textvariable=self.cleanup_interval_var, width=15).grid(row=3, column=1, sticky=tk.W, padx=(10, 0), pady=2)
+        
+        # Estadísticas de la caché de lecturas
+        stats_frame = ttk.LabelFrame(frame, text="Caché de Lecturas", padding="10")
+        stats_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        self.cache_stats_text = tk.Text(stats_frame, height=8, width=70)
+        self.cache_stats_text.pack(fill=tk.X)
+        
+        buttons = ttk.Frame(stats_frame)
+        buttons.pack(pady=5)
+        ttk.Button(buttons, text="🔄 Actualizar Estadísticas", 
+                  command=self.update_cache_stats).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="🗑️ Vaciar Caché", 
+                  command=self.clear_read_cache).pack(side=tk.LEFT, padx=5)
+        self.update_cache_stats()
+    
+    def update_cache_stats(self):
+        """Mostrar aciertos y fallos de la caché de lecturas"""
+        stats = get_read_cache().stats()
+        status_text = f"""📊 Caché de datos de referencia:
+• Estado: {'Habilitada' if stats['habilitada'] else 'Deshabilitada'}
+• Entradas: {stats['entradas']}
+• Memoria: {stats['bytes'] / 1024:.1f} KB de {stats['max_bytes'] / (1024 * 1024):.0f} MB
+• Aciertos: {stats['aciertos']}   Fallos: {stats['fallos']}   Tasa de aciertos: {stats['tasa_aciertos']:.1%}
+• Invalidaciones: {stats['invalidaciones']}   Vencidas: {stats['vencidas']}   Desalojos: {stats['desalojos']}
+"""
+        self.cache_stats_text.delete(1.0, tk.END)
+        self.cache_stats_text.insert(1.0, status_text)
+    
+    def clear_read_cache(self):
+        """Vaciar la caché de lecturas"""
+        get_read_cache().clear()
+        self.update_cache_stats()
     
     def create_action_buttons(self, parent):
         """Crear botones de acción"""
@@ -433,6 +467,9 @@ class AdvancedSettingsWindow:
             success = settings_manager.update_multiple(settings)
             
             if success:
+                get_read_cache().configure(max_mb=settings["performance.cache_size_mb"],
+                                           enabled=settings["performance.cache_enabled"])
+                self.update_cache_stats()
                 messagebox.showinfo("Éxito", "Configuraciones guardadas correctamente")
                 log_user_action("admin", "settings_saved", {"settings_count": len(settings)})
             else:
@@ -1,6 +1,5 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
 import os
 import sys
 import requests
@@ -16,7 +15,9 @@ import time
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from models.database import get_db, Empleado
+from models.engine import connect_db
 from utils.qr_server import QRServer
+from utils.sync_telemetry import get_sync_telemetry
 
 class AsistenciaQRView:
     def __init__(self, parent):
@@ -26,6 +27,7 @@ class AsistenciaQRView:
         self.qr_image = None
         self.qr_label = None
         self.status_label = None
+        self.sync_status_label = None
         self.refresh_thread = None
         self.is_running = False
         self.qr_port = 5000  # Puerto por defecto
@@ -49,6 +51,7 @@ class AsistenciaQRView:
         
         self.setup_window()
         self.create_widgets()
+        self.actualizar_telemetria()
         
         # Iniciar servidor en hilo separado para no bloquear la UI
         threading.Thread(target=self.start_qr_server_thread, daemon=True).start()
@@ -181,6 +184,12 @@ class AsistenciaQRView:
                                      text="Iniciando servidor...", 
                                      style='Status.TLabel')
         self.status_label.pack(side=tk.LEFT)
+        
+        # Telemetría de la última sincronización con Railway
+        self.sync_status_label = ttk.Label(status_frame, 
+                                          text="", 
+                                          style='Status.TLabel')
+        self.sync_status_label.pack(side=tk.RIGHT)
     
     def create_qr_section(self, parent):
         """Crear sección del QR"""
@@ -213,14 +222,10 @@ class AsistenciaQRView:
     def sincronizar_con_railway(self):
         """Sincronizar datos con Railway"""
         try:
-            import sys
-            import os
-            # Agregar el directorio raíz al path para poder importar src
-            sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-            from src.utils.railway_sync import RailwaySync
+            from utils.railway_sync import RailwaySync
             
-            # Crear instancia de sincronización
-            sync = RailwaySync()
+            # Crear instancia de sincronización sobre la misma base que el servidor QR
+            sync = RailwaySync(local_db_path=self.db_path)
             
             # Verificar estado de Railway
             status = sync.get_railway_status()
@@ -260,12 +265,22 @@ class AsistenciaQRView:
                     progress_label.config(text="Enviando empleados...")
                     progress_window.update()
                     
-                    if sync.sync_empleados_to_railway():
+                    # Instancia recién desplegada (BD vacía en /tmp): calentar con un snapshot
+                    # (requiere el secreto compartido; sin él se envían uno por uno)
+                    if status.get('empleados_count') == 0 and sync.api_token:
+                        progress_label.config(text="Enviando snapshot inicial...")
+                        progress_window.update()
+                        empleados_ok = sync.bootstrap_railway()
+                    else:
+                        empleados_ok = sync.sync_empleados_to_railway()
+                    
+                    if empleados_ok:
                         # Sincronizar asistencias
                         progress_label.config(text="Enviando asistencias...")
                         progress_window.update()
                         
-                        if sync.sync_asistencias_to_railway():
+                        # Intercambio bidireccional por journal (fusión sin pisar registros)
+                        if sync.sync_journal():
                             progress_label.config(text="✅ Sincronización completada")
                             progress_bar.stop()
                             progress_window.after(2000, progress_window.destroy)
@@ -426,6 +441,18 @@ class AsistenciaQRView:
         # Si aún no está listo, intentar de nuevo en 3 segundos (menos agresivo)
         self.window.after(3000, self.verificar_servidor)
     
+    def actualizar_telemetria(self):
+        """Mostrar duración, filas/s, bytes y lag de la última sincronización"""
+        try:
+            self.sync_status_label.config(text=get_sync_telemetry().format_status())
+        except Exception as e:
+            print(f"Error leyendo telemetría de sincronización: {e}")
+        
+        try:
+            self.window.after(10000, self.actualizar_telemetria)
+        except tk.TclError:
+            pass  # Ventana cerrada
+    
     def actualizar_qr(self):
         """Actualizar QR del día con mejor manejo de errores"""
         try:
@@ -499,7 +526,7 @@ class AsistenciaQRView:
                 self.tree.delete(item)
             
             # Obtener registros de hoy
-            conn = sqlite3.connect(self.db_path)
+            conn = connect_db(self.db_path)
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -587,7 +614,7 @@ class AsistenciaQRView:
             while self.is_running:
                 try:
                     # Obtener conteo actual de registros
-                    conn = sqlite3.connect(self.db_path)
+                    conn = connect_db(self.db_path)
                     cursor = conn.cursor()
                     cursor.execute("""
                         SELECT COUNT(*) FROM asistencias 
@@ -624,7 +651,7 @@ class AsistenciaQRView:
                 db.close()
                 
                 # Actualizar SQLite
-                conn = sqlite3.connect(self.db_path)
+                conn = connect_db(self.db_path)
                 cursor = conn.cursor()
                 
                 # Limpiar empleados existentes
@@ -682,8 +709,8 @@ class AsistenciaQRView:
         def sincronizar_desde_railway():
             try:
                 from utils.railway_sync import RailwaySync
-                sync = RailwaySync()
-                if sync.sync_from_railway():
+                sync = RailwaySync(local_db_path=self.db_path)
+                if sync.sync_journal():
                     print("✅ Sincronización desde Railway completada")
                     # Recargar registros después de sincronizar
                     self.cargar_registros_recientes()
@@ -863,6 +890,10 @@ class ReportesAsistenciaView:
                   style='Success.TButton',
                   command=self.exportar_excel).pack(side=tk.LEFT, padx=(0, 10))
         
+        ttk.Button(filters_container, text="📑 Exportar PDF", 
+                  style='Primary.TButton',
+                  command=self.exportar_pdf).pack(side=tk.LEFT, padx=(0, 10))
+        
         # Botones de períodos rápidos
         periods_frame = ttk.Frame(filters_container)
         periods_frame.pack(side=tk.LEFT, padx=(20, 0))
@@ -1012,7 +1043,7 @@ class ReportesAsistenciaView:
             fecha_desde = self.fecha_desde.get()
             fecha_hasta = self.fecha_hasta.get()
             
-            conn = sqlite3.connect(self.db_path)
+            conn = connect_db(self.db_path)
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -1226,3 +1257,24 @@ class ReportesAsistenciaView:
                 
         except Exception as e:
             messagebox.showerror("❌ Error", f"Error exportando reporte: {str(e)}")
+    
+    def exportar_pdf(self):
+        """Generar el reporte PDF del periodo en segundo plano"""
+        try:
+            from utils.pdf_reports import get_report_pipeline, esperar_reporte, abrir_archivo
+            
+            job = get_report_pipeline().submit('asistencia',
+                                               fecha_desde=self.fecha_desde.get(),
+                                               fecha_hasta=self.fecha_hasta.get(),
+                                               db_path=self.db_path)
+        except Exception as e:
+            messagebox.showerror("❌ Error", f"Error exportando reporte: {str(e)}")
+            return
+        
+        def terminado(job):
+            if job.estado != 'listo':
+                messagebox.showerror("❌ Error", f"Error generando PDF: {job.error}")
+            elif messagebox.askyesno("✅ Éxito", f"Reporte PDF generado en:\n{job.ruta}\n\n¿Desea abrirlo?"):
+                abrir_archivo(job.ruta)
+        
+        esperar_reporte(self.window, job, terminado)
@@ -90,7 +90,7 @@ DATABASE_CONFIG = {
         'description': 'Base de datos de gestión de personal y contratos'
     },
     'quimicos': {
-        'path': DIRECTORIES['database'] / 'inventario_quimicos_avanzado.db',
+        'path': DIRECTORIES['database'] / 'inventario_quimicos.db',
         'description': 'Base de datos de inventario de químicos agrícolas'
     },
     'almacen': {
@@ -2,13 +2,18 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import sys
 import os
+import threading
 from datetime import datetime, date
 from pathlib import Path
 from tkcalendar import DateEntry
 
 # Agregar path para importar modelos
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from models.database import get_db, Empleado, Contrato, TipoContrato
+from models.database import get_db, Empleado, Contrato
+from models.contratos import listar_contratos, contar_por_estado
+from utils.document_index import get_document_index
+from utils.reference_data import tipos_contrato
+from utils.contrato_excel_renderer import TEMPLATE_PATH, generar_contrato, generar_contratos_masivo
 
 # ===================== IMPORTAR GENERADORES =====================
 # Generador de contratos Excel (HABILITADO)
@@ -16,159 +21,22 @@ EXCEL_GENERATOR_AVAILABLE = True
 print("Generador de contratos Excel habilitado")
 
 def abrir_generador_contratos_excel(parent, contratos_window, contrato):
-    """Generar Excel de contratos usando la plantilla real"""
+    """Generar Excel de contratos usando la plantilla real (cargada una sola vez)"""
     try:
-        from tkinter import messagebox
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-        from datetime import datetime
-        import os
-        
         # Obtener empleado
         empleado = contratos_window.db.query(Empleado).filter(Empleado.id == contrato.empleado_id).first()
         if not empleado:
             messagebox.showerror("Error", "Empleado no encontrado")
             return
         
-        # Ruta de la plantilla
-        template_path = "templates_contratos/CONTRATO EXCEL FLORE JUNCALITO.xlsx"
-        if not os.path.exists(template_path):
-            messagebox.showerror("Error", f"Plantilla no encontrada: {template_path}")
+        if not os.path.exists(TEMPLATE_PATH):
+            messagebox.showerror("Error", f"Plantilla no encontrada: {TEMPLATE_PATH}")
             return
         
-        # Crear carpeta del empleado
-        nombre_seguro = empleado.nombre_completo.replace(" ", "_").replace("/", "_")
-        cedula_segura = empleado.cedula.replace(" ", "_")
-        empleado_dir = os.path.join("empleados_data", f"{nombre_seguro}_{cedula_segura}")
-        contratos_dir = os.path.join(empleado_dir, "contratos")
-        
-        # Crear carpetas con información de debug
-        print(f"Creando carpeta empleado: {empleado_dir}")
-        os.makedirs(empleado_dir, exist_ok=True)
-        
-        print(f"Creando carpeta contratos: {contratos_dir}")
-        os.makedirs(contratos_dir, exist_ok=True)
-        
-        # Verificar que las carpetas existen
-        if not os.path.exists(empleado_dir):
-            messagebox.showerror("Error", f"No se pudo crear la carpeta del empleado: {empleado_dir}")
-            return
-            
-        if not os.path.exists(contratos_dir):
-            messagebox.showerror("Error", f"No se pudo crear la carpeta de contratos: {contratos_dir}")
-            return
-        
-        # Cargar la plantilla
-        wb = openpyxl.load_workbook(template_path)
-        ws = wb.active
-        
-        # Función para convertir fechas a español
-        def fecha_a_espanol(fecha):
-            if not fecha:
-                return "NO DEFINIDA"
-            meses_espanol = {
-                1: "ENERO", 2: "FEBRERO", 3: "MARZO", 4: "ABRIL",
-                5: "MAYO", 6: "JUNIO", 7: "JULIO", 8: "AGOSTO",
-                9: "SEPTIEMBRE", 10: "OCTUBRE", 11: "NOVIEMBRE", 12: "DICIEMBRE"
-            }
-            dia = fecha.day
-            mes = meses_espanol[fecha.month]
-            anio = fecha.year
-            return f"{dia} DE {mes} DE {anio}"
-        
-        # Función para convertir números a letras
-        def numero_a_letras(numero):
-            if numero is None or numero == 0:
-                return "CERO PESOS"
-            numero = int(numero)
-            return f"{numero:,} PESOS"
-        
-        # Variables disponibles
-        variables = {
-            # Variables del empleado
-            '{NOMBRE_EMPLEADO}': empleado.nombre_completo or "NO DEFINIDO",
-            '{CEDULA_EMPLEADO}': empleado.cedula or "NO DEFINIDO",
-            '{DIRECCION_EMPLEADO}': empleado.direccion or "DIRECCION NO ESPECIFICADA",
-            '{TELEFONO_EMPLEADO}': empleado.telefono or "NO DEFINIDO",
-            '{EMAIL_EMPLEADO}': empleado.email or "NO DEFINIDO",
-            '{CARGO_EMPLEADO}': empleado.cargo or "OPERARIO OFICIOS VARIOS",
-            '{AREA_TRABAJO}': empleado.area_trabajo or "NO DEFINIDO",
-            
-            # Variables del contrato
-            '{NUMERO_CONTRATO}': contrato.numero_contrato or "NO DEFINIDO",
-            '{TIPO_CONTRATO}': contrato.tipo_contrato_rel.nombre if contrato.tipo_contrato_rel else "NO DEFINIDO",
-            '{SALARIO_NUMEROS}': f"$ {contrato.salario_contrato:,}" if contrato.salario_contrato else "NO DEFINIDO",
-            '{SALARIO_LETRAS}': numero_a_letras(contrato.salario_contrato) if contrato.salario_contrato else "NO DEFINIDO",
-            '{FECHA_INICIO}': fecha_a_espanol(contrato.fecha_inicio) if contrato.fecha_inicio else "NO DEFINIDA",
-            '{FECHA_FIN}': fecha_a_espanol(contrato.fecha_fin) if contrato.fecha_fin else "NO DEFINIDA",
-            '{ESTADO_CONTRATO}': contrato.estado or "NO DEFINIDO",
-            
-            # Variables de fechas y tiempos
-            '{FECHA_GENERACION}': datetime.now().strftime('%d/%m/%Y'),
-            '{FECHA_ACTUAL}': datetime.now().strftime('%d/%m/%Y'),
-            '{HORA_GENERACION}': datetime.now().strftime('%H:%M:%S'),
-            
-            # Variables de la empresa
-            '{NOMBRE_EMPRESA}': "FLORES JUNCALITO S.A.S",
-            '{DIRECCION_EMPRESA}': "CALLE 19* C N. 88-07",
-            '{CIUDAD_EMPRESA}': "EL ROSAL CUNDINAMARCA",
-            '{NOMBRE_EMPLEADOR}': "FLORES JUNCALITO S.A.S",
-            '{DIRECCION_EMPLEADOR}': "CALLE 19* C N. 88-07",
-            
-            # Variables adicionales de la plantilla
-            '{LUGAR_NACIMIENTO}': empleado.lugar_nacimiento or "EL ROSAL CUNDINAMARCA",
-            '{FECHA_NACIMIENTO}': fecha_a_espanol(empleado.fecha_nacimiento) if empleado.fecha_nacimiento else "NO DEFINIDA",
-            '{TIPO_SALARIO}': "ORDINARIO" if contrato.salario_contrato and contrato.salario_contrato < 10000000 else "INTEGRAL",
-            '{CIUDAD_CONTRATACION}': "EL ROSAL CUNDINAMARCA",
-            '{PERIODOS_PAGO}': "MENSUAL",
-            '{FECHA_INICIO_LABORES}': fecha_a_espanol(contrato.fecha_inicio) if contrato.fecha_inicio else "NO DEFINIDA",
-            '{LUGAR_LABORES}': "EL ROSAL CUNDINAMARCA",
-            '{VENCE_EL_DIA}': fecha_a_espanol(contrato.fecha_fin) if contrato.fecha_fin else "NO DEFINIDA",
-            
-            # Variables adicionales comunes
-            '{NOMBRE_TRABAJADOR}': empleado.nombre_completo or "NO DEFINIDO",
-            '{DIRECCION_TRABAJADOR}': empleado.direccion or "DIRECCION NO ESPECIFICADA",
-            '{CARGO_OFICIO}': empleado.cargo or "OPERARIO OFICIOS VARIOS",
-            '{VALOR_SALARIO}': f"$ {contrato.salario_contrato:,}" if contrato.salario_contrato else "NO DEFINIDO",
-            '{VALOR_LETRAS}': numero_a_letras(contrato.salario_contrato) if contrato.salario_contrato else "NO DEFINIDO",
-            '{FECHA_INICIACION}': fecha_a_espanol(contrato.fecha_inicio) if contrato.fecha_inicio else "NO DEFINIDA",
-            '{LUGAR_DESEMPEÑO}': "EL ROSAL CUNDINAMARCA",
-            '{TERMINO_INICIAL}': fecha_a_espanol(contrato.fecha_inicio) if contrato.fecha_inicio else "NO DEFINIDA",
-            '{FECHA_VENCIMIENTO}': fecha_a_espanol(contrato.fecha_fin) if contrato.fecha_fin else "NO DEFINIDA"
-        }
-        
-        # Reemplazar variables en toda la plantilla
-        variables_encontradas = 0
-        for row in ws.iter_rows():
-            for cell in row:
-                if cell.value and isinstance(cell.value, str):
-                    valor_original = cell.value
-                    valor_nuevo = valor_original
-                    
-                    for variable, valor in variables.items():
-                        if variable in valor_original:
-                            valor_nuevo = valor_nuevo.replace(variable, str(valor))
-                            variables_encontradas += 1
-                    
-                    if valor_nuevo != valor_original:
-                        cell.value = valor_nuevo
-        
-        # Guardar archivo
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"contrato_{cedula_segura}_{timestamp}.xlsx"
-        filepath = os.path.join(contratos_dir, filename)
-        
-        print(f"Guardando archivo en: {filepath}")
-        wb.save(filepath)
-        
-        # Verificar que el archivo se guardó correctamente
-        if os.path.exists(filepath):
-            print(f"Archivo guardado exitosamente en: {filepath}")
-            messagebox.showinfo("Éxito", f"Contrato Excel generado usando plantilla:\n{filepath}\n\nVariables reemplazadas: {variables_encontradas}")
-        else:
-            print(f"Error: El archivo no se guardó en: {filepath}")
-            messagebox.showerror("Error", f"No se pudo guardar el archivo en: {filepath}")
-            return
+        filepath = generar_contrato(contrato, empleado)
+        get_document_index().registrar_archivo(filepath)
+        print(f"Contrato Excel generado: {filepath}")
+        messagebox.showinfo("Éxito", f"Contrato Excel generado usando plantilla:\n{filepath}")
         
         # Abrir archivo
         try:
@@ -277,6 +145,8 @@ class ContratosWindow:
             ("✏️ Editar Contrato", self.editar_contrato, "#3498db", "Modificar contrato seleccionado"),
             ("👁️ Ver Detalles", self.ver_contrato, "#f39c12", "Ver información completa"),
             ("📊 Generar Excel", self.generar_contrato_excel, "#16a085", "Generar contrato en Excel"),
+            ("📑 Generar PDF", self.generar_contrato_pdf, "#c0392b", "Generar contrato en PDF"),
+            ("🗜️ Excel Masivo", self.generar_contratos_masivo, "#1abc9c", "Generar todos los contratos activos en un .zip"),
             ("📁 Abrir Carpeta", self.abrir_carpeta_empleado, "#9b59b6", "Abrir carpeta del empleado"),
             ("📄 Abrir Documento", self.abrir_documento_empleado, "#e67e22", "Abrir último documento generado"),
             ("🔄 Actualizar", self.cargar_contratos, "#34495e", "Actualizar lista"),
@@ -284,7 +154,7 @@ class ContratosWindow:
         ]
         
         # Configurar grid para botones responsive
-        for i in range(8):
+        for i in range(len(buttons_info)):
             btn_frame.grid_columnconfigure(i, weight=1)
         
         for i, (text, command, color, tooltip) in enumerate(buttons_info):
@@ -407,6 +277,7 @@ class ContratosWindow:
             menu.add_command(label="✏️ Editar", command=self.editar_contrato)
             menu.add_separator()
             menu.add_command(label="📊 Generar Excel", command=self.generar_contrato_excel)
+            menu.add_command(label="📑 Generar PDF", command=self.generar_contrato_pdf)
             
             menu.post(event.x_root, event.y_root)
     
@@ -434,8 +305,8 @@ class ContratosWindow:
                 print(f"Error limpiando TreeView: {clear_error}")
                 return
             
-            # Cargar contratos con información del empleado
-            contratos = self.db.query(Contrato).join(Empleado).all()
+            # Contratos, empleados y tipos de contrato en una sola consulta
+            contratos = listar_contratos(self.db)
             
             print(f"Procesando {len(contratos)} contratos...")
             
@@ -446,7 +317,7 @@ class ContratosWindow:
                     fecha_fin = contrato.fecha_fin.strftime("%d/%m/%Y") if contrato.fecha_fin else "No definida"
                     
                     # Formatear salario
-                    salario = f"${contrato.salario_base:,}" if contrato.salario_base else "No definido"
+                    salario = f"${contrato.salario:,}" if contrato.salario else "No definido"
                     
                     # Función para limpiar caracteres problemáticos
                     def limpiar_texto_para_display(texto):
@@ -483,24 +354,13 @@ class ContratosWindow:
                     archivos_info = self.verificar_archivos_contrato(contrato)
                     
                     # Limpiar todos los textos antes de mostrar
-                    numero_contrato_limpio = limpiar_texto_para_display(contrato.numero_contrato or "Sin número")
+                    numero_contrato_limpio = limpiar_texto_para_display(getattr(contrato, 'numero_contrato', None) or "Sin número")
                     nombre_empleado_limpio = limpiar_texto_para_display(contrato.empleado.nombre_completo)
                     cedula_limpia = limpiar_texto_para_display(contrato.empleado.cedula)
                     archivos_info_limpio = limpiar_texto_para_display(archivos_info)
                     
-                    # Obtener tipo de contrato con manejo de errores
-                    tipo_contrato = "No definido"
-                    try:
-                        if contrato.tipo_contrato_rel:
-                            tipo_contrato = contrato.tipo_contrato_rel.nombre
-                        elif contrato.tipo_contrato_id:
-                            # Intentar obtener el tipo de contrato directamente
-                            tipo_contrato_obj = self.db.query(TipoContrato).filter(TipoContrato.id == contrato.tipo_contrato_id).first()
-                            if tipo_contrato_obj:
-                                tipo_contrato = tipo_contrato_obj.nombre
-                    except Exception as tipo_error:
-                        print(f"Error obteniendo tipo de contrato para contrato {contrato.id}: {tipo_error}")
-                        tipo_contrato = "Error"
+                    # Tipo de contrato (ya cargado junto con el contrato)
+                    tipo_contrato = contrato.tipo_contrato.nombre if contrato.tipo_contrato else "No definido"
                     
                     # Insertar en TreeView con textos limpios
                     self.tree.insert('', 'end', values=(
@@ -521,7 +381,7 @@ class ContratosWindow:
                     # Insertar contrato con datos básicos
                     self.tree.insert('', 'end', values=(
                         contrato.id,
-                        contrato.numero_contrato or "Sin número",
+                        getattr(contrato, 'numero_contrato', None) or "Sin número",
                         "Error al cargar",
                         "Error al cargar",
                         "Error",
@@ -542,17 +402,14 @@ class ContratosWindow:
             messagebox.showerror("Error", f"Error al cargar contratos: {e}")
     
     def verificar_archivos_contrato(self, contrato):
-        """Verificar qué archivos Excel existen para el contrato"""
+        """Verificar qué archivos Excel existen para el contrato (desde el índice en memoria)"""
         try:
             empleado = contrato.empleado
-            nombre_seguro = empleado.nombre_completo.replace(" ", "_").replace("/", "_")
-            cedula_segura = empleado.cedula.replace(" ", "_")
-            
-            contratos_dir = Path(f"empleados_data/{nombre_seguro}_{cedula_segura}/contratos")
-            if contratos_dir.exists():
-                excel_files = list(contratos_dir.glob("contrato_excel_*.xlsx"))
-                if excel_files:
-                    return f"EXCEL ({len(excel_files)} archivos)"
+            indice = get_document_index()
+            carpeta = indice.carpeta_de(empleado.nombre_completo, empleado.cedula)
+            excel_files = indice.archivos(carpeta, "contratos/contrato_excel_*.xlsx")
+            if excel_files:
+                return f"EXCEL ({len(excel_files)} archivos)"
         except:
             pass
         
@@ -561,9 +418,10 @@ class ContratosWindow:
     def actualizar_estadisticas(self):
         """Actualizar estadísticas de contratos"""
         try:
-            total = self.db.query(Contrato).count()
-            activos = self.db.query(Contrato).filter(Contrato.estado == 'activo').count()
-            borradores = self.db.query(Contrato).filter(Contrato.estado == 'borrador').count()
+            por_estado = contar_por_estado(self.db)
+            total = sum(por_estado.values())
+            activos = por_estado.get('activo', 0)
+            borradores = por_estado.get('borrador', 0)
             
             stats_text = f"📊 Total: {total} contratos | ✅ Activos: {activos} | 📝 Borradores: {borradores}"
             
@@ -629,6 +487,74 @@ class ContratosWindow:
             messagebox.showerror("Error", f"Error abriendo generador Excel: {e}")
             print(f"Error generador Excel: {e}")
     
+    def generar_contrato_pdf(self):
+        """Generar el contrato en PDF sin bloquear la ventana"""
+        contrato = self.get_selected_contrato()
+        if not contrato:
+            return
+        
+        try:
+            from utils.pdf_reports import get_report_pipeline, esperar_reporte, abrir_archivo
+            
+            job = get_report_pipeline().submit(
+                'contrato', nombre=f"contrato_{contrato.id}_{contrato.empleado.cedula}.pdf",
+                contrato_id=contrato.id)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error generando PDF: {e}")
+            return
+        
+        def terminado(job):
+            if job.estado != 'listo':
+                messagebox.showerror("Error", f"Error generando PDF: {job.error}")
+            elif messagebox.askyesno("PDF Generado", f"Contrato generado en:\n{job.ruta}\n\n¿Desea abrirlo?"):
+                abrir_archivo(job.ruta)
+        
+        esperar_reporte(self.window, job, terminado)
+    
+    def generar_contratos_masivo(self):
+        """Generar los Excel de todos los contratos activos en un único .zip (en segundo plano)"""
+        if not os.path.exists(TEMPLATE_PATH):
+            messagebox.showerror("Error", f"Plantilla no encontrada: {TEMPLATE_PATH}")
+            return
+        
+        contratos = [c for c in listar_contratos(self.db) if c.estado == 'activo']
+        if not contratos:
+            messagebox.showinfo("Excel Masivo", "No hay contratos activos")
+            return
+        
+        zip_path = filedialog.asksaveasfilename(
+            parent=self.window, title="Guardar contratos",
+            defaultextension=".zip", filetypes=[("Archivo ZIP", "*.zip")],
+            initialfile=f"contratos_activos_{datetime.now().strftime('%Y%m%d')}.zip"
+        )
+        if not zip_path:
+            return
+        
+        resultado = {}
+        hilo = threading.Thread(
+            target=lambda: resultado.update(generar_contratos_masivo(contratos, zip_path=zip_path)),
+            daemon=True
+        )
+        hilo.start()
+        self.stats_label.config(text=f"Generando {len(contratos)} contratos...")
+        
+        def esperar():
+            if hilo.is_alive():
+                self.window.after(200, esperar)
+                return
+            self.actualizar_estadisticas()
+            if not resultado:
+                messagebox.showerror("Error", "Error generando contratos")
+                return
+            mensaje = (f"Contratos generados: {resultado['generados']}\n"
+                       f"Tiempo: {resultado['duracion']:.1f} s ({resultado['por_segundo']:.1f} contratos/s)\n\n"
+                       f"{zip_path}")
+            if resultado['errores']:
+                mensaje += f"\n\nErrores: {len(resultado['errores'])}"
+            messagebox.showinfo("Excel Masivo", mensaje)
+        
+        esperar()
+    
     def abrir_carpeta_empleado(self):
         """Abrir carpeta del empleado seleccionado"""
         contrato = self.get_selected_contrato()
@@ -637,12 +563,11 @@ class ContratosWindow:
         
         try:
             empleado = contrato.empleado
-            nombre_seguro = empleado.nombre_completo.replace(" ", "_").replace("/", "_")
-            cedula_segura = empleado.cedula.replace(" ", "_")
+            indice = get_document_index()
+            carpeta = indice.carpeta_de(empleado.nombre_completo, empleado.cedula)
+            carpeta_empleado = Path(indice.ruta(carpeta))
             
-            carpeta_empleado = Path(f"empleados_data/{nombre_seguro}_{cedula_segura}")
-            
-            if carpeta_empleado.exists():
+            if indice.existe(carpeta):
                 import subprocess
                 import platform
                 
@@ -668,18 +593,15 @@ class ContratosWindow:
         
         try:
             empleado = contrato.empleado
-            nombre_seguro = empleado.nombre_completo.replace(" ", "_").replace("/", "_")
-            cedula_segura = empleado.cedula.replace(" ", "_")
-            
-            carpeta_contratos = Path(f"empleados_data/{nombre_seguro}_{cedula_segura}/contratos")
+            indice = get_document_index()
+            carpeta = indice.carpeta_de(empleado.nombre_completo, empleado.cedula)
             
-            if carpeta_contratos.exists():
-                # Buscar el archivo más reciente
-                archivos_excel = list(carpeta_contratos.glob("*.xlsx"))
+            if indice.existe(carpeta):
+                # Documento más reciente según el índice
+                ultimo = indice.ultimo_documento(carpeta, "contratos/*.xlsx")
                 
-                if archivos_excel:
-                    # Ordenar por fecha de modificación (más reciente primero)
-                    archivo_mas_reciente = max(archivos_excel, key=lambda x: x.stat().st_mtime)
+                if ultimo:
+                    archivo_mas_reciente = Path(ultimo)
                     
                     import subprocess
                     import platform
@@ -796,7 +718,9 @@ class NuevoContratoWindow:
                 bg='#f8f9fa').grid(row=row, column=0, sticky=tk.W, pady=5)
         self.tipo_combo = ttk.Combobox(main_frame, textvariable=self.tipo_var, 
                                       font=('Segoe UI', 10), state="readonly")
-        self.tipo_combo['values'] = ["temporal", "permanente", "temporada"]
+        tipos = ["temporal", "permanente", "temporada"]
+        tipos += [nombre for _, nombre in tipos_contrato(self.db) if nombre not in tipos]
+        self.tipo_combo['values'] = tipos
         self.tipo_combo.grid(row=row, column=1, sticky=(tk.W, tk.E), pady=5, padx=(10, 10))
         
         # Fecha inicio con calendario responsive
@@ -913,8 +837,7 @@ class NuevoContratoWindow:
             
             # Obtener tipo de contrato por ID
             tipo_nombre = self.tipo_var.get()
-            tipo_contrato = self.db.query(TipoContrato).filter(TipoContrato.nombre == tipo_nombre).first()
-            tipo_contrato_id = tipo_contrato.id if tipo_contrato else None
+            tipo_contrato_id = {nombre: tipo_id for tipo_id, nombre in tipos_contrato(self.db)}.get(tipo_nombre)
             
             # Crear o actualizar contrato
             if self.contrato:
@@ -5,12 +5,19 @@ Sistema de Inventario de Almacén - Módulo Independiente
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
+from tkinter import ttk, messagebox, filedialog, simpledialog
 import sys
 import os
 from datetime import datetime, date
-import sqlite3
 import csv
+from utils.inventario_engine import get_inventario
+from utils.inventario_stats import estadisticas
+from utils.formato_espanol import numero_a_letras
+from utils import reference_data
+
+# Orden de las columnas de los datos de ejemplo y de la carga desde Excel
+COLUMNAS_CARGA = ('codigo', 'nombre', 'saldo', 'unidad', 'valor_unitario', 'stock_minimo', 'ubicacion', 'proveedor')
+
 
 class InventarioAlmacenWindow:
     def __init__(self, parent, main_window=None):
@@ -80,65 +87,17 @@ class InventarioAlmacenWindow:
         self.window.geometry(f"1200x800+{x}+{y}")
     
     def setup_database(self):
-        """Configurar base de datos específica para almacén"""
+        """Motor del inventario de almacén: esquema unificado y conexión compartida"""
         try:
-            db_dir = 'database'
-            os.makedirs(db_dir, exist_ok=True)
-            
-            db_path = os.path.join(db_dir, 'inventario_almacen.db')
-            self.conn = sqlite3.connect(db_path)
-            self.crear_tablas()
-            self.poblar_datos_almacen()
+            self.inventario = get_inventario('almacen')
         except Exception as e:
             print(f"Error BD almacén: {e}")
-            self.conn = sqlite3.connect('inventario_almacen.db')
-            self.crear_tablas()
-            self.poblar_datos_almacen()
-    
-    def crear_tablas(self):
-        """Crear tablas específicas para almacén"""
-        cursor = self.conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS productos_almacen (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                codigo TEXT UNIQUE NOT NULL,
-                nombre TEXT NOT NULL,
-                saldo INTEGER DEFAULT 0,
-                unidad TEXT NOT NULL,
-                valor_unitario REAL NOT NULL,
-                stock_minimo INTEGER DEFAULT 0,
-                ubicacion TEXT,
-                proveedor TEXT,
-                fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS movimientos_almacen (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                producto_id INTEGER,
-                tipo TEXT NOT NULL,
-                cantidad INTEGER NOT NULL,
-                fecha DATE NOT NULL,
-                factura TEXT,
-                proveedor TEXT,
-                destino TEXT,
-                valor_total REAL,
-                observaciones TEXT,
-                fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (producto_id) REFERENCES productos_almacen (id)
-            )
-        ''')
-        
-        self.conn.commit()
+            self.inventario = get_inventario('almacen', 'inventario_almacen.db')
+        self.poblar_datos_almacen()
     
     def poblar_datos_almacen(self):
         """Cargar datos específicos de almacén"""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM productos_almacen")
-        
-        if cursor.fetchone()[0] == 0:
+        if self.inventario.contar() == 0:
             print("🔄 Cargando datos de ALMACÉN desde Excel...")
             
             # Intentar cargar desde Excel
@@ -158,12 +117,7 @@ class InventarioAlmacenWindow:
                 ('ALM008', 'SOLDADURA E6013 3.2MM', 15, 'KG', 8500, 5, 'A-08', 'SOLDADURAS TÉCNICAS')
             ]
             
-            cursor.executemany('''
-                INSERT INTO productos_almacen (codigo, nombre, saldo, unidad, valor_unitario, stock_minimo, ubicacion, proveedor)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', productos_almacen)
-            
-            self.conn.commit()
+            self.inventario.insertar_productos(dict(zip(COLUMNAS_CARGA, fila)) for fila in productos_almacen)
             print("📋 Productos de ALMACÉN inicializados")
     
     def cargar_desde_excel_almacen(self):
@@ -176,20 +130,14 @@ class InventarioAlmacenWindow:
         
         try:
             import openpyxl
-            workbook = openpyxl.load_workbook(archivo_almacen, data_only=True)
+            workbook = openpyxl.load_workbook(archivo_almacen, read_only=True, data_only=True)
             sheet = workbook['Almacen'] if 'Almacen' in workbook.sheetnames else workbook.active
             
             productos = self.procesar_hoja_almacen(sheet)
+            workbook.close()
             
             if productos:
-                cursor = self.conn.cursor()
-                cursor.executemany('''
-                    INSERT OR REPLACE INTO productos_almacen 
-                    (codigo, nombre, saldo, unidad, valor_unitario, stock_minimo, ubicacion, proveedor)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', productos)
-                
-                self.conn.commit()
+                self.inventario.insertar_productos(dict(zip(COLUMNAS_CARGA, fila)) for fila in productos)
                 print(f"✅ {len(productos)} productos de ALMACÉN cargados desde Excel")
                 return True
             
@@ -206,11 +154,13 @@ class InventarioAlmacenWindow:
         
         print("   📋 Procesando productos de ALMACÉN...")
         
-        for row_num in range(1, min(sheet.max_row + 1, 200)):
+        # Una pasada en streaming sobre las filas (sin tope de filas ni lecturas celda a celda)
+        for fila in sheet.iter_rows(max_col=7, values_only=True):
+            celda = lambda col: fila[col - 1] if col <= len(fila) else None
             try:
                 # Buscar productos válidos en diferentes columnas
                 for col in range(1, 6):
-                    cell_value = sheet.cell(row=row_num, column=col).value
+                    cell_value = celda(col)
                     
                     if (cell_value and isinstance(cell_value, str) and 
                         len(str(cell_value).strip()) > 3):
@@ -227,12 +177,12 @@ class InventarioAlmacenWindow:
                             unidad = 'UND'
                             
                             for saldo_col in range(col + 1, min(col + 4, 7)):
-                                saldo_val = sheet.cell(row=row_num, column=saldo_col).value
+                                saldo_val = celda(saldo_col)
                                 if isinstance(saldo_val, (int, float)) and saldo_val >= 0:
                                     saldo = int(saldo_val)
                                     
                                     # Buscar unidad
-                                    unidad_val = sheet.cell(row=row_num, column=saldo_col + 1).value
+                                    unidad_val = celda(saldo_col + 1)
                                     if isinstance(unidad_val, str) and len(str(unidad_val).strip()) <= 10:
                                         unidad = str(unidad_val).strip().upper()
                                     break
@@ -369,19 +319,9 @@ class InventarioAlmacenWindow:
         stats_container = tk.Frame(parent, bg='#ffffff')
         stats_container.pack(fill=tk.X, padx=20, pady=(0, 20))
         
-        # Obtener estadísticas de almacén
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM productos_almacen")
-        total = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM productos_almacen WHERE saldo <= stock_minimo AND saldo > 0")
-        bajo = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM productos_almacen WHERE saldo = 0")
-        agotado = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT SUM(saldo * valor_unitario) FROM productos_almacen")
-        valor = cursor.fetchone()[0] or 0
+        # Obtener estadísticas de almacén (una pasada, en caché hasta el próximo movimiento)
+        stats = estadisticas(self.inventario)
+        total, bajo, agotado, valor = stats['total'], stats['stock_bajo'], stats['sin_stock'], stats['valor_total']
         
         # Cards específicas para almacén
         cards_data = [
@@ -569,41 +509,18 @@ class InventarioAlmacenWindow:
             for item in self.tree.get_children():
                 self.tree.delete(item)
             
-            # Query específica para almacén
-            query = "SELECT codigo, nombre, saldo, unidad, valor_unitario, stock_minimo, ubicacion FROM productos_almacen WHERE 1=1"
-            params = []
-            
-            # Aplicar filtros específicos
-            if hasattr(self, 'search_var'):
-                texto = self.search_var.get().strip().lower()
-                if texto:
-                    query += " AND (LOWER(nombre) LIKE ? OR LOWER(codigo) LIKE ?)"
-                    params.extend([f'%{texto}%', f'%{texto}%'])
-            
-            if hasattr(self, 'filter_ubicacion'):
-                ubicacion = self.filter_ubicacion.get()
-                if ubicacion and ubicacion != "Todas":
-                    query += " AND ubicacion = ?"
-                    params.append(ubicacion)
-            
-            if hasattr(self, 'filter_stock'):
-                stock_filter = self.filter_stock.get()
-                if stock_filter == "Bajo":
-                    query += " AND saldo <= stock_minimo AND saldo > 0"
-                elif stock_filter == "Agotado":
-                    query += " AND saldo = 0"
-                elif stock_filter == "Normal":
-                    query += " AND saldo > stock_minimo"
-            
-            query += " ORDER BY codigo"
-            
-            # Ejecutar query
-            cursor = self.conn.cursor()
-            cursor.execute(query, params)
+            # Búsqueda por texto completo (ordenada por relevancia) y filtros del motor
+            texto = self.search_var.get() if hasattr(self, 'search_var') else ''
+            ubicacion = self.filter_ubicacion.get() if hasattr(self, 'filter_ubicacion') else None
+            stock_filter = self.filter_stock.get() if hasattr(self, 'filter_stock') else None
+            productos = self.inventario.productos(texto, ubicacion=ubicacion if ubicacion != "Todas" else None,
+                                                  estado_stock=stock_filter)
             productos_mostrados = 0
             
-            for row in cursor.fetchall():
-                codigo, nombre, saldo, unidad, valor_unit, stock_min, ubicacion = row
+            for producto in productos:
+                codigo, nombre, saldo, unidad = producto.codigo, producto.nombre, producto.saldo or 0, producto.unidad
+                valor_unit, stock_min = producto.valor_unitario or 0, producto.stock_minimo or 0
+                ubicacion = producto.ubicacion
                 
                 # Estados específicos para almacén
                 if saldo == 0:
@@ -631,8 +548,7 @@ class InventarioAlmacenWindow:
             
             # Actualizar contador
             if hasattr(self, 'products_count_label'):
-                cursor.execute("SELECT COUNT(*) FROM productos_almacen")
-                total = cursor.fetchone()[0]
+                total = estadisticas(self.inventario)['total']
                 self.products_count_label.config(
                     text=f"Mostrando {productos_mostrados} de {total} productos"
                 )
@@ -690,9 +606,7 @@ class InventarioAlmacenWindow:
         item = self.tree.item(selection[0])
         codigo = item['values'][0]
         
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM productos_almacen WHERE codigo = ?", (codigo,))
-        return cursor.fetchone()
+        return self.inventario.producto(str(codigo))
     
     def movimiento_entrada(self):
         """Abrir diálogo de entrada de stock"""
@@ -748,8 +662,15 @@ class InventarioAlmacenWindow:
         messagebox.showinfo("Actualizado", "Datos de almacén actualizados")
     
     def reporte_almacen(self):
-        """Generar reporte específico de almacén"""
+        """Generar reporte específico de almacén (existencias de hoy o a una fecha de corte)"""
         try:
+            texto = simpledialog.askstring("Fecha de corte", "Existencias al día (DD/MM/AAAA).\nDeje vacío para hoy:",
+                                           parent=self.window)
+            if texto is None:
+                return
+            # Saldo a la fecha: cierre mensual anterior + movimientos del mes
+            corte = datetime.strptime(texto.strip(), '%d/%m/%Y').date() if texto.strip() else None
+            
             archivo = filedialog.asksaveasfilename(
                 defaultextension=".csv",
                 filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
@@ -757,27 +678,28 @@ class InventarioAlmacenWindow:
             )
             
             if archivo:
-                cursor = self.conn.cursor()
-                cursor.execute("""
-                    SELECT codigo, nombre, saldo, unidad, valor_unitario, 
-                           stock_minimo, ubicacion, proveedor,
-                           (saldo * valor_unitario) as valor_total
-                    FROM productos_almacen 
-                    ORDER BY codigo
-                """)
-                
-                productos = cursor.fetchall()
+                productos = self.inventario.productos_a_fecha(corte) if corte else self.inventario.productos()
+                productos = [(p.codigo, p.nombre, p.saldo, p.unidad, p.valor_unitario, p.stock_minimo,
+                              p.ubicacion, p.proveedor, (p.saldo or 0) * (p.valor_unitario or 0))
+                             for p in productos]
                 
                 with open(archivo, 'w', newline='', encoding='utf-8') as f:
                     writer = csv.writer(f)
                     writer.writerow(['=== REPORTE DE ALMACÉN ==='])
                     writer.writerow([f'Generado: {datetime.now().strftime("%d/%m/%Y %H:%M:%S")}'])
+                    if corte:
+                        writer.writerow([f'Existencias al: {corte.strftime("%d/%m/%Y")}'])
                     writer.writerow([])
                     writer.writerow(['Código', 'Producto', 'Saldo', 'Unidad', 'Valor Unit.',
                                    'Stock Mín.', 'Ubicación', 'Proveedor', 'Valor Total'])
                     
                     for producto in productos:
                         writer.writerow(producto)
+                    
+                    valor_inventario = sum(producto[-1] or 0 for producto in productos)
+                    writer.writerow([])
+                    writer.writerow(['Valor total del inventario', f"${valor_inventario:,.0f}",
+                                     numero_a_letras(valor_inventario)])
                 
                 messagebox.showinfo("Éxito", f"Reporte de almacén generado: {archivo}")
                 
@@ -804,11 +726,11 @@ class InventarioAlmacenWindow:
         producto = self.get_selected_producto()
         if producto:
             messagebox.showinfo("Detalles del Producto", 
-                               f"Código: {producto[1]}\n" +
-                               f"Nombre: {producto[2]}\n" +
-                               f"Saldo: {producto[3]} {producto[4]}\n" +
-                               f"Valor: ${producto[5]:,}\n" +
-                               f"Ubicación: {producto[7]}")
+                               f"Código: {producto.codigo}\n" +
+                               f"Nombre: {producto.nombre}\n" +
+                               f"Saldo: {producto.saldo} {producto.unidad}\n" +
+                               f"Valor: ${producto.valor_unitario:,}\n" +
+                               f"Ubicación: {producto.ubicacion}")
     
     def sort_column(self, col):
         """Ordenar columna específica"""
@@ -847,8 +769,6 @@ class InventarioAlmacenWindow:
     
     def cerrar_ventana(self):
         """Cerrar ventana específica"""
-        if self.conn:
-            self.conn.close()
         self.window.destroy()
 
 
@@ -953,14 +873,14 @@ class ProductoAlmacenWindow:
         if not self.producto:
             return
         
-        self.entry_codigo.insert(0, self.producto[1] or "")
-        self.entry_nombre.insert(0, self.producto[2] or "")
-        self.entry_saldo.insert(0, str(self.producto[3] or ""))
-        self.entry_unidad.insert(0, self.producto[4] or "")
-        self.entry_valor.insert(0, str(self.producto[5] or ""))
-        self.entry_stock_min.insert(0, str(self.producto[6] or ""))
-        self.combo_ubicacion.set(self.producto[7] or "")
-        self.entry_proveedor.insert(0, self.producto[8] or "")
+        self.entry_codigo.insert(0, self.producto.codigo or "")
+        self.entry_nombre.insert(0, self.producto.nombre or "")
+        self.entry_saldo.insert(0, str(self.producto.saldo or ""))
+        self.entry_unidad.insert(0, self.producto.unidad or "")
+        self.entry_valor.insert(0, str(self.producto.valor_unitario or ""))
+        self.entry_stock_min.insert(0, str(self.producto.stock_minimo or ""))
+        self.combo_ubicacion.set(self.producto.ubicacion or "")
+        self.entry_proveedor.insert(0, self.producto.proveedor or "")
         
         if self.modo == "editar":
             self.entry_codigo.config(state='disabled')
@@ -982,52 +902,32 @@ class ProductoAlmacenWindow:
                 messagebox.showerror("Error", "Los valores numéricos no son válidos")
                 return
             
-            cursor = self.main_window.conn.cursor()
+            datos = {
+                'codigo': self.entry_codigo.get().strip(),
+                'nombre': self.entry_nombre.get().strip(),
+                'saldo': saldo,
+                'unidad': self.entry_unidad.get().strip(),
+                'valor_unitario': valor,
+                'stock_minimo': stock_min,
+                'ubicacion': self.combo_ubicacion.get(),
+                'proveedor': self.entry_proveedor.get().strip()
+            }
+            inventario = self.main_window.inventario
             
             if self.modo == "nuevo":
                 # Verificar código único
-                cursor.execute("SELECT id FROM productos_almacen WHERE codigo = ?", 
-                             (self.entry_codigo.get().strip(),))
-                if cursor.fetchone():
+                if inventario.producto(datos['codigo']):
                     messagebox.showerror("Error", "El código ya existe")
                     return
                 
-                # Insertar nuevo
-                cursor.execute('''
-                    INSERT INTO productos_almacen 
-                    (codigo, nombre, saldo, unidad, valor_unitario, stock_minimo, ubicacion, proveedor)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    self.entry_codigo.get().strip(),
-                    self.entry_nombre.get().strip(),
-                    saldo,
-                    self.entry_unidad.get().strip(),
-                    valor,
-                    stock_min,
-                    self.combo_ubicacion.get(),
-                    self.entry_proveedor.get().strip()
-                ))
+                # Insertar nuevo (el saldo inicial se asienta en el libro)
+                inventario.guardar_producto(datos)
                 mensaje = "Producto de almacén creado exitosamente"
             else:
-                # Actualizar existente
-                cursor.execute('''
-                    UPDATE productos_almacen SET 
-                    nombre=?, saldo=?, unidad=?, valor_unitario=?, 
-                    stock_minimo=?, ubicacion=?, proveedor=?
-                    WHERE codigo=?
-                ''', (
-                    self.entry_nombre.get().strip(),
-                    saldo,
-                    self.entry_unidad.get().strip(),
-                    valor,
-                    stock_min,
-                    self.combo_ubicacion.get(),
-                    self.entry_proveedor.get().strip(),
-                    self.entry_codigo.get().strip()
-                ))
+                # Actualizar existente (un cambio de saldo queda como ajuste)
+                inventario.guardar_producto(datos, codigo_original=datos['codigo'])
                 mensaje = "Producto de almacén actualizado exitosamente"
             
-            self.main_window.conn.commit()
             messagebox.showinfo("Éxito", mensaje)
             
             # Actualizar tabla principal
@@ -1152,9 +1052,8 @@ class MovimientoAlmacenWindow:
                  relief='flat', bd=0, padx=20, pady=10, cursor='hand2').pack(side=tk.LEFT, padx=5)
     
     def cargar_productos(self):
-        cursor = self.main_window.conn.cursor()
-        cursor.execute("SELECT codigo, nombre FROM productos_almacen ORDER BY codigo")
-        productos = [f"{row[0]} - {row[1]}" for row in cursor.fetchall()]
+        productos = [f"{codigo} - {nombre}"
+                     for _, codigo, nombre in reference_data.productos_combo(self.main_window.inventario)]
         self.combo_producto['values'] = productos
     
     def registrar(self):
@@ -1169,47 +1068,21 @@ class MovimientoAlmacenWindow:
             if cantidad <= 0:
                 raise ValueError("Cantidad debe ser mayor a 0")
             
-            cursor = self.main_window.conn.cursor()
-            
-            # Obtener producto
-            cursor.execute("SELECT id, saldo FROM productos_almacen WHERE codigo = ?", (codigo,))
-            resultado = cursor.fetchone()
-            if not resultado:
-                messagebox.showerror("Error", "Producto no encontrado")
-                return
-            
-            producto_id, saldo_actual = resultado
-            
-            # Validar stock para salidas
-            if self.tipo == 'salida' and cantidad > saldo_actual:
-                messagebox.showerror("Error", f"Stock insuficiente. Disponible: {saldo_actual}")
-                return
-            
-            # Nuevo saldo
-            nuevo_saldo = saldo_actual + cantidad if self.tipo == 'entrada' else saldo_actual - cantidad
-            
-            # Registrar movimiento
             factura = getattr(self, 'entry_factura', None)
             proveedor = getattr(self, 'entry_proveedor', None)
             destino = getattr(self, 'entry_destino', None)
+            responsable = getattr(self, 'entry_responsable', None)
             
-            cursor.execute('''
-                INSERT INTO movimientos_almacen 
-                (producto_id, tipo, cantidad, fecha, factura, proveedor, destino, observaciones)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                producto_id, self.tipo, cantidad, date.today(),
-                factura.get() if factura else None,
-                proveedor.get() if proveedor else None,
-                destino.get() if destino else None,
-                self.entry_observaciones.get()
-            ))
-            
-            # Actualizar saldo
-            cursor.execute("UPDATE productos_almacen SET saldo = ? WHERE id = ?", 
-                         (nuevo_saldo, producto_id))
+            # Movimiento y saldo en una sola transacción (valida el stock disponible)
+            self.main_window.inventario.registrar_movimiento(
+                codigo, self.tipo, cantidad,
+                responsable=responsable.get() if responsable else '',
+                observaciones=self.entry_observaciones.get(),
+                factura=factura.get() if factura else None,
+                proveedor=proveedor.get() if proveedor else None,
+                destino=destino.get() if destino else None
+            )
             
-            self.main_window.conn.commit()
             messagebox.showinfo("Éxito", f"{self.tipo.title()} de almacén registrada correctamente")
             
             # Actualizar tabla
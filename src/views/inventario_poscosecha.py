@@ -5,12 +5,20 @@ Sistema de Inventario de Poscosecha - Módulo Independiente
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
+from tkinter import ttk, messagebox, filedialog, simpledialog
 import sys
 import os
 from datetime import datetime, date
-import sqlite3
 import csv
+from utils.inventario_engine import get_inventario
+from utils.inventario_stats import estadisticas
+from utils.formato_espanol import numero_a_letras
+from utils import reference_data
+
+# Orden de las columnas de los datos de ejemplo y de la carga desde Excel
+COLUMNAS_CARGA = ('codigo', 'categoria', 'nombre', 'saldo', 'unidad', 'valor_unitario', 'stock_minimo', 'ubicacion',
+                  'proveedor', 'tipo_producto', 'fecha_vencimiento', 'lote')
+
 
 class InventarioPoscosechaWindow:
     def __init__(self, parent, main_window=None):
@@ -80,70 +88,17 @@ class InventarioPoscosechaWindow:
         self.window.geometry(f"1200x800+{x}+{y}")
     
     def setup_database(self):
-        """Configurar base de datos específica para poscosecha"""
+        """Motor del inventario de poscosecha: esquema unificado y conexión compartida"""
         try:
-            db_dir = 'database'
-            os.makedirs(db_dir, exist_ok=True)
-            
-            db_path = os.path.join(db_dir, 'inventario_poscosecha.db')
-            self.conn = sqlite3.connect(db_path)
-            self.crear_tablas()
-            self.poblar_datos_poscosecha()
+            self.inventario = get_inventario('poscosecha')
         except Exception as e:
             print(f"Error BD poscosecha: {e}")
-            self.conn = sqlite3.connect('inventario_poscosecha.db')
-            self.crear_tablas()
-            self.poblar_datos_poscosecha()
-    
-    def crear_tablas(self):
-        """Crear tablas específicas para poscosecha"""
-        cursor = self.conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS productos_poscosecha (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                codigo TEXT UNIQUE NOT NULL,
-                categoria TEXT NOT NULL,
-                nombre TEXT NOT NULL,
-                saldo INTEGER DEFAULT 0,
-                unidad TEXT NOT NULL,
-                valor_unitario REAL NOT NULL,
-                stock_minimo INTEGER DEFAULT 0,
-                ubicacion TEXT,
-                proveedor TEXT,
-                tipo_producto TEXT,
-                fecha_vencimiento DATE,
-                lote TEXT,
-                fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS movimientos_poscosecha (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                producto_id INTEGER,
-                tipo TEXT NOT NULL,
-                cantidad INTEGER NOT NULL,
-                fecha DATE NOT NULL,
-                factura TEXT,
-                proveedor TEXT,
-                destino TEXT,
-                valor_total REAL,
-                observaciones TEXT,
-                responsable TEXT,
-                fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (producto_id) REFERENCES productos_poscosecha (id)
-            )
-        ''')
-        
-        self.conn.commit()
+            self.inventario = get_inventario('poscosecha', 'inventario_poscosecha.db')
+        self.poblar_datos_poscosecha()
     
     def poblar_datos_poscosecha(self):
         """Cargar datos específicos de poscosecha"""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM productos_poscosecha")
-        
-        if cursor.fetchone()[0] == 0:
+        if self.inventario.contar() == 0:
             print("🔄 Cargando datos de POSCOSECHA desde Excel...")
             
             # Intentar cargar desde Excel
@@ -163,12 +118,7 @@ class InventarioPoscosechaWindow:
                 ('PC008', 'QUIMICO', 'DESINFECTANTE CLORO', 0, 'LT', 8500, 10, 'PC-08', 'QUIMICOS INDUSTRIALES', 'LIMPIEZA', '2025-08-20', 'LT2024008')
             ]
             
-            cursor.executemany('''
-                INSERT INTO productos_poscosecha (codigo, categoria, nombre, saldo, unidad, valor_unitario, stock_minimo, ubicacion, proveedor, tipo_producto, fecha_vencimiento, lote)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', productos_poscosecha)
-            
-            self.conn.commit()
+            self.inventario.insertar_productos(dict(zip(COLUMNAS_CARGA, fila)) for fila in productos_poscosecha)
             print("📋 Productos de POSCOSECHA inicializados")
     
     def cargar_desde_excel_poscosecha(self):
@@ -181,20 +131,14 @@ class InventarioPoscosechaWindow:
         
         try:
             import openpyxl
-            workbook = openpyxl.load_workbook(archivo_poscosecha, data_only=True)
+            workbook = openpyxl.load_workbook(archivo_poscosecha, read_only=True, data_only=True)
             sheet = workbook['Poscosecha'] if 'Poscosecha' in workbook.sheetnames else workbook.active
             
             productos = self.procesar_hoja_poscosecha(sheet)
+            workbook.close()
             
             if productos:
-                cursor = self.conn.cursor()
-                cursor.executemany('''
-                    INSERT OR REPLACE INTO productos_poscosecha 
-                    (codigo, categoria, nombre, saldo, unidad, valor_unitario, stock_minimo, ubicacion, proveedor, tipo_producto, fecha_vencimiento, lote)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', productos)
-                
-                self.conn.commit()
+                self.inventario.insertar_productos(dict(zip(COLUMNAS_CARGA, fila)) for fila in productos)
                 print(f"✅ {len(productos)} productos de POSCOSECHA cargados desde Excel")
                 return True
             
@@ -211,11 +155,13 @@ class InventarioPoscosechaWindow:
         
         print("   📋 Procesando productos de POSCOSECHA...")
         
-        for row_num in range(1, min(sheet.max_row + 1, 200)):
+        # Una pasada en streaming sobre las filas (sin tope de filas ni lecturas celda a celda)
+        for fila in sheet.iter_rows(max_col=8, values_only=True):
+            celda = lambda col: fila[col - 1] if col <= len(fila) else None
             try:
                 # Buscar productos válidos en diferentes columnas
                 for col in range(1, 6):
-                    cell_value = sheet.cell(row=row_num, column=col).value
+                    cell_value = celda(col)
                     
                     if (cell_value and isinstance(cell_value, str) and 
                         len(str(cell_value).strip()) > 5):
@@ -235,12 +181,12 @@ class InventarioPoscosechaWindow:
                             unidad = 'UND'
                             
                             for saldo_col in range(col + 1, min(col + 4, 8)):
-                                saldo_val = sheet.cell(row=row_num, column=saldo_col).value
+                                saldo_val = celda(saldo_col)
                                 if isinstance(saldo_val, (int, float)) and saldo_val >= 0:
                                     saldo = int(saldo_val)
                                     
                                     # Buscar unidad
-                                    unidad_val = sheet.cell(row=row_num, column=saldo_col + 1).value
+                                    unidad_val = celda(saldo_col + 1)
                                     if isinstance(unidad_val, str) and len(str(unidad_val).strip()) <= 10:
                                         unidad = str(unidad_val).strip().upper()
                                     break
@@ -418,22 +364,10 @@ class InventarioPoscosechaWindow:
         stats_container = tk.Frame(parent, bg='#ffffff')
         stats_container.pack(fill=tk.X, padx=20, pady=(0, 20))
         
-        # Obtener estadísticas de poscosecha
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM productos_poscosecha")
-        total = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM productos_poscosecha WHERE saldo <= stock_minimo AND saldo > 0")
-        bajo = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM productos_poscosecha WHERE saldo = 0")
-        agotado = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(DISTINCT categoria) FROM productos_poscosecha")
-        categorias = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT SUM(saldo * valor_unitario) FROM productos_poscosecha")
-        valor = cursor.fetchone()[0] or 0
+        # Obtener estadísticas de poscosecha (una pasada, en caché hasta el próximo movimiento)
+        stats = estadisticas(self.inventario)
+        total, bajo, agotado = stats['total'], stats['stock_bajo'], stats['sin_stock']
+        categorias, valor = stats['categorias'], stats['valor_total']
         
         # Cards específicas para poscosecha
         cards_data = [
@@ -492,8 +426,13 @@ class InventarioPoscosechaWindow:
         
         self.filter_categoria = tk.StringVar(value="Todas")
         self.filter_categoria.trace('w', self.on_search_change)
+        categorias = {"EMBALAJE", "QUIMICO", "ETIQUETA", "HERRAMIENTA", "GENERAL"}
+        try:
+            categorias.update(reference_data.categorias(self.inventario))
+        except Exception as e:
+            print(f"Error cargando categorías: {e}")
         categoria_combo = ttk.Combobox(categoria_frame, textvariable=self.filter_categoria,
-                                      values=["Todas", "EMBALAJE", "QUIMICO", "ETIQUETA", "HERRAMIENTA", "GENERAL"],
+                                      values=["Todas"] + sorted(categorias),
                                       state="readonly", font=('Segoe UI', 10))
         categoria_combo.pack(fill=tk.X, pady=(3, 0))
         
@@ -637,47 +576,23 @@ class InventarioPoscosechaWindow:
             for item in self.tree.get_children():
                 self.tree.delete(item)
             
-            # Query específica para poscosecha
-            query = "SELECT codigo, categoria, nombre, saldo, unidad, valor_unitario, stock_minimo, tipo_producto FROM productos_poscosecha WHERE 1=1"
-            params = []
-            
-            # Aplicar filtros específicos
-            if hasattr(self, 'search_var'):
-                texto = self.search_var.get().strip().lower()
-                if texto:
-                    query += " AND (LOWER(nombre) LIKE ? OR LOWER(codigo) LIKE ? OR LOWER(categoria) LIKE ?)"
-                    params.extend([f'%{texto}%', f'%{texto}%', f'%{texto}%'])
-            
-            if hasattr(self, 'filter_categoria'):
-                categoria = self.filter_categoria.get()
-                if categoria and categoria != "Todas":
-                    query += " AND categoria = ?"
-                    params.append(categoria)
-            
-            if hasattr(self, 'filter_tipo'):
-                tipo = self.filter_tipo.get()
-                if tipo and tipo != "Todos":
-                    query += " AND tipo_producto = ?"
-                    params.append(tipo)
-            
-            if hasattr(self, 'filter_stock'):
-                stock_filter = self.filter_stock.get()
-                if stock_filter == "Bajo":
-                    query += " AND saldo <= stock_minimo AND saldo > 0"
-                elif stock_filter == "Agotado":
-                    query += " AND saldo = 0"
-                elif stock_filter == "Normal":
-                    query += " AND saldo > stock_minimo"
-            
-            query += " ORDER BY categoria, codigo"
-            
-            # Ejecutar query
-            cursor = self.conn.cursor()
-            cursor.execute(query, params)
+            # Búsqueda por texto completo (ordenada por relevancia; sin texto, por categoría)
+            texto = self.search_var.get() if hasattr(self, 'search_var') else ''
+            categoria = self.filter_categoria.get() if hasattr(self, 'filter_categoria') else None
+            tipo = self.filter_tipo.get() if hasattr(self, 'filter_tipo') else None
+            stock_filter = self.filter_stock.get() if hasattr(self, 'filter_stock') else None
+            productos = self.inventario.productos(texto, categoria=categoria if categoria != "Todas" else None,
+                                                  estado_stock=stock_filter)
+            if tipo and tipo != "Todos":
+                productos = [p for p in productos if p.tipo_producto == tipo]
+            if not texto.strip():
+                productos.sort(key=lambda p: (p.categoria or '', p.codigo))
             productos_mostrados = 0
             
-            for row in cursor.fetchall():
-                codigo, categoria, nombre, saldo, unidad, valor_unit, stock_min, tipo_producto = row
+            for producto in productos:
+                codigo, categoria, nombre, saldo = producto.codigo, producto.categoria, producto.nombre, producto.saldo or 0
+                unidad, valor_unit, stock_min = producto.unidad, producto.valor_unitario or 0, producto.stock_minimo or 0
+                tipo_producto = producto.tipo_producto
                 
                 # Estados específicos para poscosecha
                 if saldo == 0:
@@ -705,8 +620,7 @@ class InventarioPoscosechaWindow:
             
             # Actualizar contador
             if hasattr(self, 'products_count_label'):
-                cursor.execute("SELECT COUNT(*) FROM productos_poscosecha")
-                total = cursor.fetchone()[0]
+                total = estadisticas(self.inventario)['total']
                 self.products_count_label.config(
                     text=f"Mostrando {productos_mostrados} de {total} productos"
                 )
@@ -766,9 +680,7 @@ class InventarioPoscosechaWindow:
         item = self.tree.item(selection[0])
         codigo = item['values'][0]
         
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM productos_poscosecha WHERE codigo = ?", (codigo,))
-        return cursor.fetchone()
+        return self.inventario.producto(str(codigo))
     
     def movimiento_entrada(self):
         """Abrir diálogo de entrada de stock"""
@@ -824,8 +736,15 @@ class InventarioPoscosechaWindow:
         messagebox.showinfo("Actualizado", "Stock de poscosecha actualizado")
     
     def reporte_poscosecha(self):
-        """Generar reporte específico de poscosecha"""
+        """Generar reporte específico de poscosecha (existencias de hoy o a una fecha de corte)"""
         try:
+            texto = simpledialog.askstring("Fecha de corte", "Existencias al día (DD/MM/AAAA).\nDeje vacío para hoy:",
+                                           parent=self.window)
+            if texto is None:
+                return
+            # Saldo a la fecha: cierre mensual anterior + movimientos del mes
+            corte = datetime.strptime(texto.strip(), '%d/%m/%Y').date() if texto.strip() else None
+            
             archivo = filedialog.asksaveasfilename(
                 defaultextension=".csv",
                 filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
@@ -833,27 +752,30 @@ class InventarioPoscosechaWindow:
             )
             
             if archivo:
-                cursor = self.conn.cursor()
-                cursor.execute("""
-                    SELECT codigo, categoria, nombre, saldo, unidad, valor_unitario, 
-                           stock_minimo, ubicacion, proveedor, tipo_producto,
-                           (saldo * valor_unitario) as valor_total
-                    FROM productos_poscosecha 
-                    ORDER BY categoria, codigo
-                """)
-                
-                productos = cursor.fetchall()
+                productos = self.inventario.productos_a_fecha(corte) if corte else self.inventario.productos()
+                productos.sort(key=lambda p: (p.categoria or '', p.codigo))
+                productos = [(p.codigo, p.categoria, p.nombre, p.saldo, p.unidad, p.valor_unitario,
+                              p.stock_minimo, p.ubicacion, p.proveedor, p.tipo_producto,
+                              (p.saldo or 0) * (p.valor_unitario or 0))
+                             for p in productos]
                 
                 with open(archivo, 'w', newline='', encoding='utf-8') as f:
                     writer = csv.writer(f)
                     writer.writerow(['=== REPORTE DE POSCOSECHA ==='])
                     writer.writerow([f'Generado: {datetime.now().strftime("%d/%m/%Y %H:%M:%S")}'])
+                    if corte:
+                        writer.writerow([f'Existencias al: {corte.strftime("%d/%m/%Y")}'])
                     writer.writerow([])
                     writer.writerow(['Código', 'Categoría', 'Producto', 'Saldo', 'Unidad', 'Valor Unit.',
                                    'Stock Mín.', 'Ubicación', 'Proveedor', 'Tipo', 'Valor Total'])
                     
                     for producto in productos:
                         writer.writerow(producto)
+                    
+                    valor_inventario = sum(producto[-1] or 0 for producto in productos)
+                    writer.writerow([])
+                    writer.writerow(['Valor total del inventario', f"${valor_inventario:,.0f}",
+                                     numero_a_letras(valor_inventario)])
                 
                 messagebox.showinfo("Éxito", f"Reporte de poscosecha generado: {archivo}")
                 
@@ -913,8 +835,6 @@ class InventarioPoscosechaWindow:
     
     def cerrar_ventana(self):
         """Cerrar ventana específica"""
-        if self.conn:
-            self.conn.close()
         self.window.destroy()
 
 
@@ -1028,17 +948,17 @@ class ProductoPoscosechaWindow:
         if not self.producto:
             return
         
-        self.entry_codigo.insert(0, self.producto[1] or "")
-        self.combo_categoria.set(self.producto[2] or "")
-        self.entry_nombre.insert(0, self.producto[3] or "")
-        self.entry_saldo.insert(0, str(self.producto[4] or ""))
-        self.combo_unidad.set(self.producto[5] or "")
-        self.entry_valor.insert(0, str(self.producto[6] or ""))
-        self.entry_stock_min.insert(0, str(self.producto[7] or ""))
-        self.entry_ubicacion.insert(0, self.producto[8] or "")
-        self.entry_proveedor.insert(0, self.producto[9] or "")
-        self.combo_tipo.set(self.producto[10] or "")
-        self.entry_lote.insert(0, self.producto[12] or "")
+        self.entry_codigo.insert(0, self.producto.codigo or "")
+        self.combo_categoria.set(self.producto.categoria or "")
+        self.entry_nombre.insert(0, self.producto.nombre or "")
+        self.entry_saldo.insert(0, str(self.producto.saldo or ""))
+        self.combo_unidad.set(self.producto.unidad or "")
+        self.entry_valor.insert(0, str(self.producto.valor_unitario or ""))
+        self.entry_stock_min.insert(0, str(self.producto.stock_minimo or ""))
+        self.entry_ubicacion.insert(0, self.producto.ubicacion or "")
+        self.entry_proveedor.insert(0, self.producto.proveedor or "")
+        self.combo_tipo.set(self.producto.tipo_producto or "")
+        self.entry_lote.insert(0, self.producto.lote or "")
         
         if self.modo == "editar":
             self.entry_codigo.config(state='disabled')
@@ -1060,58 +980,35 @@ class ProductoPoscosechaWindow:
                 messagebox.showerror("Error", "Los valores numéricos no son válidos")
                 return
             
-            cursor = self.main_window.conn.cursor()
+            datos = {
+                'codigo': self.entry_codigo.get().strip(),
+                'categoria': self.combo_categoria.get(),
+                'nombre': self.entry_nombre.get().strip(),
+                'saldo': saldo,
+                'unidad': self.combo_unidad.get(),
+                'valor_unitario': valor,
+                'stock_minimo': stock_min,
+                'ubicacion': self.entry_ubicacion.get().strip(),
+                'proveedor': self.entry_proveedor.get().strip(),
+                'tipo_producto': self.combo_tipo.get(),
+                'lote': self.entry_lote.get().strip()
+            }
+            inventario = self.main_window.inventario
             
             if self.modo == "nuevo":
                 # Verificar código único
-                cursor.execute("SELECT id FROM productos_poscosecha WHERE codigo = ?", 
-                             (self.entry_codigo.get().strip(),))
-                if cursor.fetchone():
+                if inventario.producto(datos['codigo']):
                     messagebox.showerror("Error", "El código ya existe")
                     return
                 
-                # Insertar nuevo
-                cursor.execute('''
-                    INSERT INTO productos_poscosecha 
-                    (codigo, categoria, nombre, saldo, unidad, valor_unitario, stock_minimo, ubicacion, proveedor, tipo_producto, lote)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    self.entry_codigo.get().strip(),
-                    self.combo_categoria.get(),
-                    self.entry_nombre.get().strip(),
-                    saldo,
-                    self.combo_unidad.get(),
-                    valor,
-                    stock_min,
-                    self.entry_ubicacion.get().strip(),
-                    self.entry_proveedor.get().strip(),
-                    self.combo_tipo.get(),
-                    self.entry_lote.get().strip()
-                ))
+                # Insertar nuevo (el saldo inicial se asienta en el libro)
+                inventario.guardar_producto(datos)
                 mensaje = "Producto de poscosecha creado exitosamente"
             else:
-                # Actualizar existente
-                cursor.execute('''
-                    UPDATE productos_poscosecha SET 
-                    categoria=?, nombre=?, saldo=?, unidad=?, valor_unitario=?, 
-                    stock_minimo=?, ubicacion=?, proveedor=?, tipo_producto=?, lote=?
-                    WHERE codigo=?
-                ''', (
-                    self.combo_categoria.get(),
-                    self.entry_nombre.get().strip(),
-                    saldo,
-                    self.combo_unidad.get(),
-                    valor,
-                    stock_min,
-                    self.entry_ubicacion.get().strip(),
-                    self.entry_proveedor.get().strip(),
-                    self.combo_tipo.get(),
-                    self.entry_lote.get().strip(),
-                    self.entry_codigo.get().strip()
-                ))
+                # Actualizar existente (un cambio de saldo queda como ajuste)
+                inventario.guardar_producto(datos, codigo_original=datos['codigo'])
                 mensaje = "Producto de poscosecha actualizado exitosamente"
             
-            self.main_window.conn.commit()
             messagebox.showinfo("Éxito", mensaje)
             
             # Actualizar tabla principal
@@ -1248,9 +1145,8 @@ class MovimientoPoscosechaWindow:
                  relief='flat', bd=0, padx=20, pady=10, cursor='hand2').pack(side=tk.LEFT, padx=5)
     
     def cargar_productos(self):
-        cursor = self.main_window.conn.cursor()
-        cursor.execute("SELECT codigo, nombre FROM productos_poscosecha ORDER BY codigo")
-        productos = [f"{row[0]} - {row[1]}" for row in cursor.fetchall()]
+        productos = [f"{codigo} - {nombre}"
+                     for _, codigo, nombre in reference_data.productos_combo(self.main_window.inventario)]
         self.combo_producto['values'] = productos
     
     def registrar(self):
@@ -1265,48 +1161,21 @@ class MovimientoPoscosechaWindow:
             if cantidad <= 0:
                 raise ValueError("Cantidad debe ser mayor a 0")
             
-            cursor = self.main_window.conn.cursor()
-            
-            # Obtener producto
-            cursor.execute("SELECT id, saldo FROM productos_poscosecha WHERE codigo = ?", (codigo,))
-            resultado = cursor.fetchone()
-            if not resultado:
-                messagebox.showerror("Error", "Producto no encontrado")
-                return
-            
-            producto_id, saldo_actual = resultado
-            
-            # Validar stock para salidas
-            if self.tipo == 'salida' and cantidad > saldo_actual:
-                messagebox.showerror("Error", f"Stock insuficiente. Disponible: {saldo_actual}")
-                return
-            
-            # Nuevo saldo
-            nuevo_saldo = saldo_actual + cantidad if self.tipo == 'entrada' else saldo_actual - cantidad
-            
-            # Registrar movimiento
             factura = getattr(self, 'entry_factura', None)
             proveedor = getattr(self, 'entry_proveedor', None)
             destino = getattr(self, 'entry_destino', None)
+            responsable = getattr(self, 'entry_responsable', None)
             
-            cursor.execute('''
-                INSERT INTO movimientos_poscosecha 
-                (producto_id, tipo, cantidad, fecha, factura, proveedor, destino, observaciones, responsable)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                producto_id, self.tipo, cantidad, date.today(),
-                factura.get() if factura else None,
-                proveedor.get() if proveedor else None,
-                destino.get() if destino else None,
-                self.entry_observaciones.get(),
-                self.entry_responsable.get()
-            ))
-            
-            # Actualizar saldo
-            cursor.execute("UPDATE productos_poscosecha SET saldo = ? WHERE id = ?", 
-                         (nuevo_saldo, producto_id))
+            # Movimiento y saldo en una sola transacción (valida el stock disponible)
+            self.main_window.inventario.registrar_movimiento(
+                codigo, self.tipo, cantidad,
+                responsable=responsable.get() if responsable else '',
+                observaciones=self.entry_observaciones.get(),
+                factura=factura.get() if factura else None,
+                proveedor=proveedor.get() if proveedor else None,
+                destino=destino.get() if destino else None
+            )
             
-            self.main_window.conn.commit()
             messagebox.showinfo("Éxito", f"{self.tipo.title()} de poscosecha registrada correctamente")
             
             # Actualizar tabla
@@ -15,12 +15,13 @@ from tkinter import ttk, messagebox, filedialog
 import sys
 import os
 from datetime import datetime, date, timedelta
-import sqlite3
 import csv
 import json
 from pathlib import Path
 import threading
 import time
+from utils import inventario_stats, reference_data
+from utils.inventario_engine import get_inventario
 
 # Intentar importar librerías opcionales
 try:
@@ -37,6 +38,9 @@ try:
 except ImportError:
     MATPLOTLIB_AVAILABLE = False
 
+# Días de anticipación para las alertas de vencimiento
+DIAS_ALERTA_VENCIMIENTO = 30
+
 class SistemaInventarioQuimicos:
     """Sistema principal mejorado"""
     
@@ -47,7 +51,7 @@ class SistemaInventarioQuimicos:
         self.root.configure(bg='#f8f9fa')
         
         # Variables del sistema
-        self.conn = None
+        self.inventario = None
         self.notification_queue = []
         self.auto_backup_enabled = True
         
@@ -93,14 +97,11 @@ class SistemaInventarioQuimicos:
             messagebox.showerror("Error", f"Error configurando sistema: {e}")
     
     def setup_database(self):
-        """Configurar base de datos mejorada"""
+        """Motor del inventario de químicos (la misma base que la ventana principal)"""
         try:
-            db_path = self.db_dir / 'inventario_quimicos_avanzado.db'
-            self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
-            self.conn.execute("PRAGMA foreign_keys = ON")
-            
-            # Crear tablas mejoradas
-            self.crear_tablas_avanzadas()
+            self.inventario = get_inventario('quimicos')
+            self.db_path = self.inventario.db_path
+            self.migrar_base_avanzada()
             
             print("✅ Base de datos configurada")
             
@@ -108,139 +109,15 @@ class SistemaInventarioQuimicos:
             print(f"❌ Error en base de datos: {e}")
             messagebox.showerror("Error", f"Error configurando base de datos: {e}")
     
-    def crear_tablas_avanzadas(self):
-        """Crear tablas con funcionalidades avanzadas"""
-        cursor = self.conn.cursor()
-        
-        # Tabla principal de productos químicos mejorada
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS productos_quimicos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                codigo TEXT UNIQUE NOT NULL,
-                clase TEXT NOT NULL,
-                nombre TEXT NOT NULL,
-                descripcion TEXT,
-                saldo_real INTEGER DEFAULT 0,
-                unidad TEXT NOT NULL,
-                valor_unitario REAL NOT NULL,
-                stock_minimo INTEGER DEFAULT 0,
-                stock_maximo INTEGER DEFAULT 1000,
-                ubicacion TEXT,
-                proveedor TEXT,
-                fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                nivel_peligrosidad TEXT DEFAULT 'MEDIO',
-                ingrediente_activo TEXT,
-                concentracion TEXT,
-                numero_registro TEXT,
-                fecha_vencimiento DATE,
-                lote TEXT,
-                activo BOOLEAN DEFAULT 1,
-                notas TEXT
-            )
-        ''')
-        
-        # Tabla de movimientos mejorada
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS movimientos_quimicos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                producto_id INTEGER,
-                tipo TEXT NOT NULL,
-                cantidad INTEGER NOT NULL,
-                cantidad_anterior INTEGER,
-                cantidad_nueva INTEGER,
-                fecha DATE NOT NULL,
-                hora TIME DEFAULT CURRENT_TIME,
-                factura TEXT,
-                orden_compra TEXT,
-                proveedor TEXT,
-                destino TEXT,
-                area_aplicacion TEXT,
-                cultivo TEXT,
-                valor_unitario REAL,
-                valor_total REAL,
-                observaciones TEXT,
-                responsable TEXT,
-                autorizado_por TEXT,
-                fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (producto_id) REFERENCES productos_quimicos (id)
-            )
-        ''')
-        
-        # Tabla de alertas del sistema
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS alertas_sistema (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                tipo TEXT NOT NULL,
-                titulo TEXT NOT NULL,
-                mensaje TEXT NOT NULL,
-                nivel TEXT DEFAULT 'INFO',
-                fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                leida BOOLEAN DEFAULT 0,
-                producto_id INTEGER,
-                datos_json TEXT,
-                FOREIGN KEY (producto_id) REFERENCES productos_quimicos (id)
-            )
-        ''')
-        
-        # Tabla de configuraciones
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS configuraciones (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                clave TEXT UNIQUE NOT NULL,
-                valor TEXT,
-                descripcion TEXT,
-                fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Tabla de backup log
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS backup_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                archivo TEXT NOT NULL,
-                fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                tamaño INTEGER,
-                tipo TEXT DEFAULT 'AUTO',
-                estado TEXT DEFAULT 'EXITOSO'
-            )
-        ''')
-        
-        # Triggers para auditoría
-        cursor.execute('''
-            CREATE TRIGGER IF NOT EXISTS actualizar_fecha_producto
-            AFTER UPDATE ON productos_quimicos
-            BEGIN
-                UPDATE productos_quimicos 
-                SET fecha_actualizacion = CURRENT_TIMESTAMP 
-                WHERE id = NEW.id;
-            END;
-        ''')
-        
-        self.conn.commit()
-        self.insertar_configuraciones_default()
-    
-    def insertar_configuraciones_default(self):
-        """Insertar configuraciones por defecto"""
-        cursor = self.conn.cursor()
-        
-        configs_default = [
-            ('auto_backup_intervalo', '24', 'Intervalo de backup automático en horas'),
-            ('stock_alerta_dias', '7', 'Días de anticipación para alertas de stock'),
-            ('vencimiento_alerta_dias', '30', 'Días de anticipación para alertas de vencimiento'),
-            ('empresa_nombre', 'Empresa Agrícola', 'Nombre de la empresa'),
-            ('responsable_default', 'Administrador', 'Responsable por defecto'),
-            ('moneda', 'COP', 'Moneda del sistema'),
-            ('backup_auto_enabled', '1', 'Backup automático habilitado')
-        ]
-        
-        for clave, valor, desc in configs_default:
-            cursor.execute('''
-                INSERT OR IGNORE INTO configuraciones (clave, valor, descripcion)
-                VALUES (?, ?, ?)
-            ''', (clave, valor, desc))
-        
-        self.conn.commit()
+    def migrar_base_avanzada(self):
+        """Traer una sola vez los productos de la base propia que usaba esta ventana"""
+        anterior = self.db_dir / 'inventario_quimicos_avanzado.db'
+        if not anterior.exists():
+            return
+        nuevos = self.inventario.importar_base_anterior(str(anterior), {'saldo_real': 'saldo'})
+        # El archivo queda renombrado (con su historial) para no volver a importarlo
+        anterior.rename(anterior.with_name(anterior.name + '.migrada'))
+        self.log_activity(f"{nuevos} productos migrados desde {anterior.name}")
     
     def configurar_estilos(self):
         """Configurar estilos mejorados"""
@@ -447,6 +324,7 @@ class SistemaInventarioQuimicos:
         ]
         
         self.filter_vars = {}
+        self.filter_combos = {}
         for label_text, var_name, values in filter_configs:
             filter_frame = tk.Frame(filters_frame, bg='white')
             filter_frame.pack(fill=tk.X, pady=3)
@@ -462,6 +340,7 @@ class SistemaInventarioQuimicos:
                                 values=values, state="readonly", 
                                 font=('Segoe UI', 9))
             combo.pack(fill=tk.X, pady=(3, 0))
+            self.filter_combos[var_name] = combo
         
         # Botón limpiar filtros
         clear_btn = tk.Button(filters_frame, text="🗑️ Limpiar Filtros", 
@@ -648,9 +527,7 @@ class SistemaInventarioQuimicos:
             self.log_activity("Inicializando sistema...")
             
             # Poblar datos si es necesario
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM productos_quimicos")
-            count = cursor.fetchone()[0]
+            count = self.inventario.contar()
             
             if count == 0:
                 self.populate_sample_data()
@@ -669,8 +546,6 @@ class SistemaInventarioQuimicos:
     
     def populate_sample_data(self):
         """Poblar datos de ejemplo mejorados"""
-        cursor = self.conn.cursor()
-        
         productos_ejemplo = [
             # (codigo, clase, nombre, descripcion, saldo, unidad, valor_unit, stock_min, stock_max, ubicacion, proveedor, nivel_peligro, ingrediente_activo, concentracion, numero_registro, fecha_venc, lote)
             ('QM001', 'ACARICIDA', 'Abafed', 'Acaricida sistémico de amplio espectro', 32000, 'C.C', 80, 5000, 50000, 'A-01', 'AGROQUIMICOS ANDINOS', 'ALTO', 'Abamectina', '1.8% EC', 'ICA-001', '2025-12-31', 'LT2024001'),
@@ -683,29 +558,23 @@ class SistemaInventarioQuimicos:
             ('QM008', 'FUNGICIDA', 'Propiconazole', 'Fungicida sistémico triazol', 3200, 'ML', 180, 500, 8000, 'A-05', 'CORTEVA AGRISCIENCE', 'ALTO', 'Propiconazol', '25% EC', 'ICA-008', '2025-11-28', 'LT2024008')
         ]
         
-        for producto in productos_ejemplo:
-            cursor.execute('''
-                INSERT INTO productos_quimicos 
-                (codigo, clase, nombre, descripcion, saldo_real, unidad, valor_unitario, 
-                 stock_minimo, stock_maximo, ubicacion, proveedor, nivel_peligrosidad, 
-                 ingrediente_activo, concentracion, numero_registro, fecha_vencimiento, lote)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', producto)
-        
-        self.conn.commit()
+        columnas = ('codigo', 'clase', 'nombre', 'descripcion', 'saldo', 'unidad', 'valor_unitario',
+                    'stock_minimo', 'stock_maximo', 'ubicacion', 'proveedor', 'nivel_peligrosidad',
+                    'ingrediente_activo', 'concentracion', 'numero_registro', 'fecha_vencimiento', 'lote')
+        self.inventario.insertar_productos(dict(zip(columnas, producto)) for producto in productos_ejemplo)
         print(f"✅ {len(productos_ejemplo)} productos de ejemplo creados")
     
     def load_providers_for_filters(self):
-        """Cargar proveedores para filtros"""
+        """Cargar proveedores (y clases registradas) para filtros"""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT DISTINCT proveedor FROM productos_quimicos WHERE proveedor IS NOT NULL ORDER BY proveedor")
-            proveedores = ["Todos"] + [row[0] for row in cursor.fetchall()]
-            
-            if 'filter_proveedor' in self.filter_vars:
-                combo = None
-                # Encontrar el combo de proveedores y actualizar sus valores
-                # (Esto requeriría una referencia al widget, se implementaría en versión completa)
+            combos = getattr(self, 'filter_combos', {})
+            if 'filter_proveedor' in combos:
+                combos['filter_proveedor']['values'] = ["Todos"] + list(
+                    reference_data.proveedores(self.inventario))
+            if 'filter_clase' in combos:
+                clases = set(combos['filter_clase']['values'][1:])
+                clases.update(reference_data.categorias(self.inventario))
+                combos['filter_clase']['values'] = ["Todas"] + sorted(clases)
                 
         except Exception as e:
             print(f"Error cargando proveedores: {e}")
@@ -717,33 +586,21 @@ class SistemaInventarioQuimicos:
             for item in self.inventory_tree.get_children():
                 self.inventory_tree.delete(item)
             
-            # Construir query con filtros
-            query = """
-                SELECT codigo, clase, nombre, saldo_real, unidad, valor_unitario, 
-                       stock_minimo, nivel_peligrosidad, proveedor, fecha_vencimiento
-                FROM productos_quimicos 
-                WHERE activo = 1
-            """
-            params = []
-            
-            # Aplicar filtros (si existen)
-            if hasattr(self, 'search_var') and self.search_var.get().strip():
-                search_term = f"%{self.search_var.get().strip().lower()}%"
-                query += " AND (LOWER(nombre) LIKE ? OR LOWER(codigo) LIKE ? OR LOWER(clase) LIKE ?)"
-                params.extend([search_term, search_term, search_term])
-            
-            # Filtros adicionales se aplicarían aquí
-            
-            query += " ORDER BY clase, codigo"
-            
-            cursor = self.conn.cursor()
-            cursor.execute(query, params)
+            # Búsqueda por texto completo (ordenada por relevancia; sin texto, por clase)
+            texto = self.search_var.get() if hasattr(self, 'search_var') else ''
+            productos = self.inventario.productos(texto, solo_activos=True)
+            if not texto.strip():
+                productos.sort(key=lambda p: (p.clase or '', p.codigo))
             
             productos_mostrados = 0
             productos_criticos = 0
             
-            for row in cursor.fetchall():
-                codigo, clase, nombre, saldo, unidad, valor_unit, stock_min, nivel_peligro, proveedor, fecha_venc = row
+            for producto in productos:
+                codigo, clase, nombre, saldo, unidad = (producto.codigo, producto.clase, producto.nombre,
+                                                        producto.saldo or 0, producto.unidad)
+                valor_unit, stock_min = producto.valor_unitario or 0, producto.stock_minimo or 0
+                nivel_peligro, proveedor, fecha_venc = (producto.nivel_peligrosidad, producto.proveedor,
+                                                        producto.fecha_vencimiento)
                 
                 # Determinar estado del stock
                 if saldo == 0:
@@ -778,7 +635,7 @@ class SistemaInventarioQuimicos:
                         if dias_para_vencer < 0:
                             vence_texto = "🔴 VENCIDO"
                             tags += ('vencido',)
-                        elif dias_para_vencer <= 30:
+                        elif dias_para_vencer <= DIAS_ALERTA_VENCIMIENTO:
                             vence_texto = f"⚠️ {dias_para_vencer}d"
                             tags += ('por_vencer',)
                         else:
@@ -810,8 +667,7 @@ class SistemaInventarioQuimicos:
             
             # Actualizar contador
             if hasattr(self, 'inventory_count_label'):
-                cursor.execute("SELECT COUNT(*) FROM productos_quimicos WHERE activo = 1")
-                total = cursor.fetchone()[0]
+                total = self.estadisticas()['activos']
                 self.inventory_count_label.config(
                     text=f"Mostrando {productos_mostrados} de {total} productos • {productos_criticos} requieren atención"
                 )
@@ -823,6 +679,10 @@ class SistemaInventarioQuimicos:
             messagebox.showerror("Error", f"Error cargando inventario: {e}")
             return 0
     
+    def estadisticas(self):
+        """Indicadores del inventario en una pasada (en caché hasta la próxima escritura)"""
+        return inventario_stats.estadisticas(self.inventario, DIAS_ALERTA_VENCIMIENTO)
+    
     def update_statistics(self):
         """Actualizar estadísticas en tiempo real"""
         try:
@@ -830,22 +690,19 @@ class SistemaInventarioQuimicos:
             for widget in self.stats_container.winfo_children():
                 widget.destroy()
             
-            cursor = self.conn.cursor()
-            
-            # Obtener estadísticas
-            stats_queries = [
-                ("SELECT COUNT(*) FROM productos_quimicos WHERE activo = 1", "Total Productos", "📦"),
-                ("SELECT COUNT(*) FROM productos_quimicos WHERE saldo_real = 0 AND activo = 1", "Sin Stock", "🔴"),
-                ("SELECT COUNT(*) FROM productos_quimicos WHERE saldo_real <= stock_minimo AND saldo_real > 0 AND activo = 1", "Stock Bajo", "🟡"),
-                ("SELECT COUNT(*) FROM productos_quimicos WHERE nivel_peligrosidad = 'ALTO' AND activo = 1", "Alto Riesgo", "⚠️"),
-                ("SELECT COALESCE(SUM(saldo_real * valor_unitario), 0) FROM productos_quimicos WHERE activo = 1", "Valor Total", "💰")
+            stats = self.estadisticas()
+            tarjetas = [
+                ('activos', "Total Productos", "📦"),
+                ('sin_stock', "Sin Stock", "🔴"),
+                ('stock_bajo', "Stock Bajo", "🟡"),
+                ('alto_riesgo', "Alto Riesgo", "⚠️"),
+                ('valor_total', "Valor Total", "💰")
             ]
             
             colors = ['#3498db', '#e74c3c', '#f39c12', '#e67e22', '#27ae60']
             
-            for i, (query, label, icon) in enumerate(stats_queries):
-                cursor.execute(query)
-                value = cursor.fetchone()[0]
+            for i, (indicador, label, icon) in enumerate(tarjetas):
+                value = stats[indicador]
                 
                 if label == "Valor Total":
                     value_text = f"${value:,.0f}"
@@ -888,12 +745,8 @@ class SistemaInventarioQuimicos:
             current_time = datetime.now().strftime("%d/%m/%Y - %H:%M")
             
             # Actualizar estadísticas rápidas
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM productos_quimicos WHERE activo = 1")
-            total = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM productos_quimicos WHERE saldo_real <= stock_minimo AND activo = 1")
-            alertas = cursor.fetchone()[0]
+            stats = self.estadisticas()
+            total, alertas = stats['activos'], stats['bajo_minimo']
             
             stats_text = f"📦 {total} productos • ⚠️ {alertas} alertas"
             
@@ -988,9 +841,7 @@ class SistemaInventarioQuimicos:
         codigo = item['values'][0]
         
         # Obtener datos completos del producto
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM productos_quimicos WHERE codigo = ?", (codigo,))
-        producto = cursor.fetchone()
+        producto = self.inventario.producto(str(codigo))
         
         if producto:
             ProductDialog(self.root, self, mode="edit", product_data=producto)
@@ -1062,9 +913,7 @@ class SistemaInventarioQuimicos:
             item = self.inventory_tree.item(selection[0])
             codigo = item['values'][0]
             
-            cursor = self.conn.cursor()
-            cursor.execute("UPDATE productos_quimicos SET activo = 0 WHERE codigo = ?", (codigo,))
-            self.conn.commit()
+            self.inventario.guardar_producto({'activo': 0}, codigo_original=str(codigo))
             
             self.refresh_all_data()
             messagebox.showinfo("Éxito", "Producto desactivado correctamente")
@@ -1168,19 +1017,11 @@ class SistemaInventarioQuimicos:
             backup_filename = f"backup_quimicos_{timestamp}.db"
             backup_path = self.backup_dir / backup_filename
             
-            # Crear backup
-            with open(self.conn.execute("PRAGMA database_list").fetchone()[2], 'rb') as source:
-                with open(backup_path, 'wb') as backup:
-                    backup.write(source.read())
+            # Crear backup (copia consistente aunque haya movimientos en curso)
+            file_size = self.inventario.respaldar(str(backup_path))
             
-            # Registrar en log de backups
-            cursor = self.conn.cursor()
-            file_size = backup_path.stat().st_size
-            cursor.execute('''
-                INSERT INTO backup_log (archivo, tamaño, tipo)
-                VALUES (?, ?, ?)
-            ''', (str(backup_path), file_size, tipo))
-            self.conn.commit()
+            # Registrar en el log del sistema
+            self.log_activity(f"Backup {tipo} creado: {backup_path} ({file_size} bytes)")
             
             return str(backup_path)
             
@@ -1192,21 +1033,9 @@ class SistemaInventarioQuimicos:
         """Configurar sistema de notificaciones"""
         def check_notifications():
             try:
-                # Verificar stock bajo
-                cursor = self.conn.cursor()
-                cursor.execute("""
-                    SELECT COUNT(*) FROM productos_quimicos 
-                    WHERE saldo_real <= stock_minimo AND activo = 1
-                """)
-                stock_bajo = cursor.fetchone()[0]
-                
-                # Verificar productos por vencer
-                cursor.execute("""
-                    SELECT COUNT(*) FROM productos_quimicos 
-                    WHERE fecha_vencimiento <= date('now', '+30 days') 
-                    AND fecha_vencimiento > date('now') AND activo = 1
-                """)
-                por_vencer = cursor.fetchone()[0]
+                # Stock bajo y productos por vencer
+                stats = self.estadisticas()
+                stock_bajo, por_vencer = stats['bajo_minimo'], stats['por_vencer']
                 
                 # Generar notificaciones si es necesario
                 if stock_bajo > 0:
@@ -1227,14 +1056,10 @@ class SistemaInventarioQuimicos:
         self.root.after(5000, schedule_check)
     
     def create_alert(self, tipo, mensaje, nivel="INFO"):
-        """Crear alerta en el sistema"""
+        """Registrar alerta en el log y en la barra de estado"""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                INSERT INTO alertas_sistema (tipo, titulo, mensaje, nivel)
-                VALUES (?, ?, ?, ?)
-            ''', (tipo, f"Alerta: {tipo}", mensaje, nivel))
-            self.conn.commit()
+            self.log_activity(f"Alerta {tipo}: {mensaje}", nivel)
+            self.update_status(f"⚠️ {mensaje}")
             
         except Exception as e:
             print(f"Error creando alerta: {e}")
@@ -1255,9 +1080,7 @@ class SistemaInventarioQuimicos:
             if self.auto_backup_enabled:
                 self.create_backup("CIERRE")
             
-            # Cerrar conexión BD
-            if self.conn:
-                self.conn.close()
+            # La conexión del motor es compartida con la ventana principal: no se cierra aquí
             
             self.log_activity("Sistema cerrado correctamente")
             self.root.destroy()
@@ -1340,7 +1163,7 @@ class ProductDialog:
             ("Ingrediente Activo:", "ingrediente_activo", "entry", None),
             ("Concentración:", "concentracion", "entry", None),
             ("Número de Registro:", "numero_registro", "entry", None),
-            ("Stock Actual*:", "saldo_real", "entry", None),
+            ("Stock Actual*:", "saldo", "entry", None),
             ("Unidad*:", "unidad", "combo", ["C.C", "ML", "LT", "GR", "KG", "UND", "GAL"]),
             ("Valor Unitario*:", "valor_unitario", "entry", None),
             ("Stock Mínimo*:", "stock_minimo", "entry", None),
@@ -1423,30 +1246,20 @@ class ProductDialog:
         if not self.product_data:
             return
         
-        # Mapear campos de BD a widgets
-        field_mapping = {
-            1: 'codigo', 2: 'clase', 3: 'nombre', 4: 'descripcion', 5: 'saldo_real',
-            6: 'unidad', 7: 'valor_unitario', 8: 'stock_minimo', 9: 'stock_maximo',
-            10: 'ubicacion', 11: 'proveedor', 14: 'nivel_peligrosidad', 
-            15: 'ingrediente_activo', 16: 'concentracion', 17: 'numero_registro',
-            18: 'fecha_vencimiento', 19: 'lote', 21: 'notas'
-        }
-        
-        for db_index, widget_name in field_mapping.items():
-            if widget_name in self.widgets and db_index < len(self.product_data):
-                value = self.product_data[db_index]
-                widget = self.widgets[widget_name]
-                
-                if isinstance(widget, tk.Text):
-                    widget.delete('1.0', tk.END)
-                    if value:
-                        widget.insert('1.0', str(value))
-                elif isinstance(widget, ttk.Combobox):
-                    widget.set(str(value) if value else "")
-                else:
-                    widget.delete(0, tk.END)
-                    if value is not None:
-                        widget.insert(0, str(value))
+        # Cada widget se llama como su columna en el motor
+        for widget_name, widget in self.widgets.items():
+            value = getattr(self.product_data, widget_name, None)
+            
+            if isinstance(widget, tk.Text):
+                widget.delete('1.0', tk.END)
+                if value:
+                    widget.insert('1.0', str(value))
+            elif isinstance(widget, ttk.Combobox):
+                widget.set(str(value) if value else "")
+            else:
+                widget.delete(0, tk.END)
+                if value is not None:
+                    widget.insert(0, str(value))
         
         # Deshabilitar código en modo edición
         if self.mode == "edit":
@@ -1464,7 +1277,7 @@ class ProductDialog:
     def save_product(self):
         try:
             # Validar campos obligatorios
-            required_fields = ['codigo', 'clase', 'nombre', 'saldo_real', 'unidad', 'valor_unitario', 'stock_minimo', 'nivel_peligrosidad']
+            required_fields = ['codigo', 'clase', 'nombre', 'saldo', 'unidad', 'valor_unitario', 'stock_minimo', 'nivel_peligrosidad']
             
             for field in required_fields:
                 widget = self.widgets[field]
@@ -1480,7 +1293,7 @@ class ProductDialog:
             
             # Validar valores numéricos
             try:
-                saldo_real = int(self.widgets['saldo_real'].get())
+                saldo = int(self.widgets['saldo'].get())
                 valor_unitario = float(self.widgets['valor_unitario'].get())
                 stock_minimo = int(self.widgets['stock_minimo'].get())
                 stock_maximo = int(self.widgets['stock_maximo'].get() or 1000)
@@ -1496,53 +1309,22 @@ class ProductDialog:
                 else:
                     data[field_name] = widget.get().strip()
             
-            cursor = self.main_app.conn.cursor()
+            data.update(saldo=saldo, valor_unitario=valor_unitario, stock_minimo=stock_minimo,
+                        stock_maximo=stock_maximo, fecha_vencimiento=data['fecha_vencimiento'] or None)
             
-            if self.mode == "create":
-                # Verificar código único
-                cursor.execute("SELECT id FROM productos_quimicos WHERE codigo = ?", (data['codigo'],))
-                if cursor.fetchone():
-                    messagebox.showerror("Error", "El código ya existe")
-                    return
-                
-                # Insertar nuevo producto
-                cursor.execute('''
-                    INSERT INTO productos_quimicos 
-                    (codigo, clase, nombre, descripcion, saldo_real, unidad, valor_unitario, 
-                     stock_minimo, stock_maximo, ubicacion, proveedor, nivel_peligrosidad, 
-                     ingrediente_activo, concentracion, numero_registro, fecha_vencimiento, lote, notas)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    data['codigo'], data['clase'], data['nombre'], data['descripcion'],
-                    saldo_real, data['unidad'], valor_unitario, stock_minimo, stock_maximo,
-                    data['ubicacion'], data['proveedor'], data['nivel_peligrosidad'],
-                    data['ingrediente_activo'], data['concentracion'], data['numero_registro'],
-                    data['fecha_vencimiento'] or None, data['lote'], data['notas']
-                ))
-                
-                mensaje = "Producto creado exitosamente"
-                
-            else:
-                # Actualizar producto existente
-                cursor.execute('''
-                    UPDATE productos_quimicos SET 
-                    clase=?, nombre=?, descripcion=?, saldo_real=?, unidad=?, valor_unitario=?, 
-                    stock_minimo=?, stock_maximo=?, ubicacion=?, proveedor=?, nivel_peligrosidad=?, 
-                    ingrediente_activo=?, concentracion=?, numero_registro=?, fecha_vencimiento=?, 
-                    lote=?, notas=?
-                    WHERE codigo=?
-                ''', (
-                    data['clase'], data['nombre'], data['descripcion'], saldo_real,
-                    data['unidad'], valor_unitario, stock_minimo, stock_maximo,
-                    data['ubicacion'], data['proveedor'], data['nivel_peligrosidad'],
-                    data['ingrediente_activo'], data['concentracion'], data['numero_registro'],
-                    data['fecha_vencimiento'] or None, data['lote'], data['notas'],
-                    data['codigo']
-                ))
-                
-                mensaje = "Producto actualizado exitosamente"
+            # Un saldo distinto del actual queda como ajuste en el libro de movimientos
+            try:
+                if self.mode == "create":
+                    self.main_app.inventario.guardar_producto(data)
+                    mensaje = "Producto creado exitosamente"
+                else:
+                    self.main_app.inventario.guardar_producto(data, codigo_original=data['codigo'])
+                    mensaje = "Producto actualizado exitosamente"
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
             
-            self.main_app.conn.commit()
+            self.main_app.load_providers_for_filters()
             
             # Log de actividad
             self.main_app.log_activity(f"Producto {data['codigo']} {'creado' if self.mode == 'create' else 'actualizado'}")
@@ -1753,10 +1535,8 @@ class MovementDialog:
         frm.pack(fill=tk.BOTH, expand=True)
 
         tk.Label(frm, text="Producto:").grid(row=0, column=0, sticky='w')
-        cursor = self.app.conn.cursor()
-        cursor.execute("SELECT id, codigo, nombre FROM productos_quimicos WHERE activo=1")
-        productos = cursor.fetchall()
-        self.map = {f"{codigo} - {nombre}": pid for pid, codigo, nombre in productos}
+        productos = reference_data.productos_combo(self.app.inventario, solo_activos=True)
+        self.map = {f"{codigo} - {nombre}": codigo for _, codigo, nombre in productos}
         self.combo = ttk.Combobox(frm, values=list(self.map.keys()), state='readonly')
         self.combo.grid(row=0, column=1, pady=5)
 
@@ -1781,22 +1561,16 @@ class MovementDialog:
         except ValueError:
             messagebox.showerror("Error", "Cantidad inválida")
             return
-        pid = self.map[sel]
-        cursor = self.app.conn.cursor()
-        cursor.execute("SELECT saldo_real FROM productos_quimicos WHERE id=?", (pid,))
-        antes = cursor.fetchone()[0]
-        nuevo = antes + qty if self.tipo == 'entrada' else antes - qty
-        if nuevo < 0:
-            messagebox.showerror("Error", "Stock insuficiente")
+        # Asiento en el libro de movimientos: el motor valida cantidad y saldo y lo actualiza
+        try:
+            self.app.inventario.registrar_movimiento(self.map[sel], self.tipo, qty,
+                                                     responsable=self.resp_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        except Exception as e:
+            messagebox.showerror("Error", f"Error registrando movimiento: {e}")
             return
-        cursor.execute(
-            "INSERT INTO movimientos_quimicos "
-            "(producto_id, tipo, cantidad, cantidad_anterior, cantidad_nueva, responsable) "
-            "VALUES (?, ?, ?, ?, ?, ?)",
-            (pid, self.tipo, qty, antes, nuevo, self.resp_var.get())
-        )
-        cursor.execute("UPDATE productos_quimicos SET saldo_real=? WHERE id=?", (nuevo, pid))
-        self.app.conn.commit()
         messagebox.showinfo("Éxito", f"{'Entrada' if self.tipo=='entrada' else 'Salida'} registrada con éxito")
         self.app.refresh_all_data()
         self.window.destroy()
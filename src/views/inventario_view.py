@@ -7,9 +7,9 @@ Maneja entradas y salidas de productos para todos los sistemas
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
 from datetime import datetime, date
-import os
+from utils.historial_movimientos import HistorialMovimientos, cargar_al_desplazar, fecha_filtro
+from utils.inventario_engine import get_inventario
 
 class MovimientoInventarioWindow:
     """Ventana para registrar movimientos de inventario"""
@@ -34,49 +34,8 @@ class MovimientoInventarioWindow:
         self.load_products()
     
     def setup_database(self):
-        """Configurar conexión a base de datos"""
-        db_paths = {
-            'quimicos': 'database/inventario_quimicos_avanzado.db',
-            'almacen': 'database/inventario_almacen.db',
-            'poscosecha': 'database/inventario_poscosecha.db'
-        }
-        
-        self.db_path = db_paths.get(self.sistema)
-        if not self.db_path or not os.path.exists(self.db_path):
-            messagebox.showerror("Error", f"Base de datos de {self.sistema} no encontrada")
-            self.window.destroy()
-            return
-        
-        # Crear tabla de movimientos si no existe
-        self.create_movements_table()
-    
-    def create_movements_table(self):
-        """Crear tabla de movimientos si no existe"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        table_name = f"movimientos_{self.sistema}"
-        
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS {table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                producto_codigo TEXT NOT NULL,
-                producto_nombre TEXT NOT NULL,
-                tipo TEXT NOT NULL,
-                cantidad INTEGER NOT NULL,
-                fecha DATE NOT NULL,
-                hora TIME DEFAULT CURRENT_TIME,
-                saldo_anterior INTEGER,
-                saldo_nuevo INTEGER,
-                responsable TEXT,
-                observaciones TEXT,
-                fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (producto_codigo) REFERENCES productos_{self.sistema} (codigo)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        """Motor del inventario (crea o completa las tablas de productos y movimientos)"""
+        self.inventario = get_inventario(self.sistema)
     
     def setup_window(self):
         """Configurar ventana"""
@@ -272,47 +231,24 @@ class MovimientoInventarioWindow:
     def load_products(self):
         """Cargar productos disponibles"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Query según sistema
-            if self.sistema == 'quimicos':
-                cursor.execute("""
-                    SELECT codigo, nombre, saldo_real, unidad 
-                    FROM productos_quimicos 
-                    WHERE activo = 1 
-                    ORDER BY nombre
-                """)
-            elif self.sistema == 'almacen':
-                cursor.execute("""
-                    SELECT codigo, nombre, saldo, unidad 
-                    FROM productos_almacen 
-                    ORDER BY nombre
-                """)
-            else:  # poscosecha
-                cursor.execute("""
-                    SELECT codigo, nombre, saldo, unidad 
-                    FROM productos_poscosecha 
-                    ORDER BY nombre
-                """)
+            productos = self.inventario.productos(solo_activos=True)
+            productos.sort(key=lambda p: p.nombre or '')
             
             # Crear lista de productos para combobox
             products = []
             self.products_data = {}
             
-            for row in cursor.fetchall():
-                codigo, nombre, saldo, unidad = row
-                display_text = f"{codigo} - {nombre}"
+            for producto in productos:
+                display_text = f"{producto.codigo} - {producto.nombre}"
                 products.append(display_text)
                 self.products_data[display_text] = {
-                    'codigo': codigo,
-                    'nombre': nombre,
-                    'saldo': saldo,
-                    'unidad': unidad
+                    'codigo': producto.codigo,
+                    'nombre': producto.nombre,
+                    'saldo': producto.saldo,
+                    'unidad': producto.unidad
                 }
             
             self.product_combo['values'] = products
-            conn.close()
             
         except Exception as e:
             messagebox.showerror("Error", f"Error cargando productos: {e}")
@@ -410,58 +346,16 @@ class MovimientoInventarioWindow:
             responsible = self.responsible_var.get().strip()
             observations = self.observations_text.get('1.0', tk.END).strip()
             
-            # Calcular nuevo saldo
-            current_stock = product_info['saldo']
-            if self.tipo == 'entrada':
-                new_stock = current_stock + quantity
-            else:  # salida
-                new_stock = current_stock - quantity
-            
-            # Registrar en base de datos
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # 1. Registrar movimiento
-            table_name = f"movimientos_{self.sistema}"
-            cursor.execute(f'''
-                INSERT INTO {table_name} 
-                (producto_codigo, producto_nombre, tipo, cantidad, fecha, 
-                 saldo_anterior, saldo_nuevo, responsable, observaciones)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                product_info['codigo'],
-                product_info['nombre'],
-                self.tipo,
-                quantity,
-                movement_date,
-                current_stock,
-                new_stock,
-                responsible,
-                observations
-            ))
-            
-            # 2. Actualizar saldo del producto
-            if self.sistema == 'quimicos':
-                cursor.execute('''
-                    UPDATE productos_quimicos 
-                    SET saldo_real = ? 
-                    WHERE codigo = ?
-                ''', (new_stock, product_info['codigo']))
-            elif self.sistema == 'almacen':
-                cursor.execute('''
-                    UPDATE productos_almacen 
-                    SET saldo = ? 
-                    WHERE codigo = ?
-                ''', (new_stock, product_info['codigo']))
-            else:  # poscosecha
-                cursor.execute('''
-                    UPDATE productos_poscosecha 
-                    SET saldo = ? 
-                    WHERE codigo = ?
-                ''', (new_stock, product_info['codigo']))
-            
-            conn.commit()
-            conn.close()
+            # Registrar movimiento y nuevo saldo en una sola transacción
+            cuando = datetime.combine(movement_date, datetime.now().time())
+            try:
+                movimiento = self.inventario.registrar_movimiento(
+                    product_info['codigo'], self.tipo, quantity, responsible, observations, cuando=cuando
+                )
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            current_stock, new_stock = movimiento.saldo_anterior, movimiento.saldo_nuevo
             
             # Mensaje de éxito
             tipo_text = "Entrada" if self.tipo == 'entrada' else "Salida"
@@ -492,13 +386,8 @@ class HistorialMovimientosWindow:
         self.parent = parent
         self.sistema = sistema
         
-        # Configurar base de datos
-        db_paths = {
-            'quimicos': 'database/inventario_quimicos_avanzado.db',
-            'almacen': 'database/inventario_almacen.db',
-            'poscosecha': 'database/inventario_poscosecha.db'
-        }
-        self.db_path = db_paths.get(sistema)
+        self.inventario = get_inventario(sistema)
+        self.historial = None
         
         # Crear ventana
         self.window = tk.Toplevel(parent)
@@ -546,7 +435,12 @@ class HistorialMovimientosWindow:
         self.type_filter.pack(side=tk.LEFT, padx=5)
         self.type_filter.bind('<<ComboboxSelected>>', lambda e: self.load_history())
         
-        # Filtro por fecha
+        # Filtro por producto
+        tk.Label(filter_frame, text="Código:", bg='white').pack(side=tk.LEFT, padx=(20, 5))
+        self.code_filter = tk.Entry(filter_frame, width=12)
+        self.code_filter.pack(side=tk.LEFT, padx=5)
+        
+        # Filtro por fecha (DD/MM/AAAA)
         tk.Label(filter_frame, text="Desde:", bg='white').pack(side=tk.LEFT, padx=(20, 5))
         self.date_from = tk.Entry(filter_frame, width=12)
         self.date_from.pack(side=tk.LEFT, padx=5)
@@ -562,6 +456,9 @@ class HistorialMovimientosWindow:
                              relief='flat', padx=15, pady=5)
         filter_btn.pack(side=tk.LEFT, padx=20)
         
+        self.count_label = tk.Label(filter_frame, text="", bg='white', fg='#7f8c8d')
+        self.count_label.pack(side=tk.RIGHT, padx=5)
+        
         # Tabla de historial
         table_frame = tk.Frame(self.window, bg='white')
         table_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 20))
@@ -586,7 +483,10 @@ class HistorialMovimientosWindow:
         # Scrollbars
         v_scroll = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
         h_scroll = ttk.Scrollbar(table_frame, orient=tk.HORIZONTAL, command=self.tree.xview)
-        self.tree.configure(yscrollcommand=v_scroll.set, xscrollcommand=h_scroll.set)
+        self.tree.configure(xscrollcommand=h_scroll.set)
+        
+        # Páginas siguientes al acercarse al final
+        cargar_al_desplazar(self.tree, v_scroll, self.load_next_page)
         
         # Grid
         self.tree.grid(row=0, column=0, sticky='nsew')
@@ -605,40 +505,37 @@ class HistorialMovimientosWindow:
         close_btn.pack(pady=(0, 20))
     
     def load_history(self):
-        """Cargar historial de movimientos"""
+        """Cargar la primera página del historial con los filtros actuales"""
         try:
-            # Limpiar tabla
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            
-            if not os.path.exists(self.db_path):
-                return
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Query base
-            table_name = f"movimientos_{self.sistema}"
-            query = f"SELECT * FROM {table_name} WHERE 1=1"
-            params = []
-            
-            # Aplicar filtros
-            if self.type_filter.get() != 'Todos':
-                query += " AND tipo = ?"
-                params.append(self.type_filter.get())
-            
-            # TODO: Implementar filtros de fecha
-            
-            query += " ORDER BY fecha DESC, hora DESC"
-            
-            cursor.execute(query, params)
-            
-            # Cargar datos
-            for row in cursor.fetchall():
-                # Formatear datos
-                fecha = row[5] if row[5] else ''
-                hora = row[6] if row[6] else ''
-                tipo = row[3].upper()
+            tipo_filtro = self.type_filter.get()
+            historial = HistorialMovimientos(
+                self.inventario,
+                tipo=None if tipo_filtro == 'Todos' else tipo_filtro,
+                codigo=self.code_filter.get().strip(),
+                desde=fecha_filtro(self.date_from.get()),
+                hasta=fecha_filtro(self.date_to.get()))
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        
+        # Limpiar tabla
+        self.tree.delete(*self.tree.get_children())
+        self.tree.yview_moveto(0)
+        
+        # Configurar colores
+        self.tree.tag_configure('entrada', foreground='#27ae60')
+        self.tree.tag_configure('salida', foreground='#e74c3c')
+        
+        self.historial = historial
+        self.load_next_page()
+    
+    def load_next_page(self):
+        """Agregar la siguiente página de movimientos al final de la tabla"""
+        if not self.historial or not self.historial.hay_mas:
+            return
+        try:
+            for movimiento in self.historial.siguiente_pagina():
+                tipo = movimiento.tipo.upper()
                 
                 # Color según tipo
                 if tipo == 'ENTRADA':
@@ -647,16 +544,13 @@ class HistorialMovimientosWindow:
                     tags = ('salida',)
                 
                 self.tree.insert('', tk.END, values=(
-                    fecha, hora, tipo, row[2], row[4],
-                    row[7], row[8], row[9], row[10]
+                    movimiento.fecha or '', movimiento.hora or '', tipo, movimiento.producto_nombre,
+                    movimiento.cantidad, movimiento.saldo_anterior, movimiento.saldo_nuevo,
+                    movimiento.responsable, movimiento.observaciones
                 ), tags=tags)
             
-            # Configurar colores
-            self.tree.tag_configure('entrada', foreground='#27ae60')
-            self.tree.tag_configure('salida', foreground='#e74c3c')
-            
-            conn.close()
-            
+            mas = " (desplace para ver más)" if self.historial.hay_mas else ""
+            self.count_label.config(text=f"{self.historial.cargados} movimientos{mas}")
         except Exception as e:
             messagebox.showerror("Error", f"Error cargando historial: {e}")
 
@@ -2,34 +2,44 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import sys
 import os
-import sqlite3
 from datetime import datetime, date
-import csv
-import pandas as pd
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils.dataframe import dataframe_to_rows
-from tkcalendar import DateEntry
-from pathlib import Path
+import queue
+import threading
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from alerts.notification_system import abrir_centro_alertas
 
 # Agregar path para importar modelos
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from models.database import get_db, Empleado
+from models.database import get_db, Empleado, DB_PATH
 from views.backup_config_view import abrir_configuracion_seguridad
 from utils.config_fix import abrir_configuracion_avanzada_corregida
+from models.engine import connect_db, get_engine
+from utils.document_index import get_document_index
+from utils.empleado_search import EmpleadoStore
+from utils.inventario_analytics import analizar_inventarios, exportar as exportar_analitica
+from utils.inventario_engine import get_inventario
+from utils.inventario_stats import estadisticas
+from utils.pdf_reports import get_report_pipeline, esperar_reporte, abrir_archivo
+from utils.search_index import buscar
+from views.virtual_grid import VirtualGrid
 
 class MainWindow:
     def __init__(self, root):
         self.root = root
         self.db = get_db()
         self.contratos_window = None  # Para controlar única ventana de contratos
+        self.empleados_store = EmpleadoStore()
+        self._filtro_job = None
+        self._orden = None  # (columna, descendente)
         self.configurar_estilos()
         self.setup_main_window()
         self.create_widgets()
+    
+    def iniciar_servicios(self):
+        """Servicios en segundo plano; main.py los arranca cuando la ventana ya se pintó"""
         # Ya no creamos carpeta separada, usamos empleados_data
+        threading.Thread(target=get_document_index().start_watcher, daemon=True).start()
     
     def configurar_estilos(self):
         """Configurar estilos visuales mejorados"""
@@ -96,6 +106,7 @@ class MainWindow:
         buttons_info = [
             ("Nuevo Empleado", self.nuevo_empleado, "#27ae60"),      # Verde esmeralda
             ("Editar Empleado", self.editar_empleado, "#3498db"),      # Azul cielo
+            ("Excel Masivo", self.generar_excel_masivo, "#2980b9"),    # Azul
             ("Contratos", self.abrir_contratos, "#8e44ad"),            # Púrpura
             ("Inventarios", self.abrir_inventarios, "#16a085"),        # Verde azulado
             ("Asistencia QR", self.abrir_asistencia_qr, "#f39c12"),    # Naranja
@@ -184,6 +195,9 @@ class MainWindow:
         h_scrollbar = ttk.Scrollbar(empleados_frame, orient=tk.HORIZONTAL, command=self.tree.xview)
         self.tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
         
+        # Solo se materializan las filas visibles
+        self.empleados_grid = VirtualGrid(self.tree, v_scrollbar, rowheight=25)
+        
         # Grid para tree y scrollbars
         self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         v_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
@@ -239,13 +253,12 @@ class MainWindow:
             from datetime import datetime
             current_time = datetime.now().strftime("%H:%M:%S")
             
-            # Contar empleados
-            total_empleados = self.db.query(Empleado).count()
-            activos = self.db.query(Empleado).filter(Empleado.estado == True).count()
+            # Contar empleados (desde el almacén en memoria, sin consultas por segundo)
+            total_empleados, activos = self.empleados_store.contar_estados()
             inactivos = total_empleados - activos
             
-            # Contar elementos mostrados en la tabla
-            items_mostrados = len(self.tree.get_children())
+            # Filas que cumplen los filtros (no solo las visibles)
+            items_mostrados = len(self.empleados_grid)
             
             status_text = f"Total: {total_empleados} | Activos: {activos} | Inactivos: {inactivos} | Mostrando: {items_mostrados} | {current_time}"
             self.status_label.config(text=status_text)
@@ -256,9 +269,12 @@ class MainWindow:
             self.root.after(1000, self.update_status)
     
     def on_search_change(self, *args):
-        """Llamada cuando cambian los filtros de búsqueda"""
-        if hasattr(self, 'tree'):
-            self.cargar_empleados()
+        """Llamada cuando cambian los filtros de búsqueda (con espera para no filtrar en cada tecla)"""
+        if not hasattr(self, 'empleados_grid'):
+            return
+        if self._filtro_job:
+            self.root.after_cancel(self._filtro_job)
+        self._filtro_job = self.root.after(150, self.aplicar_filtros)
     
     def limpiar_filtros(self):
         """Limpiar todos los filtros"""
@@ -267,92 +283,86 @@ class MainWindow:
         self.filter_estado.set("Activos")
         
     def cargar_empleados(self):
-        """Cargar empleados en el TreeView con filtros aplicados"""
+        """Recargar el almacén de empleados desde la base de datos y aplicar filtros"""
+        try:
+            self.empleados_store.cargar_desde_db(self.db)
+            print(f"Se cargaron {len(self.empleados_store)} empleados")
+            self.aplicar_filtros()
+        except Exception as e:
+            print(f"Error al cargar empleados: {e}")
+    
+    def aplicar_filtros(self):
+        """Filtrar en memoria y mostrar el resultado en la grilla virtual"""
+        self._filtro_job = None
         try:
-            # Limpiar datos existentes
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            
-            # Construir query base
-            query = self.db.query(Empleado)
-            
-            # Aplicar filtro de estado
             estado_filtro = self.filter_estado.get()
-            if estado_filtro == "Activos":
-                query = query.filter(Empleado.estado == True)
-            elif estado_filtro == "Inactivos":
-                query = query.filter(Empleado.estado == False)
-            
-            # Aplicar filtro de área
+            estado = {"Activos": True, "Inactivos": False}.get(estado_filtro)
             area_filtro = self.filter_area.get()
-            if area_filtro and area_filtro != "Todas":
-                query = query.filter(Empleado.area_trabajo == area_filtro)
-            
-            # Aplicar búsqueda por texto
-            texto_busqueda = self.search_var.get().strip().lower()
-            if texto_busqueda:
-                query = query.filter(
-                    (Empleado.nombre_completo.ilike(f'%{texto_busqueda}%')) |
-                    (Empleado.cedula.ilike(f'%{texto_busqueda}%')) |
-                    (Empleado.cargo.ilike(f'%{texto_busqueda}%'))
-                )
+            area = area_filtro if area_filtro and area_filtro != "Todas" else None
             
-            # Ejecutar query
-            empleados = query.all()
+            store = self.empleados_store
+            texto = self.search_var.get()
+            ids = self.buscar_empleados(texto) if texto.strip() else None
+            if ids is not None:
+                indices = store.filtrar_ids(ids, estado=estado, area=area)
+            else:
+                indices = store.buscar(texto, estado=estado, area=area)
+            if self._orden:
+                indices = store.ordenar(indices, *self._orden)
+            
+            # Estado de Excel de todas las filas desde el índice en memoria
+            con_excel = get_document_index().cedulas_con_excel()
+            columnas = store.columnas
+            
+            def valores(i):
+                salario = columnas['salario_base'][i]
+                cedula = columnas['cedula'][i] or ""
+                return (
+                    columnas['id'][i],
+                    columnas['nombre_completo'][i],
+                    cedula,
+                    columnas['telefono'][i] or "No definido",
+                    columnas['area_trabajo'][i] or "No definida",
+                    columnas['cargo'][i] or "No definido",
+                    f"${salario:,}" if salario else "No definido",
+                    "Activo" if columnas['estado'][i] else "Inactivo",
+                    "SI" if cedula.replace(" ", "_") in con_excel else "NO"
+                )
             
-            # Cargar en TreeView (optimizado - sin verificación de Excel por defecto)
-            for emp in empleados:
-                estado_texto = "Activo" if emp.estado else "Inactivo"
-                salario_texto = f"${emp.salario_base:,}" if emp.salario_base else "No definido"
-                
-                # Solo verificar Excel si es necesario (optimización)
-                excel_status = "N/A"  # Por defecto no verificamos
-                
-                self.tree.insert('', 'end', values=(
-                    emp.id,
-                    emp.nombre_completo,
-                    emp.cedula,
-                    emp.telefono or "No definido",
-                    emp.area_trabajo or "No definida",
-                    emp.cargo or "No definido",
-                    salario_texto,
-                    estado_texto,
-                    excel_status
-                ))
-            
-            total = len(empleados)
-            print(f"Se cargaron {total} empleados")
+            self.empleados_grid.set_rows(indices, valores, clave=lambda i: str(columnas['id'][i]))
             
         except Exception as e:
-            print(f"Error al cargar empleados: {e}")
+            print(f"Error al filtrar empleados: {e}")
+    
+    def buscar_empleados(self, texto):
+        """Ids de empleados por relevancia desde el índice de búsqueda común (None si falla)"""
+        try:
+            conn = connect_db(DB_PATH)
+            try:
+                return [fila[0] for fila in buscar(conn, 'empleados', texto, limite=-1)]
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Error buscando empleados en el índice: {e}")
+            return None
     
     def verificar_excel_empleado(self, cedula):
         """Verificar si existe archivo Excel para el empleado en empleados_data"""
         try:
-            # Buscar en empleados_data por cedula
-            if os.path.exists("empleados_data"):
-                for empleado_folder in os.listdir("empleados_data"):
-                    if cedula.replace(" ", "_") in empleado_folder:
-                        empleado_path = os.path.join("empleados_data", empleado_folder)
-                        if os.path.isdir(empleado_path):
-                            # Buscar cualquier archivo Excel en la carpeta
-                            for file in os.listdir(empleado_path):
-                                if file.endswith('.xlsx'):
-                                    return True
-            return False
+            return get_document_index().tiene_excel(cedula)
         except:
             return False
     
     def sort_column(self, col):
-        """Ordenar TreeView por columna"""
-        try:
-            data = [(self.tree.set(child, col), child) for child in self.tree.get_children('')]
-            data.sort()
-            
-            for index, (val, child) in enumerate(data):
-                self.tree.move(child, '', index)
-        except:
-            pass
+        """Ordenar la lista completa de empleados por columna (clic de nuevo invierte el orden)"""
+        columna = {'ID': 'id', 'Nombre': 'nombre_completo', 'Cedula': 'cedula', 'Telefono': 'telefono',
+                   'Area': 'area_trabajo', 'Cargo': 'cargo', 'Salario': 'salario_base',
+                   'Estado': 'estado'}.get(col)
+        if not columna:
+            return
+        descendente = self._orden == (columna, False)
+        self._orden = (columna, descendente)
+        self.aplicar_filtros()
     
     def on_double_click(self, event):
         """Manejar doble click en TreeView"""
@@ -447,232 +457,11 @@ class MainWindow:
     def generar_excel_empleado(self, empleado, abrir_despues=False):
         """Generar archivo Excel automáticamente para el empleado"""
         try:
-            # Función para limpiar texto preservando caracteres especiales
-            def limpiar_texto(texto):
-                if texto is None:
-                    return "No definido"
-                # Convertir a string y limpiar solo caracteres problemáticos específicos
-                texto_str = str(texto).strip()
-                if not texto_str:
-                    return "No definido"
-                # Reemplazar solo caracteres que realmente causan problemas en Excel
-                # pero preservar tildes y ñ
-                caracteres_problematicos = {
-                    '\u2705': '✓',  # check mark
-                    '\u274c': '✗',  # cross mark
-                    '\u2026': '...',  # ellipsis
-                }
-                for problema, reemplazo in caracteres_problematicos.items():
-                    texto_str = texto_str.replace(problema, reemplazo)
-                return texto_str
-            
-            # Crear carpeta del empleado en empleados_data
-            def limpiar_nombre_archivo(texto):
-                if not texto:
-                    return "sin_nombre"
-                caracteres_prohibidos = ['<', '>', ':', '"', '/', '\\', '|', '?', '*']
-                texto_limpio = str(texto)
-                for char in caracteres_prohibidos:
-                    texto_limpio = texto_limpio.replace(char, '_')
-                texto_limpio = texto_limpio.replace(" ", "_")
-                return texto_limpio
-            
-            nombre_seguro = limpiar_nombre_archivo(empleado.nombre_completo)
-            cedula_segura = limpiar_nombre_archivo(empleado.cedula)
-            empleado_dir = os.path.join("empleados_data", f"{nombre_seguro}_{cedula_segura}")
-            
-            # Crear carpeta del empleado si no existe
-            os.makedirs(empleado_dir, exist_ok=True)
-            
-            # Crear subcarpeta contratos si no existe
-            contratos_dir = os.path.join(empleado_dir, "contratos")
-            os.makedirs(contratos_dir, exist_ok=True)
-            
-            # Crear nombre de archivo con timestamp
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"empleado_{cedula_segura}_{timestamp}.xlsx"
-            filepath = os.path.join(contratos_dir, filename)
-            
-            # Crear workbook
-            wb = openpyxl.Workbook()
-            
-            # ===== HOJA 1: DATOS PERSONALES =====
-            ws1 = wb.active
-            ws1.title = "Datos Personales"
-            
-            # Configurar estilos
-            header_font = Font(size=14, bold=True, color="FFFFFF")
-            header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            title_font = Font(size=18, bold=True, color="2F4F4F")
-            data_font = Font(size=11)
-            border = Border(left=Side(style='thin'), right=Side(style='thin'), 
-                           top=Side(style='thin'), bottom=Side(style='thin'))
-            
-            # Título principal (sin tildes)
-            ws1.merge_cells('A1:D1')
-            ws1['A1'] = "INFORMACION DEL EMPLEADO"
-            ws1['A1'].font = title_font
-            ws1['A1'].alignment = Alignment(horizontal='center', vertical='center')
-            
-            # Fecha de generación
-            ws1.merge_cells('A2:D2')
-            ws1['A2'] = f"Generado: {datetime.now().strftime('%d/%m/%Y %H:%M')}"
-            ws1['A2'].alignment = Alignment(horizontal='center')
-            ws1['A2'].font = Font(size=10, italic=True)
-            
-            # Datos personales (con limpieza de texto)
-            row = 4
-            datos_personales = [
-                ("DATOS BASICOS", ""),
-                ("Nombre Completo:", limpiar_texto(empleado.nombre_completo)),
-                ("Cedula:", limpiar_texto(empleado.cedula)),
-                ("Telefono:", limpiar_texto(empleado.telefono)),
-                ("Email:", limpiar_texto(empleado.email)),
-                ("Direccion:", limpiar_texto(empleado.direccion)),
-                ("", ""),
-                ("DATOS LABORALES", ""),
-                ("Area de Trabajo:", limpiar_texto(empleado.area_trabajo)),
-                ("Cargo:", limpiar_texto(empleado.cargo)),
-                ("Salario Base:", f"${empleado.salario_base:,}" if empleado.salario_base else "No definido"),
-                ("Estado:", "Activo" if empleado.estado else "Inactivo"),
-                ("Fecha de Ingreso:", empleado.fecha_creacion.strftime('%d/%m/%Y') if empleado.fecha_creacion else "No definida")
-            ]
-            
-            for label, value in datos_personales:
-                if label in ["DATOS BASICOS", "DATOS LABORALES"]:
-                    # Headers de sección
-                    ws1.merge_cells(f'A{row}:D{row}')
-                    ws1[f'A{row}'] = limpiar_texto(label)
-                    ws1[f'A{row}'].font = header_font
-                    ws1[f'A{row}'].fill = header_fill
-                    ws1[f'A{row}'].alignment = Alignment(horizontal='center', vertical='center')
-                    ws1[f'A{row}'].border = border
-                elif label == "":
-                    # Fila vacía
-                    pass
-                else:
-                    # Datos (limpiar ambos textos)
-                    ws1[f'A{row}'] = limpiar_texto(label)
-                    ws1[f'B{row}'] = limpiar_texto(value)
-                    ws1[f'A{row}'].font = Font(size=11, bold=True)
-                    ws1[f'B{row}'].font = data_font
-                    ws1[f'A{row}'].border = border
-                    ws1[f'B{row}'].border = border
-                
-                row += 1
-            
-            # Ajustar ancho de columnas
-            ws1.column_dimensions['A'].width = 20
-            ws1.column_dimensions['B'].width = 30
-            ws1.column_dimensions['C'].width = 15
-            ws1.column_dimensions['D'].width = 15
-            
-            # ===== HOJA 2: SEGUIMIENTO =====
-            ws2 = wb.create_sheet("Seguimiento")
-            
-            # Título
-            ws2.merge_cells('A1:F1')
-            ws2['A1'] = "SEGUIMIENTO Y NOTAS"
-            ws2['A1'].font = title_font
-            ws2['A1'].alignment = Alignment(horizontal='center', vertical='center')
-            
-            # Headers de tabla (sin tildes)
-            headers_seguimiento = ['Fecha', 'Tipo', 'Descripcion', 'Usuario', 'Estado', 'Observaciones']
-            for i, header in enumerate(headers_seguimiento, 1):
-                cell = ws2.cell(row=3, column=i, value=limpiar_texto(header))
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.border = border
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-            
-            # Fila de ejemplo (limpiando texto)
-            ejemplo_seguimiento = [
-                datetime.now().strftime('%d/%m/%Y'),
-                'CREACION',
-                'Empleado registrado en el sistema',
-                'Sistema',
-                'COMPLETADO',
-                'Registro inicial automatico'
-            ]
-            
-            for i, value in enumerate(ejemplo_seguimiento, 1):
-                cell = ws2.cell(row=4, column=i, value=limpiar_texto(value))
-                cell.font = data_font
-                cell.border = border
-            
-            # Ajustar anchos
-            column_widths = [12, 15, 30, 15, 12, 25]
-            for i, width in enumerate(column_widths, 1):
-                ws2.column_dimensions[chr(64 + i)].width = width
-            
-            # ===== HOJA 3: CAPACITACIONES =====
-            ws3 = wb.create_sheet("Capacitaciones")
-            
-            # Título
-            ws3.merge_cells('A1:E1')
-            ws3['A1'] = "REGISTRO DE CAPACITACIONES"
-            ws3['A1'].font = title_font
-            ws3['A1'].alignment = Alignment(horizontal='center', vertical='center')
-            
-            # Headers (sin tildes)
-            headers_capacitaciones = ['Fecha', 'Capacitacion', 'Instructor', 'Duracion (hrs)', 'Estado']
-            for i, header in enumerate(headers_capacitaciones, 1):
-                cell = ws3.cell(row=3, column=i, value=limpiar_texto(header))
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.border = border
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-            
-            # Instrucciones (sin tildes)
-            ws3['A5'] = "INSTRUCCIONES:"
-            ws3['A5'].font = Font(size=12, bold=True, color="8B0000")
-            
-            instrucciones = [
-                "• Registrar todas las capacitaciones recibidas",
-                "• Actualizar el estado segun el progreso",
-                "• Incluir certificaciones obtenidas",
-                "• Revisar mensualmente"
-            ]
-            
-            for i, instruccion in enumerate(instrucciones, 6):
-                ws3[f'A{i}'] = limpiar_texto(instruccion)
-                ws3[f'A{i}'].font = Font(size=10)
-            
-            # Ajustar anchos
-            for i, width in enumerate([12, 25, 20, 12, 15], 1):
-                ws3.column_dimensions[chr(64 + i)].width = width
-            
-            # ===== HOJA 4: EVALUACIONES =====
-            ws4 = wb.create_sheet("Evaluaciones")
-            
-            # Título
-            ws4.merge_cells('A1:F1')
-            ws4['A1'] = "EVALUACIONES DE DESEMPEÑO"
-            ws4['A1'].font = title_font
-            ws4['A1'].alignment = Alignment(horizontal='center', vertical='center')
-            
-            # Headers (sin tildes)
-            headers_eval = ['Fecha', 'Periodo', 'Puntuacion', 'Fortalezas', 'Areas de Mejora', 'Evaluador']
-            for i, header in enumerate(headers_eval, 1):
-                cell = ws4.cell(row=3, column=i, value=limpiar_texto(header))
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.border = border
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-            
-            # Ejemplo de evaluación (sin tildes)
-            ws4['A5'] = "Proxima evaluacion:"
-            ws4['B5'] = (datetime.now().replace(month=datetime.now().month+3) if datetime.now().month <= 9 
-                         else datetime.now().replace(year=datetime.now().year+1, month=datetime.now().month-9)).strftime('%d/%m/%Y')
-            ws4['A5'].font = Font(size=11, bold=True)
-            ws4['B5'].font = Font(size=11, color="FF0000")
-            
-            # Ajustar anchos
-            for i, width in enumerate([12, 15, 12, 25, 25, 15], 1):
-                ws4.column_dimensions[chr(64 + i)].width = width
-            
-            # Guardar archivo
-            wb.save(filepath)
+            from utils.empleado_excel_generator import EmpleadoExcelBatch, datos_empleado
+            resumen = EmpleadoExcelBatch().generar([datos_empleado(empleado)], forzar=True)
+            if resumen['errores']:
+                raise Exception(resumen['errores'][0][1])
+            filepath = resumen['archivos'][0]
             
             print(f"Excel generado: {filepath}")
             
@@ -691,6 +480,74 @@ class MainWindow:
             print(f"Error generando Excel: {e}")
             messagebox.showerror("Error", f"Error generando Excel: {e}")
             return False
+    
+    def generar_excel_masivo(self):
+        """Generar en segundo plano los Excel de los empleados seleccionados (o de todos los activos)"""
+        from utils.empleado_excel_generator import EmpleadoExcelBatch, datos_empleado
+        
+        ids = [int(i) for i in self.empleados_grid.seleccion()]
+        if ids:
+            consulta = self.db.query(Empleado).filter(Empleado.id.in_(ids))
+            descripcion = f"{len(ids)} empleado(s) seleccionado(s)"
+        else:
+            consulta = self.db.query(Empleado).filter(Empleado.estado == True)
+            descripcion = "todos los empleados activos"
+        
+        if not messagebox.askyesno("Excel Masivo",
+                                   f"¿Generar Excel para {descripcion}?\n\n"
+                                   "Se omiten los empleados cuyos datos no cambiaron desde su último Excel."):
+            return
+        
+        empleados = [datos_empleado(e) for e in consulta.all()]
+        if not empleados:
+            messagebox.showinfo("Excel Masivo", "No hay empleados para generar")
+            return
+        
+        lote = EmpleadoExcelBatch()
+        progreso = lote.iniciar(empleados)
+        
+        # Ventana de avance (la generación corre fuera del hilo de la interfaz)
+        ventana = tk.Toplevel(self.root)
+        ventana.title("Generando Excel de empleados")
+        ventana.geometry("420x150")
+        ventana.transient(self.root)
+        ventana.protocol("WM_DELETE_WINDOW", lote.cancelar)
+        
+        etiqueta = tk.Label(ventana, text=f"Preparando {len(empleados)} empleados...", font=('Arial', 10))
+        etiqueta.pack(pady=(20, 10))
+        barra = ttk.Progressbar(ventana, maximum=len(empleados), length=380)
+        barra.pack(padx=20)
+        tk.Button(ventana, text="Cancelar", command=lote.cancelar,
+                  bg='#e74c3c', fg='white', relief='flat', padx=15).pack(pady=10)
+        
+        def revisar_progreso():
+            try:
+                while True:
+                    evento = progreso.get_nowait()
+                    if evento['tipo'] == 'progreso':
+                        barra['value'] = evento['hechos']
+                        etiqueta.config(text=f"{evento['hechos']}/{evento['total']} - "
+                                             f"{evento['cedula']} ({evento['estado']})")
+                        continue
+                    
+                    resumen = evento['resumen']
+                    ventana.destroy()
+                    self.aplicar_filtros()
+                    mensaje = (f"Generados: {resumen['generados']}\n"
+                               f"Sin cambios (omitidos): {resumen['omitidos']}\n"
+                               f"Errores: {len(resumen['errores'])}\n"
+                               f"Tiempo: {resumen['duracion']:.1f} s")
+                    if resumen['cancelado']:
+                        mensaje = "Generación cancelada\n\n" + mensaje
+                    if resumen['errores']:
+                        mensaje += "\n\n" + "\n".join(f"{c}: {e}" for c, e in resumen['errores'][:5])
+                    messagebox.showinfo("Excel Masivo", mensaje)
+                    return
+            except queue.Empty:
+                pass
+            ventana.after(100, revisar_progreso)
+        
+        revisar_progreso()
 
 
 # ================= SISTEMA COMPLETO DE INVENTARIOS =================
@@ -811,77 +668,8 @@ class FullInventarioWindow:
             print(f"Error configurando bases de datos: {e}")
     
     def create_databases(self):
-        """Crear bases de datos y tablas"""
-        # Base de datos de químicos
-        conn_q = sqlite3.connect(self.db_paths['quimicos'])
-        cursor_q = conn_q.cursor()
-        cursor_q.execute('''
-            CREATE TABLE IF NOT EXISTS productos_quimicos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                codigo TEXT UNIQUE,
-                clase TEXT,
-                nombre TEXT,
-                saldo INTEGER DEFAULT 0,
-                unidad TEXT,
-                valor_unitario REAL DEFAULT 0,
-                ubicacion TEXT,
-                proveedor TEXT,
-                fecha_vencimiento DATE,
-                nivel_peligrosidad TEXT DEFAULT 'MEDIO',
-                stock_minimo INTEGER DEFAULT 0,
-                activo INTEGER DEFAULT 1,
-                fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        conn_q.commit()
-        conn_q.close()
-        
-        # Base de datos de almacén
-        conn_a = sqlite3.connect(self.db_paths['almacen'])
-        cursor_a = conn_a.cursor()
-        cursor_a.execute('''
-            CREATE TABLE IF NOT EXISTS productos_almacen (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                codigo TEXT UNIQUE,
-                nombre TEXT,
-                categoria TEXT DEFAULT 'General',
-                saldo INTEGER DEFAULT 0,
-                unidad TEXT,
-                valor_unitario REAL DEFAULT 0,
-                stock_minimo INTEGER DEFAULT 0,
-                ubicacion TEXT,
-                proveedor TEXT,
-                activo INTEGER DEFAULT 1,
-                fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        conn_a.commit()
-        conn_a.close()
-        
-        # Base de datos de poscosecha
-        conn_p = sqlite3.connect(self.db_paths['poscosecha'])
-        cursor_p = conn_p.cursor()
-        cursor_p.execute('''
-            CREATE TABLE IF NOT EXISTS productos_poscosecha (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                codigo TEXT UNIQUE,
-                categoria TEXT,
-                nombre TEXT,
-                saldo INTEGER DEFAULT 0,
-                unidad TEXT,
-                valor_unitario REAL DEFAULT 0,
-                stock_minimo INTEGER DEFAULT 0,
-                ubicacion TEXT,
-                proveedor TEXT,
-                tipo_producto TEXT,
-                tipo TEXT DEFAULT 'General',
-                activo INTEGER DEFAULT 1,
-                fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        conn_p.commit()
-        conn_p.close()
-        
+        """Crear o completar el esquema unificado de cada inventario"""
+        self.inventarios = {linea: get_inventario(linea, ruta) for linea, ruta in self.db_paths.items()}
         print("Bases de datos creadas exitosamente")
     
     def create_interface(self):
@@ -1094,15 +882,12 @@ class FullInventarioWindow:
     
     def load_sample_quimicos(self):
         """Cargar datos de ejemplo para químicos"""
-        conn = sqlite3.connect(self.db_paths['quimicos'])
-        cursor = conn.cursor()
-        
         # Verificar si ya hay datos
-        cursor.execute("SELECT COUNT(*) FROM productos_quimicos")
-        if cursor.fetchone()[0] > 0:
-            conn.close()
+        if self.inventarios['quimicos'].contar() > 0:
             return
         
+        columnas = ('codigo', 'clase', 'nombre', 'saldo', 'unidad', 'valor_unitario', 'ubicacion',
+                    'proveedor', 'fecha_vencimiento', 'nivel_peligrosidad')
         sample_data = [
             ('QM001', 'ACARICIDA', 'Abamectina 1.8%', 500, 'ML', 120, 'A-01', 'BAYER', '2025-12-31', 'ALTO'),
             ('QM002', 'FUNGICIDA', 'Mancozeb 80%', 2000, 'GR', 85, 'A-02', 'SYNGENTA', '2025-10-15', 'MEDIO'),
@@ -1111,26 +896,15 @@ class FullInventarioWindow:
             ('QM005', 'FERTILIZANTE', 'Urea 46%', 5000, 'KG', 2.5, 'C-01', 'YARA', None, 'BAJO'),
         ]
         
-        cursor.executemany('''
-            INSERT INTO productos_quimicos 
-            (codigo, clase, nombre, saldo, unidad, valor_unitario, ubicacion, proveedor, fecha_vencimiento, nivel_peligrosidad)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', sample_data)
-        
-        conn.commit()
-        conn.close()
+        self.inventarios['quimicos'].insertar_productos(dict(zip(columnas, fila)) for fila in sample_data)
     
     def load_sample_almacen(self):
         """Cargar datos de ejemplo para almacén"""
-        conn = sqlite3.connect(self.db_paths['almacen'])
-        cursor = conn.cursor()
-        
         # Verificar si ya hay datos
-        cursor.execute("SELECT COUNT(*) FROM productos_almacen")
-        if cursor.fetchone()[0] > 0:
-            conn.close()
+        if self.inventarios['almacen'].contar() > 0:
             return
         
+        columnas = ('codigo', 'nombre', 'saldo', 'unidad', 'valor_unitario', 'stock_minimo', 'ubicacion', 'proveedor')
         sample_data = [
             ('ALM001', 'Aceite 15W-40', 50, 'LT', 45000, 10, 'A-01', 'LUBRICANTES SA'),
             ('ALM002', 'Filtro de aire', 25, 'UND', 25000, 5, 'A-02', 'REPUESTOS DIESEL'),
@@ -1139,26 +913,16 @@ class FullInventarioWindow:
             ('ALM005', 'Cable eléctrico 12AWG', 200, 'MT', 2500, 50, 'A-05', 'ELECTRICOS DEL VALLE'),
         ]
         
-        cursor.executemany('''
-            INSERT INTO productos_almacen 
-            (codigo, nombre, saldo, unidad, valor_unitario, stock_minimo, ubicacion, proveedor)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', sample_data)
-        
-        conn.commit()
-        conn.close()
+        self.inventarios['almacen'].insertar_productos(dict(zip(columnas, fila)) for fila in sample_data)
     
     def load_sample_poscosecha(self):
         """Cargar datos de ejemplo para poscosecha"""
-        conn = sqlite3.connect(self.db_paths['poscosecha'])
-        cursor = conn.cursor()
-        
         # Verificar si ya hay datos
-        cursor.execute("SELECT COUNT(*) FROM productos_poscosecha")
-        if cursor.fetchone()[0] > 0:
-            conn.close()
+        if self.inventarios['poscosecha'].contar() > 0:
             return
         
+        columnas = ('codigo', 'categoria', 'nombre', 'saldo', 'unidad', 'valor_unitario', 'stock_minimo',
+                    'ubicacion', 'proveedor', 'tipo_producto')
         sample_data = [
             ('PC001', 'EMBALAJE', 'Cajas cartón 18kg', 1000, 'UND', 2500, 100, 'PC-01', 'CARTONERIA', 'EMPAQUE'),
             ('PC002', 'QUIMICO', 'Tiabendazol', 50, 'KG', 45000, 10, 'PC-02', 'AGROQUIMICOS', 'TRATAMIENTO'),
@@ -1167,41 +931,15 @@ class FullInventarioWindow:
             ('PC005', 'EMBALAJE', 'Pallets 120x80', 150, 'UND', 125000, 20, 'PC-05', 'PALLETS COL', 'EMPAQUE'),
         ]
         
-        cursor.executemany('''
-            INSERT INTO productos_poscosecha 
-            (codigo, categoria, nombre, saldo, unidad, valor_unitario, stock_minimo, ubicacion, proveedor, tipo_producto)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', sample_data)
-        
-        conn.commit()
-        conn.close()
+        self.inventarios['poscosecha'].insertar_productos(dict(zip(columnas, fila)) for fila in sample_data)
     
     def get_inventory_stats(self):
         """Obtener estadísticas de inventarios"""
         stats = {'quimicos': 0, 'almacen': 0, 'poscosecha': 0, 'total': 0}
         
         try:
-            # Químicos
-            conn = sqlite3.connect(self.db_paths['quimicos'])
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM productos_quimicos")
-            stats['quimicos'] = cursor.fetchone()[0]
-            conn.close()
-            
-            # Almacén
-            conn = sqlite3.connect(self.db_paths['almacen'])
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM productos_almacen")
-            stats['almacen'] = cursor.fetchone()[0]
-            conn.close()
-            
-            # Poscosecha
-            conn = sqlite3.connect(self.db_paths['poscosecha'])
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM productos_poscosecha")
-            stats['poscosecha'] = cursor.fetchone()[0]
-            conn.close()
-            
+            for linea, inventario in self.inventarios.items():
+                stats[linea] = estadisticas(inventario)['total']
             stats['total'] = stats['quimicos'] + stats['almacen'] + stats['poscosecha']
             
         except Exception as e:
@@ -1215,6 +953,9 @@ class FullInventarioWindow:
     def import_from_excel_to_inventory(self, system_type):
         """Importar productos desde Excel a un inventario específico"""
         try:
+            from utils.inventario_import import (importar_productos, leer_excel_inventario,
+                                                 texto_vista_previa, vista_previa)
+            
             file_path = filedialog.askopenfilename(
                 title=f"Seleccionar archivo Excel para {system_type}",
                 filetypes=[("Excel files", "*.xlsx *.xls"), ("All files", "*.*")]
@@ -1223,211 +964,32 @@ class FullInventarioWindow:
             if not file_path:
                 return
             
-            # Procesar el archivo según el tipo de inventario
-            if system_type == 'quimicos':
-                df = pd.read_excel(file_path, header=None)
-                # Buscar encabezados
-                header_row = None
-                for i, row in df.iterrows():
-                    if 'SALDO ANTERIOR' in str(row.values):
-                        header_row = i
-                        break
-                if header_row is not None:
-                    df = pd.read_excel(file_path, header=header_row)
-                else:
-                    df = pd.DataFrame()
-                    
-            elif system_type == 'almacen':
-                df = pd.read_excel(file_path, header=None)
-                # Buscar encabezados
-                header_row = None
-                for i, row in df.iterrows():
-                    if 'PRODUCTO' in str(row.values) and 'SALDO' in str(row.values):
-                        header_row = i
-                        break
-                if header_row is not None:
-                    df = pd.read_excel(file_path, header=header_row)
-                else:
-                    df = pd.DataFrame()
-                    
-            elif system_type == 'poscosecha':
-                df = pd.read_excel(file_path, header=None)
-                # Buscar encabezados
-                header_row = None
-                for i, row in df.iterrows():
-                    if 'PRODUCTO' in str(row.values) and 'SALDO' in str(row.values):
-                        header_row = i
-                        break
-                if header_row is not None:
-                    df = pd.read_excel(file_path, header=header_row)
-                else:
-                    df = pd.DataFrame()
-            else:
-                # Fallback: intentar leer como archivo estándar
-                df = pd.read_excel(file_path)
+            # Una sola lectura del libro: encabezado, filas y columnas normalizadas
+            productos, resumen = leer_excel_inventario(file_path, system_type)
             
-            if df.empty:
+            if not productos:
                 messagebox.showerror("Error", "No se pudieron procesar datos del archivo Excel")
                 return
             
-            # Mostrar información del archivo
-            info_msg = f"Archivo: {os.path.basename(file_path)}\n"
-            info_msg += f"Registros procesados: {len(df)}\n"
-            info_msg += f"Columnas: {', '.join(df.columns.tolist())}"
+            # Mostrar información del archivo y lo que cambiaría (sin aplicar nada aún)
+            info_msg = f"Archivo: {resumen['archivo']}\n"
+            info_msg += f"Registros procesados: {resumen['leidas']} ({resumen['validas']} productos con saldo)\n"
+            info_msg += f"Columnas: {', '.join(resumen['columnas'])}\n\n"
+            info_msg += texto_vista_previa(vista_previa(self.inventarios[system_type], productos))
             
-            if messagebox.askyesno("Confirmar Importación", 
-                                 f"{info_msg}\n\n¿Desea importar estos datos?"):
-                
-                # Conectar a la base de datos correspondiente
-                base_dir = Path(__file__).resolve().parent.parent.parent
-                db_path = base_dir / "database" / f"inventario_{system_type}.db"
-                
-                conn = sqlite3.connect(str(db_path))
-                cursor = conn.cursor()
-                
-                # Limpiar tabla existente
-                if system_type == 'quimicos':
-                    cursor.execute("DELETE FROM productos_quimicos")
-                elif system_type == 'almacen':
-                    cursor.execute("DELETE FROM productos_almacen")
-                elif system_type == 'poscosecha':
-                    cursor.execute("DELETE FROM productos_poscosecha")
-                
-                # Insertar datos
-                imported_count = 0
-                for index, row in df.iterrows():
-                    try:
-                        if system_type == 'quimicos':
-                            saldo = row.iloc[0] if len(row) > 0 else 0
-                            clase = row.iloc[1] if len(row) > 1 else 'General'
-                            producto = row.iloc[2] if len(row) > 2 else ''
-                            valor = row.iloc[3] if len(row) > 3 else 50.0  # VALOR REAL DEL EXCEL
-                            stock_min = 10  # Stock mínimo por defecto
-                            proveedor = 'Proveedor General'  # Proveedor por defecto
-                            
-                            if pd.notna(producto) and str(producto).strip() != '':
-                                try:
-                                    saldo_num = int(float(saldo)) if pd.notna(saldo) else 0
-                                    valor_num = float(valor) if pd.notna(valor) else 50.0
-                                    stock_min_num = int(float(stock_min)) if pd.notna(stock_min) else 10
-                                except:
-                                    saldo_num = 0
-                                    valor_num = 50.0
-                                    stock_min_num = 10
-                                
-                                # Solo importar si tiene saldo > 0
-                                if saldo_num > 0:
-                                    codigo = f"Q{imported_count:03d}"
-                                    cursor.execute('''
-                                        INSERT INTO productos_quimicos 
-                                        (codigo, nombre, clase, saldo, unidad, valor_unitario, 
-                                         stock_minimo, ubicacion, proveedor, activo)
-                                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                                    ''', (
-                                        codigo,
-                                        str(producto).strip(),
-                                        str(clase).strip() if pd.notna(clase) else 'General',
-                                        saldo_num,
-                                        'Kg',
-                                        valor_num,  # Valor real del Excel
-                                        stock_min_num,  # Stock mínimo real del Excel
-                                        'Almacén General',
-                                        str(proveedor).strip() if pd.notna(proveedor) else 'Proveedor General',
-                                        1
-                                    ))
-                                    imported_count += 1
-                                    
-                        elif system_type == 'almacen':
-                            # Para almacén, usar índices de columna
-                            saldo = row.iloc[0] if len(row) > 0 else 0
-                            producto = row.iloc[1] if len(row) > 1 else None
-                            # Para almacén, usar valores por defecto ya que el Excel no tiene datos de precios
-                            valor = 15.0  # Valor por defecto razonable
-                            stock_min = 5  # Stock mínimo por defecto
-                            proveedor = 'Proveedor General'  # Proveedor por defecto
-                            
-                            if pd.notna(producto) and str(producto).strip() != '' and str(producto).strip() != 'PRODUCTO y saldos':
-                                try:
-                                    saldo_num = int(float(saldo)) if pd.notna(saldo) else 0
-                                    valor_num = float(valor) if pd.notna(valor) else 15.0
-                                    stock_min_num = int(float(stock_min)) if pd.notna(stock_min) else 5
-                                except:
-                                    saldo_num = 0
-                                    valor_num = 15.0
-                                    stock_min_num = 5
-                                
-                                # Solo importar si tiene saldo > 0
-                                if saldo_num > 0:
-                                    codigo = f"A{imported_count:03d}"
-                                    cursor.execute('''
-                                        INSERT INTO productos_almacen 
-                                        (codigo, nombre, categoria, saldo, unidad, valor_unitario, 
-                                         stock_minimo, ubicacion, proveedor, activo)
-                                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                                    ''', (
-                                        codigo,
-                                        str(producto).strip(),
-                                        'General',
-                                        saldo_num,
-                                        'Unidad',
-                                        valor_num,  # Valor real del Excel
-                                        stock_min_num,  # Stock mínimo real del Excel
-                                        'Almacén General',
-                                        str(proveedor).strip() if pd.notna(proveedor) else 'Proveedor General',
-                                        1
-                                    ))
-                                    imported_count += 1
-                                    
-                        elif system_type == 'poscosecha':
-                            # Para poscosecha, usar índices de columna
-                            producto = row.iloc[0] if len(row) > 0 else None
-                            saldo = row.iloc[1] if len(row) > 1 else 0
-                            # Para poscosecha, usar valores por defecto ya que el Excel no tiene datos de precios
-                            valor = 25.0  # Valor por defecto razonable
-                            stock_min = 8  # Stock mínimo por defecto
-                            proveedor = 'Proveedor General'  # Proveedor por defecto
-                            
-                            if pd.notna(producto) and str(producto).strip() != '' and str(producto).strip() != 'PRODUCTO':
-                                try:
-                                    saldo_num = int(float(saldo)) if pd.notna(saldo) else 0
-                                    valor_num = float(valor) if pd.notna(valor) else 25.0
-                                    stock_min_num = int(float(stock_min)) if pd.notna(stock_min) else 8
-                                except:
-                                    saldo_num = 0
-                                    valor_num = 25.0
-                                    stock_min_num = 8
-                                
-                                # Solo importar si tiene saldo > 0
-                                if saldo_num > 0:
-                                    codigo = f"P{imported_count:03d}"
-                                    cursor.execute('''
-                                        INSERT INTO productos_poscosecha 
-                                        (codigo, nombre, tipo, saldo, unidad, valor_unitario, 
-                                         stock_minimo, ubicacion, proveedor, activo)
-                                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                                    ''', (
-                                        codigo,
-                                        str(producto).strip(),
-                                        'General',
-                                        saldo_num,
-                                        'Unidad',
-                                        valor_num,  # Valor real del Excel
-                                        stock_min_num,  # Stock mínimo real del Excel
-                                        'Almacén General',
-                                        str(proveedor).strip() if pd.notna(proveedor) else 'Proveedor General',
-                                        1
-                                    ))
-                                    imported_count += 1
-                                    
-                    except Exception as e:
-                        print(f"Error importando fila {index}: {e}")
-                        continue
-                    
-                conn.commit()
-                conn.close()
+            respuesta = messagebox.askyesnocancel(
+                "Confirmar Importación",
+                f"{info_msg}\n\n¿Aplicar sólo estos cambios?\n"
+                f"Sí = actualizar (conserva historial)   No = reemplazar todo el inventario")
+            
+            if respuesta is not None:
+                resumen = importar_productos(self.inventarios[system_type], productos, resumen,
+                                             incremental=respuesta)
                 
                 messagebox.showinfo("Importación Exitosa", 
-                                  f"Se importaron {imported_count} productos exitosamente a {system_type.title()}")
+                                  f"Se importaron {resumen['importadas']} productos exitosamente a {system_type.title()}\n"
+                                  f"{resumen['leidas']} filas en {resumen['segundos']:.2f} s "
+                                  f"({resumen['filas_por_segundo']:,.0f} filas/s)")
                 
                 # ACTUALIZAR LA TABLA AUTOMÁTICAMENTE
                 self.refresh_inventory_tables(system_type)
@@ -1453,26 +1015,8 @@ class FullInventarioWindow:
         if messagebox.askyesno("Confirmar Limpieza", 
                               "¿Está seguro de que desea eliminar TODOS los productos de todos los inventarios?\n\nEsta acción no se puede deshacer."):
             try:
-                # Limpiar químicos
-                conn_q = sqlite3.connect(self.db_paths['quimicos'])
-                cursor_q = conn_q.cursor()
-                cursor_q.execute("DELETE FROM productos_quimicos")
-                conn_q.commit()
-                conn_q.close()
-                
-                # Limpiar almacén
-                conn_a = sqlite3.connect(self.db_paths['almacen'])
-                cursor_a = conn_a.cursor()
-                cursor_a.execute("DELETE FROM productos_almacen")
-                conn_a.commit()
-                conn_a.close()
-                
-                # Limpiar poscosecha
-                conn_p = sqlite3.connect(self.db_paths['poscosecha'])
-                cursor_p = conn_p.cursor()
-                cursor_p.execute("DELETE FROM productos_poscosecha")
-                conn_p.commit()
-                conn_p.close()
+                for inventario in self.inventarios.values():
+                    inventario.vaciar()
                 
                 # Actualizar todas las tablas
                 for tab in self.inventory_tabs:
@@ -1486,33 +1030,52 @@ class FullInventarioWindow:
                 messagebox.showerror("Error", f"Error limpiando inventarios: {e}")
     
     def generate_report(self):
-        """Generar reporte completo de inventarios"""
+        """Generar reporte completo de inventarios (resumen .txt o analítica en .xlsx/.csv)"""
         try:
             # Obtener estadísticas
             stats = self.get_inventory_stats()
             
-            # Crear contenido del reporte
-            report_content = "REPORTE DE INVENTARIOS\n"
-            report_content += "=" * 50 + "\n\n"
-            report_content += f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n\n"
-            report_content += f"QUÍMICOS: {stats['quimicos']} productos\n"
-            report_content += f"ALMACÉN: {stats['almacen']} productos\n"
-            report_content += f"POSCOSECHA: {stats['poscosecha']} productos\n"
-            report_content += f"TOTAL: {stats['total']} productos\n\n"
-            
             # Guardar reporte
             file_path = filedialog.asksaveasfilename(
                 title="Guardar Reporte",
                 defaultextension=".txt",
-                filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+                filetypes=[("Text files", "*.txt"), ("Excel files", "*.xlsx"), ("CSV files", "*.csv"),
+                           ("All files", "*.*")]
             )
             
-            if file_path:
+            if not file_path:
+                return
+            
+            if os.path.splitext(file_path)[1].lower() in ('.xlsx', '.csv'):
+                exportar_analitica(self.inventarios, file_path)
+            else:
+                analisis = analizar_inventarios(self.inventarios)
+                
+                # Crear contenido del reporte
+                report_content = "REPORTE DE INVENTARIOS\n"
+                report_content += "=" * 50 + "\n\n"
+                report_content += f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n\n"
+                report_content += f"QUÍMICOS: {stats['quimicos']} productos\n"
+                report_content += f"ALMACÉN: {stats['almacen']} productos\n"
+                report_content += f"POSCOSECHA: {stats['poscosecha']} productos\n"
+                report_content += f"TOTAL: {stats['total']} productos\n\n"
+                report_content += "ANÁLISIS DEL ÚLTIMO AÑO\n"
+                report_content += "-" * 50 + "\n"
+                for linea, grupo in analisis.groupby('linea', sort=False):
+                    clases = grupo['clase_abc'].value_counts()
+                    report_content += (f"{linea.upper()}: valor ${grupo['valor_stock'].sum():,.2f} | "
+                                       f"consumo ${grupo['valor_consumo'].sum():,.2f} | "
+                                       f"ABC {clases.get('A', 0)}/{clases.get('B', 0)}/{clases.get('C', 0)}\n")
+                    for fila in grupo[grupo['reponer']].itertuples():
+                        report_content += (f"   • Reponer {fila.codigo} {fila.nombre}: saldo {fila.saldo:.0f}, "
+                                           f"punto de reorden {fila.punto_reorden:.0f}, "
+                                           f"{fila.dias_cobertura:.0f} días de cobertura\n")
+                
                 with open(file_path, 'w', encoding='utf-8') as f:
                     f.write(report_content)
-                
-                messagebox.showinfo("Reporte Generado", 
-                                  f"Reporte guardado exitosamente en:\n{file_path}")
+            
+            messagebox.showinfo("Reporte Generado", 
+                              f"Reporte guardado exitosamente en:\n{file_path}")
                 
         except Exception as e:
             messagebox.showerror("Error", f"Error generando reporte: {e}")
@@ -1520,6 +1083,8 @@ class FullInventarioWindow:
     def export_data(self):
         """Exportar datos de todos los inventarios"""
         try:
+            import pandas as pd
+            
             # Seleccionar directorio de destino
             export_dir = filedialog.askdirectory(title="Seleccionar carpeta para exportar")
             
@@ -1528,32 +1093,12 @@ class FullInventarioWindow:
             
             exported_files = []
             
-            # Exportar químicos
-            conn_q = sqlite3.connect(self.db_paths['quimicos'])
-            df_q = pd.read_sql_query("SELECT * FROM productos_quimicos", conn_q)
-            if not df_q.empty:
-                file_path = os.path.join(export_dir, "inventario_quimicos.csv")
-                df_q.to_csv(file_path, index=False, encoding='utf-8')
-                exported_files.append("inventario_quimicos.csv")
-            conn_q.close()
-            
-            # Exportar almacén
-            conn_a = sqlite3.connect(self.db_paths['almacen'])
-            df_a = pd.read_sql_query("SELECT * FROM productos_almacen", conn_a)
-            if not df_a.empty:
-                file_path = os.path.join(export_dir, "inventario_almacen.csv")
-                df_a.to_csv(file_path, index=False, encoding='utf-8')
-                exported_files.append("inventario_almacen.csv")
-            conn_a.close()
-            
-            # Exportar poscosecha
-            conn_p = sqlite3.connect(self.db_paths['poscosecha'])
-            df_p = pd.read_sql_query("SELECT * FROM productos_poscosecha", conn_p)
-            if not df_p.empty:
-                file_path = os.path.join(export_dir, "inventario_poscosecha.csv")
-                df_p.to_csv(file_path, index=False, encoding='utf-8')
-                exported_files.append("inventario_poscosecha.csv")
-            conn_p.close()
+            for linea, inventario in self.inventarios.items():
+                df = pd.read_sql_query(f"SELECT * FROM {inventario.linea.tabla}", get_engine(inventario.db_path))
+                if not df.empty:
+                    nombre = f"inventario_{linea}.csv"
+                    df.to_csv(os.path.join(export_dir, nombre), index=False, encoding='utf-8')
+                    exported_files.append(nombre)
             
             if exported_files:
                 messagebox.showinfo("Exportación Exitosa", 
@@ -1607,6 +1152,20 @@ class FullInventarioWindow:
 
 # ================= PESTAÑA INDIVIDUAL PARA CADA SISTEMA =================
 
+# Columnas de la tabla de cada inventario: (encabezado, campo del producto)
+COLUMNAS_INVENTARIO = {
+    'quimicos': (('Codigo', 'codigo'), ('Clase', 'clase'), ('Producto', 'nombre'), ('Saldo', 'saldo'),
+                 ('Unidad', 'unidad'), ('Valor', 'valor_unitario'), ('Ubicacion', 'ubicacion'),
+                 ('Proveedor', 'proveedor'), ('Peligrosidad', 'nivel_peligrosidad')),
+    'almacen': (('Codigo', 'codigo'), ('Producto', 'nombre'), ('Saldo', 'saldo'), ('Unidad', 'unidad'),
+                ('Valor', 'valor_unitario'), ('Stock Min', 'stock_minimo'), ('Ubicacion', 'ubicacion'),
+                ('Proveedor', 'proveedor')),
+    'poscosecha': (('Codigo', 'codigo'), ('Categoria', 'categoria'), ('Producto', 'nombre'), ('Saldo', 'saldo'),
+                   ('Unidad', 'unidad'), ('Valor', 'valor_unitario'), ('Stock Min', 'stock_minimo'),
+                   ('Ubicacion', 'ubicacion'), ('Tipo', 'tipo_producto')),
+}
+
+
 class InventorySystemTab:
     """Pestaña individual para cada sistema de inventario"""
     
@@ -1614,6 +1173,8 @@ class InventorySystemTab:
         self.parent = parent
         self.system_type = system_type
         self.db_path = db_path
+        self.inventario = get_inventario(system_type, db_path)
+        self.columnas = COLUMNAS_INVENTARIO[system_type]
         self.color = color
         self.main_window = main_window
         
@@ -1715,16 +1276,9 @@ class InventorySystemTab:
                                    padx=15, pady=10)
         table_frame.pack(fill=tk.BOTH, expand=True, pady=(10, 0))
         
-        # Configurar columnas según el tipo de sistema
-        if self.system_type == 'quimicos':
-            columns = ('Codigo', 'Clase', 'Producto', 'Saldo', 'Unidad', 'Valor', 'Ubicacion', 'Proveedor', 'Peligrosidad')
-            style_name = 'Quimicos.Treeview'
-        elif self.system_type == 'almacen':
-            columns = ('Codigo', 'Producto', 'Saldo', 'Unidad', 'Valor', 'Stock Min', 'Ubicacion', 'Proveedor')
-            style_name = 'Almacen.Treeview'
-        else:  # poscosecha
-            columns = ('Codigo', 'Categoria', 'Producto', 'Saldo', 'Unidad', 'Valor', 'Stock Min', 'Ubicacion', 'Tipo')
-            style_name = 'Poscosecha.Treeview'
+        # Columnas según el tipo de sistema
+        columns = tuple(encabezado for encabezado, _ in self.columnas)
+        style_name = f"{self.system_type.title()}.Treeview"
         
         # TreeView con altura reducida para dar espacio a los botones
         self.tree = ttk.Treeview(table_frame, columns=columns, show='headings',
@@ -1762,8 +1316,8 @@ class InventorySystemTab:
         actions_frame = tk.Frame(parent, bg='#f8f9fa')
         actions_frame.pack(fill=tk.X, pady=(10, 0))
         
-        # Configurar expansión de columnas para botones responsive (8 columnas)
-        for i in range(8):
+        # Configurar expansión de columnas para botones responsive (10 columnas)
+        for i in range(10):
             actions_frame.grid_columnconfigure(i, weight=1)
         
         # Todos los botones en una sola fila compacta
@@ -1772,9 +1326,11 @@ class InventorySystemTab:
             ("Editar", self.edit_product, '#34495e'),
             ("Entrada", self.movimiento_entrada, '#27ae60'),
             ("Salida", self.movimiento_salida, '#e74c3c'),
+            ("En bloque", self.movimientos_en_bloque, '#d35400'),
             ("Historial", self.ver_historial_movimientos, '#8e44ad'),
             ("Eliminar", self.delete_product, '#c0392b'),
             ("Exportar", self.export_products, '#7f8c8d'),
+            ("PDF", self.reporte_pdf, '#16a085'),
             ("Importar", lambda: self.main_window.import_from_excel_to_inventory(self.system_type), '#f39c12')
         ]
         
@@ -1788,54 +1344,30 @@ class InventorySystemTab:
     
     def load_data(self):
         """Cargar datos en la tabla"""
+        self.mostrar_productos()
+    
+    def mostrar_productos(self, texto=''):
+        """Llenar la tabla con los productos (filtrados por texto completo si hay búsqueda)"""
         try:
             # Limpiar tabla
             for item in self.tree.get_children():
                 self.tree.delete(item)
             
-            # Conectar a base de datos
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Query según tipo de sistema
-            if self.system_type == 'quimicos':
-                cursor.execute("""
-                    SELECT codigo, clase, nombre, saldo, unidad, valor_unitario, 
-                           ubicacion, proveedor, nivel_peligrosidad
-                    FROM productos_quimicos ORDER BY codigo
-                """)
-            elif self.system_type == 'almacen':
-                cursor.execute("""
-                    SELECT codigo, nombre, saldo, unidad, valor_unitario, 
-                           stock_minimo, ubicacion, proveedor
-                    FROM productos_almacen ORDER BY codigo
-                """)
-            else:  # poscosecha
-                cursor.execute("""
-                    SELECT codigo, categoria, nombre, saldo, unidad, valor_unitario,
-                           stock_minimo, ubicacion, tipo_producto
-                    FROM productos_poscosecha ORDER BY codigo
-                """)
-            
-            # Cargar datos
-            products_count = 0
-            for row in cursor.fetchall():
-                # Formatear valores
-                formatted_row = list(row)
-                if self.system_type == 'quimicos':
-                    formatted_row[5] = f"${row[5]:,.0f}" if row[5] else "$0"
-                elif self.system_type == 'almacen':
-                    formatted_row[4] = f"${row[4]:,.0f}" if row[4] else "$0"
-                else:  # poscosecha
-                    formatted_row[5] = f"${row[5]:,.0f}" if row[5] else "$0"
-                
-                self.tree.insert('', tk.END, values=formatted_row)
-                products_count += 1
+            productos = self.inventario.productos(texto)
+            for producto in productos:
+                valores = []
+                for _, campo in self.columnas:
+                    valor = getattr(producto, campo)
+                    if campo == 'valor_unitario':
+                        valor = f"${valor:,.0f}" if valor else "$0"
+                    valores.append(valor)
+                self.tree.insert('', tk.END, values=valores)
             
             # Actualizar contador
-            self.count_label.config(text=f"Total: {products_count} productos")
-            
-            conn.close()
+            if texto:
+                self.count_label.config(text=f"Encontrados: {len(productos)} productos")
+            else:
+                self.count_label.config(text=f"Total: {len(productos)} productos")
             
         except Exception as e:
             print(f"Error cargando datos de {self.system_type}: {e}")
@@ -1847,64 +1379,7 @@ class InventorySystemTab:
     
     def search_products(self):
         """Buscar productos"""
-        search_term = self.search_var.get().strip().lower()
-        if not search_term:
-            self.load_data()
-            return
-        
-        try:
-            # Limpiar tabla
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Query de búsqueda según tipo
-            if self.system_type == 'quimicos':
-                cursor.execute("""
-                    SELECT codigo, clase, nombre, saldo, unidad, valor_unitario, 
-                           ubicacion, proveedor, nivel_peligrosidad
-                    FROM productos_quimicos 
-                    WHERE LOWER(nombre) LIKE ? OR LOWER(codigo) LIKE ? OR LOWER(clase) LIKE ?
-                    ORDER BY codigo
-                """, (f'%{search_term}%', f'%{search_term}%', f'%{search_term}%'))
-            elif self.system_type == 'almacen':
-                cursor.execute("""
-                    SELECT codigo, nombre, saldo, unidad, valor_unitario, 
-                           stock_minimo, ubicacion, proveedor
-                    FROM productos_almacen 
-                    WHERE LOWER(nombre) LIKE ? OR LOWER(codigo) LIKE ?
-                    ORDER BY codigo
-                """, (f'%{search_term}%', f'%{search_term}%'))
-            else:  # poscosecha
-                cursor.execute("""
-                    SELECT codigo, categoria, nombre, saldo, unidad, valor_unitario,
-                           stock_minimo, ubicacion, tipo_producto
-                    FROM productos_poscosecha 
-                    WHERE LOWER(nombre) LIKE ? OR LOWER(codigo) LIKE ? OR LOWER(categoria) LIKE ?
-                    ORDER BY codigo
-                """, (f'%{search_term}%', f'%{search_term}%', f'%{search_term}%'))
-            
-            # Cargar resultados
-            results_count = 0
-            for row in cursor.fetchall():
-                formatted_row = list(row)
-                if self.system_type == 'quimicos':
-                    formatted_row[5] = f"${row[5]:,.0f}" if row[5] else "$0"
-                elif self.system_type == 'almacen':
-                    formatted_row[4] = f"${row[4]:,.0f}" if row[4] else "$0"
-                else:
-                    formatted_row[5] = f"${row[5]:,.0f}" if row[5] else "$0"
-                
-                self.tree.insert('', tk.END, values=formatted_row)
-                results_count += 1
-            
-            self.count_label.config(text=f"Encontrados: {results_count} productos")
-            conn.close()
-            
-        except Exception as e:
-            print(f"Error en búsqueda: {e}")
+        self.mostrar_productos(self.search_var.get().strip())
     
     def clear_search(self):
         """Limpiar búsqueda"""
@@ -1941,18 +1416,7 @@ class InventorySystemTab:
         if product:
             if messagebox.askyesno("Confirmar", f"¿Eliminar el producto {product[0]}?"):
                 try:
-                    conn = sqlite3.connect(self.db_path)
-                    cursor = conn.cursor()
-                    
-                    if self.system_type == 'quimicos':
-                        cursor.execute("DELETE FROM productos_quimicos WHERE codigo = ?", (product[0],))
-                    elif self.system_type == 'almacen':
-                        cursor.execute("DELETE FROM productos_almacen WHERE codigo = ?", (product[0],))
-                    else:
-                        cursor.execute("DELETE FROM productos_poscosecha WHERE codigo = ?", (product[0],))
-                    
-                    conn.commit()
-                    conn.close()
+                    self.inventario.eliminar_producto(product[0])
                     
                     self.load_data()
                     messagebox.showinfo("Éxito", "Producto eliminado")
@@ -1970,27 +1434,24 @@ class InventorySystemTab:
         
         if file_path:
             try:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                
-                if self.system_type == 'quimicos':
-                    cursor.execute("SELECT * FROM productos_quimicos")
-                elif self.system_type == 'almacen':
-                    cursor.execute("SELECT * FROM productos_almacen")
-                else:
-                    cursor.execute("SELECT * FROM productos_poscosecha")
-                
-                with open(file_path, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow([description[0] for description in cursor.description])
-                    writer.writerows(cursor.fetchall())
-                
-                conn.close()
+                self.inventario.exportar_csv(file_path)
                 messagebox.showinfo("Éxito", f"Datos exportados a: {file_path}")
                 
             except Exception as e:
                 messagebox.showerror("Error", f"Error exportando: {e}")
 
+    def reporte_pdf(self):
+        """Generar el reporte PDF de existencias en segundo plano"""
+        job = get_report_pipeline().submit('inventario', sistema=self.system_type, db_path=self.db_path)
+        
+        def terminado(job):
+            if job.estado != 'listo':
+                messagebox.showerror("Error", f"Error generando PDF: {job.error}")
+            elif messagebox.askyesno("Reporte PDF", f"Reporte guardado en:\n{job.ruta}\n\n¿Desea abrirlo?"):
+                abrir_archivo(job.ruta)
+        
+        esperar_reporte(self.parent, job, terminado)
+
     def movimiento_entrada(self):
         """Abrir diálogo de entrada de stock"""
         try:
@@ -2013,6 +1474,16 @@ class InventorySystemTab:
         except Exception as e:
             messagebox.showerror("Error", f"Error al abrir salida de stock: {e}")
 
+    def movimientos_en_bloque(self):
+        """Abrir la grilla de entradas o salidas de varias líneas"""
+        tipo = messagebox.askquestion("Movimientos en bloque", "¿Registrar ENTRADAS?\n(No = salidas)")
+        try:
+            from utils.movimientos_inventario import MovimientosEnBloqueWindow
+            MovimientosEnBloqueWindow(self.parent, self.system_type, 'entrada' if tipo == 'yes' else 'salida',
+                                      self.db_path)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al abrir movimientos en bloque: {e}")
+
     def ver_historial_movimientos(self):
         """Ver historial de movimientos"""
         try:
@@ -2142,22 +1613,12 @@ class ProductFormWindow:
         ]
         
         # Campos específicos por sistema
-        if self.tab.system_type == 'quimicos':
-            specific_fields = [
-                ("Clase:", "clase"),
-                ("Nivel Peligrosidad:", "nivel_peligrosidad"),
-                ("Fecha Vencimiento:", "fecha_vencimiento")
-            ]
-        elif self.tab.system_type == 'almacen':
-            specific_fields = [
-                ("Stock Mínimo:", "stock_minimo")
-            ]
-        else:  # poscosecha
-            specific_fields = [
-                ("Categoría:", "categoria"),
-                ("Stock Mínimo:", "stock_minimo"),
-                ("Tipo Producto:", "tipo_producto")
-            ]
+        etiquetas = {
+            'clase': "Clase:", 'nivel_peligrosidad': "Nivel Peligrosidad:",
+            'fecha_vencimiento': "Fecha Vencimiento:", 'stock_minimo': "Stock Mínimo:",
+            'categoria': "Categoría:", 'tipo_producto': "Tipo Producto:"
+        }
+        specific_fields = [(etiquetas[campo], campo) for campo in self.tab.inventario.linea.campos]
         
         # Crear campos
         all_fields = common_fields + specific_fields
@@ -2220,35 +1681,19 @@ class ProductFormWindow:
         if not self.product_data:
             return
         
-        # Mapear datos según tipo de sistema
-        if self.tab.system_type == 'quimicos':
-            mapping = {
-                'codigo': 0, 'clase': 1, 'nombre': 2, 'saldo': 3, 'unidad': 4,
-                'valor_unitario': 5, 'ubicacion': 6, 'proveedor': 7, 'nivel_peligrosidad': 8
-            }
-        elif self.tab.system_type == 'almacen':
-            mapping = {
-                'codigo': 0, 'nombre': 1, 'saldo': 2, 'unidad': 3,
-                'valor_unitario': 4, 'stock_minimo': 5, 'ubicacion': 6, 'proveedor': 7
-            }
-        else:  # poscosecha
-            mapping = {
-                'codigo': 0, 'categoria': 1, 'nombre': 2, 'saldo': 3, 'unidad': 4,
-                'valor_unitario': 5, 'stock_minimo': 6, 'ubicacion': 7, 'tipo_producto': 8
-            }
+        producto = self.tab.inventario.producto(str(self.product_data[0]))
+        if not producto:
+            return
         
         # Cargar datos en los campos
         for field_name, widget in self.entries.items():
-            if field_name in mapping:
-                index = mapping[field_name]
-                if index < len(self.product_data):
-                    value = self.product_data[index]
-                    if value is not None:
-                        if isinstance(widget, ttk.Combobox):
-                            widget.set(str(value))
-                        else:
-                            widget.delete(0, tk.END)
-                            widget.insert(0, str(value))
+            value = getattr(producto, field_name)
+            if value is not None:
+                if isinstance(widget, ttk.Combobox):
+                    widget.set(str(value))
+                else:
+                    widget.delete(0, tk.END)
+                    widget.insert(0, str(value))
     
     def save_product(self):
         """Guardar producto"""
@@ -2272,29 +1717,24 @@ class ProductFormWindow:
                 else:
                     data[field_name] = value
             
-            # Conectar a base de datos
-            conn = sqlite3.connect(self.tab.db_path)
-            cursor = conn.cursor()
+            if 'fecha_vencimiento' in data:
+                data['fecha_vencimiento'] = data['fecha_vencimiento'] or None
+            
+            # Verificar código único
+            codigo_original = None if self.mode == "new" else str(self.product_data[0])
+            if data['codigo'] != codigo_original and self.tab.inventario.producto(data['codigo']):
+                messagebox.showerror("Error", "El código ya existe")
+                return
             
             if self.mode == "new":
-                # Verificar código único
-                table_name = f"productos_{self.tab.system_type}"
-                cursor.execute(f"SELECT id FROM {table_name} WHERE codigo = ?", (data['codigo'],))
-                if cursor.fetchone():
-                    messagebox.showerror("Error", "El código ya existe")
-                    return
-                
                 # Insertar nuevo producto
-                self.insert_new_product(cursor, data)
+                self.tab.inventario.guardar_producto(data)
                 message = "Producto creado exitosamente"
             else:
                 # Actualizar producto existente
-                self.update_existing_product(cursor, data)
+                self.tab.inventario.guardar_producto(data, codigo_original)
                 message = "Producto actualizado exitosamente"
             
-            conn.commit()
-            conn.close()
-            
             messagebox.showinfo("Éxito", message)
             self.tab.load_data()
             
@@ -2308,80 +1748,6 @@ class ProductFormWindow:
         except Exception as e:
             messagebox.showerror("Error", f"Error guardando producto: {e}")
     
-    def insert_new_product(self, cursor, data):
-        """Insertar nuevo producto"""
-        if self.tab.system_type == 'quimicos':
-            cursor.execute('''
-                INSERT INTO productos_quimicos 
-                (codigo, clase, nombre, saldo, unidad, valor_unitario, ubicacion, proveedor, nivel_peligrosidad, fecha_vencimiento)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                data['codigo'], data.get('clase', ''), data['nombre'], data['saldo'],
-                data['unidad'], data['valor_unitario'], data.get('ubicacion', ''),
-                data.get('proveedor', ''), data.get('nivel_peligrosidad', 'MEDIO'),
-                data.get('fecha_vencimiento', '') or None
-            ))
-        elif self.tab.system_type == 'almacen':
-            cursor.execute('''
-                INSERT INTO productos_almacen 
-                (codigo, nombre, saldo, unidad, valor_unitario, stock_minimo, ubicacion, proveedor)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                data['codigo'], data['nombre'], data['saldo'], data['unidad'],
-                data['valor_unitario'], data.get('stock_minimo', 0),
-                data.get('ubicacion', ''), data.get('proveedor', '')
-            ))
-        else:  # poscosecha
-            cursor.execute('''
-                INSERT INTO productos_poscosecha 
-                (codigo, categoria, nombre, saldo, unidad, valor_unitario, stock_minimo, ubicacion, proveedor, tipo_producto)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                data['codigo'], data.get('categoria', ''), data['nombre'], data['saldo'],
-                data['unidad'], data['valor_unitario'], data.get('stock_minimo', 0),
-                data.get('ubicacion', ''), data.get('proveedor', ''), data.get('tipo_producto', '')
-            ))
-    
-    def update_existing_product(self, cursor, data):
-        """Actualizar producto existente"""
-        codigo_original = self.product_data[0]
-        
-        if self.tab.system_type == 'quimicos':
-            cursor.execute('''
-                UPDATE productos_quimicos SET 
-                codigo=?, clase=?, nombre=?, saldo=?, unidad=?, valor_unitario=?, 
-                ubicacion=?, proveedor=?, nivel_peligrosidad=?, fecha_vencimiento=?
-                WHERE codigo=?
-            ''', (
-                data['codigo'], data.get('clase', ''), data['nombre'], data['saldo'],
-                data['unidad'], data['valor_unitario'], data.get('ubicacion', ''),
-                data.get('proveedor', ''), data.get('nivel_peligrosidad', 'MEDIO'),
-                data.get('fecha_vencimiento', '') or None, codigo_original
-            ))
-        elif self.tab.system_type == 'almacen':
-            cursor.execute('''
-                UPDATE productos_almacen SET 
-                codigo=?, nombre=?, saldo=?, unidad=?, valor_unitario=?, 
-                stock_minimo=?, ubicacion=?, proveedor=?
-                WHERE codigo=?
-            ''', (
-                data['codigo'], data['nombre'], data['saldo'], data['unidad'],
-                data['valor_unitario'], data.get('stock_minimo', 0),
-                data.get('ubicacion', ''), data.get('proveedor', ''), codigo_original
-            ))
-        else:  # poscosecha
-            cursor.execute('''
-                UPDATE productos_poscosecha SET 
-                codigo=?, categoria=?, nombre=?, saldo=?, unidad=?, valor_unitario=?, 
-                stock_minimo=?, ubicacion=?, proveedor=?, tipo_producto=?
-                WHERE codigo=?
-            ''', (
-                data['codigo'], data.get('categoria', ''), data['nombre'], data['saldo'],
-                data['unidad'], data['valor_unitario'], data.get('stock_minimo', 0),
-                data.get('ubicacion', ''), data.get('proveedor', ''), 
-                data.get('tipo_producto', ''), codigo_original
-            ))
-    
     def clear_form(self):
         """Limpiar formulario"""
         for widget in self.entries.values():
@@ -2484,6 +1850,7 @@ class EmpleadosWindow:
         date_label = tk.Label(main_frame, text="Fecha de Nacimiento:", font=('Arial', 11, 'bold'),
                             bg='#f8f9fa', fg='#2c3e50')
         date_label.grid(row=row, column=0, sticky=tk.W, pady=10, padx=(0, 15))
+        from tkcalendar import DateEntry
         self.date_fecha_nacimiento = DateEntry(main_frame, width=27, background='darkblue', foreground='white', 
                                               borderwidth=2, date_pattern='dd/mm/yyyy', font=('Arial', 10))
         self.date_fecha_nacimiento.grid(row=row, column=1, pady=8)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Grilla Virtual
+Envuelve un ttk.Treeview para mostrar listas muy largas materializando solo
+las filas visibles. La barra de desplazamiento, la rueda del ratón y las
+flechas del teclado se traducen a un desplazamiento sobre la lista completa.
+"""
+
+from typing import Callable, List, Optional
+
+
+class VirtualGrid:
+    """Vista virtual sobre un Treeview: solo existen como ítems las filas en pantalla"""
+
+    def __init__(self, tree, v_scrollbar, rowheight: int = 25):
+        self.tree = tree
+        self.scrollbar = v_scrollbar
+        self.rowheight = rowheight
+        self.filas: List = []
+        self.valores: Optional[Callable] = None
+        self.clave: Callable = str
+        self.offset = 0
+        self.visibles = 20
+        self._seleccion = set()
+
+        self.scrollbar.configure(command=self._on_scrollbar)
+        self.tree.configure(yscrollcommand=lambda *args: None)
+        self.tree.bind('<Configure>', self._on_configure)
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll(3))
+        self.tree.bind('<Down>', lambda e: self._mover_seleccion(1))
+        self.tree.bind('<Up>', lambda e: self._mover_seleccion(-1))
+        self.tree.bind('<Next>', lambda e: self._mover_seleccion(self.visibles))
+        self.tree.bind('<Prior>', lambda e: self._mover_seleccion(-self.visibles))
+        self.tree.bind('<<TreeviewSelect>>', self._on_select, add='+')
+
+    def set_rows(self, filas: List, valores: Callable, clave: Callable = str):
+        """
+        filas: lista completa (p.ej. índices del almacén)
+        valores: fila → tupla de valores de columnas
+        clave: fila → iid estable (para conservar la selección al desplazar)
+        """
+        self.filas = filas
+        self.valores = valores
+        self.clave = clave
+        self.offset = min(self.offset, max(0, len(filas) - self.visibles))
+        self.render()
+
+    def __len__(self):
+        return len(self.filas)
+
+    def seleccion(self) -> set:
+        """iids seleccionados, incluidos los que quedaron fuera de la ventana visible"""
+        return set(self._seleccion)
+
+    def render(self):
+        """Materializar solo la ventana visible"""
+        ventana = self.filas[self.offset:self.offset + self.visibles]
+        self.tree.delete(*self.tree.get_children())
+        for fila in ventana:
+            self.tree.insert('', 'end', iid=self.clave(fila), values=self.valores(fila))
+        visibles = [iid for iid in self._seleccion if self.tree.exists(iid)]
+        if visibles:
+            self.tree.selection_set(visibles)
+
+        total = len(self.filas)
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.visibles) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll(self, filas: int):
+        maximo = max(0, len(self.filas) - self.visibles)
+        nuevo = max(0, min(maximo, self.offset + filas))
+        if nuevo != self.offset:
+            self.offset = nuevo
+            self.render()
+        return 'break'
+
+    def _on_scrollbar(self, accion, cantidad, unidad=None):
+        if accion == 'moveto':
+            self.scroll(int(float(cantidad) * len(self.filas)) - self.offset)
+        elif accion == 'scroll':
+            paso = self.visibles if unidad == 'pages' else 1
+            self.scroll(int(cantidad) * paso)
+
+    def _on_mousewheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def _on_configure(self, event):
+        # Una fila menos por la cabecera de columnas
+        visibles = max(1, event.height // self.rowheight - 1)
+        if visibles != self.visibles:
+            self.visibles = visibles
+            self.offset = min(self.offset, max(0, len(self.filas) - self.visibles))
+            self.render()
+
+    def _on_select(self, event=None):
+        en_pantalla = set(self.tree.get_children())
+        self._seleccion = (self._seleccion - en_pantalla) | set(self.tree.selection())
+
+    def _mover_seleccion(self, paso: int):
+        if not self.filas:
+            return 'break'
+        claves = [self.clave(f) for f in self.filas[self.offset:self.offset + self.visibles]]
+        actual = self.tree.selection()
+        if actual and actual[0] in claves:
+            posicion = self.offset + claves.index(actual[0])
+        else:
+            posicion = self.offset - paso if paso > 0 else self.offset + self.visibles
+        destino = max(0, min(len(self.filas) - 1, posicion + paso))
+
+        if destino < self.offset:
+            self.offset = destino
+        elif destino >= self.offset + self.visibles:
+            self.offset = destino - self.visibles + 1
+        self._seleccion = {self.clave(self.filas[destino])}
+        self.render()
+        self.tree.focus(self.clave(self.filas[destino]))
+        return 'break'
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de los endpoints de Railway que escriben datos (secreto compartido)
+"""
+
+import importlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+TOKEN = 'secreto-de-prueba'
+AUTORIZADO = {'Authorization': f"Bearer {TOKEN}"}
+
+
+@pytest.fixture
+def servidor(tmp_path, monkeypatch):
+    """app.py recién importado en un directorio temporal (crea ahí su base)"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('RAILWAY_ENVIRONMENT', raising=False)
+    monkeypatch.setenv('RAILWAY_API_TOKEN', TOKEN)
+    sys.modules.pop('app', None)
+    modulo = importlib.import_module('app')
+    yield modulo
+    sys.modules.pop('app', None)
+
+
+def _contar(modulo, tabla):
+    conn = modulo.get_db_connection()
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_restaurar_snapshot_exige_el_token(servidor, monkeypatch):
+    cliente = servidor.app.test_client()
+    assert cliente.post('/api/empleados', json={'cedula': '1', 'nombre_completo': 'Ana'},
+                        headers=AUTORIZADO).status_code == 200
+
+    for headers in ({}, {'Authorization': 'Bearer otro'}, {'Authorization': TOKEN}):
+        respuesta = cliente.post('/restore_snapshot', data=b'basura', headers=headers)
+        assert respuesta.status_code == 401
+    assert _contar(servidor, 'empleados') == 1
+
+    # Con el token pasa a validar el contenido
+    assert cliente.post('/restore_snapshot', data=b'basura', headers=AUTORIZADO).status_code != 401
+
+    # Sin secreto configurado en el servidor el endpoint queda cerrado
+    monkeypatch.delenv('RAILWAY_API_TOKEN')
+    assert cliente.post('/restore_snapshot', data=b'basura', headers=AUTORIZADO).status_code == 401
+
+
+def test_escrituras_de_empleados_exigen_token_y_la_baja_es_logica(servidor):
+    cliente = servidor.app.test_client()
+    for metodo, ruta, cuerpo in (('post', '/api/empleados', {'cedula': '1', 'nombre_completo': 'Ana'}),
+                                 ('put', '/api/empleados/1', {'cargo': 'Jefe'}),
+                                 ('delete', '/api/empleados/1', None),
+                                 ('post', '/api/asistencias', {'cedula_empleado': '1', 'fecha': '2025-01-02'}),
+                                 ('post', '/api/batch', {'operations': []})):
+        assert getattr(cliente, metodo)(ruta, json=cuerpo).status_code == 401
+
+    cliente.post('/api/empleados', json={'cedula': '1', 'nombre_completo': 'Ana'}, headers=AUTORIZADO)
+    cliente.post('/api/empleados', json={'cedula': '2', 'nombre_completo': 'Luis'}, headers=AUTORIZADO)
+    assert cliente.post('/api/asistencias', headers=AUTORIZADO, json={
+        'cedula_empleado': '1', 'fecha': '2025-01-02', 'hora_entrada': '08:00:00'}).status_code == 200
+
+    # La baja deja el empleado inactivo y sus asistencias enlazadas
+    assert cliente.delete('/api/empleados/1', headers=AUTORIZADO).status_code == 200
+    respuesta = cliente.post('/api/batch', headers=AUTORIZADO, json={
+        'operations': [{'op': 'delete_empleado', 'cedula': '2'}, {'op': 'delete_empleado', 'cedula': '9'}]})
+    assert [r['success'] for r in respuesta.get_json()['results']] == [True, False]
+    assert {e['cedula']: e['estado'] for e in cliente.get('/api/empleados').get_json()} == {'1': 0, '2': 0}
+    asistencias = cliente.get('/api/asistencias').get_json()
+    assert [(a['cedula_empleado'], a['fecha']) for a in asistencias] == [('1', '2025-01-02')]
+    assert cliente.delete('/api/empleados/9', headers=AUTORIZADO).status_code == 404
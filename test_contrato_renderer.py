@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests del renderizador de contratos Excel con plantilla en caché
+"""
+
+import os
+import sys
+import zipfile
+from datetime import date
+
+import openpyxl
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from models.database import Contrato, Empleado, TipoContrato
+from utils.contrato_excel_renderer import ContratoTemplate, generar_contratos_masivo, variables_contrato
+
+
+def _plantilla(tmp_path):
+    ruta = str(tmp_path / "plantilla.xlsx")
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws['A1'] = "CONTRATO {TIPO_CONTRATO}"
+    ws['A2'] = "Trabajador: {NOMBRE_EMPLEADO} C.C. {CEDULA_EMPLEADO}"
+    ws['A3'] = "='BASE DE DATOS'!H24"
+    ws['A4'] = "='BASE DE DATOS'!Z99"
+    ws['A5'] = "{VARIABLE_DESCONOCIDA}"
+    ws['A6'] = "Texto fijo"
+    wb.save(ruta)
+    return ruta
+
+
+def _contrato(i):
+    empleado = Empleado(id=i, cedula=str(500 + i), nombre_completo=f"María Peña {i}")
+    return Contrato(id=i, empleado=empleado, tipo_contrato=TipoContrato(nombre='Término fijo'),
+                    fecha_inicio=date(2025, 1, 1), salario=1423500, estado='activo')
+
+
+def test_render_llena_y_restaura_la_plantilla(tmp_path):
+    plantilla = ContratoTemplate(_plantilla(tmp_path))
+    for i in (1, 2):
+        contrato = _contrato(i)
+        destino = str(tmp_path / f"c{i}.xlsx")
+        assert plantilla.render(variables_contrato(contrato, contrato.empleado), destino) == 4
+
+        ws = openpyxl.load_workbook(destino).active
+        assert ws['A1'].value == "CONTRATO Término fijo"
+        assert ws['A2'].value == f"Trabajador: María Peña {i} C.C. {500 + i}"
+        assert ws['A3'].value == "UN MILLÓN CUATROCIENTOS VEINTITRÉS MIL QUINIENTOS PESOS"
+        assert ws['A4'].value == "='BASE DE DATOS'!Z99"
+        assert ws['A5'].value == "{VARIABLE_DESCONOCIDA}"
+
+    assert plantilla._ws['A2'].value == "Trabajador: {NOMBRE_EMPLEADO} C.C. {CEDULA_EMPLEADO}"
+
+
+def test_masivo_a_zip(tmp_path):
+    zip_path = str(tmp_path / "contratos.zip")
+    resumen = generar_contratos_masivo([_contrato(i) for i in range(5)], zip_path=zip_path,
+                                       template_path=_plantilla(tmp_path))
+    assert resumen['generados'] == 5 and not resumen['errores']
+    with zipfile.ZipFile(zip_path) as archivo:
+        assert len(archivo.namelist()) == 5
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests del listado de contratos y del índice de documentos
+"""
+
+import os
+import sys
+from datetime import date
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from models.database import Base, Contrato, Empleado, TipoContrato
+from models.contratos import contar_por_estado, listar_contratos
+from utils.document_index import DocumentIndex
+
+
+def _sesion_con_contratos():
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    tipo = TipoContrato(nombre='Término fijo')
+    for i, estado in enumerate(['activo', 'activo', 'borrador', 'terminado']):
+        empleado = Empleado(cedula=str(100 + i), nombre_completo=f"Empleado {i}")
+        db.add(Contrato(empleado=empleado, tipo_contrato=tipo if i % 2 == 0 else None,
+                        fecha_inicio=date(2025, 1, 1), salario=1300000, estado=estado))
+    db.commit()
+    db.expunge_all()
+    return engine, db
+
+
+def test_listado_en_una_consulta():
+    """Empleado y tipo de contrato no disparan consultas adicionales por fila"""
+    engine, db = _sesion_con_contratos()
+    sentencias = []
+    event.listen(engine, 'before_cursor_execute', lambda *args: sentencias.append(args[2]))
+
+    contratos = listar_contratos(db)
+    filas = [(c.empleado.cedula, c.tipo_contrato.nombre if c.tipo_contrato else None) for c in contratos]
+
+    assert len(sentencias) == 1
+    assert filas == [('100', 'Término fijo'), ('101', None), ('102', 'Término fijo'), ('103', None)]
+
+    sentencias.clear()
+    assert contar_por_estado(db) == {'activo': 2, 'borrador': 1, 'terminado': 1}
+    assert len(sentencias) == 1
+
+
+def test_indice_de_documentos(tmp_path):
+    """El índice sirve desde memoria hasta que se invalida"""
+    carpeta = tmp_path / 'Ana_Perez_123' / 'contratos'
+    carpeta.mkdir(parents=True)
+    (carpeta / 'contrato_excel_123_1.xlsx').write_bytes(b'')
+
+    indice = DocumentIndex(str(tmp_path), ttl=3600)
+    nombre = indice.carpeta_de('Ana Perez', '123')
+    assert indice.archivos(nombre, 'contratos/contrato_excel_*.xlsx') == ['contratos/contrato_excel_123_1.xlsx']
+
+    (carpeta / 'contrato_excel_123_2.xlsx').write_bytes(b'')
+    assert len(indice.archivos(nombre)) == 1
+    indice.invalidate()
+    assert len(indice.archivos(nombre)) == 2
+
+
+def test_indice_por_cedula_y_refresco_incremental(tmp_path):
+    """Búsqueda por cédula, registro directo de archivos y refresco solo de lo cambiado"""
+    (tmp_path / 'Ana_Maria_Perez_10_20' / 'contratos').mkdir(parents=True)
+    (tmp_path / 'Luis_Gomez_30').mkdir()
+    (tmp_path / 'Luis_Gomez_30' / 'notas.txt').write_text('x')
+
+    indice = DocumentIndex(str(tmp_path))
+    assert indice.refrescar() == 2
+    assert indice.refrescar() == 0
+    assert indice.cedulas_con_excel() == set()
+
+    ruta = tmp_path / 'Ana_Maria_Perez_10_20' / 'contratos' / 'empleado_10_20_1.xlsx'
+    ruta.write_bytes(b'12345')
+    indice.registrar_archivo(str(ruta))
+    assert indice.tiene_excel('10 20')
+    assert not indice.tiene_excel('30')
+    assert indice.documentos('10_20')[0]['tamano'] == 5
+    assert indice.ultimo_documento('Ana_Maria_Perez_10_20') == str(ruta)
+    assert indice.refrescar() == 0
+
+    (tmp_path / 'Luis_Gomez_30' / 'hoja.xlsx').write_bytes(b'')
+    os.utime(tmp_path / 'Luis_Gomez_30', (1, 1))
+    assert indice.refrescar() == 1
+    assert indice.cedulas_con_excel() >= {'10_20', '30'}
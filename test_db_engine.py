@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de la fábrica de engines SQLite compartida
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from models.engine import connect_db, get_engine
+
+
+def test_pragmas_y_engine_compartido(tmp_path):
+    """Cada conexión del pool sale en WAL/NORMAL y el engine es uno por archivo"""
+    db_path = str(tmp_path / 'prueba.db')
+    assert get_engine(db_path) is get_engine(os.path.join(str(tmp_path), '.', 'prueba.db'))
+
+    conn = connect_db(db_path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+    conn.close()
+
+
+def test_triggers_que_se_actualizan_a_si_mismos(tmp_path):
+    """Los PRAGMAs compartidos no cambian la semántica: sin recursive_triggers"""
+    conn = connect_db(str(tmp_path / 'triggers.db'))
+    conn.executescript("""
+        CREATE TABLE p (id INTEGER PRIMARY KEY, saldo INTEGER, fecha_actualizacion TEXT);
+        CREATE TRIGGER p_fecha AFTER UPDATE ON p BEGIN
+            UPDATE p SET fecha_actualizacion = 'hoy' WHERE id = NEW.id;
+        END;
+        INSERT INTO p (id, saldo) VALUES (1, 0);
+    """)
+    conn.execute("UPDATE p SET saldo = 5 WHERE id = 1")
+    assert conn.execute("SELECT saldo, fecha_actualizacion FROM p").fetchone() == (5, 'hoy')
+    assert conn.execute("PRAGMA recursive_triggers").fetchone()[0] == 0
+    conn.close()
+
+
+def test_row_factory_no_se_filtra_y_hilos(tmp_path):
+    """row_factory solo aplica al llamador y las conexiones sirven a varios hilos"""
+    db_path = str(tmp_path / 'hilos.db')
+    conn = connect_db(db_path, row_factory=sqlite3.Row)
+    conn.execute("CREATE TABLE t (n INTEGER)")
+    conn.commit()
+    assert conn.execute("SELECT 1 AS uno").fetchone()['uno'] == 1
+    conn.close()
+
+    def escribir(i):
+        c = connect_db(db_path)
+        c.execute("INSERT INTO t VALUES (?)", (i,))
+        c.commit()
+        c.close()
+
+    hilos = [threading.Thread(target=escribir, args=(i,)) for i in range(20)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    conn = connect_db(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone() == (20,)
+    conn.close()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de la generación en lote de Excel de empleados
+"""
+
+import os
+import queue
+import sys
+from datetime import date
+
+import openpyxl
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from models.database import Empleado
+from utils.empleado_excel_generator import EmpleadoExcelBatch, MIN_LOTE_PROCESOS, datos_empleado
+
+
+def _empleados(n):
+    return [{
+        'nombre_completo': f"José Muñoz {i}", 'cedula': str(1000 + i), 'telefono': None,
+        'email': None, 'direccion': None, 'area_trabajo': 'poscosecha', 'cargo': 'Operario',
+        'salario_base': 1300000, 'estado': True, 'fecha_ingreso': '01/02/2025',
+    } for i in range(n)]
+
+
+def test_lote_en_procesos_con_progreso(tmp_path):
+    empleados = _empleados(MIN_LOTE_PROCESOS + 2)
+    progreso = queue.Queue()
+    resumen = EmpleadoExcelBatch(base_dir=str(tmp_path), max_workers=2).generar(empleados, progreso)
+
+    assert resumen['generados'] == len(empleados) and not resumen['errores']
+    eventos = []
+    while not progreso.empty():
+        eventos.append(progreso.get())
+    assert [e['hechos'] for e in eventos[:-1]] == list(range(1, len(empleados) + 1))
+    assert eventos[-1]['tipo'] == 'fin'
+
+    # Cada archivo lleva los datos de su empleado aunque la plantilla se reutilice
+    for datos in empleados:
+        ruta = next(r for r in resumen['archivos'] if f"_{datos['cedula']}_" in os.path.basename(r))
+        hoja = openpyxl.load_workbook(ruta)["Datos Personales"]
+        assert hoja['B5'].value == datos['nombre_completo']
+        assert hoja['B6'].value == datos['cedula']
+        assert hoja['B7'].value == "No definido"
+
+
+def test_omite_empleados_sin_cambios(tmp_path):
+    lote = EmpleadoExcelBatch(base_dir=str(tmp_path), max_workers=1)
+    empleados = _empleados(3)
+    assert lote.generar(empleados)['generados'] == 3
+
+    empleados[1]['cargo'] = 'Supervisor'
+    resumen = lote.generar(empleados)
+    assert (resumen['generados'], resumen['omitidos']) == (1, 2)
+
+    # Si el archivo se borra se vuelve a generar
+    os.remove(lote.leer_manifiesto()['1000']['archivo'])
+    resumen = lote.generar(empleados)
+    assert (resumen['generados'], resumen['omitidos']) == (1, 2)
+    assert lote.generar(empleados, forzar=True)['generados'] == 3
+
+
+def test_datos_desde_modelo():
+    empleado = Empleado(cedula='123', nombre_completo='Ana', estado=True, fecha_ingreso=date(2025, 3, 4))
+    datos = datos_empleado(empleado)
+    assert datos['fecha_ingreso'] == '04/03/2025' and datos['estado'] is True
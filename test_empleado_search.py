@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de la búsqueda de empleados en memoria
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from utils.empleado_search import EmpleadoStore
+
+
+FILAS = [
+    (1, 'José Pérez', '1010', None, 'planta', 'Operario', 1300000, True),
+    (2, 'María Gómez', '2020', '300', 'postcosecha', 'Supervisora', None, True),
+    (3, 'Josefina Ruiz', '3030', None, 'planta', 'Cortadora', 1400000, False),
+    (4, 'Luis Pérez', '4040', None, 'postcosecha', 'Operario', 1300000, True),
+]
+
+
+def _ids(store, indices):
+    return [store.columnas['id'][i] for i in indices]
+
+
+def test_busqueda_con_y_sin_indice_coinciden():
+    """El índice de trigramas devuelve lo mismo que el recorrido lineal"""
+    lineal = EmpleadoStore()
+    lineal.cargar(FILAS, indexar_en_segundo_plano=False)
+    lineal._trigramas = None
+    indexado = EmpleadoStore()
+    indexado.cargar(FILAS, indexar_en_segundo_plano=False)
+    assert indexado.indexado
+
+    for consulta in ['', 'j', 'jos', 'JOSE', 'perez', 'operario', '2020', 'zzz', 'pérez op']:
+        assert lineal.buscar(consulta) == indexado.buscar(consulta), consulta
+
+    assert _ids(indexado, indexado.buscar('jose')) == [1, 3]
+    assert _ids(indexado, indexado.buscar('perez', estado=True, area='postcosecha')) == [4]
+
+
+def test_filtrado_incremental_y_orden():
+    """Refinar la consulta reutiliza el resultado anterior; ordenar deja nulos al final"""
+    store = EmpleadoStore()
+    store.cargar(FILAS, indexar_en_segundo_plano=False)
+    assert _ids(store, store.buscar('jo')) == [1, 3]
+    assert _ids(store, store.buscar('jose')) == [1, 3]
+    assert _ids(store, store.buscar('josef')) == [3]
+    assert _ids(store, store.buscar('o')) == [1, 2, 3, 4]
+
+    todos = store.buscar('')
+    assert _ids(store, store.ordenar(todos, 'nombre_completo')) == [1, 3, 4, 2]
+    assert _ids(store, store.ordenar(todos, 'salario_base', descendente=True)) == [3, 1, 4, 2]
+    assert store.contar_estados() == (4, 3)
+
+    # Ids que resolvió el índice de búsqueda común: se respeta su orden y se filtran
+    assert _ids(store, store.filtrar_ids([4, 9, 1, 3])) == [4, 1, 3]
+    assert _ids(store, store.filtrar_ids([4, 1, 3], estado=True, area='planta')) == [1]
+
+
+def test_indice_en_segundo_plano():
+    """La carga no espera al índice y este queda listo poco después"""
+    store = EmpleadoStore()
+    store.cargar(FILAS * 500)
+    assert len(store.buscar('ruiz')) == 500
+    for _ in range(100):
+        if store.indexado:
+            break
+        time.sleep(0.02)
+    assert store.indexado
+    assert len(store.buscar('ruiz')) == 500
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de la conversión de números y fechas a texto en español
+"""
+
+import os
+import sys
+from datetime import date, datetime
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from utils.formato_espanol import cache_info, fecha_a_espanol, numero_a_letras
+
+
+@pytest.mark.parametrize("numero, esperado", [
+    (0, "CERO PESOS"),
+    (1, "UN PESO"),
+    (16, "DIECISÉIS PESOS"),
+    (21, "VEINTIÚN PESOS"),
+    (31, "TREINTA Y UN PESOS"),
+    (100, "CIEN PESOS"),
+    (101, "CIENTO UN PESOS"),
+    (1000, "MIL PESOS"),
+    (21000, "VEINTIÚN MIL PESOS"),
+    (101000, "CIENTO UN MIL PESOS"),
+    (140606, "CIENTO CUARENTA MIL SEISCIENTOS SEIS PESOS"),
+    (1000000, "UN MILLÓN DE PESOS"),
+    (1423500, "UN MILLÓN CUATROCIENTOS VEINTITRÉS MIL QUINIENTOS PESOS"),
+    (2000100, "DOS MILLONES CIEN PESOS"),
+    (21000000, "VEINTIÚN MILLONES DE PESOS"),
+    (1000000000, "MIL MILLONES DE PESOS"),
+    (2500000000000, "DOS BILLONES QUINIENTOS MIL MILLONES DE PESOS"),
+    (1423500.75, "UN MILLÓN CUATROCIENTOS VEINTITRÉS MIL QUINIENTOS PESOS"),
+    (None, "CERO PESOS"),
+])
+def test_numero_a_letras(numero, esperado):
+    assert numero_a_letras(numero) == esperado
+
+
+def test_numero_sin_moneda_y_negativos():
+    assert numero_a_letras(21, moneda='') == "VEINTIUNO"
+    assert numero_a_letras(-5) == "MENOS CINCO PESOS"
+    with pytest.raises(ValueError):
+        numero_a_letras(10 ** 24)
+
+
+def test_fecha_a_espanol():
+    assert fecha_a_espanol(date(2026, 10, 19)) == "19 DE OCTUBRE DE 2026"
+    assert fecha_a_espanol(datetime(2025, 1, 2, 8, 30)) == "2 DE ENERO DE 2025"
+    assert fecha_a_espanol(None) == "NO DEFINIDA"
+
+
+def test_conversiones_memorizadas():
+    antes = cache_info()['numeros'].hits
+    for _ in range(3):
+        numero_a_letras(1423500)
+    assert cache_info()['numeros'].hits >= antes + 2
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests del historial de movimientos por páginas (paginación por clave e índices)
+"""
+
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from utils.historial_movimientos import HistorialMovimientos, fecha_filtro
+from utils.inventario_engine import InventarioEngine
+
+
+@pytest.fixture
+def inventario(tmp_path):
+    inventario = InventarioEngine('almacen', str(tmp_path / "inventario_almacen.db"))
+    inventario.insertar_productos([{'codigo': 'A1', 'nombre': 'Guantes', 'saldo': 0},
+                                   {'codigo': 'A2', 'nombre': 'Cinta', 'saldo': 0}])
+    inicio = datetime(2024, 1, 1, 8, 0)
+    for dia in range(60):
+        cuando = inicio + timedelta(days=dia)
+        inventario.registrar_movimiento('A1', 'entrada', 5, cuando=cuando)
+        inventario.registrar_movimiento('A2', 'entrada', 5, cuando=cuando)
+        # Misma fecha y hora: el id desempata entre páginas
+        inventario.registrar_movimiento('A1', 'salida', 1, cuando=cuando)
+    yield inventario
+    inventario.cerrar()
+
+
+def test_paginas_recorren_todo_sin_repetir_en_orden(inventario):
+    historial = HistorialMovimientos(inventario, tamano=7)
+    vistos = []
+    while historial.hay_mas:
+        vistos.extend(historial.siguiente_pagina())
+    todos = inventario.movimientos(limite=10000)
+    assert [m.id for m in vistos] == [m.id for m in todos] and historial.cargados == len(todos)
+    assert historial.siguiente_pagina() == []
+
+
+def test_filtros_de_tipo_producto_y_fechas(inventario):
+    historial = HistorialMovimientos(inventario, tipo='salida', codigo='A1', desde=fecha_filtro('10/01/2024'),
+                                     hasta=fecha_filtro(' 19/01/2024 '), tamano=4)
+    pagina = historial.siguiente_pagina() + historial.siguiente_pagina() + historial.siguiente_pagina()
+    assert [m.fecha_hora[:10] for m in pagina] == [f"2024-01-{d}" for d in range(19, 9, -1)]
+    assert {(m.tipo, m.producto_codigo) for m in pagina} == {('salida', 'A1')} and not historial.hay_mas
+
+    assert fecha_filtro('') is None
+    with pytest.raises(ValueError):
+        fecha_filtro('2024-01-10')
+    with pytest.raises(ValueError):
+        HistorialMovimientos(inventario, desde=date(2024, 2, 1), hasta=date(2024, 1, 1))
+
+
+def test_paginas_usan_indice_sin_ordenar(inventario):
+    movimientos = inventario.linea.tabla_movimientos
+    for filtro, indice in (("tipo = 'salida' AND ", f"idx_{movimientos}_tipo"),
+                           ("producto_codigo = 'A1' AND ", f"idx_{movimientos}_producto"),
+                           ("", f"idx_{movimientos}_fecha")):
+        plan = ' '.join(str(fila[-1]) for fila in inventario.consultar(
+            f"EXPLAIN QUERY PLAN SELECT * FROM {movimientos} "
+            f"WHERE {filtro}fecha_hora >= ? AND (fecha_hora, id) < (?, ?) ORDER BY fecha_hora DESC, id DESC LIMIT 200",
+            ('2024-01-01', '2024-02-01', 10)))
+        assert indice in plan and 'TEMP B-TREE' not in plan, plan
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de la analítica de inventarios (consumo, cobertura, ABC, reorden y valorización)
+"""
+
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from utils.inventario_analytics import analizar, analizar_inventarios, exportar, valorizacion
+from utils.inventario_engine import InventarioEngine
+from utils.read_cache import get_read_cache
+
+HOY = date(2025, 12, 31)
+
+
+def _a_las_diez(dia: date) -> datetime:
+    return datetime.combine(dia, datetime.min.time()) + timedelta(hours=10)
+
+
+def test_consumo_cobertura_abc_y_reorden(tmp_path):
+    get_read_cache().clear()
+    inventario = InventarioEngine('almacen', str(tmp_path / "inventario_almacen.db"))
+    inventario.insertar_productos([
+        {'codigo': 'A1', 'nombre': 'Guantes', 'saldo': 0, 'valor_unitario': 10.0},
+        {'codigo': 'A2', 'nombre': 'Cinta', 'saldo': 0, 'valor_unitario': 1.0},
+        {'codigo': 'A3', 'nombre': 'Tijeras', 'saldo': 0, 'valor_unitario': 5.0},
+    ])
+    inicio = HOY - timedelta(days=9)
+    inventario.registrar_movimiento('A1', 'entrada', 200, cuando=_a_las_diez(inicio - timedelta(days=30)))
+    inventario.registrar_movimiento('A2', 'entrada', 50, cuando=_a_las_diez(inicio - timedelta(days=30)))
+    inventario.registrar_movimiento('A3', 'entrada', 7, cuando=_a_las_diez(inicio - timedelta(days=30)))
+    for dia in range(10):
+        inventario.registrar_movimiento('A1', 'salida', 10, cuando=_a_las_diez(inicio + timedelta(days=dia)))
+    inventario.registrar_movimiento('A2', 'salida', 20, cuando=_a_las_diez(inicio))
+
+    df = analizar(inventario, hoy=HOY, dias=10, dias_entrega=5).set_index('codigo')
+    assert df.loc['A1', 'consumo_periodo'] == 100 and df.loc['A1', 'consumo_diario'] == 10
+    assert df.loc['A1', 'desviacion_diaria'] == 0 and df.loc['A1', 'dias_cobertura'] == 10
+    assert df.loc['A1', 'punto_reorden'] == 50 and not df.loc['A1', 'reponer']
+    # Consumo irregular: el stock de seguridad sube el punto de reorden
+    assert df.loc['A2', 'consumo_diario'] == 2 and df.loc['A2', 'punto_reorden'] > 10
+    assert df.loc['A2', 'reponer']
+    assert df.loc['A3', 'dias_cobertura'] == float('inf') and not df.loc['A3', 'reponer']
+    assert list(df['clase_abc']) == ['A', 'C', 'C']
+
+    # Valor al cierre de cada mes (sólo hay libro desde noviembre)
+    valores = valorizacion(inventario, date(2025, 10, 1), HOY)
+    assert list(valores['unidades']) == [0, 257, 137]
+    assert valores['valor'].iloc[-1] == 100 * 10.0 + 30 * 1.0 + 7 * 5.0
+
+    # En caché en el día; un movimiento lo invalida
+    aciertos = get_read_cache().stats()['aciertos']
+    analizar(inventario, hoy=HOY, dias=10, dias_entrega=5)
+    assert get_read_cache().stats()['aciertos'] == aciertos + 1
+    inventario.registrar_movimiento('A3', 'salida', 7, cuando=_a_las_diez(HOY))
+    assert analizar(inventario, hoy=HOY, dias=10, dias_entrega=5).set_index('codigo').loc['A3', 'saldo'] == 0
+    inventario.cerrar()
+    get_read_cache().clear()
+
+
+def test_un_anio_de_movimientos_en_menos_de_un_segundo(tmp_path):
+    get_read_cache().clear()
+    inventarios = {linea: InventarioEngine(linea, str(tmp_path / f"inventario_{linea}.db"))
+                   for linea in ('almacen', 'poscosecha')}
+    for inventario in inventarios.values():
+        inventario.insertar_productos([{'codigo': f"P{i:03d}", 'nombre': f"Producto {i}", 'saldo': 0,
+                                        'valor_unitario': float(i + 1)} for i in range(60)])
+        inventario.registrar_movimientos([{'codigo': f"P{i:03d}", 'cantidad': 5000} for i in range(60)],
+                                         tipo='entrada', cuando=_a_las_diez(HOY - timedelta(days=365)))
+        for dia in range(365):
+            inventario.registrar_movimientos(
+                [{'codigo': f"P{i:03d}", 'cantidad': 1 + (i + dia) % 7} for i in range(0, 60, 1 + dia % 3)],
+                tipo='salida', cuando=_a_las_diez(HOY - timedelta(days=dia)))
+
+    inicio = time.perf_counter()
+    df = analizar_inventarios(inventarios, hoy=HOY)
+    valores = {linea: valorizacion(inventario, HOY - timedelta(days=365), HOY)
+               for linea, inventario in inventarios.items()}
+    assert time.perf_counter() - inicio < 1.0
+
+    assert len(df) == 120 and set(df['linea']) == {'almacen', 'poscosecha'}
+    assert set(df['clase_abc']) == {'A', 'B', 'C'}
+    assert valores['almacen']['unidades'].iloc[-1] == df[df['linea'] == 'almacen']['saldo'].sum()
+
+    ruta = exportar(inventarios, str(tmp_path / "analitica.xlsx"), hoy=HOY)
+    import openpyxl
+    libro = openpyxl.load_workbook(ruta)
+    assert libro['Productos'].max_row == 121 and libro['Valorización'].max_row == 14
+    for inventario in inventarios.values():
+        inventario.cerrar()
+    get_read_cache().clear()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests del motor de inventarios (esquema unificado por línea)
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+from datetime import date, datetime
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from utils.inventario_engine import InventarioEngine, LINEAS, Producto
+from utils.movimientos_inventario import leer_archivo_movimientos
+
+
+def test_productos_y_movimientos_en_las_tres_lineas(tmp_path):
+    for linea in LINEAS:
+        inventario = InventarioEngine(linea, str(tmp_path / f"inventario_{linea}.db"))
+        inventario.insertar_productos([
+            {'codigo': 'B1', 'nombre': 'Guantes de nitrilo', 'saldo': 10, 'valor_unitario': 1500},
+            {'codigo': 'A1', 'nombre': 'Mancozeb', 'saldo': 5, LINEAS[linea].columna_categoria: 'FUNGICIDA'},
+        ])
+        assert [p.codigo for p in inventario.productos()] == ['A1', 'B1']
+        assert [p.codigo for p in inventario.productos('nitrilo')] == ['B1']
+        assert [p.codigo for p in inventario.productos(categoria='FUNGICIDA')] == ['A1']
+
+        movimiento = inventario.registrar_movimiento('B1', 'salida', 4, responsable='Ana',
+                                                     cuando=datetime(2024, 5, 2, 8, 30))
+        assert (movimiento.saldo_anterior, movimiento.saldo_nuevo, movimiento.valor_total) == (10, 6, 6000)
+        inventario.registrar_movimiento('B1', 'entrada', 1)
+        assert inventario.producto('B1').saldo == 7
+        assert [m.tipo for m in inventario.movimientos('B1')] == ['entrada', 'ajuste', 'salida']
+        with pytest.raises(ValueError):
+            inventario.registrar_movimiento('B1', 'salida', 8)
+        assert inventario.producto('B1').saldo == 7
+        inventario.cerrar()
+
+
+def test_guardar_producto_y_codigo_repetido(tmp_path):
+    inventario = InventarioEngine('quimicos', str(tmp_path / "inventario_quimicos.db"))
+    inventario.guardar_producto({'codigo': 'QM1', 'nombre': 'Urea', 'clase': 'FERTILIZANTE', 'saldo': 3})
+    inventario.guardar_producto({'codigo': 'QM2', 'nombre': 'Glifosato'})
+    with pytest.raises(ValueError):
+        inventario.guardar_producto({'codigo': 'QM1', 'nombre': 'Otro'})
+    with pytest.raises(ValueError):
+        inventario.guardar_producto({'codigo': 'QM1'}, codigo_original='QM2')
+
+    # La actualización sólo toca las columnas recibidas
+    inventario.guardar_producto({'codigo': 'QM10', 'saldo': 9}, codigo_original='QM1')
+    producto = inventario.producto('QM10')
+    assert isinstance(producto, Producto)
+    assert (producto.nombre, producto.clase, producto.saldo, producto.nivel_peligrosidad) == \
+        ('Urea', 'FERTILIZANTE', 9, 'MEDIO')
+    inventario.cerrar()
+
+
+def test_migra_una_base_vieja(tmp_path):
+    # Variante que creaba la ventana de almacén: sin categoría ni activo, movimientos por producto_id
+    ruta = str(tmp_path / "inventario_almacen.db")
+    conn = sqlite3.connect(ruta)
+    conn.executescript("""
+        CREATE TABLE productos_almacen (id INTEGER PRIMARY KEY AUTOINCREMENT, codigo TEXT UNIQUE NOT NULL,
+            nombre TEXT NOT NULL, saldo INTEGER DEFAULT 0, unidad TEXT NOT NULL, valor_unitario REAL NOT NULL,
+            stock_minimo INTEGER DEFAULT 0, ubicacion TEXT, proveedor TEXT);
+        CREATE TABLE movimientos_almacen (id INTEGER PRIMARY KEY AUTOINCREMENT, producto_id INTEGER,
+            tipo TEXT NOT NULL, cantidad INTEGER NOT NULL, fecha DATE NOT NULL, factura TEXT,
+            observaciones TEXT);
+        INSERT INTO productos_almacen (codigo, nombre, saldo, unidad, valor_unitario) VALUES ('ALM1', 'Aceite', 5, 'LT', 100);
+        INSERT INTO movimientos_almacen (producto_id, tipo, cantidad, fecha) VALUES (1, 'entrada', 5, '2024-01-10');
+    """)
+    conn.commit()
+    conn.close()
+
+    inventario = InventarioEngine('almacen', ruta)
+    producto = inventario.producto('ALM1')
+    assert (producto.categoria, producto.activo) == ('General', 1)
+    historial = inventario.movimientos('ALM1')
+    assert [(m.producto_nombre, m.fecha_hora) for m in historial] == [('Aceite', '2024-01-10 00:00:00')]
+
+    # Las columnas NOT NULL de la variante vieja (fecha, unidad, valor_unitario) se siguen llenando
+    inventario.registrar_movimiento('ALM1', 'salida', 2, factura='F-1')
+    inventario.guardar_producto({'codigo': 'ALM2', 'nombre': 'Filtro'})
+    assert [p.codigo for p in inventario.productos(estado_stock='Normal')] == ['ALM1']
+    assert inventario.contar() == 2
+    inventario.cerrar()
+
+
+def test_importa_la_base_avanzada_de_quimicos(tmp_path):
+    # Base propia de la ventana avanzada de químicos: saldo_real y columnas extra
+    anterior = str(tmp_path / "inventario_quimicos_avanzado.db")
+    conn = sqlite3.connect(anterior)
+    conn.executescript("""
+        CREATE TABLE productos_quimicos (id INTEGER PRIMARY KEY AUTOINCREMENT, codigo TEXT UNIQUE NOT NULL,
+            clase TEXT NOT NULL, nombre TEXT NOT NULL, saldo_real INTEGER DEFAULT 0, unidad TEXT NOT NULL,
+            valor_unitario REAL NOT NULL, ingrediente_activo TEXT, fecha_actualizacion TIMESTAMP);
+        INSERT INTO productos_quimicos (codigo, clase, nombre, saldo_real, unidad, valor_unitario, ingrediente_activo)
+            VALUES ('QM1', 'FUNGICIDA', 'Mancozeb', 150, 'GR', 75, 'Mancozeb'),
+                   ('QM2', 'HERBICIDA', 'Glifosato', 40, 'ML', 45, 'Glifosato');
+    """)
+    conn.commit()
+    conn.close()
+
+    inventario = InventarioEngine('quimicos', str(tmp_path / "inventario_quimicos.db"))
+    inventario.guardar_producto({'codigo': 'QM2', 'nombre': 'Glifosato', 'saldo': 7})
+    assert inventario.importar_base_anterior(anterior, {'saldo_real': 'saldo'}) == 1
+
+    producto = inventario.producto('QM1')
+    assert (producto.clase, producto.saldo, producto.ingrediente_activo) == ('FUNGICIDA', 150, 'Mancozeb')
+    assert [(m.tipo, m.cantidad) for m in inventario.movimientos('QM1')] == [('ajuste', 150)]
+    # Lo que ya estaba en la base del motor no se pisa
+    assert inventario.producto('QM2').saldo == 7
+
+    copia = tmp_path / "respaldo.db"
+    assert inventario.respaldar(str(copia)) == copia.stat().st_size
+    conn = sqlite3.connect(str(copia))
+    assert conn.execute("SELECT codigo, saldo FROM productos_quimicos ORDER BY codigo").fetchall() == \
+        [('QM1', 150), ('QM2', 7)]
+    conn.close()
+    inventario.cerrar()
+
+
+def test_libro_cierres_y_saldo_a_fecha(tmp_path):
+    inventario = InventarioEngine('poscosecha', str(tmp_path / "inventario_poscosecha.db"))
+    inventario.guardar_producto({'codigo': 'PC1', 'nombre': 'Cajas', 'saldo': 0})
+    for cuando, tipo, cantidad in ((datetime(2024, 1, 5), 'entrada', 100), (datetime(2024, 1, 20), 'salida', 30),
+                                   (datetime(2024, 2, 3), 'salida', 20), (datetime(2024, 3, 15), 'entrada', 5)):
+        inventario.registrar_movimiento('PC1', tipo, cantidad, cuando=cuando)
+    assert inventario.producto('PC1').saldo == 55
+
+    # El libro es de solo anexión, también para quien escriba por fuera del motor
+    conn = sqlite3.connect(inventario.db_path)
+    with pytest.raises(sqlite3.DatabaseError):
+        conn.execute("UPDATE movimientos_poscosecha SET cantidad = 1")
+    with pytest.raises(sqlite3.DatabaseError):
+        conn.execute("DELETE FROM movimientos_poscosecha")
+    conn.close()
+
+    assert inventario.cerrar_periodos_pendientes(hoy=date(2024, 4, 10)) == ['2024-01', '2024-02', '2024-03']
+    assert inventario.saldo_a_fecha('PC1', date(2024, 1, 31)) == 70
+    assert inventario.saldo_a_fecha('PC1', date(2024, 2, 2)) == 70
+    assert inventario.saldo_a_fecha('PC1', date(2024, 2, 3)) == 50
+
+    # Un movimiento con fecha en un mes cerrado invalida ese cierre y los siguientes
+    inventario.registrar_movimiento('PC1', 'salida', 10, cuando=datetime(2024, 2, 10))
+    assert inventario.consultar("SELECT MAX(periodo) FROM cierres_poscosecha") == [('2024-01',)]
+    assert [p.saldo for p in inventario.productos_a_fecha(date(2024, 2, 29))] == [40]
+
+    # Un cambio directo del saldo queda asentado como ajuste
+    inventario.guardar_producto({'codigo': 'PC1', 'saldo': 60}, codigo_original='PC1')
+    assert inventario.movimientos('PC1', tipo='ajuste')[0].cantidad == 15
+    assert inventario.recalcular_saldos() == 0
+    inventario.cerrar()
+
+
+def test_salidas_concurrentes_no_pierden_saldo(tmp_path):
+    ruta = str(tmp_path / "inventario_almacen.db")
+    principal = InventarioEngine('almacen', ruta)
+    principal.insertar_productos([{'codigo': 'ALM1', 'nombre': 'Guantes', 'saldo': 100}])
+    # Varias conexiones sobre el mismo archivo, como varias ventanas o procesos
+    conexiones = [principal] + [InventarioEngine('almacen', ruta) for _ in range(5)]
+    saldos, rechazadas = [], []
+    inicio = threading.Barrier(24)
+
+    def despachar(inventario):
+        inicio.wait()
+        for _ in range(6):
+            try:
+                saldos.append(inventario.registrar_movimiento('ALM1', 'salida', 1).saldo_nuevo)
+            except ValueError:
+                rechazadas.append(1)
+
+    hilos = [threading.Thread(target=despachar, args=(conexiones[i % len(conexiones)],)) for i in range(24)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert sorted(saldos) == list(range(100))
+    assert len(rechazadas) == 24 * 6 - 100
+    assert principal.producto('ALM1').saldo == 0
+    assert principal.recalcular_saldos() == 0
+
+    # El trigger rechaza una salida que no alcance aunque no pase por el motor
+    conn = sqlite3.connect(ruta)
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO movimientos_almacen (producto_id, tipo, cantidad) VALUES (1, 'salida', 1)")
+    conn.close()
+    for inventario in conexiones:
+        inventario.cerrar()
+
+
+def test_alta_concurrente_del_mismo_codigo(tmp_path):
+    ruta = str(tmp_path / "inventario_quimicos.db")
+    conexiones = [InventarioEngine('quimicos', ruta) for _ in range(6)]
+    creados, repetidos = [], []
+    inicio = threading.Barrier(len(conexiones))
+
+    def crear(inventario):
+        inicio.wait()
+        try:
+            inventario.guardar_producto({'codigo': 'QM1', 'nombre': 'Urea', 'saldo': 5})
+            creados.append(1)
+        except ValueError:
+            repetidos.append(1)
+
+    hilos = [threading.Thread(target=crear, args=(inventario,)) for inventario in conexiones]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    # Uno la crea y los demás reciben el error de código repetido, no un IntegrityError
+    assert (len(creados), len(repetidos)) == (1, len(conexiones) - 1)
+    assert [(m.tipo, m.cantidad) for m in conexiones[0].movimientos('QM1')] == [('ajuste', 5)]
+    for inventario in conexiones:
+        inventario.cerrar()
+
+
+def test_movimientos_en_bloque_todo_o_nada(tmp_path):
+    inventario = InventarioEngine('almacen', str(tmp_path / "inventario_almacen.db"))
+    inventario.insertar_productos([{'codigo': 'A1', 'nombre': 'Guantes', 'saldo': 10, 'valor_unitario': 100},
+                                   {'codigo': 'A2', 'nombre': 'Botas', 'saldo': 2}])
+    lineas = [{'codigo': 'A1', 'cantidad': '6'}, {'codigo': 'A1', 'cantidad': 5},
+              {'codigo': 'NO', 'cantidad': 1}, {'codigo': 'A2', 'cantidad': '1.5'}]
+    resumen = inventario.registrar_movimientos(lineas, tipo='salida', destino='Bloque 3')
+    # Las salidas del mismo producto se acumulan; ninguna línea se asienta
+    assert [n for n, _ in resumen['errores']] == [2, 3, 4]
+    assert resumen['aplicados'] == 0 and inventario.producto('A1').saldo == 10
+
+    ruta = tmp_path / "factura.csv"
+    ruta.write_text("Código;Cantidad;Tipo;Observaciones\nA1;6;salida;\n\nA2;3;entrada;Reposición\n",
+                    encoding='utf-8')
+    lineas = leer_archivo_movimientos(str(ruta))
+    assert [linea['linea'] for linea in lineas] == [2, 4]
+    resumen = inventario.registrar_movimientos(lineas, responsable='Ana', factura='F-9')
+    assert (resumen['aplicados'], resumen['errores']) == (2, [])
+    assert [(m.producto_codigo, m.saldo_nuevo, m.factura) for m in resumen['movimientos']] == \
+        [('A1', 4, 'F-9'), ('A2', 5, 'F-9')]
+    assert [m.id for m in inventario.movimientos(limite=2)][::-1] == [m.id for m in resumen['movimientos']]
+    assert (inventario.producto('A1').saldo, inventario.producto('A2').saldo) == (4, 5)
+    inventario.cerrar()
+
+
+def test_sincronizar_aplica_solo_diferencias(tmp_path):
+    inventario = InventarioEngine('almacen', str(tmp_path / "inventario_almacen.db"))
+    inventario.insertar_productos([
+        {'codigo': 'A000', 'nombre': 'Aceite motor', 'saldo': 5, 'valor_unitario': 15.0},
+        {'codigo': 'A001', 'nombre': 'Filtro', 'saldo': 2, 'valor_unitario': 15.0},
+        {'codigo': 'A002', 'nombre': 'Cable', 'saldo': 9, 'valor_unitario': 15.0},
+    ])
+    # Los códigos del Excel son posicionales: se empareja por nombre normalizado
+    excel = [{'codigo': 'A000', 'nombre': 'ACEITE  MOTOR', 'saldo': 5, 'valor_unitario': 15},
+             {'codigo': 'A001', 'nombre': 'Filtro', 'saldo': 7, 'valor_unitario': 18.0},
+             {'codigo': 'A002', 'nombre': 'Soldadura', 'saldo': 4, 'valor_unitario': 15.0}]
+
+    previa = inventario.sincronizar_productos(excel, clave='nombre', aplicar=False)
+    assert (previa['nuevos'], previa['desactivados'], previa['sin_cambios']) == (['A003'], ['A002'], 1)
+    assert previa['actualizados'] == [('A001', {'saldo': (2, 7), 'valor_unitario': (15.0, 18.0)})]
+    assert inventario.contar() == 3 and inventario.producto('A001').saldo == 2
+
+    resumen = inventario.sincronizar_productos(excel, clave='nombre')
+    assert resumen['aplicado']
+    assert [(p.codigo, p.saldo, p.activo) for p in inventario.productos()] == \
+        [('A000', 5, 1), ('A001', 7, 1), ('A002', 9, 0), ('A003', 4, 1)]
+    assert inventario.movimientos('A001', tipo='ajuste')[0].observaciones == "Ajuste por importación"
+    assert inventario.recalcular_saldos() == 0
+    # Una segunda importación igual no cambia nada
+    assert inventario.sincronizar_productos(excel, clave='nombre')['aplicado'] is False
+    inventario.cerrar()
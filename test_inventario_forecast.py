@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests del pronóstico de reposición y de las alertas por quiebre proyectado
+"""
+
+import os
+import sqlite3
+import sys
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from utils.inventario_engine import get_inventario
+from utils.inventario_forecast import alertas_quiebre, ejecutar_si_vencido, suavizado_exponencial
+from utils.read_cache import get_read_cache
+
+HOY = date(2025, 6, 30)
+
+
+def test_suavizado_en_forma_cerrada_igual_al_iterativo():
+    matriz = np.random.default_rng(7).poisson(4, size=(5, 60)).astype(float)
+    nivel = matriz.mean(axis=1)
+    for dia in range(matriz.shape[1]):
+        nivel = 0.3 * matriz[:, dia] + 0.7 * nivel
+    assert np.allclose(suavizado_exponencial(matriz, 0.3), nivel)
+
+
+def test_pronostico_diario_y_alertas_por_fecha_de_quiebre(tmp_path):
+    get_read_cache().clear()
+    db_path = str(tmp_path / "inventario_almacen.db")
+    inventario = get_inventario('almacen', db_path)
+    inventario.insertar_productos([
+        {'codigo': 'A1', 'nombre': 'Guantes', 'saldo': 0, 'valor_unitario': 10.0},
+        {'codigo': 'A2', 'nombre': 'Cinta', 'saldo': 0, 'valor_unitario': 1.0},
+        {'codigo': 'A3', 'nombre': 'Tijeras', 'saldo': 3, 'valor_unitario': 5.0},
+        {'codigo': 'A4', 'nombre': 'Palas', 'saldo': 40, 'valor_unitario': 5.0},
+    ])
+    comienzo = datetime.combine(HOY - timedelta(days=89), datetime.min.time()) + timedelta(hours=8)
+    inventario.registrar_movimiento('A1', 'entrada', 1000, cuando=comienzo - timedelta(days=1))
+    inventario.registrar_movimiento('A2', 'entrada', 1000, cuando=comienzo - timedelta(days=1))
+    for dia in range(90):
+        inventario.registrar_movimiento('A1', 'salida', 10, cuando=comienzo + timedelta(days=dia))
+        if dia % 10 == 0:
+            inventario.registrar_movimiento('A2', 'salida', 1, cuando=comienzo + timedelta(days=dia))
+
+    ahora = datetime.combine(HOY, datetime.min.time()) + timedelta(hours=20)
+    resumen = ejecutar_si_vencido({'almacen': db_path}, ahora=ahora, dias_entrega=5)
+    assert resumen['lineas'] == {'almacen': 2} and resumen['errores'] == []
+    # Ya calculado hoy: no se repite hasta que venza
+    assert ejecutar_si_vencido({'almacen': db_path}, ahora=ahora + timedelta(hours=1)) is None
+
+    pronosticos = dict((f[0], f[1:]) for f in inventario.consultar(
+        "SELECT p.codigo, f.demanda_diaria, f.punto_reorden FROM pronosticos_almacen f "
+        "JOIN productos_almacen p ON p.id = f.producto_id"))
+    assert pronosticos['A1'] == (10.0, 50)
+
+    # A1 tiene 100 unidades: 10 días de cobertura, dentro del horizonte de 14
+    criticos, bajos = alertas_quiebre(inventario, 5, 15, horizonte_dias=14, hoy=HOY)
+    assert [(p[0], p[4], p[5]) for p in bajos] == [('A1', '2025-07-10', 50)]
+    # Sin pronóstico (A3, A4) rigen los umbrales fijos; A2 rota poco y tiene stock de sobra
+    assert [(p[0], p[4]) for p in criticos] == [('A3', None)]
+
+    # Un movimiento invalida la caché y adelanta la fecha de quiebre
+    inventario.registrar_movimiento('A1', 'salida', 60, cuando=ahora)
+    criticos, bajos = alertas_quiebre(inventario, 5, 15, horizonte_dias=14, hoy=HOY)
+    assert [(p[0], p[4]) for p in criticos] == [('A3', None), ('A1', '2025-07-04')]
+    inventario.cerrar()
+    get_read_cache().clear()
+
+
+def test_linea_sin_salidas_no_se_recalcula_hasta_que_venza(tmp_path):
+    get_read_cache().clear()
+    db_path = str(tmp_path / "inventario_poscosecha.db")
+    inventario = get_inventario('poscosecha', db_path)
+    inventario.insertar_productos([{'codigo': 'P1', 'nombre': 'Cajas', 'saldo': 30}])
+
+    assert ejecutar_si_vencido({'poscosecha': db_path})['lineas'] == {'poscosecha': 0}
+    # Sin filas de pronóstico, el cálculo igual quedó anotado
+    assert ejecutar_si_vencido({'poscosecha': db_path}, ahora=datetime.now() + timedelta(minutes=5)) is None
+    assert ejecutar_si_vencido({'poscosecha': db_path}, ahora=datetime.now() + timedelta(hours=25)) is not None
+
+    # Una fila mal formada deshace la transacción y la conexión sigue usable
+    with pytest.raises(sqlite3.Error):
+        inventario.guardar_pronosticos([(1, 2.0)])
+    assert inventario.guardar_pronosticos([(1, 2.0, 0.5, 7, 20)]) == 1
+    inventario.cerrar()
+    get_read_cache().clear()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de la importación de inventarios desde Excel
+"""
+
+import os
+import sys
+
+import openpyxl
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from utils.inventario_engine import InventarioEngine
+from utils.inventario_import import importar_productos, leer_excel_inventario, vista_previa
+
+
+def test_una_pasada_normaliza_y_carga(tmp_path):
+    ruta = str(tmp_path / "quimicos.xlsx")
+    libro = openpyxl.Workbook()
+    hoja = libro.active
+    hoja.append(["INVENTARIO DE QUÍMICOS"])
+    hoja.append([])
+    hoja.append(["SALDO ANTERIOR", "CLASE", "PRODUCTO", "VALOR"])
+    hoja.append([12, "FUNGICIDA", "  Mancozeb ", 38000])
+    hoja.append(["7", None, "Urea", "sin precio"])
+    hoja.append([0, "HERBICIDA", "Glifosato", 20000])   # sin saldo: no se importa
+    hoja.append([5, "INSECTICIDA", None, 1000])          # sin nombre: no se importa
+    for i in range(500):
+        hoja.append([3.9, "FERTILIZANTE", f"Producto {i}", 100])
+    libro.save(ruta)
+
+    productos, resumen = leer_excel_inventario(ruta, 'quimicos')
+    assert (resumen['leidas'], resumen['validas']) == (504, 502)
+    assert resumen['columnas'] == ["SALDO ANTERIOR", "CLASE", "PRODUCTO", "VALOR"]
+    assert productos[0] == {'codigo': 'Q000', 'nombre': 'Mancozeb', 'saldo': 12, 'clase': 'FUNGICIDA',
+                           'unidad': 'Kg', 'valor_unitario': 38000.0, 'stock_minimo': 10,
+                           'ubicacion': 'Almacén General', 'proveedor': 'Proveedor General'}
+    assert (productos[1]['clase'], productos[1]['valor_unitario'], productos[2]['saldo']) == ('General', 50.0, 3)
+
+    inventario = InventarioEngine('quimicos', str(tmp_path / "inventario_quimicos.db"))
+    inventario.guardar_producto({'codigo': 'VIEJO', 'nombre': 'Se reemplaza'})
+    resumen = importar_productos(inventario, productos, resumen)
+    assert resumen['importadas'] == 502 and resumen['filas_por_segundo'] > 0
+    assert inventario.contar() == 502 and inventario.producto('VIEJO') is None
+    assert inventario.producto('Q001').saldo == 7
+    assert inventario.recalcular_saldos() == 0
+    inventario.cerrar()
+
+
+def test_reimportar_sin_cambios_respeta_lo_editado(tmp_path):
+    ruta = str(tmp_path / "almacen.xlsx")
+    libro = openpyxl.Workbook()
+    hoja = libro.active
+    hoja.append(["PRODUCTO y saldos"])
+    hoja.append(["SALDO", "PRODUCTO"])
+    hoja.append([4, "Aceite hidráulico"])
+    hoja.append([9, "Guantes"])
+    libro.save(ruta)
+
+    inventario = InventarioEngine('almacen', str(tmp_path / "inventario_almacen.db"))
+    productos, resumen = leer_excel_inventario(ruta, 'almacen')
+    importar_productos(inventario, productos, resumen, incremental=True)
+    codigo = next(p.codigo for p in inventario.productos() if p.nombre == 'Aceite hidráulico')
+    inventario.guardar_producto({'valor_unitario': 45000.0, 'unidad': 'LT', 'proveedor': 'LUBRICANTES SA'},
+                                codigo_original=codigo)
+
+    # El Excel sólo trae saldo y nombre: los defectos del perfil no cuentan como cambios
+    productos, resumen = leer_excel_inventario(ruta, 'almacen')
+    previa = vista_previa(inventario, productos)
+    assert previa['actualizados'] == [] and previa['sin_cambios'] == 2
+    resumen = importar_productos(inventario, productos, resumen, incremental=True)
+    assert resumen['importadas'] == 0
+    producto = inventario.producto(codigo)
+    assert (producto.valor_unitario, producto.unidad, producto.proveedor) == (45000.0, 'LT', 'LUBRICANTES SA')
+    inventario.cerrar()
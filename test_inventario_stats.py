@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests del servicio de estadísticas de inventarios
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from utils.inventario_engine import InventarioEngine
+from utils.inventario_stats import estadisticas, productos_en_alerta
+from utils.read_cache import get_read_cache
+
+
+def test_indicadores_en_una_pasada_y_hasta_el_proximo_movimiento(tmp_path):
+    get_read_cache().clear()
+    pronto = (date.today() + timedelta(days=10)).isoformat()
+    inventario = InventarioEngine('quimicos', str(tmp_path / "inventario_quimicos.db"))
+    inventario.insertar_productos([
+        {'codigo': 'Q1', 'nombre': 'Urea', 'clase': 'FERTILIZANTE', 'saldo': 100, 'stock_minimo': 10,
+         'valor_unitario': 2.5},
+        {'codigo': 'Q2', 'nombre': 'Glifosato', 'clase': 'HERBICIDA', 'saldo': 4, 'stock_minimo': 10,
+         'nivel_peligrosidad': 'ALTO', 'fecha_vencimiento': pronto},
+        {'codigo': 'Q3', 'nombre': 'Cobre', 'clase': 'FUNGICIDA', 'saldo': 0},
+        {'codigo': 'Q4', 'nombre': 'Viejo', 'clase': 'FUNGICIDA', 'saldo': 50, 'activo': 0},
+    ])
+
+    stats = estadisticas(inventario)
+    assert {k: stats[k] for k in ('total', 'activos', 'sin_stock', 'stock_bajo', 'bajo_minimo', 'alto_riesgo',
+                                  'por_vencer', 'categorias', 'unidades', 'valor_total')} == \
+        {'total': 4, 'activos': 3, 'sin_stock': 1, 'stock_bajo': 1, 'bajo_minimo': 2, 'alto_riesgo': 1,
+         'por_vencer': 1, 'categorias': 3, 'unidades': 104, 'valor_total': 250.0}
+
+    criticos, bajos = productos_en_alerta(inventario, 5, 15)
+    assert ([p[0] for p in criticos], bajos) == (['Q3', 'Q2'], [])
+
+    # En caché hasta que un movimiento invalida la tabla
+    aciertos = get_read_cache().stats()['aciertos']
+    estadisticas(inventario)
+    assert get_read_cache().stats()['aciertos'] == aciertos + 1
+    inventario.registrar_movimiento('Q1', 'salida', 95)
+    assert estadisticas(inventario)['stock_bajo'] == 2
+    assert [p[0] for p in productos_en_alerta(inventario, 5, 15)[0]] == ['Q3', 'Q2', 'Q1']
+    inventario.cerrar()
+    get_read_cache().clear()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de la cola de reportes PDF
+"""
+
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from utils.pdf_reports import PDFReportPipeline
+
+
+def _inventario(ruta):
+    conn = sqlite3.connect(ruta)
+    conn.execute("""CREATE TABLE productos_almacen (id INTEGER PRIMARY KEY, codigo TEXT, nombre TEXT,
+                    saldo REAL, unidad TEXT, valor_unitario REAL, stock_minimo REAL)""")
+    conn.executemany("INSERT INTO productos_almacen (codigo, nombre, saldo, unidad, valor_unitario, stock_minimo) "
+                     "VALUES (?, ?, ?, ?, ?, ?)",
+                     [(f"A{i:03d}", f"Guantes de nitrilo talla {i} ñ", i, 'und', 1500, 5) for i in range(60)])
+    conn.commit()
+    conn.close()
+
+
+def test_reporte_inventario(tmp_path):
+    db_path = str(tmp_path / "inventario.db")
+    _inventario(db_path)
+    salida = tmp_path / "reportes"
+    pipeline = PDFReportPipeline(output_dir=str(salida), workers=2)
+
+    trabajos = [pipeline.submit('inventario', sistema='almacen', db_path=db_path) for _ in range(3)]
+    for job in trabajos:
+        assert job.esperar(30)
+        assert job.estado == 'listo', job.error
+        with open(job.ruta, 'rb') as f:
+            assert f.read(4) == b'%PDF'
+    pipeline.shutdown()
+
+    # Cada trabajo deja su propio archivo y ningún temporal
+    assert len({job.ruta for job in trabajos}) == 3
+    assert not [n for n in os.listdir(salida) if n.endswith('.tmp')]
+
+
+def test_error_no_deja_archivos(tmp_path):
+    pipeline = PDFReportPipeline(output_dir=str(tmp_path), workers=1)
+    job = pipeline.submit('inventario', sistema='bodega')
+    assert job.esperar(30)
+    assert job.estado == 'error' and 'bodega' in job.error
+    assert os.listdir(tmp_path) == []
+    pipeline.shutdown()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests del repositorio de Railway contra un servidor HTTP falso local
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from models.database import RailwayDatabase
+
+
+class FakeRailway(BaseHTTPRequestHandler):
+    """Servidor falso que cuenta peticiones y responde con retardo"""
+    hits = {}
+    autorizacion = None
+    empleados = [{'cedula': '1', 'nombre_completo': 'Ana'}]
+
+    def _responder(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        FakeRailway.hits[self.path] = FakeRailway.hits.get(self.path, 0) + 1
+        time.sleep(0.2)
+        self._responder(FakeRailway.empleados)
+
+    def do_POST(self):
+        FakeRailway.hits[self.path] = FakeRailway.hits.get(self.path, 0) + 1
+        FakeRailway.autorizacion = self.headers.get('Authorization')
+        data = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if self.path == '/api/batch':
+            self._responder({'results': [{'success': op['op'] != 'bad'} for op in data['operations']]})
+        else:
+            FakeRailway.empleados = FakeRailway.empleados + [data]
+            self._responder({'success': True})
+
+    def log_message(self, *args):
+        pass
+
+
+def _servidor():
+    FakeRailway.hits = {}
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeRailway)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_lecturas_concurrentes_se_unen_y_se_cachean():
+    """Diez lecturas simultáneas producen una sola petición y luego se sirven de caché"""
+    server, url = _servidor()
+    try:
+        repo = RailwayDatabase(base_url=url, cache_ttl=60)
+        resultados = []
+        hilos = [threading.Thread(target=lambda: resultados.append(repo.get_empleados())) for _ in range(10)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        assert len(resultados) == 10
+        assert all(r == [{'cedula': '1', 'nombre_completo': 'Ana'}] for r in resultados)
+        repo.get_empleados()
+        assert FakeRailway.hits['/api/empleados'] == 1
+    finally:
+        server.shutdown()
+
+
+def test_escritura_invalida_cache_y_lote_en_una_peticion():
+    """Una escritura fuerza una nueva lectura; un lote viaja en una sola petición"""
+    server, url = _servidor()
+    try:
+        repo = RailwayDatabase(base_url=url, cache_ttl=60, api_token='secreto')
+        repo.get_empleados()
+        assert repo.add_empleado({'cedula': '2', 'nombre_completo': 'Luis'})
+        assert len(repo.get_empleados()) == 2
+        assert FakeRailway.hits['/api/empleados'] == 3
+
+        resultados = repo.batch_write([{'op': 'add_empleado', 'data': {}}, {'op': 'bad'}])
+        assert resultados == [True, False]
+        assert FakeRailway.hits['/api/batch'] == 1
+        assert FakeRailway.autorizacion == 'Bearer secreto'
+    finally:
+        server.shutdown()
+
+
+def test_submit_no_bloquea_y_entrega_resultado():
+    """submit devuelve de inmediato y entrega el resultado al callback"""
+    server, url = _servidor()
+    try:
+        repo = RailwayDatabase(base_url=url)
+        recibido = threading.Event()
+        inicio = time.monotonic()
+        future = repo.submit('get_empleados', callback=lambda r: recibido.set())
+        assert time.monotonic() - inicio < 0.1
+        assert recibido.wait(5)
+        assert future.result()[0]['cedula'] == '1'
+    finally:
+        server.shutdown()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de la caché de lecturas y de los datos de referencia
+"""
+
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from utils import reference_data
+from utils.inventario_engine import InventarioEngine
+from utils.read_cache import ReadCache, get_read_cache, invalidar
+
+
+def test_ttl_etiquetas_y_estadisticas():
+    cache = ReadCache(max_bytes=1024 * 1024)
+    cargas = []
+
+    def cargar():
+        cargas.append(1)
+        return ('a', 'b')
+
+    assert cache.get_or_load('k', cargar, etiquetas=('tabla',)) == ('a', 'b')
+    assert cache.get_or_load('k', cargar, etiquetas=('tabla',)) == ('a', 'b')
+    assert len(cargas) == 1
+
+    assert cache.invalidate('otra') == 0
+    assert cache.invalidate('tabla') == 1
+    cache.get_or_load('k', cargar)
+    assert len(cargas) == 2
+
+    cache.get_or_load('corta', cargar, ttl=0)
+    cache.get_or_load('corta', cargar, ttl=0)
+    stats = cache.stats()
+    assert (stats['aciertos'], stats['fallos'], stats['vencidas'], stats['invalidaciones']) == (1, 4, 1, 1)
+
+
+def test_limite_de_memoria_desaloja_lru():
+    valor = tuple(f"proveedor {i}" for i in range(50))
+    cache = ReadCache(max_bytes=3 * 4096)
+    for clave in ('a', 'b', 'c', 'd'):
+        cache.set(clave, valor)
+        cache.get_or_load('a', lambda: None)  # 'a' siempre es la más reciente
+    stats = cache.stats()
+    assert stats['bytes'] <= cache.max_bytes and stats['desalojos'] > 0
+    assert cache.get_or_load('a', lambda: 'recargado') == valor
+
+    cache.configure(max_mb=0)
+    assert cache.stats()['entradas'] == 0
+
+
+def test_escritura_durante_la_carga_no_deja_valor_viejo():
+    cache = ReadCache(max_bytes=1024 * 1024)
+
+    def cargar():
+        cache.invalidate('tabla')  # otra escritura llega mientras se consulta
+        return 'viejo'
+
+    assert cache.get_or_load('k', cargar, etiquetas=('tabla',)) == 'viejo'
+    assert cache.get_or_load('k', lambda: 'nuevo', etiquetas=('tabla',)) == 'nuevo'
+
+
+def test_proveedores_se_invalidan_al_escribir(tmp_path):
+    get_read_cache().clear()
+    inventario = InventarioEngine('poscosecha', str(tmp_path / "inventario.db"))
+    inventario.guardar_producto({'codigo': 'P1', 'nombre': 'Caja', 'categoria': 'EMBALAJE',
+                                 'proveedor': 'Cartones SA'})
+
+    assert reference_data.proveedores(inventario) == ('Cartones SA',)
+    # Escritura por fuera del motor: sin invalidar sigue sirviendo lo que tenía en caché
+    conn = sqlite3.connect(inventario.db_path)
+    conn.execute("INSERT INTO productos_poscosecha (codigo, nombre, categoria, proveedor) "
+                 "VALUES ('P2', 'Cinta', 'ETIQUETA', 'Adhesivos Ltda')")
+    conn.commit()
+    conn.close()
+    assert reference_data.proveedores(inventario) == ('Cartones SA',)
+
+    invalidar('productos_poscosecha')
+    assert reference_data.proveedores(inventario) == ('Adhesivos Ltda', 'Cartones SA')
+    assert reference_data.categorias(inventario) == ('EMBALAJE', 'ETIQUETA')
+    assert [p[1] for p in reference_data.productos_combo(inventario)] == ['P1', 'P2']
+
+    # Las escrituras del motor invalidan solas
+    inventario.guardar_producto({'activo': 0}, codigo_original='P2')
+    assert [p[1] for p in reference_data.productos_combo(inventario, solo_activos=True)] == ['P1']
+    inventario.cerrar()
+    get_read_cache().clear()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests del índice de búsqueda de texto completo (FTS5)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from models.engine import connect_db
+from utils.search_index import SearchIndex
+
+
+def _base_productos(tmp_path):
+    conn = connect_db(str(tmp_path / "inventario_almacen.db"))
+    conn.execute("""
+        CREATE TABLE productos_almacen (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            codigo TEXT UNIQUE, nombre TEXT, saldo REAL DEFAULT 0
+        )
+    """)
+    conn.executemany("INSERT INTO productos_almacen (codigo, nombre) VALUES (?, ?)", [
+        ('ALM-001', 'Guantes de nitrilo'),
+        ('ALM-002', 'Tijeras de poda'),
+        ('ALM-003', 'Bolsas para niño y niña'),
+    ])
+    conn.commit()
+    return conn
+
+
+def _codigos(conn, indice, texto):
+    ids = [fila[0] for fila in indice.buscar(conn, 'productos_almacen', texto)]
+    return [conn.execute("SELECT codigo FROM productos_almacen WHERE id = ?", (i,)).fetchone()[0] for i in ids]
+
+
+def test_busqueda_sin_tildes_y_por_prefijo(tmp_path):
+    conn = _base_productos(tmp_path)
+    indice = SearchIndex()
+    try:
+        assert _codigos(conn, indice, 'nino') == ['ALM-003']
+        assert _codigos(conn, indice, 'NIÑA') == ['ALM-003']
+        assert _codigos(conn, indice, 'tij pod') == ['ALM-002']
+        assert sorted(_codigos(conn, indice, 'alm')) == ['ALM-001', 'ALM-002', 'ALM-003']
+        assert indice.buscar(conn, 'productos_almacen', '  ') == []
+    finally:
+        conn.close()
+
+
+def test_triggers_mantienen_el_indice(tmp_path):
+    conn = _base_productos(tmp_path)
+    indice = SearchIndex()
+    try:
+        assert _codigos(conn, indice, 'guantes') == ['ALM-001']
+
+        conn.execute("INSERT INTO productos_almacen (codigo, nombre) VALUES ('ALM-004', 'Azadón')")
+        conn.execute("UPDATE productos_almacen SET nombre = 'Guantes de cuero' WHERE codigo = 'ALM-002'")
+        conn.execute("DELETE FROM productos_almacen WHERE codigo = 'ALM-001'")
+        # INSERT OR REPLACE borra la fila previa: el índice no debe conservarla
+        conn.execute("INSERT OR REPLACE INTO productos_almacen (codigo, nombre) VALUES ('ALM-003', 'Baldes')")
+        conn.commit()
+
+        assert _codigos(conn, indice, 'azadon') == ['ALM-004']
+        assert _codigos(conn, indice, 'guantes') == ['ALM-002']
+        assert _codigos(conn, indice, 'tijeras') == []
+        assert _codigos(conn, indice, 'bolsas') == []
+        assert _codigos(conn, indice, 'baldes') == ['ALM-003']
+        conn.execute("INSERT INTO productos_almacen_fts(productos_almacen_fts) VALUES ('integrity-check')")
+    finally:
+        conn.close()
+
+
+def test_filtro_ordena_por_relevancia(tmp_path):
+    conn = _base_productos(tmp_path)
+    conn.execute("INSERT INTO productos_almacen (codigo, nombre) VALUES ('ALM-005', 'Poda poda poda')")
+    conn.commit()
+    indice = SearchIndex()
+    try:
+        filtro = indice.filtro_busqueda(conn, 'productos_almacen', 'poda')
+        filas = conn.execute(
+            f"SELECT codigo, saldo FROM productos_almacen{filtro.join} "
+            f"WHERE saldo = 0{filtro.where} ORDER BY {filtro.orden}",
+            filtro.join_params + filtro.where_params,
+        ).fetchall()
+        assert [f[0] for f in filas] == ['ALM-005', 'ALM-002']
+    finally:
+        conn.close()
+
+
+def test_subcadenas_y_codigos_por_trigramas(tmp_path):
+    conn = _base_productos(tmp_path)
+    conn.execute("INSERT INTO productos_almacen (codigo, nombre) VALUES ('ALM004', 'Filtro de aire')")
+    conn.commit()
+    indice = SearchIndex()
+    try:
+        assert _codigos(conn, indice, '001') == ['ALM-001']
+        assert _codigos(conn, indice, '004') == ['ALM004']
+        assert _codigos(conn, indice, 'ltro') == ['ALM004']
+        assert _codigos(conn, indice, 'ltro air') == ['ALM004']
+        # Las coincidencias por palabra van antes que las de sólo subcadena
+        conn.execute("INSERT INTO productos_almacen (codigo, nombre) VALUES ('ALM-006', 'Portafiltro')")
+        conn.commit()
+        assert _codigos(conn, indice, 'filtro') == ['ALM004', 'ALM-006']
+    finally:
+        conn.close()
+
+
+def test_productos_del_motor_por_subcadena(tmp_path):
+    from utils.inventario_engine import InventarioEngine
+
+    inventario = InventarioEngine('almacen', str(tmp_path / "inventario_almacen.db"))
+    inventario.insertar_productos([{'codigo': 'ALM001', 'nombre': 'Filtro de aire'},
+                                   {'codigo': 'ALM002', 'nombre': 'Guantes'}])
+    try:
+        assert [p.codigo for p in inventario.productos(texto='001')] == ['ALM001']
+        assert [p.codigo for p in inventario.productos(texto='ltro')] == ['ALM001']
+    finally:
+        inventario.cerrar()
+
+
+def test_ninguna_busqueda_recorre_la_tabla(tmp_path):
+    conn = _base_productos(tmp_path)
+    indice = SearchIndex()
+    try:
+        for texto in ('ltro 001', 'gu', 'niña'):
+            filtro = indice.filtro_busqueda(conn, 'productos_almacen', texto)
+            assert 'LIKE' not in filtro.where
+            plan = [fila[-1] for fila in conn.execute(
+                f"EXPLAIN QUERY PLAN SELECT productos_almacen.id FROM productos_almacen{filtro.join} "
+                f"WHERE 1=1{filtro.where} ORDER BY {filtro.orden}", filtro.join_params + filtro.where_params)]
+            assert 'SEARCH productos_almacen USING INTEGER PRIMARY KEY (rowid=?)' in plan, plan
+            assert not any(p.startswith('SCAN productos_almacen ') or p == 'SCAN productos_almacen'
+                           for p in plan), plan
+    finally:
+        conn.close()
+
+
+def test_empleados_por_la_misma_api(tmp_path):
+    conn = connect_db(str(tmp_path / "empleados.db"))
+    conn.execute("""
+        CREATE TABLE empleados (
+            id INTEGER PRIMARY KEY, cedula TEXT UNIQUE, nombre_completo TEXT, cargo TEXT, estado BOOLEAN
+        )
+    """)
+    conn.executemany("INSERT INTO empleados (cedula, nombre_completo, cargo) VALUES (?, ?, ?)", [
+        ('1012345678', 'José Muñoz', 'Operario'),
+        ('52987654', 'Ana Pérez', 'Supervisora'),
+    ])
+    conn.commit()
+    indice = SearchIndex()
+    try:
+        def ids(texto):
+            return [fila[0] for fila in indice.buscar(conn, 'empleados', texto, limite=-1)]
+        assert ids('jose munoz') == [1]
+        assert ids('perez') == [2]
+        assert ids('987') == [2]
+        assert ids('visor') == [2]
+        conn.execute("UPDATE empleados SET nombre_completo = 'Ana Pérez Ríos' WHERE id = 2")
+        conn.commit()
+        assert ids('rios') == [2]
+    finally:
+        conn.close()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests del perfil de arranque y de la carga diferida de módulos pesados
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from utils.startup_profile import StartupProfiler, parse_importtime, perfil_importaciones
+
+SALIDA = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      1500 |       2100 |     sqlalchemy.sql
+import time:       300 |       2400 |   sqlalchemy
+import time:      5000 |       7400 | views.main_window
+"""
+
+
+def test_parse_importtime():
+    modulos = parse_importtime(SALIDA)
+    assert [m['modulo'] for m in modulos] == ['_io', 'sqlalchemy.sql', 'sqlalchemy', 'views.main_window']
+    assert [m['nivel'] for m in modulos] == [1, 2, 1, 0]
+    assert modulos[-1]['propio_ms'] == 5.0 and modulos[-1]['acumulado_ms'] == 7.4
+
+
+def test_ventana_principal_no_importa_modulos_pesados():
+    perfil = perfil_importaciones('views.main_window')
+    assert perfil['cantidad'] > 0
+    assert perfil['pesados'] == []
+
+
+def test_al_pintar_registra_primera_ventana():
+    class RootFalso:
+        def after_idle(self, funcion):
+            funcion()
+
+    profiler = StartupProfiler()
+    profiler.marcar('importaciones')
+    tiempos = []
+    profiler.al_pintar(RootFalso(), tiempos.append)
+    assert tiempos == [profiler.primera_ventana]
+    assert [f for f, _ in profiler.fases] == ['importaciones', 'primera_ventana']
+    assert 'primera ventana' in profiler.reporte()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests del journal de sincronización de asistencias
+"""
+
+import gzip
+import itertools
+import json
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from utils.railway_sync import RailwaySync
+from utils.sync_journal import SyncJournal, aplicar_en_db, aplicar_eventos, reproducir
+from utils.sync_telemetry import SyncTelemetry
+
+
+def _evento(node, seq, ts, entrada=None, salida=None, ip=None):
+    return {
+        'id': f"{node}:{seq}", 'node': node, 'seq': seq, 'ts': ts,
+        'cedula': '123', 'fecha': '2025-03-01',
+        'hora_entrada': entrada, 'hora_salida': salida, 'ip_registro': ip
+    }
+
+
+def test_fusion_determinista_en_cualquier_orden():
+    """El estado fusionado no depende del orden de llegada de los eventos"""
+    eventos = [
+        _evento('local', 1, 10, entrada='2025-03-01 07:05:00.000000', ip='10.0.0.2'),
+        _evento('railway', 1, 20, entrada='2025-03-01 07:00:00.000000', ip='1.1.1.1'),
+        _evento('railway', 2, 30, salida='2025-03-01 16:00:00.000000'),
+        _evento('local', 2, 40, salida='2025-03-01 17:30:00.000000'),
+    ]
+    resultados = {
+        json.dumps(reproducir(orden)[('123', '2025-03-01')], sort_keys=True)
+        for orden in itertools.permutations(eventos)
+    }
+    assert len(resultados) == 1
+
+    registro = json.loads(resultados.pop())
+    assert registro['hora_entrada'] == '2025-03-01 07:00:00.000000'
+    assert registro['hora_salida'] == '2025-03-01 17:30:00.000000'
+    assert registro['ip_registro'] == '1.1.1.1'
+    assert registro['tipo_registro'] == 'salida'
+
+
+def test_journal_se_reproduce_tras_reinicio(tmp_path):
+    """Un journal reabierto reconstruye el mismo estado e ignora líneas truncadas"""
+    path = str(tmp_path / 'asistencia_journal.ndjson')
+    journal = SyncJournal(path, node_id='local')
+    journal.registrar('123', '2025-03-01', hora_entrada='2025-03-01T07:00:00')
+    journal.registrar('123', '2025-03-01', hora_salida='2025-03-01T16:00:00')
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"id":"local:3","node"')
+
+    reabierto = SyncJournal(path, node_id='local')
+    assert reabierto.journal_id == journal.journal_id
+    assert reabierto.estado() == journal.estado()
+    assert reabierto.registrar('456', '2025-03-01')['seq'] == 3
+    assert len(SyncJournal(path, node_id='local')) == 3
+
+
+def test_aplicar_en_db_es_idempotente(tmp_path):
+    """Aplicar dos veces los mismos eventos deja una sola fila fusionada"""
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE empleados (id INTEGER PRIMARY KEY, cedula TEXT, nombre_completo TEXT, estado INTEGER)")
+    conn.execute("""
+        CREATE TABLE asistencias (id INTEGER PRIMARY KEY, empleado_id INTEGER, fecha DATE,
+            hora_entrada DATETIME, hora_salida DATETIME, tipo_registro TEXT,
+            token_qr TEXT, ip_registro TEXT, dispositivo TEXT)
+    """)
+    conn.execute("INSERT INTO empleados (cedula, nombre_completo, estado) VALUES ('123', 'Ana', 1)")
+    conn.execute("""
+        INSERT INTO asistencias (empleado_id, fecha, hora_entrada, tipo_registro)
+        VALUES (1, '2025-03-01', '2025-03-01 07:10:00', 'entrada')
+    """)
+
+    journal = SyncJournal(str(tmp_path / 'j.ndjson'), node_id='local')
+    eventos = [_evento('railway', 1, 5, salida='2025-03-01T16:00:00')]
+    assert aplicar_eventos(journal, conn, eventos) == 1
+    assert aplicar_eventos(journal, conn, eventos) == 0
+    aplicar_en_db(conn, journal.estado().values())
+
+    filas = conn.execute("SELECT hora_entrada, hora_salida, tipo_registro FROM asistencias").fetchall()
+    assert filas == [('2025-03-01 07:10:00.000000', '2025-03-01 16:00:00.000000', 'salida')]
+
+
+def test_snapshot_solo_empleados_y_asistencias_aunque_haya_indice_fts(tmp_path):
+    """El snapshot copia las dos tablas (con sus índices) a una base nueva, sin FTS ni otras tablas"""
+    origen = str(tmp_path / 'empleados.db')
+    conn = sqlite3.connect(origen)
+    conn.execute("CREATE TABLE empleados (id INTEGER PRIMARY KEY, cedula TEXT, nombre_completo TEXT, cargo TEXT)")
+    conn.execute("CREATE TABLE asistencias (id INTEGER PRIMARY KEY, empleado_id INTEGER, fecha DATE)")
+    conn.execute("CREATE INDEX idx_asistencias_fecha ON asistencias (fecha)")
+    conn.execute("CREATE TABLE contratos (id INTEGER PRIMARY KEY)")
+    conn.execute("INSERT INTO empleados (cedula, nombre_completo, cargo) VALUES ('123', 'José Muñoz', 'Operario')")
+    conn.execute("INSERT INTO asistencias (empleado_id, fecha) VALUES (1, '2025-03-01')")
+    # Índice FTS5 con sus tablas sombra, que no pueden borrarse una a una
+    conn.execute("CREATE VIRTUAL TABLE empleados_fts USING fts5(nombre_completo, content='empleados', "
+                 "content_rowid='id')")
+    conn.execute("INSERT INTO empleados_fts(empleados_fts) VALUES ('rebuild')")
+    conn.commit()
+    conn.close()
+
+    snapshot = str(tmp_path / 'snapshot.db.gz')
+    sync = RailwaySync(local_db_path=origen, telemetry=SyncTelemetry(str(tmp_path / 'telemetria.db')))
+    assert len(sync.create_snapshot(snapshot)) == 64
+
+    restaurado = tmp_path / 'restaurado.db'
+    with gzip.open(snapshot, 'rb') as gz:
+        restaurado.write_bytes(gz.read())
+    conn = sqlite3.connect(str(restaurado))
+    esquema = {fila[0] for fila in conn.execute("SELECT name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'")}
+    assert esquema == {'empleados', 'asistencias', 'idx_asistencias_fecha'}
+    assert conn.execute("SELECT nombre_completo FROM empleados").fetchall() == [('José Muñoz',)]
+    assert conn.execute("SELECT COUNT(*) FROM asistencias").fetchone()[0] == 1
+    conn.close()
+
+
+def test_sync_fallido_registra_el_lag_pendiente(tmp_path):
+    """Tras un intercambio fallido el resumen no sigue mostrando el último lag bueno"""
+    telemetria = SyncTelemetry(str(tmp_path / 'telemetria.db'))
+    with telemetria.start('journal') as run:
+        run.lag_segundos, run.exito = 0.0, True
+
+    journal = SyncJournal(str(tmp_path / 'asistencia_journal.ndjson'), node_id='local')
+    journal.registrar('123', '2025-03-01', hora_entrada='2025-03-01T07:00:00')
+    sync = RailwaySync(railway_url='http://127.0.0.1:9', local_db_path=str(tmp_path / 'empleados.db'),
+                       telemetry=telemetria)
+    assert sync.sync_journal(journal) is False
+
+    ultima = telemetria.get_runs(limit=1)[0]
+    assert ultima['exito'] == 0 and ultima['lag_s'] is not None
+    assert telemetria.get_summary()['lag_s'] == ultima['lag_s']